@@ -0,0 +1,83 @@
+"""materialize reminder notifications by (reminder_id, fire_at)
+
+Revision ID: a6c9d1e2f235
+Revises: f5b8c3d0e124
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c9d1e2f235'
+down_revision: Union[str, Sequence[str], None] = 'f5b8c3d0e124'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing reminders keep timezone_offset/notify_at NULL; they are scheduled
+    # with the client's offset on the owner's next notification poll.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    if 'reminders' in existing_tables:
+        columns = {col["name"] for col in inspector.get_columns('reminders')}
+        if 'timezone_offset' not in columns:
+            op.add_column('reminders', sa.Column('timezone_offset', sa.Integer(), nullable=True))
+        if 'notify_at' not in columns:
+            op.add_column('reminders', sa.Column('notify_at', sa.DateTime(), nullable=True))
+        indexes = {ix["name"] for ix in inspector.get_indexes('reminders')}
+        if 'ix_reminders_pending_notify_at' not in indexes:
+            op.create_index('ix_reminders_pending_notify_at', 'reminders', ['is_notified', 'notify_at'], unique=False)
+
+    if 'notifications' in existing_tables:
+        columns = {col["name"] for col in inspector.get_columns('notifications')}
+        if 'reminder_id' not in columns:
+            op.add_column('notifications', sa.Column('reminder_id', sa.Integer(), nullable=True))
+        if 'fire_at' not in columns:
+            op.add_column('notifications', sa.Column('fire_at', sa.DateTime(), nullable=True))
+        indexes = {ix["name"] for ix in inspector.get_indexes('notifications')}
+        if 'uq_notifications_reminder_fire_at' not in indexes:
+            op.create_index(
+                'uq_notifications_reminder_fire_at',
+                'notifications',
+                ['reminder_id', 'fire_at'],
+                unique=True,
+            )
+        if 'ix_notifications_user_id_id' not in indexes:
+            op.create_index('ix_notifications_user_id_id', 'notifications', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    if 'notifications' in existing_tables:
+        indexes = {ix["name"] for ix in inspector.get_indexes('notifications')}
+        if 'ix_notifications_user_id_id' in indexes:
+            op.drop_index('ix_notifications_user_id_id', table_name='notifications')
+        if 'uq_notifications_reminder_fire_at' in indexes:
+            op.drop_index('uq_notifications_reminder_fire_at', table_name='notifications')
+        columns = {col["name"] for col in inspector.get_columns('notifications')}
+        with op.batch_alter_table('notifications') as batch_op:
+            if 'fire_at' in columns:
+                batch_op.drop_column('fire_at')
+            if 'reminder_id' in columns:
+                batch_op.drop_column('reminder_id')
+
+    if 'reminders' in existing_tables:
+        indexes = {ix["name"] for ix in inspector.get_indexes('reminders')}
+        if 'ix_reminders_pending_notify_at' in indexes:
+            op.drop_index('ix_reminders_pending_notify_at', table_name='reminders')
+        columns = {col["name"] for col in inspector.get_columns('reminders')}
+        with op.batch_alter_table('reminders') as batch_op:
+            if 'notify_at' in columns:
+                batch_op.drop_column('notify_at')
+            if 'timezone_offset' in columns:
+                batch_op.drop_column('timezone_offset')
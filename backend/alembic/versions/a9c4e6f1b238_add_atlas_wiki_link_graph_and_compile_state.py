@@ -0,0 +1,185 @@
+"""add atlas wiki tables, link graph and compile state
+
+Revision ID: a9c4e6f1b238
+Revises: c8e1f3a4b457
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e6f1b238'
+down_revision: Union[str, Sequence[str], None] = 'c8e1f3a4b457'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _outbound(value) -> list[str]:
+    try:
+        data = json.loads(value or "[]")
+    except (TypeError, ValueError):
+        return []
+    return [str(v).strip() for v in data if str(v).strip()] if isinstance(data, list) else []
+
+
+def _backfill_links(bind) -> None:
+    rows = bind.execute(sa.text("SELECT user_id, path, outbound_links FROM atlas_wiki_pages")).fetchall()
+    edges = {(user_id, path, target) for user_id, path, out in rows for target in _outbound(out)}
+    if edges:
+        bind.execute(
+            sa.text("INSERT INTO atlas_wiki_links (user_id, source_path, target_path) VALUES (:u, :s, :t)"),
+            [{"u": u, "s": s, "t": t} for u, s, t in edges],
+        )
+    op.execute("""
+        UPDATE atlas_wiki_pages SET inbound_links_count = (
+            SELECT COUNT(*) FROM atlas_wiki_links l
+            WHERE l.user_id = atlas_wiki_pages.user_id AND l.target_path = atlas_wiki_pages.path
+        )
+    """)
+
+
+def upgrade() -> None:
+    # services/atlas_wiki_service.py keeps atlas_wiki_links and the inbound
+    # counts current on every page write, and records per-document compile
+    # hashes in atlas_wiki_compile_state. Wiki pages are searched through
+    # search_documents (entity_type 'wiki_page').
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    had_pages = 'atlas_wiki_pages' in existing_tables
+
+    if not had_pages:
+        op.create_table(
+            'atlas_wiki_pages',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('path', sa.String(length=500), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('page_type', sa.String(length=30), nullable=False),
+            sa.Column('content', sa.Text(), nullable=True),
+            sa.Column('summary', sa.Text(), nullable=True),
+            sa.Column('tags', sa.Text(), nullable=True),
+            sa.Column('source_doc_ids', sa.Text(), nullable=True),
+            sa.Column('source_refs', sa.Text(), nullable=True),
+            sa.Column('outbound_links', sa.Text(), nullable=True),
+            sa.Column('inbound_links_count', sa.Integer(), nullable=True),
+            sa.Column('last_compiled_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'path', name='uq_atlas_wiki_pages_user_path'),
+        )
+        op.create_index('ix_atlas_wiki_pages_id', 'atlas_wiki_pages', ['id'], unique=False)
+        op.create_index('ix_atlas_wiki_pages_user_id', 'atlas_wiki_pages', ['user_id'], unique=False)
+        op.create_index('ix_atlas_wiki_pages_user_updated', 'atlas_wiki_pages', ['user_id', 'updated_at'], unique=False)
+
+    if 'atlas_wiki_links' not in existing_tables:
+        op.create_table(
+            'atlas_wiki_links',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('source_path', sa.String(length=500), nullable=False),
+            sa.Column('target_path', sa.String(length=500), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id', 'source_path', 'target_path'),
+        )
+        op.create_index('ix_atlas_wiki_links_user_target', 'atlas_wiki_links', ['user_id', 'target_path'], unique=False)
+        if had_pages:
+            _backfill_links(bind)
+
+    if 'atlas_wiki_compile_state' not in existing_tables:
+        op.create_table(
+            'atlas_wiki_compile_state',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('source_key', sa.String(length=120), nullable=False),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('page_path', sa.String(length=500), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=True),
+            sa.Column('summary', sa.Text(), nullable=True),
+            sa.Column('topics', sa.Text(), nullable=True),
+            sa.Column('entities', sa.Text(), nullable=True),
+            sa.Column('compiled_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id', 'source_key'),
+        )
+
+    if 'atlas_wiki_events' not in existing_tables:
+        op.create_table(
+            'atlas_wiki_events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('event_type', sa.String(length=40), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('details', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_atlas_wiki_events_id', 'atlas_wiki_events', ['id'], unique=False)
+        op.create_index('ix_atlas_wiki_events_user_id', 'atlas_wiki_events', ['user_id'], unique=False)
+        op.create_index('ix_atlas_wiki_events_created_at', 'atlas_wiki_events', ['created_at'], unique=False)
+
+    if 'atlas_wiki_contradictions' not in existing_tables:
+        op.create_table(
+            'atlas_wiki_contradictions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('topic', sa.String(length=255), nullable=False),
+            sa.Column('page_a_path', sa.String(length=500), nullable=False),
+            sa.Column('page_b_path', sa.String(length=500), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('evidence_a', sa.Text(), nullable=True),
+            sa.Column('evidence_b', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('resolved_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_atlas_wiki_contradictions_id', 'atlas_wiki_contradictions', ['id'], unique=False)
+        op.create_index('ix_atlas_wiki_contradictions_user_id', 'atlas_wiki_contradictions', ['user_id'], unique=False)
+        op.create_index('ix_atlas_wiki_contradictions_status', 'atlas_wiki_contradictions', ['status'], unique=False)
+
+    if 'atlas_wiki_schemas' not in existing_tables:
+        op.create_table(
+            'atlas_wiki_schemas',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('schema_markdown', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id'),
+        )
+        op.create_index('ix_atlas_wiki_schemas_id', 'atlas_wiki_schemas', ['id'], unique=False)
+
+    if had_pages and 'search_documents' in existing_tables:
+        op.execute("""
+            INSERT INTO search_documents (entity_type, entity_id, owner_id, is_public, title, body, created_at)
+            SELECT 'wiki_page', p.id, p.user_id, false, substr(COALESCE(p.title, ''), 1, 255),
+                   substr(p.path || ' ' || COALESCE(p.summary, '') || ' ' || COALESCE(p.content, ''), 1, 4000),
+                   p.created_at
+            FROM atlas_wiki_pages p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM search_documents d WHERE d.entity_type = 'wiki_page' AND d.entity_id = p.id
+            )
+        """)
+
+
+def downgrade() -> None:
+    # The page, event, contradiction and schema tables may predate this
+    # revision, so only the tables it introduced are dropped.
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    if 'search_documents' in existing_tables:
+        op.execute("DELETE FROM search_documents WHERE entity_type = 'wiki_page'")
+    if 'atlas_wiki_compile_state' in existing_tables:
+        op.drop_table('atlas_wiki_compile_state')
+    if 'atlas_wiki_links' in existing_tables:
+        op.drop_index('ix_atlas_wiki_links_user_target', table_name='atlas_wiki_links')
+        op.drop_table('atlas_wiki_links')
@@ -0,0 +1,65 @@
+"""add podcast_session_messages
+
+Revision ID: b3d7f2a9c561
+Revises: a9c4e6f1b238
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d7f2a9c561'
+down_revision: Union[str, Sequence[str], None] = 'a9c4e6f1b238'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Podcast conversations are appended here one entry per row. Existing
+    # podcast_sessions.conversation blobs are moved over by
+    # services/podcast_agent.py the first time a session is loaded.
+    bind = op.get_bind()
+    if 'podcast_session_messages' in set(sa.inspect(bind).get_table_names()):
+        return
+    op.create_table(
+        'podcast_session_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.String(length=64), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=True),
+        sa.Column('entry_type', sa.String(length=30), nullable=True),
+        sa.Column('entry', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['podcast_sessions.session_id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_podcast_session_messages_session_id_id',
+        'podcast_session_messages',
+        ['session_id', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if 'podcast_session_messages' not in set(sa.inspect(bind).get_table_names()):
+        return
+    rows = bind.execute(sa.text("SELECT session_id, entry FROM podcast_session_messages ORDER BY session_id, id")).fetchall()
+    conversations: dict[str, list] = {}
+    for session_id, entry in rows:
+        try:
+            conversations.setdefault(session_id, []).append(json.loads(entry or "{}"))
+        except ValueError:
+            continue
+    for session_id, entries in conversations.items():
+        bind.execute(
+            sa.text("UPDATE podcast_sessions SET conversation = :conversation WHERE session_id = :session_id"),
+            {"conversation": json.dumps(entries, ensure_ascii=False), "session_id": session_id},
+        )
+    op.drop_index('ix_podcast_session_messages_session_id_id', table_name='podcast_session_messages')
+    op.drop_table('podcast_session_messages')
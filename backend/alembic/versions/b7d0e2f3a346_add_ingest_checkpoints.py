@@ -0,0 +1,49 @@
+"""add ingest_checkpoints for the resumable ingest pipeline
+
+Revision ID: b7d0e2f3a346
+Revises: a6c9d1e2f235
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d0e2f3a346'
+down_revision: Union[str, Sequence[str], None] = 'a6c9d1e2f235'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Entries recorded in ingest/state.json are imported on the next run.
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+
+    if 'ingest_checkpoints' not in existing_tables:
+        op.create_table(
+            'ingest_checkpoints',
+            sa.Column('slug', sa.String(length=200), nullable=False),
+            sa.Column('doc_id', sa.String(length=36), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('resolved_url', sa.String(length=500), nullable=True),
+            sa.Column('download_path', sa.String(length=500), nullable=True),
+            sa.Column('chunks_path', sa.String(length=500), nullable=True),
+            sa.Column('chunk_count', sa.Integer(), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('slug'),
+        )
+        op.create_index('ix_ingest_checkpoints_status', 'ingest_checkpoints', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    if 'ingest_checkpoints' in existing_tables:
+        op.drop_index('ix_ingest_checkpoints_status', table_name='ingest_checkpoints')
+        op.drop_table('ingest_checkpoints')
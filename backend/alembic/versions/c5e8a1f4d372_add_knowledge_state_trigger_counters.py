@@ -0,0 +1,65 @@
+"""add trigger counters and (user_id, concept_id) index to student_knowledge_states
+
+Revision ID: c5e8a1f4d372
+Revises: b3d7f2a9c561
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a1f4d372'
+down_revision: Union[str, Sequence[str], None] = 'b3d7f2a9c561'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Concepts already past the mastery milestone were notified by the old
+    # per-event check, so they are marked as notified. The daily wrong-answer
+    # counter starts empty and fills from the next flashcard review.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'student_knowledge_states' not in set(inspector.get_table_names()):
+        return
+
+    columns = {col["name"] for col in inspector.get_columns('student_knowledge_states')}
+    if 'flashcard_wrong_day' not in columns:
+        op.add_column('student_knowledge_states', sa.Column('flashcard_wrong_day', sa.Date(), nullable=True))
+    if 'flashcard_wrong_count' not in columns:
+        op.add_column('student_knowledge_states', sa.Column('flashcard_wrong_count', sa.Integer(), nullable=True))
+    if 'milestone_notified_at' not in columns:
+        op.add_column('student_knowledge_states', sa.Column('milestone_notified_at', sa.DateTime(), nullable=True))
+        op.execute(
+            "UPDATE student_knowledge_states SET milestone_notified_at = last_updated "
+            "WHERE p_mastery > 0.85 AND interaction_count >= 3"
+        )
+
+    indexes = {ix["name"] for ix in inspector.get_indexes('student_knowledge_states')}
+    if 'ix_student_knowledge_states_user_concept' not in indexes:
+        op.create_index(
+            'ix_student_knowledge_states_user_concept',
+            'student_knowledge_states',
+            ['user_id', 'concept_id'],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'student_knowledge_states' not in set(inspector.get_table_names()):
+        return
+
+    indexes = {ix["name"] for ix in inspector.get_indexes('student_knowledge_states')}
+    if 'ix_student_knowledge_states_user_concept' in indexes:
+        op.drop_index('ix_student_knowledge_states_user_concept', table_name='student_knowledge_states')
+    columns = {col["name"] for col in inspector.get_columns('student_knowledge_states')}
+    with op.batch_alter_table('student_knowledge_states') as batch_op:
+        for name in ('milestone_notified_at', 'flashcard_wrong_count', 'flashcard_wrong_day'):
+            if name in columns:
+                batch_op.drop_column(name)
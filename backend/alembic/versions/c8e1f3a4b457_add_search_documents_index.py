@@ -0,0 +1,144 @@
+"""add search_documents full-text index for search_content
+
+Revision ID: c8e1f3a4b457
+Revises: b7d0e2f3a346
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f3a4b457'
+down_revision: Union[str, Sequence[str], None] = 'b7d0e2f3a346'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+        title, body,
+        content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE search_documents ADD COLUMN tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_search_documents_tsv ON search_documents USING gin (tsv)",
+    "CREATE INDEX ix_search_documents_title_trgm ON search_documents USING gin (title gin_trgm_ops)",
+]
+
+
+def _backfill(bind) -> None:
+    if bind.dialect.name == 'sqlite':
+        newline, aggregate = "char(10)", "group_concat(question_text, char(10))"
+    else:
+        newline, aggregate = "chr(10)", "string_agg(question_text, chr(10))"
+    columns = "entity_type, entity_id, owner_id, is_public, title, body, created_at"
+    op.execute(f"""
+        INSERT INTO search_documents ({columns})
+        SELECT 'note', id, user_id, COALESCE(is_public, false), substr(COALESCE(title, ''), 1, 255),
+               substr(COALESCE(content, ''), 1, 4000), created_at
+        FROM notes WHERE user_id IS NOT NULL AND COALESCE(is_deleted, false) = false
+    """)
+    op.execute(f"""
+        INSERT INTO search_documents ({columns})
+        SELECT 'flashcard_set', id, user_id, COALESCE(is_public, false), substr(COALESCE(title, ''), 1, 255),
+               substr(COALESCE(description, ''), 1, 4000), created_at
+        FROM flashcard_sets WHERE user_id IS NOT NULL
+    """)
+    op.execute(f"""
+        INSERT INTO search_documents ({columns})
+        SELECT 'chat', id, user_id, false, substr(COALESCE(title, ''), 1, 255), '', created_at
+        FROM chat_sessions WHERE user_id IS NOT NULL
+    """)
+    op.execute(f"""
+        INSERT INTO search_documents ({columns})
+        SELECT 'question_set', qs.id, qs.user_id, false, substr(COALESCE(qs.title, ''), 1, 255),
+               substr(COALESCE(qs.description, '') || {newline} || COALESCE(
+                   (SELECT {aggregate} FROM questions q WHERE q.question_set_id = qs.id), ''
+               ), 1, 4000),
+               qs.created_at
+        FROM question_sets qs WHERE qs.user_id IS NOT NULL
+    """)
+
+
+def upgrade() -> None:
+    # services/search_index.py keeps these rows in step with notes, flashcard
+    # sets, chats and question sets from a Session after_flush hook.
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    if 'search_documents' in existing_tables:
+        return
+
+    op.create_table(
+        'search_documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('is_public', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('uq_search_documents_entity', 'search_documents', ['entity_type', 'entity_id'], unique=True)
+    op.create_index('ix_search_documents_owner_type', 'search_documents', ['owner_id', 'entity_type'], unique=False)
+
+    statements = SQLITE_FTS if bind.dialect.name == 'sqlite' else POSTGRES_INDEX
+    for statement in statements:
+        op.execute(statement)
+
+    # search_index counts a page's questions per set; flashcards already has
+    # ix_flashcards_set_created and chat_messages ix_chat_messages_session_id_id.
+    if 'questions' in existing_tables:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_questions_question_set_id ON questions (question_set_id)")
+
+    required = {'notes', 'flashcard_sets', 'chat_sessions', 'question_sets', 'questions'}
+    if required <= existing_tables:
+        _backfill(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    op.execute("DROP INDEX IF EXISTS ix_questions_question_set_id")
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('search_documents_ai', 'search_documents_ad', 'search_documents_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS search_documents_fts")
+    if 'search_documents' in existing_tables:
+        op.drop_index('ix_search_documents_owner_type', table_name='search_documents')
+        op.drop_index('uq_search_documents_entity', table_name='search_documents')
+        op.drop_table('search_documents')
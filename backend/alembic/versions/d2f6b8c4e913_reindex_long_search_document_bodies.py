@@ -0,0 +1,63 @@
+"""re-index search_documents bodies that were clipped at 4000 characters
+
+Revision ID: d2f6b8c4e913
+Revises: c5e8a1f4d372
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8c4e913'
+down_revision: Union[str, Sequence[str], None] = 'c5e8a1f4d372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BODY_CHARS = 200000
+
+
+def upgrade() -> None:
+    # services/search_index.py now indexes up to BODY_CHARS of each body.
+    # Only rows whose source text ran past the old 4000-character clip are
+    # rewritten; the FTS5 triggers (SQLite) and the generated tsv column
+    # (Postgres) follow the UPDATE.
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    if 'search_documents' not in existing_tables:
+        return
+    if bind.dialect.name == 'sqlite':
+        newline, aggregate = "char(10)", "group_concat(question_text, char(10))"
+    else:
+        newline, aggregate = "chr(10)", "string_agg(question_text, chr(10))"
+
+    sources = {
+        'note': ('notes', "COALESCE(s.content, '')"),
+        'flashcard_set': ('flashcard_sets', "COALESCE(s.description, '')"),
+        'question_set': (
+            'question_sets',
+            f"COALESCE(s.description, '') || {newline} || COALESCE("
+            f"(SELECT {aggregate} FROM questions q WHERE q.question_set_id = s.id), '')",
+        ),
+        'wiki_page': (
+            'atlas_wiki_pages',
+            f"COALESCE(s.path, '') || {newline} || COALESCE(s.summary, '') || {newline} || COALESCE(s.content, '')",
+        ),
+    }
+    for entity_type, (table, body) in sources.items():
+        if table not in existing_tables or (entity_type == 'question_set' and 'questions' not in existing_tables):
+            continue
+        op.execute(f"""
+            UPDATE search_documents
+            SET body = (SELECT substr({body}, 1, {BODY_CHARS}) FROM {table} s WHERE s.id = search_documents.entity_id)
+            WHERE entity_type = '{entity_type}'
+              AND entity_id IN (SELECT s.id FROM {table} s WHERE length({body}) > 4000)
+        """)
+
+
+def downgrade() -> None:
+    # Longer bodies are still valid rows for the previous revision.
+    pass
@@ -0,0 +1,38 @@
+"""add chat_messages (chat_session_id, id) keyset index
+
+Revision ID: e4a7b2c9d013
+Revises: c7d8e9f0a1b2
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7b2c9d013'
+down_revision: Union[str, Sequence[str], None] = 'c7d8e9f0a1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'chat_messages' not in set(inspector.get_table_names()):
+        return
+    existing_indexes = {ix["name"] for ix in inspector.get_indexes('chat_messages')}
+    if 'ix_chat_messages_session_id_id' not in existing_indexes:
+        op.create_index('ix_chat_messages_session_id_id', 'chat_messages', ['chat_session_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'chat_messages' not in set(inspector.get_table_names()):
+        return
+    existing_indexes = {ix["name"] for ix in inspector.get_indexes('chat_messages')}
+    if 'ix_chat_messages_session_id_id' in existing_indexes:
+        op.drop_index('ix_chat_messages_session_id_id', table_name='chat_messages')
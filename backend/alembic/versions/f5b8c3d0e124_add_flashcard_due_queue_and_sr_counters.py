@@ -0,0 +1,82 @@
+"""add flashcard_due_queue and flashcard_sr_counters
+
+Revision ID: f5b8c3d0e124
+Revises: e4a7b2c9d013
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b8c3d0e124'
+down_revision: Union[str, Sequence[str], None] = 'e4a7b2c9d013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are materialized per user on first read, so no backfill is needed.
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+
+    if 'flashcard_due_queue' not in existing_tables:
+        op.create_table(
+            'flashcard_due_queue',
+            sa.Column('card_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('set_id', sa.Integer(), nullable=False),
+            sa.Column('due_at', sa.DateTime(), nullable=True),
+            sa.Column('sr_state', sa.String(length=20), nullable=True),
+            sa.Column('interval', sa.Float(), nullable=True),
+            sa.Column('lapses', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('card_id'),
+        )
+        op.create_index('ix_flashcard_due_queue_set_id', 'flashcard_due_queue', ['set_id'], unique=False)
+        op.create_index('ix_flashcard_due_queue_user_due', 'flashcard_due_queue', ['user_id', 'due_at'], unique=False)
+        op.create_index('ix_flashcard_due_queue_user_lapses', 'flashcard_due_queue', ['user_id', 'lapses'], unique=False)
+        op.create_index(
+            'ix_flashcard_due_queue_user_state_interval',
+            'flashcard_due_queue',
+            ['user_id', 'sr_state', 'interval'],
+            unique=False,
+        )
+
+    if 'flashcard_sr_counters' not in existing_tables:
+        op.create_table(
+            'flashcard_sr_counters',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('total_cards', sa.Integer(), nullable=True),
+            sa.Column('new_count', sa.Integer(), nullable=True),
+            sa.Column('learning_count', sa.Integer(), nullable=True),
+            sa.Column('review_count', sa.Integer(), nullable=True),
+            sa.Column('relearning_count', sa.Integer(), nullable=True),
+            sa.Column('total_reviews', sa.Integer(), nullable=True),
+            sa.Column('total_correct', sa.Integer(), nullable=True),
+            sa.Column('total_lapses', sa.Integer(), nullable=True),
+            sa.Column('ease_hard', sa.Integer(), nullable=True),
+            sa.Column('ease_difficult', sa.Integer(), nullable=True),
+            sa.Column('ease_normal', sa.Integer(), nullable=True),
+            sa.Column('ease_easy', sa.Integer(), nullable=True),
+            sa.Column('ease_very_easy', sa.Integer(), nullable=True),
+            sa.Column('review_interval_sum', sa.Float(), nullable=True),
+            sa.Column('mature_count', sa.Integer(), nullable=True),
+            sa.Column('rebuilt_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('user_id'),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    if 'flashcard_sr_counters' in existing_tables:
+        op.drop_table('flashcard_sr_counters')
+    if 'flashcard_due_queue' in existing_tables:
+        op.drop_index('ix_flashcard_due_queue_user_state_interval', table_name='flashcard_due_queue')
+        op.drop_index('ix_flashcard_due_queue_user_lapses', table_name='flashcard_due_queue')
+        op.drop_index('ix_flashcard_due_queue_user_due', table_name='flashcard_due_queue')
+        op.drop_index('ix_flashcard_due_queue_set_id', table_name='flashcard_due_queue')
+        op.drop_table('flashcard_due_queue')
@@ -0,0 +1,146 @@
+"""Time /get_chat_messages against sessions of increasing length.
+
+    python -m benchmarks.chat_history --sizes 100 1000 10000 --limit 50
+
+Seeds a throwaway SQLite database with one chat session per size and reports
+p50/p95 latency for the legacy full-history response, the first keyset page
+(cold and cached), a deep page via `before`, and a 304 revalidation. The
+paged rows should stay flat as the session grows; the full rows grow linearly.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-that-is-long-enough-for-jwt")
+
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from routes import chat
+from services import redis_cache
+
+TABLES = [
+    models.User.__table__,
+    models.ChatFolder.__table__,
+    models.ChatSession.__table__,
+    models.ChatMessage.__table__,
+    models.ChatTutorState.__table__,
+]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _seed(db, sizes: list[int]) -> None:
+    db.add(models.User(id=1, username="bench", email="bench@example.com"))
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for session_id, size in enumerate(sizes, start=1):
+        db.add(models.ChatSession(id=session_id, user_id=1, title=f"{size} messages"))
+        db.bulk_insert_mappings(models.ChatMessage, [
+            {
+                "chat_session_id": session_id,
+                "user_id": 1,
+                "user_message": f"Question {i} about photosynthesis and the Calvin cycle?",
+                "ai_response": "An answer paragraph. " * 20,
+                "timestamp": start + timedelta(seconds=i),
+            }
+            for i in range(size)
+        ])
+    db.commit()
+
+
+def _call(db, user, session_id: int, etag=None, **params):
+    request = SimpleNamespace(headers={"if-none-match": etag} if etag else {})
+    response = Response()
+    body = chat.get_chat_messages(
+        request, response, chat_id=str(session_id),
+        limit=params.get("limit"), before=params.get("before"),
+        current_user=user, db=db,
+    )
+    return body, response
+
+
+def _time(fn, repeats: int) -> dict:
+    latencies = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+    }
+
+
+def run(sizes: list[int], limit: int, repeats: int) -> list[dict]:
+    redis_cache._redis_client = None
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'chat_bench.db'}")
+        Base.metadata.create_all(engine, tables=TABLES)
+        db = sessionmaker(bind=engine)()
+        _seed(db, sizes)
+        user = db.get(models.User, 1)
+
+        rows = []
+        for session_id, size in enumerate(sizes, start=1):
+            _, first = _call(db, user, session_id, limit=limit)
+            etag = first.headers["ETag"]
+            deep_cursor = size // 2
+
+            def cold_page():
+                redis_cache.invalidate_chat_page(session_id)
+                _call(db, user, session_id, limit=limit)
+
+            rows.append({
+                "messages": size,
+                "full": _time(lambda: _call(db, user, session_id), max(3, repeats // 10)),
+                "first_page_cold": _time(cold_page, repeats),
+                "first_page_cached": _time(lambda: _call(db, user, session_id, limit=limit), repeats),
+                "deep_page": _time(lambda: _call(db, user, session_id, limit=limit, before=deep_cursor), repeats),
+                "not_modified": _time(lambda: _call(db, user, session_id, etag=etag, limit=limit), repeats),
+            })
+        db.close()
+        engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat history pagination")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    rows = run(args.sizes, args.limit, args.repeats)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    columns = ["full", "first_page_cold", "first_page_cached", "deep_page", "not_modified"]
+    header = f"{'messages':>9} " + " ".join(f"{c + ' p50':>22}" for c in columns)
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['messages']:>9} " + " ".join(f"{row[c]['p50_ms']:>22}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Compare embedding backends on this machine.
+
+    python -m benchmarks.embedding_backends --backends torch onnx onnx-int8
+
+Reports bulk throughput (docs/sec, the add_document_chunks path) and p50/p95
+single-query latency (the search_context path) per backend and model, plus
+cosine parity against the torch vectors.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import numpy as np
+
+from services import embedding_service
+
+SAMPLE_SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The derivative of a function measures its instantaneous rate of change.",
+    "Newton's second law states that force equals mass times acceleration.",
+    "Mitochondria generate most of the cell's supply of adenosine triphosphate.",
+    "A binary search tree keeps keys ordered so lookups take logarithmic time.",
+    "Supply and demand determine the equilibrium price in a competitive market.",
+    "The French Revolution began in 1789 and reshaped European politics.",
+    "Covalent bonds form when atoms share pairs of valence electrons.",
+]
+
+
+def _corpus(size: int) -> list[str]:
+    return [f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]} (chunk {i})" for i in range(size)]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def run(models: list[str], backends: list[str], docs: int, queries: int) -> list[dict]:
+    corpus = _corpus(docs)
+    results = []
+    for model_name in models:
+        reference = None
+        for backend in backends:
+            started = time.perf_counter()
+            try:
+                encoder = embedding_service.load_encoder(model_name, backend)
+            except Exception as e:
+                results.append({"model": model_name, "backend": backend, "error": str(e)})
+                continue
+            load_s = time.perf_counter() - started
+
+            embedding_service.encode_many(encoder, corpus[:16])
+
+            started = time.perf_counter()
+            vectors = np.asarray(embedding_service.encode_many(encoder, corpus), dtype=np.float32)
+            bulk_s = time.perf_counter() - started
+
+            latencies = []
+            for i in range(queries):
+                query = SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]
+                t0 = time.perf_counter()
+                embedding_service.encode_many(encoder, [query])
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+            row = {
+                "model": model_name,
+                "backend": backend,
+                "load_s": round(load_s, 2),
+                "docs_per_sec": round(docs / bulk_s, 1),
+                "query_p50_ms": round(statistics.median(latencies), 2),
+                "query_p95_ms": round(_percentile(latencies, 95), 2),
+            }
+            if backend == "torch":
+                reference = vectors
+            elif reference is not None:
+                sims = _cosine_rows(reference, vectors)
+                row["parity_min_cos"] = round(float(sims.min()), 4)
+                row["parity_mean_cos"] = round(float(sims.mean()), 4)
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding encoder backends")
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=[embedding_service.PRIMARY_MODEL, embedding_service.MINILM_MODEL],
+    )
+    parser.add_argument("--backends", nargs="+", default=list(embedding_service.BACKENDS))
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    rows = run(args.models, args.backends, args.docs, args.queries)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    header = f"{'model':<28} {'backend':<10} {'docs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'min cos':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        if "error" in row:
+            print(f"{row['model']:<28} {row['backend']:<10} error: {row['error']}")
+            continue
+        print(
+            f"{row['model']:<28} {row['backend']:<10} {row['docs_per_sec']:>9} "
+            f"{row['query_p50_ms']:>8} {row['query_p95_ms']:>8} {row.get('parity_min_cos', '-'):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Benchmark gamification counters: the repair job and the award path.
+
+    python -m benchmarks.gamification_recalculate --users 100000 --awards 5000
+
+Seeds a throwaway SQLite database with --users users, each with a few chat
+messages, notes and flashcard sets spread over this week and earlier, then
+times:
+
+  recalc legacy  the old per-user loop (stats row lookup plus six COUNT
+                 queries per user), run on --legacy-users users and scaled
+                 up to --users
+  recalc bulk    recalculate_all_stats (GROUP BY aggregates, one UPDATE)
+  award inline   award_points per event, one commit each
+  award batched  the same events through AwardPipeline.flush
+
+Both award modes see the same events with the duplicate window disabled so
+they do the same work. The bulk run's counters are checked against the
+legacy loop for the sampled users.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-that-is-long-enough-for-jwt")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from services import gamification_pipeline as gp
+from services import gamification_system as gs
+from services import leaderboard_service, redis_cache
+
+TABLES = [
+    models.User.__table__,
+    models.UserGamificationStats.__table__,
+    models.PointTransaction.__table__,
+    models.Notification.__table__,
+    models.ChatSession.__table__,
+    models.ChatMessage.__table__,
+    models.Note.__table__,
+    models.FlashcardSet.__table__,
+]
+AWARD_TYPES = ["ai_chat", "ai_chat", "ai_chat", "note_created", "flashcard_reviewed", "question_answered"]
+COMPARED = [
+    "total_ai_chats", "weekly_ai_chats", "total_notes_created", "weekly_notes_created",
+    "total_flashcards_created", "weekly_flashcards_created", "total_points", "weekly_points", "level",
+]
+
+
+def seed(engine, users: int, seed_value: int = 42) -> dict:
+    rng = random.Random(seed_value)
+    Base.metadata.create_all(engine, tables=TABLES)
+    week_start = datetime.combine(gs.get_week_start(), datetime.min.time()).replace(tzinfo=timezone.utc)
+    batch = 20_000
+    counts = {"chat_messages": 0, "notes": 0, "flashcard_sets": 0}
+
+    def when():
+        return week_start + timedelta(hours=rng.uniform(-24 * 60, 24 * 3))
+
+    with engine.begin() as conn:
+        for offset in range(0, users, batch):
+            ids = range(offset + 1, min(offset + batch, users) + 1)
+            conn.execute(insert(models.User), [
+                {"id": uid, "username": f"learner{uid}", "email": f"learner{uid}@example.com"} for uid in ids
+            ])
+            conn.execute(insert(models.ChatSession), [
+                {"id": uid, "public_token": f"c{uid}", "user_id": uid, "title": "chat"} for uid in ids
+            ])
+            messages = [
+                {"chat_session_id": uid, "user_id": uid, "user_message": "q", "ai_response": "a", "timestamp": when()}
+                for uid in ids for _ in range(rng.randint(0, 10))
+            ]
+            notes = [
+                {"uid": f"n{uid}-{i}", "user_id": uid, "title": "note", "content": "", "created_at": when()}
+                for uid in ids for i in range(rng.randint(0, 4))
+            ]
+            sets = [
+                {"public_token": f"f{uid}-{i}", "user_id": uid, "title": "set", "created_at": when()}
+                for uid in ids for i in range(rng.randint(0, 2))
+            ]
+            if messages:
+                conn.execute(insert(models.ChatMessage), messages)
+            if notes:
+                conn.execute(insert(models.Note), notes)
+            if sets:
+                conn.execute(insert(models.FlashcardSet), sets)
+            counts["chat_messages"] += len(messages)
+            counts["notes"] += len(notes)
+            counts["flashcard_sets"] += len(sets)
+    return counts
+
+
+def legacy_recalculate(db, user_ids) -> None:
+    """The per-user loop recalculate_all_stats used to run."""
+    week_start = datetime.combine(gs.get_week_start(), datetime.min.time()).replace(tzinfo=timezone.utc)
+    sources = (
+        ("ai_chats", models.ChatMessage, models.ChatMessage.timestamp, "ai_chat"),
+        ("notes_created", models.Note, models.Note.created_at, "note_created"),
+        ("flashcards_created", models.FlashcardSet, models.FlashcardSet.created_at, "flashcard_set"),
+    )
+    for user_id in user_ids:
+        stats = gs.get_or_create_stats(db, user_id)
+        stats.total_points = stats.weekly_points = 0
+        for field, model, created, activity in sources:
+            total = db.query(func.count(model.id)).filter(model.user_id == user_id).scalar() or 0
+            weekly = db.query(func.count(model.id)).filter(model.user_id == user_id, created >= week_start).scalar() or 0
+            setattr(stats, f"total_{field}", total)
+            setattr(stats, f"weekly_{field}", weekly)
+            stats.total_points += total * gs.POINT_VALUES[activity]
+            stats.weekly_points += weekly * gs.POINT_VALUES[activity]
+        stats.experience = stats.total_points
+        stats.level = gs.calculate_level_from_xp(stats.experience)
+    db.commit()
+
+
+def _counters(db, user_ids) -> dict:
+    rows = db.query(models.UserGamificationStats).filter(models.UserGamificationStats.user_id.in_(user_ids)).all()
+    return {r.user_id: tuple(getattr(r, c) for c in COMPARED) for r in rows}
+
+
+def run(users: int, legacy_users: int, awards: int) -> list[dict]:
+    redis_cache._redis_client = None
+    gs.DUPLICATE_WINDOW = timedelta(0)
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'gamification.db'}")
+        t0 = time.perf_counter()
+        counts = seed(engine, users)
+        seed_s = time.perf_counter() - t0
+        factory = sessionmaker(bind=engine)
+        sample = list(range(1, min(users, legacy_users) + 1))
+
+        with factory() as db:
+            t0 = time.perf_counter()
+            legacy_recalculate(db, sample)
+            legacy_s = time.perf_counter() - t0
+            expected = _counters(db, sample)
+
+        with factory() as db:
+            t0 = time.perf_counter()
+            gs.recalculate_all_stats(db)
+            bulk_s = time.perf_counter() - t0
+            matches = _counters(db, sample) == expected
+
+        scale = users / len(sample)
+        out.append({"mode": "recalc legacy", "users": users, "seconds": round(legacy_s * scale, 2),
+                    "note": f"measured {len(sample)} users in {legacy_s:.2f}s, scaled x{scale:g}"})
+        out.append({"mode": "recalc bulk", "users": users, "seconds": round(bulk_s, 2),
+                    "note": f"matches legacy: {matches}; seeded {counts} in {seed_s:.0f}s"})
+
+        rng = random.Random(3)
+        events = [(rng.randint(1, users), rng.choice(AWARD_TYPES)) for _ in range(awards)]
+        with factory() as db:
+            t0 = time.perf_counter()
+            for user_id, activity in events:
+                gs.award_points(db, user_id, activity)
+            inline_s = time.perf_counter() - t0
+
+        pipeline = gp.AwardPipeline(factory, max_batch=500)
+        t0 = time.perf_counter()
+        for user_id, activity in events:
+            pipeline.submit(user_id, activity, start=False)
+        pipeline.flush()
+        batched_s = time.perf_counter() - t0
+        stats = pipeline.stats()
+        out.append({"mode": "award inline", "users": users, "seconds": round(inline_s, 2),
+                    "note": f"{awards / inline_s:.0f} awards/s"})
+        out.append({"mode": "award batched", "users": users, "seconds": round(batched_s, 2),
+                    "note": f"{awards / batched_s:.0f} awards/s in {stats['batches']} batches"})
+        leaderboard_service._memory_boards.clear()
+        engine.dispose()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gamification recalculation and award batching")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--legacy-users", type=int, default=5_000, help="users the per-user loop is timed on")
+    parser.add_argument("--awards", type=int, default=5_000)
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    rows = run(args.users, args.legacy_users, args.awards)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'mode':>14} {'users':>8} {'seconds':>9}  note")
+    print("-" * 72)
+    for row in rows:
+        print(f"{row['mode']:>14} {row['users']:>8} {row['seconds']:>9}  {row['note']}")
+
+
+if __name__ == "__main__":
+    main()
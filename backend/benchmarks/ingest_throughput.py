@@ -0,0 +1,183 @@
+"""Measure ingest throughput (entries/minute) against a local HTTP fixture server.
+
+    python -m benchmarks.ingest_throughput --entries 24 --latency-ms 150
+
+Serves generated PDFs from a local server that sleeps --latency-ms per
+request (standing in for a remote origin), then runs the ingest pipeline
+twice over the same catalog into throwaway SQLite databases:
+
+  serial   one download at a time, in-process PDF processing, one embed call
+           per document: the shape of the old entry-at-a-time loop
+  staged   concurrent downloads over the shared client, the process pool,
+           and cross-document embedding batches
+
+The embedding model is a stub whose encode() costs --embed-call-ms per call
+plus a little per text, so batching shows up the way it does on a real model.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-that-is-long-enough-for-jwt")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from ingest import pipeline as ingest_pipeline
+from services import vector_store as vs
+
+TABLES = [
+    models.User.__table__,
+    models.ContextFolder.__table__,
+    models.ContextDocument.__table__,
+    models.IngestCheckpoint.__table__,
+]
+PARAGRAPH = (
+    "Cellular respiration releases energy from glucose. Glycolysis happens in the "
+    "cytoplasm, the Krebs cycle in the mitochondrial matrix, and oxidative "
+    "phosphorylation across the inner mitochondrial membrane."
+)
+
+
+class StubModel:
+    def __init__(self, call_ms: float, per_text_ms: float = 0.2):
+        self.call_s = call_ms / 1000.0
+        self.per_text_s = per_text_ms / 1000.0
+
+    def encode(self, texts, **kwargs):
+        time.sleep(self.call_s + self.per_text_s * len(texts))
+        return [[float(len(t) % 97)] + [0.0] * 383 for t in texts]
+
+
+def _pdf(n: int, pages: int) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(72, 72, 523, 770),
+            f"Book {n}, chapter {p + 1}. " + " ".join([PARAGRAPH] * 8),
+            fontsize=10,
+        )
+    return doc.tobytes()
+
+
+def _serve(documents: dict[str, bytes], latency_s: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency_s)
+            body = documents.get(self.path, b"")
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def _run_once(catalog: list[dict], model: StubModel, tmp: Path, label: str, **pipeline_kwargs) -> dict:
+    engine = create_engine(f"sqlite:///{tmp / f'{label}.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=TABLES)
+    vs_url = f"sqlite:///{tmp / f'{label}_vs.db'}"
+    with create_engine(vs_url).begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE embeddings (id TEXT NOT NULL, collection TEXT NOT NULL, user_id TEXT, "
+            "content TEXT NOT NULL, embedding TEXT, metadata TEXT DEFAULT '{}', "
+            "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (collection, id))"
+        ))
+    vs.initialize(model, vs_url)
+
+    pipeline = ingest_pipeline.IngestPipeline(
+        session_factory=sessionmaker(bind=engine),
+        work_dir=str(tmp / f"{label}_work"),
+        **pipeline_kwargs,
+    )
+    t0 = time.perf_counter()
+    stats = pipeline.run(catalog)
+    elapsed = time.perf_counter() - t0
+    engine.dispose()
+    return {
+        "mode": label,
+        "entries": len(catalog),
+        "succeeded": stats.succeeded,
+        "seconds": round(elapsed, 2),
+        "entries_per_minute": round(stats.succeeded / elapsed * 60, 1),
+    }
+
+
+def run(entries: int, pages: int, latency_ms: float, embed_call_ms: float, workers: int) -> list[dict]:
+    documents = {f"/doc-{n}.pdf": _pdf(n, pages) for n in range(entries)}
+    httpd = _serve(documents, latency_ms / 1000.0)
+    base_url = f"http://127.0.0.1:{httpd.server_port}"
+    catalog = [
+        {
+            "slug": f"bench-{n}",
+            "title": f"Bench Book {n}",
+            "subject": "Biology",
+            "curriculum": "us",
+            "source_type": "direct",
+            "direct_url": f"{base_url}/doc-{n}.pdf",
+        }
+        for n in range(entries)
+    ]
+    model = StubModel(embed_call_ms)
+    ingest_pipeline.STATE_FILE = os.devnull
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            return [
+                _run_once(catalog, model, tmp_path, "serial",
+                          download_concurrency=1, process_workers=0, embed_batch_chunks=1),
+                _run_once(catalog, model, tmp_path, "staged",
+                          download_concurrency=8, process_workers=workers, embed_batch_chunks=2048),
+            ]
+    finally:
+        httpd.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the staged ingest pipeline")
+    parser.add_argument("--entries", type=int, default=24)
+    parser.add_argument("--pages", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--embed-call-ms", type=float, default=40.0)
+    parser.add_argument("--workers", type=int, default=ingest_pipeline.PROCESS_WORKERS)
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rows = run(args.entries, args.pages, args.latency_ms, args.embed_call_ms, args.workers)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    columns = ["entries", "succeeded", "seconds", "entries_per_minute"]
+    header = f"{'mode':>8} " + " ".join(f"{c:>20}" for c in columns)
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['mode']:>8} " + " ".join(f"{row[c]:>20}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Compare exhaustive (every parser) and adaptive PDF extraction.
+
+    python -m benchmarks.pdf_extraction --pages 20 200 --repeats 3
+    python -m benchmarks.pdf_extraction --corpus ~/pdfs
+
+Without --corpus a fixture corpus is generated with PyMuPDF: plain text pages,
+two-column pages, image-only (scanned) pages, and documents with a repeated
+running header. For each document the report shows pages/sec for both paths
+and parity, the token-overlap F1 of the adaptive text against the exhaustive
+text. Parity near 1.0 with a higher adaptive pages/sec is the expected result.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-that-is-long-enough-for-jwt")
+
+from services import document_processor as dp
+
+PARAGRAPH = (
+    "Photosynthesis converts light energy into chemical energy. The light "
+    "dependent reactions take place in the thylakoid membranes and produce ATP "
+    "and NADPH, which the Calvin cycle then uses to fix carbon dioxide."
+)
+
+
+def _text_pdf(pages: int, two_column: bool = False, header: bool = False) -> bytes:
+    import fitz
+
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        if header:
+            page.insert_text((72, 40), "BIOL 101 Lecture Notes", fontsize=9)
+        body = f"Section {n + 1}. " + " ".join([PARAGRAPH] * 4)
+        if two_column:
+            page.insert_textbox(fitz.Rect(40, 60, 290, 780), body, fontsize=10)
+            page.insert_textbox(fitz.Rect(305, 60, 555, 780), body[::-1].swapcase()[:400] + " " + PARAGRAPH, fontsize=10)
+        else:
+            page.insert_textbox(fitz.Rect(72, 60, 523, 780), body, fontsize=11)
+    return doc.tobytes()
+
+
+def _scanned_pdf(pages: int) -> bytes:
+    import fitz
+
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 280), False)
+    pix.clear_with(230)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pix)
+    return doc.tobytes()
+
+
+def fixture_corpus(sizes: list[int]) -> dict[str, bytes]:
+    corpus = {}
+    for size in sizes:
+        corpus[f"text-{size}p"] = _text_pdf(size)
+        corpus[f"two-column-{size}p"] = _text_pdf(size, two_column=True)
+        corpus[f"header-{size}p"] = _text_pdf(size, header=True)
+    corpus[f"scanned-{min(sizes)}p"] = _scanned_pdf(min(sizes))
+    return corpus
+
+
+def load_corpus(directory: Path) -> dict[str, bytes]:
+    return {path.name: path.read_bytes() for path in sorted(directory.glob("*.pdf"))}
+
+
+def _tokens(text: str) -> Counter:
+    return Counter(text.lower().split())
+
+
+def parity(reference: str, candidate: str) -> float:
+    ref, cand = _tokens(reference), _tokens(candidate)
+    if not ref and not cand:
+        return 1.0
+    overlap = sum((ref & cand).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(cand.values())
+    recall = overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def _time(fn, repeats: int):
+    timings, result = [], None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings), result
+
+
+def run(corpus: dict[str, bytes], repeats: int) -> list[dict]:
+    rows = []
+    for name, data in corpus.items():
+        exhaustive_s, exhaustive = _time(lambda: dp._extract_pages_exhaustive(data), repeats)
+        adaptive_s, adaptive = _time(lambda: dp._extract_pages_adaptive(data), repeats)
+        adaptive = adaptive or []
+        page_count = max(len(exhaustive), len(adaptive), 1)
+        rows.append({
+            "document": name,
+            "pages": page_count,
+            "exhaustive_pages_per_s": round(page_count / exhaustive_s, 1),
+            "adaptive_pages_per_s": round(page_count / adaptive_s, 1),
+            "speedup": round(exhaustive_s / adaptive_s, 2),
+            "fallback_pages": sum(1 for p in adaptive if p["parser"] != "pymupdf"),
+            "parity_f1": round(parity(
+                "\n".join(p["text"] for p in exhaustive),
+                "\n".join(p["text"] for p in adaptive),
+            ), 4),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark adaptive PDF extraction")
+    parser.add_argument("--pages", nargs="+", type=int, default=[20, 120])
+    parser.add_argument("--corpus", type=Path, help="directory of PDFs to use instead of generated fixtures")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else fixture_corpus(args.pages)
+    rows = run(corpus, args.repeats)
+    dp._process_pool and dp._process_pool.shutdown()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    columns = ["pages", "exhaustive_pages_per_s", "adaptive_pages_per_s", "speedup", "fallback_pages", "parity_f1"]
+    header = f"{'document':>20} " + " ".join(f"{c:>22}" for c in columns)
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['document']:>20} " + " ".join(f"{row[c]:>22}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
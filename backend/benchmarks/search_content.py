@@ -0,0 +1,219 @@
+"""Compare search_content latency: LIKE scan vs the full-text search index.
+
+    python -m benchmarks.search_content --rows 1000000 --queries 50
+
+Seeds a throwaway SQLite database with --rows searchable entities (mostly
+notes, plus flashcard sets with cards, chats with messages and question
+sets with questions) spread over --users owners, some notes public, and
+builds the FTS5 index the migration installs. Each query is a topic term
+plus the per-word expansion search_content adds, issued for a random user:
+
+  legacy  routes.search._legacy_search_results (LIKE per type, then a
+          count and author query per hit)
+  index   services.search_index.search + to_result (one ranked statement)
+
+Reports p50/p95/max milliseconds and the average result count.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-that-is-long-enough-for-jwt")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base
+from routes import search as search_routes
+from services import search_index
+
+TYPES = ["flashcard_set", "note", "chat", "question_set"]
+TOPICS = [
+    "photosynthesis", "mitochondria", "plate tectonics", "french revolution", "quadratic equations",
+    "cellular respiration", "world war", "organic chemistry", "supply and demand", "shakespeare sonnets",
+    "electromagnetism", "cold war", "genetics", "calculus limits", "roman empire", "thermodynamics",
+]
+FILLER = (
+    "review summary lecture outline key terms definitions examples practice exam notes chapter "
+    "section diagram process cycle energy system theory evidence analysis history model"
+).split()
+TABLES = [
+    models.User.__table__,
+    models.Folder.__table__,
+    models.Note.__table__,
+    models.FlashcardSet.__table__,
+    models.Flashcard.__table__,
+    models.ChatFolder.__table__,
+    models.ChatSession.__table__,
+    models.ChatMessage.__table__,
+    models.QuestionSet.__table__,
+    models.Question.__table__,
+]
+# Lookup indexes the earlier migrations add to the production schema.
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_flashcards_set_created ON flashcards (set_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_question_set_id ON questions (question_set_id)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_user_deleted_updated ON notes (user_id, is_deleted, updated_at)",
+]
+BACKFILL = [
+    """INSERT INTO search_documents (entity_type, entity_id, owner_id, is_public, title, body, created_at)
+       SELECT 'note', id, user_id, is_public, title, substr(content, 1, 4000), created_at FROM notes""",
+    """INSERT INTO search_documents (entity_type, entity_id, owner_id, is_public, title, body, created_at)
+       SELECT 'flashcard_set', id, user_id, is_public, title, description, created_at FROM flashcard_sets""",
+    """INSERT INTO search_documents (entity_type, entity_id, owner_id, is_public, title, body, created_at)
+       SELECT 'chat', id, user_id, 0, title, '', created_at FROM chat_sessions""",
+    """INSERT INTO search_documents (entity_type, entity_id, owner_id, is_public, title, body, created_at)
+       SELECT 'question_set', qs.id, qs.user_id, 0, qs.title,
+              COALESCE(qs.description, '') || char(10) ||
+              COALESCE((SELECT group_concat(question_text, char(10)) FROM questions q WHERE q.question_set_id = qs.id), ''),
+              qs.created_at
+       FROM question_sets qs""",
+]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(FILLER) for _ in range(words))
+
+
+def seed(engine, rows: int, users: int, seed_value: int = 40) -> None:
+    rng = random.Random(seed_value)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    Base.metadata.create_all(engine, tables=TABLES)
+    counts = {"note": int(rows * 0.7), "flashcard_set": int(rows * 0.12), "chat": int(rows * 0.12)}
+    counts["question_set"] = rows - sum(counts.values())
+    batch = 20_000
+
+    def when(n):
+        return start + timedelta(minutes=n)
+
+    def title(n):
+        return f"{rng.choice(TOPICS).title()} {rng.choice(FILLER)} {n}"
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": uid, "username": f"learner{uid}", "email": f"learner{uid}@example.com"}
+            for uid in range(1, users + 1)
+        ])
+        for offset in range(0, counts["note"], batch):
+            conn.execute(insert(models.Note), [
+                {"id": n + 1, "uid": f"n{n}", "user_id": rng.randint(1, users), "title": title(n),
+                 "content": f"{rng.choice(TOPICS)} {_text(rng, 60)}", "is_public": rng.random() < 0.05,
+                 "is_deleted": False, "created_at": when(n)}
+                for n in range(offset, min(offset + batch, counts["note"]))
+            ])
+        conn.execute(insert(models.FlashcardSet), [
+            {"id": n + 1, "public_token": f"f{n}", "user_id": rng.randint(1, users), "title": title(n),
+             "description": _text(rng, 12), "is_public": rng.random() < 0.1, "created_at": when(n)}
+            for n in range(counts["flashcard_set"])
+        ])
+        conn.execute(insert(models.Flashcard), [
+            {"set_id": rng.randint(1, max(1, counts["flashcard_set"])), "question": _text(rng, 6), "answer": _text(rng, 4)}
+            for _ in range(counts["flashcard_set"] * 3)
+        ])
+        conn.execute(insert(models.ChatSession), [
+            {"id": n + 1, "public_token": f"c{n}", "user_id": rng.randint(1, users), "title": title(n),
+             "created_at": when(n), "updated_at": when(n)}
+            for n in range(counts["chat"])
+        ])
+        conn.execute(insert(models.ChatMessage), [
+            {"chat_session_id": rng.randint(1, max(1, counts["chat"])), "user_message": "hi", "ai_response": "hello"}
+            for _ in range(counts["chat"] * 2)
+        ])
+        conn.execute(insert(models.QuestionSet), [
+            {"id": n + 1, "user_id": rng.randint(1, users), "title": title(n), "description": _text(rng, 8),
+             "created_at": when(n)}
+            for n in range(counts["question_set"])
+        ])
+        conn.execute(insert(models.Question), [
+            {"question_set_id": rng.randint(1, max(1, counts["question_set"])), "question_text": _text(rng, 10)}
+            for _ in range(counts["question_set"] * 3)
+        ])
+        search_index.create_sqlite_schema(conn)
+        for statement in INDEXES + BACKFILL:
+            conn.execute(text(statement))
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def run(rows: int, users: int, queries: int) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'search.db'}")
+        t0 = time.perf_counter()
+        seed(engine, rows, users)
+        seed_s = time.perf_counter() - t0
+        db = sessionmaker(bind=engine)()
+        rng = random.Random(7)
+        workload = []
+        for _ in range(queries):
+            topic = rng.choice(TOPICS)
+            terms = [topic] + [w for w in topic.split() if len(w) > 2 and w != topic]
+            workload.append((rng.randint(1, users), topic, terms))
+
+        def legacy(user_id, query, terms):
+            return search_routes._legacy_search_results(db, user_id, query, terms, TYPES, None, None)
+
+        def indexed(user_id, query, terms):
+            return [search_index.to_result(row, user_id) for row in search_index.search(db, user_id, terms, TYPES)]
+
+        out = []
+        for label, fn in (("legacy", legacy), ("index", indexed)):
+            samples, hits = [], 0
+            for user_id, query, terms in workload:
+                t0 = time.perf_counter()
+                hits += len(fn(user_id, query, terms))
+                samples.append(time.perf_counter() - t0)
+            out.append({
+                "mode": label,
+                "rows": rows,
+                "seed_s": round(seed_s, 1),
+                **_percentiles(samples),
+                "avg_results": round(hits / len(workload), 1),
+            })
+        db.close()
+        engine.dispose()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search_content: LIKE scan vs full-text index")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--json", action="store_true", help="print raw JSON rows")
+    args = parser.parse_args()
+
+    rows = run(args.rows, args.users, args.queries)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    columns = ["rows", "p50_ms", "p95_ms", "max_ms", "avg_results"]
+    header = f"{'mode':>8} " + " ".join(f"{c:>12}" for c in columns)
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['mode']:>8} " + " ".join(f"{row[c]:>12}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark chunked transcription offline on generated audio.
+
+    python -m benchmarks.transcription_chunking --minutes 20 --chunk-seconds 120
+
+Writes a WAV of tone "sentences" separated by short silences, with a script
+of what each sentence says, then transcribes it with the ScriptTranscriber
+stand-in (latency proportional to audio length, like a hosted model):
+
+  single   one request for the whole file
+  chunked  silence-aware chunks, concurrent under the provider limit
+
+Reports wall time, chunk count, and whether the stitched transcript matches
+the script exactly (no lost or duplicated sentences at the cuts). Needs
+ffmpeg on PATH or FFMPEG_BINARY.
+"""
+import argparse
+import asyncio
+import json
+import math
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import audio_chunking as ac
+
+
+def generate(path: Path, minutes: float, rate: int = 8000) -> tuple[list, float]:
+    script, t, n = [], 0.5, 0
+    while t < minutes * 60:
+        speech = 3.0 + (n * 7 % 5)
+        script.append((t, t + speech, f"Sentence {n} of the lecture on plate tectonics."))
+        t += speech + 0.6 + (n % 3) * 0.4
+        n += 1
+    duration = t + 0.5
+    tone = [struct.pack("<h", int(6000 * math.sin(2 * math.pi * 330 * i / rate))) for i in range(rate)]
+    silence = struct.pack("<h", 0)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        cursor = 0
+        for start, end, _ in script:
+            wav.writeframes(silence * (int(start * rate) - cursor))
+            frames = int(end * rate) - int(start * rate)
+            wav.writeframes(b"".join(tone[i % rate] for i in range(frames)))
+            cursor = int(end * rate)
+        wav.writeframes(silence * (int(duration * rate) - cursor))
+    return script, duration
+
+
+def run(minutes: float, chunk_seconds: float, overlap: float, latency: float, concurrency: int) -> dict:
+    ac.PROVIDER_CONCURRENCY["local"] = concurrency
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_path = Path(tmp) / "lecture.wav"
+        script, duration = generate(audio_path, minutes)
+        expected = " ".join(text for _, _, text in script)
+
+        single = ac.ScriptTranscriber(script, seconds_per_audio_second=latency)
+        whole = ac.AudioChunk(index=0, start=0, end=duration, core_start=0, core_end=duration)
+        t0 = time.perf_counter()
+        asyncio.run(single(whole))
+        single_s = time.perf_counter() - t0
+
+        chunked = ac.ScriptTranscriber(script, seconds_per_audio_second=latency)
+        t0 = time.perf_counter()
+        analysis = ac.analyze_audio(str(audio_path))
+        analyze_s = time.perf_counter() - t0
+        result = asyncio.run(ac.transcribe_chunked(
+            str(audio_path), chunked, "local", target=chunk_seconds, overlap=overlap, analysis=analysis,
+        ))
+        chunked_s = time.perf_counter() - t0
+
+    return {
+        "audio_minutes": round(duration / 60, 1),
+        "sentences": len(script),
+        "chunks": result.get("chunks"),
+        "concurrency": concurrency,
+        "single_s": round(single_s, 2),
+        "analyze_s": round(analyze_s, 2),
+        "chunked_s": round(chunked_s, 2),
+        "speedup": round(single_s / chunked_s, 2),
+        "transcript_matches": result.get("transcript") == expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark silence-aware chunked transcription")
+    parser.add_argument("--minutes", type=float, default=20)
+    parser.add_argument("--chunk-seconds", type=float, default=120)
+    parser.add_argument("--overlap", type=float, default=ac.OVERLAP_SECONDS)
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in seconds per audio second")
+    parser.add_argument("--concurrency", type=int, default=ac.PROVIDER_CONCURRENCY["groq"])
+    parser.add_argument("--json", action="store_true", help="print the raw JSON row")
+    args = parser.parse_args()
+
+    if not ac.ffmpeg_binary():
+        parser.error("ffmpeg not found; install it or set FFMPEG_BINARY")
+    row = run(args.minutes, args.chunk_seconds, args.overlap, args.latency, args.concurrency)
+    if args.json:
+        print(json.dumps(row, indent=2))
+        return
+    for key, value in row.items():
+        print(f"{key:>20}  {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -229,10 +229,10 @@ def _get_model():
         with _lock:
             if _model is None:
                 try:
-                    from sentence_transformers import SentenceTransformer
-                    logger.info("[LANG] Loading all-MiniLM-L6-v2…")
-                    _model = SentenceTransformer("all-MiniLM-L6-v2")
-                    logger.info("[LANG] Model loaded.")
+                    from services import embedding_service
+                    _model = embedding_service.get_model(embedding_service.MINILM_MODEL, fallback=None)
+                    if _model is not None:
+                        logger.info("[LANG] Using shared all-MiniLM-L6-v2.")
                 except Exception as e:
                     logger.warning(f"[LANG] Could not load sentence-transformer: {e}")
     return _model
@@ -280,7 +280,8 @@ def _embed(text: str) -> Optional[np.ndarray]:
     m = _get_model()
     if m is None:
         return None
-    return m.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
+    from services import embedding_service
+    return np.asarray(embedding_service.encode_one(m, text, normalize=True), dtype=np.float32)
 
 _SIGNAL_CLASSES = ["confusion", "re_ask", "doubt", "hesitation", "neutral", "extension", "mastery"]
 _D_EMBED        = 384
@@ -14,6 +14,7 @@ from flashcard_minimal import (
     FlashcardGenerationRequest
 )
 import models
+from services import flashcard_due_queue
 
 logger = logging.getLogger(__name__)
 
@@ -456,6 +457,7 @@ async def reset_all_mastery(db: Session = Depends(get_db)):
             "marked_for_review": False,
             "last_reviewed": None
         })
+        flashcard_due_queue.invalidate_all(db)
         db.commit()
         
         return {
@@ -482,6 +484,7 @@ async def delete_set(set_id: int, db: Session = Depends(get_db)):
     db.query(models.Flashcard).filter(
         models.Flashcard.set_id == set_id
     ).delete(synchronize_session=False)
+    flashcard_due_queue.invalidate_user(db, flashcard_set.user_id)
 
     db.delete(flashcard_set)
     db.commit()
@@ -4,6 +4,7 @@ from __future__ import annotations
 import logging
 import re
 import time
+from contextlib import contextmanager
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -28,18 +29,36 @@ def _get_httpx():
     except ImportError as e:
         raise DownloadError("httpx not installed — run: pip install httpx") from e
 
+@contextmanager
+def shared_client(timeout: int = _DEFAULT_TIMEOUT, max_connections: int = 16):
+    """One connection-pooled client for a whole ingest run. httpx.Client is
+    thread-safe, so the pipeline's download threads all share it."""
+    httpx = _get_httpx()
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    with httpx.Client(follow_redirects=True, timeout=timeout, headers=_HEADERS, limits=limits) as client:
+        yield client
+
+@contextmanager
+def _client_or_new(client, timeout: int):
+    if client is not None:
+        yield client
+        return
+    httpx = _get_httpx()
+    with httpx.Client(follow_redirects=True, timeout=timeout, headers=_HEADERS) as new_client:
+        yield new_client
+
 def download_bytes(
     url: str,
     timeout: int = _DEFAULT_TIMEOUT,
     retries: int = 2,
     max_bytes: int = _PIPELINE_MAX_PDF_BYTES,
+    client=None,
 ) -> bytes:
-    httpx = _get_httpx()
     last_error: Optional[Exception] = None
     for attempt in range(retries + 1):
         try:
-            with httpx.Client(follow_redirects=True, timeout=timeout, headers=_HEADERS) as client:
-                resp = client.get(url)
+            with _client_or_new(client, timeout) as http:
+                resp = http.get(url)
                 resp.raise_for_status()
                 data = resp.content
                 if len(data) > max_bytes:
@@ -81,20 +100,19 @@ def _find_pdf_link_in_html(html: str, base_url: str = "") -> Optional[str]:
                 return url
     return None
 
-def resolve_openstax(entry: dict) -> tuple[bytes, str]:
+def resolve_openstax(entry: dict, client=None) -> tuple[bytes, str]:
     if entry.get("direct_url"):
         url = entry["direct_url"]
-        return download_bytes(url), url
+        return download_bytes(url, client=client), url
 
     page_url = entry.get("page_url", "")
     if not page_url:
         raise DownloadError(f"No page_url or direct_url for entry: {entry.get('slug')}")
 
     logger.info(f"Fetching OpenStax book page: {page_url}")
-    httpx = _get_httpx()
     try:
-        with httpx.Client(follow_redirects=True, timeout=30, headers=_HEADERS) as client:
-            resp = client.get(page_url)
+        with _client_or_new(client, 30) as http:
+            resp = http.get(page_url)
             resp.raise_for_status()
             html = resp.text
     except Exception as e:
@@ -108,22 +126,21 @@ def resolve_openstax(entry: dict) -> tuple[bytes, str]:
         )
 
     logger.info(f"Resolved OpenStax PDF: {pdf_url}")
-    return download_bytes(pdf_url), pdf_url
+    return download_bytes(pdf_url, client=client), pdf_url
 
-def resolve_aqa(entry: dict) -> tuple[bytes, str]:
+def resolve_aqa(entry: dict, client=None) -> tuple[bytes, str]:
     if entry.get("direct_url"):
         url = entry["direct_url"]
-        return download_bytes(url), url
+        return download_bytes(url, client=client), url
 
     page_url = entry.get("page_url", "")
     if not page_url:
         raise DownloadError(f"No page_url or direct_url for entry: {entry.get('slug')}")
 
     logger.info(f"Fetching AQA spec page: {page_url}")
-    httpx = _get_httpx()
     try:
-        with httpx.Client(follow_redirects=True, timeout=30, headers=_HEADERS) as client:
-            resp = client.get(page_url)
+        with _client_or_new(client, 30) as http:
+            resp = http.get(page_url)
             resp.raise_for_status()
             html = resp.text
     except Exception as e:
@@ -137,19 +154,19 @@ def resolve_aqa(entry: dict) -> tuple[bytes, str]:
         )
 
     logger.info(f"Resolved AQA spec PDF: {pdf_url}")
-    return download_bytes(pdf_url), pdf_url
+    return download_bytes(pdf_url, client=client), pdf_url
 
-def resolve_entry(entry: dict) -> tuple[bytes, str]:
+def resolve_entry(entry: dict, client=None) -> tuple[bytes, str]:
     source_type = entry.get("source_type", "direct")
 
     if source_type == "openstax":
-        return resolve_openstax(entry)
+        return resolve_openstax(entry, client=client)
     elif source_type in ("gcse_aqa", "gcse_edexcel"):
-        return resolve_aqa(entry)
+        return resolve_aqa(entry, client=client)
     elif source_type == "direct":
         url = entry.get("direct_url") or entry.get("page_url", "")
         if not url:
             raise DownloadError(f"No URL for direct entry: {entry.get('slug')}")
-        return download_bytes(url), url
+        return download_bytes(url, client=client), url
     else:
         raise DownloadError(f"Unknown source_type: {source_type}")
@@ -3,10 +3,12 @@ from __future__ import annotations
 
 import json
 import logging
+import multiprocessing
 import os
 import sys
 import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
 from typing import Optional
@@ -22,8 +24,13 @@ from sqlalchemy import text
 
 logger = logging.getLogger(__name__)
 
+# Legacy per-run state file; read once to seed ingest_checkpoints.
 STATE_FILE = os.path.join(os.path.dirname(__file__), "state.json")
+WORK_DIR = os.path.join(os.path.dirname(__file__), "work")
 VERIFY_EVERY = 5
+DOWNLOAD_CONCURRENCY = int(os.getenv("INGEST_DOWNLOAD_CONCURRENCY", "4"))
+PROCESS_WORKERS = int(os.getenv("INGEST_PROCESS_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+EMBED_BATCH_CHUNKS = int(os.getenv("INGEST_EMBED_BATCH_CHUNKS", "2048"))
 SYSTEM_USER_EMAIL = "system@brainwave.internal"
 SYSTEM_USERNAME = "system"
 
@@ -60,12 +67,44 @@ def _load_state() -> dict:
             return {}
     return {}
 
-def _save_state(state: dict) -> None:
-    try:
-        with open(STATE_FILE, "w") as f:
-            json.dump(state, f, indent=2)
-    except Exception as e:
-        logger.warning(f"Failed to save state: {e}")
+def _doc_id_for(slug: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"brainwave_ingest:{slug}"))
+
+def _entry_slug(entry: dict) -> str:
+    return entry.get("slug", entry.get("title", "unknown"))
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _init_process_worker() -> None:
+    # Entries already run in parallel; per-document page pools would
+    # oversubscribe the CPU.
+    document_processor.PDF_EXTRACT_WORKERS = 1
+
+def _process_download(download_path: str, chunks_path: str, entry: dict, resolved_url: str) -> dict:
+    """Processing stage, run in a worker process. Chunks are written next to
+    the download so the embed stage (or a resumed run) reads them from disk."""
+    with open(download_path, "rb") as f:
+        pdf_bytes = f.read()
+    proc = document_processor.process_upload(
+        file_bytes=pdf_bytes,
+        filename=entry["title"] + ".pdf",
+        subject=entry.get("subject", ""),
+        grade_level=entry.get("grade_level", ""),
+        scope="hs_shared",
+        source_url=resolved_url,
+    )
+    if proc.get("error"):
+        return {"error": f"Processing failed: {proc['error']}"}
+    chunks = proc["chunks"]
+    if not chunks:
+        return {"error": "No chunks extracted from document"}
+    payload = {"chunks": chunks, "chunk_pages": proc.get("chunk_pages", [])}
+    _write_atomic(chunks_path, json.dumps(payload).encode("utf-8"))
+    return {"chunk_count": len(chunks), "pdf_page_count": proc.get("pdf_page_count")}
 
 def _get_or_create_system_user(db) -> int:
     from models import User
@@ -129,11 +168,35 @@ def _upsert_context_document(
     db.commit()
 
 class IngestPipeline:
-    def __init__(self, dry_run: bool = False, resume: bool = True):
+    """Staged ingest: downloads run on a thread pool over one shared HTTP
+    client, PDF processing on a process pool, and embedding on the calling
+    thread in batches of about embed_batch_chunks chunks across documents.
+    Progress is checkpointed per entry in ingest_checkpoints, so a crashed
+    run resumes each entry from its last completed stage."""
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        resume: bool = True,
+        session_factory=SessionLocal,
+        work_dir: str = WORK_DIR,
+        download_concurrency: int = DOWNLOAD_CONCURRENCY,
+        process_workers: int = PROCESS_WORKERS,
+        embed_batch_chunks: int = EMBED_BATCH_CHUNKS,
+    ):
         self.dry_run = dry_run
         self.resume = resume
+        self.session_factory = session_factory
+        self.work_dir = work_dir
+        self.download_concurrency = max(1, download_concurrency)
+        self.process_workers = process_workers
+        self.embed_batch_chunks = max(1, embed_batch_chunks)
         self._system_user_id: Optional[int] = None
-        self._state: dict = {}
+        self._pending_embed: list[tuple[dict, object]] = []
+        self._pending_chunks = 0
+        self._recent_batch: list[dict] = []
+        self._started_at: dict[str, float] = {}
+        self._labels: dict[str, str] = {}
 
     def _ensure_sqlite_schema_compat(self) -> None:
         db_url = os.environ.get("DATABASE_URL", "")
@@ -163,11 +226,10 @@ class IngestPipeline:
         self._ensure_sqlite_schema_compat()
         logger.info("Initializing vector_store + embedding model...")
         try:
-            from sentence_transformers import SentenceTransformer
-            try:
-                _em = SentenceTransformer("BAAI/bge-small-en-v1.5")
-            except Exception:
-                _em = SentenceTransformer("all-MiniLM-L6-v2")
+            from services import embedding_service
+            _em = embedding_service.get_model(embedding_service.PRIMARY_MODEL)
+            if _em is None:
+                raise RuntimeError("no embedding model could be loaded")
             vector_store.initialize(_em)
         except Exception as e:
             raise RuntimeError(f"vector_store init failed: {e}") from e
@@ -180,11 +242,6 @@ class IngestPipeline:
         except Exception:
             logger.info("Redis not available — using in-memory cache fallback.")
 
-        if self.resume:
-            self._state = _load_state()
-            already = len([k for k, v in self._state.items() if v.get("success")])
-            logger.info(f"Loaded state: {already} previously ingested docs will be skipped.")
-
     def _get_system_user_id(self, db) -> int:
         if self._system_user_id is None:
             self._system_user_id = _get_or_create_system_user(db)
@@ -199,7 +256,7 @@ class IngestPipeline:
         curriculum = entry.get("curriculum", "")
         source_type = entry.get("source_type", "direct")
 
-        doc_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"brainwave_ingest:{slug}"))
+        doc_id = _doc_id_for(slug)
 
         start = time.time()
         result = IngestResult(
@@ -297,82 +354,298 @@ class IngestPipeline:
         result.duration_s = time.time() - start
         return result
 
-    def run(self, catalog: list[dict]) -> RunStats:
+    def _load_checkpoints(self, db, catalog: list[dict]) -> dict:
+        from models import IngestCheckpoint
+
+        slugs = [_entry_slug(entry) for entry in catalog]
+        checkpoints = {
+            cp.slug: cp
+            for cp in db.query(IngestCheckpoint).filter(IngestCheckpoint.slug.in_(slugs)).all()
+        }
+        legacy = _load_state() if self.resume and len(checkpoints) < len(set(slugs)) else {}
+        imported = 0
+        for slug in slugs:
+            if slug in checkpoints:
+                continue
+            cp = IngestCheckpoint(slug=slug, doc_id=_doc_id_for(slug), status="pending", chunk_count=0, attempts=0)
+            previous = legacy.get(slug, {})
+            if previous.get("success"):
+                cp.status = "done"
+                cp.chunk_count = previous.get("chunk_count", 0)
+                imported += 1
+            db.add(cp)
+            checkpoints[slug] = cp
+        db.commit()
+        if imported:
+            logger.info(f"Imported {imported} completed entries from {STATE_FILE}")
+        return checkpoints
+
+    def _artifact_paths(self, doc_id: str) -> tuple[str, str]:
+        return (
+            os.path.join(self.work_dir, f"{doc_id}.pdf"),
+            os.path.join(self.work_dir, f"{doc_id}.chunks.json"),
+        )
+
+    def _download(self, client, entry: dict, doc_id: str) -> tuple[str, str]:
+        from ingest.downloader import resolve_entry
+
+        logger.info(f"  Downloading: {entry.get('title')}")
+        pdf_bytes, resolved_url = resolve_entry(entry, client=client)
+        download_path, _ = self._artifact_paths(doc_id)
+        _write_atomic(download_path, pdf_bytes)
+        logger.info(f"  Downloaded {len(pdf_bytes) / 1024:.0f} KB from {resolved_url}")
+        return download_path, resolved_url
+
+    def _process_executor(self):
+        if self.process_workers <= 0:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-process")
+        return ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process_worker,
+        )
+
+    def _submit_process(self, executor, entry: dict, cp):
+        _, chunks_path = self._artifact_paths(cp.doc_id)
+        logger.info(f"  Processing: {entry.get('title')}")
+        return executor.submit(_process_download, cp.download_path, chunks_path, entry, cp.resolved_url or "")
+
+    def _result_for(self, entry: dict, cp, success: bool, error: str = "") -> IngestResult:
+        slug = _entry_slug(entry)
+        return IngestResult(
+            doc_id=cp.doc_id,
+            slug=slug,
+            title=entry.get("title", slug),
+            subject=entry.get("subject", ""),
+            curriculum=entry.get("curriculum", ""),
+            success=success,
+            chunk_count=cp.chunk_count or 0,
+            resolved_url=cp.resolved_url or "",
+            duration_s=time.time() - self._started_at.get(slug, time.time()),
+            error=error,
+        )
+
+    def _fail(self, db, entry: dict, cp, error: str, stats: RunStats) -> None:
+        cp.status = "failed"
+        cp.error = error
+        db.commit()
+        stats.failed += 1
+        stats.results.append(self._result_for(entry, cp, False, error))
+        logger.error(f"{self._labels.get(cp.slug, '')} FAILED: {entry.get('title', cp.slug)} — {error}")
+
+    def _queue_embed(self, db, entry: dict, cp, stats: RunStats) -> None:
+        self._pending_embed.append((entry, cp))
+        self._pending_chunks += cp.chunk_count or 0
+        if self._pending_chunks >= self.embed_batch_chunks:
+            self._flush_embeddings(db, stats)
+
+    def _flush_embeddings(self, db, stats: RunStats) -> None:
+        batch, self._pending_embed, self._pending_chunks = self._pending_embed, [], 0
+        if not batch:
+            return
+        user_id = self._get_system_user_id(db)
+        documents = []
+        ready = []
+        for entry, cp in batch:
+            try:
+                with open(cp.chunks_path, encoding="utf-8") as f:
+                    payload = json.load(f)
+                chunks = payload["chunks"]
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Re-process from the download on the next run.
+                if cp.chunks_path and os.path.exists(cp.chunks_path):
+                    os.remove(cp.chunks_path)
+                cp.chunks_path = None
+                self._fail(db, entry, cp, f"chunks file unreadable: {e}", stats)
+                continue
+            expected = sum(1 for c in chunks if c and c.strip())
+            if not expected:
+                self._fail(db, entry, cp, "no non-empty chunks", stats)
+                continue
+            ready.append((entry, cp, expected))
+            documents.append({
+                "user_id": str(user_id),
+                "doc_id": cp.doc_id,
+                "filename": entry["title"] + ".pdf",
+                "chunks": chunks,
+                "chunk_pages": payload.get("chunk_pages") or None,
+                "subject": entry.get("subject", ""),
+                "grade_level": entry.get("grade_level", ""),
+                "scope": "hs_shared",
+                "source_url": cp.resolved_url or "",
+                "source_name": entry.get("source_name", ""),
+                "license": entry.get("license", ""),
+                "replace_existing": True,
+                "curriculum": entry.get("curriculum", ""),
+                "source_type": entry.get("source_type", "direct"),
+                "book_title": entry.get("title", ""),
+            })
+
+        if not documents:
+            return
+        logger.info(f"  Embedding + storing {sum(len(d['chunks']) for d in documents)} chunks from {len(ready)} docs")
+        try:
+            stored_counts = context_store.add_documents_chunks(documents)
+        except Exception as e:
+            for entry, cp, _ in ready:
+                self._fail(db, entry, cp, f"context_store.add_documents_chunks error: {e}", stats)
+            return
+
+        for (entry, cp, expected), stored in zip(ready, stored_counts):
+            if stored < expected:
+                self._fail(db, entry, cp, f"stored {stored}/{expected} chunks", stats)
+                continue
+            try:
+                _upsert_context_document(
+                    db=db,
+                    user_id=user_id,
+                    doc_id=cp.doc_id,
+                    entry=entry,
+                    chunk_count=stored,
+                    resolved_url=cp.resolved_url or "",
+                )
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"  DB record failed (non-fatal): {e}")
+            cp.status = "done"
+            cp.chunk_count = stored
+            cp.error = None
+            db.commit()
+            for path in (cp.download_path, cp.chunks_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+            result = self._result_for(entry, cp, True)
+            stats.succeeded += 1
+            stats.results.append(result)
+            logger.info(
+                f"{self._labels.get(cp.slug, '')} OK: {result.title} — "
+                f"{result.chunk_count} chunks in {result.duration_s:.1f}s"
+            )
+            self._recent_batch.append({
+                "doc_id": result.doc_id,
+                "title": result.title,
+                "subject": result.subject,
+                "curriculum": result.curriculum,
+            })
+            if len(self._recent_batch) >= VERIFY_EVERY:
+                logger.info(f"\n--- Spot-checking batch of {len(self._recent_batch)} docs ---")
+                self._spot_check(stats, sample_rate=0.4, min_checks=2)
+
+    def _spot_check(self, stats: RunStats, sample_rate: float, min_checks: int) -> None:
         from ingest import verify
 
+        check_results = verify.spot_check_batch(self._recent_batch, sample_rate=sample_rate, min_checks=min_checks)
+        stats.spot_checks_run += len(check_results)
+        for cr in check_results:
+            if cr.passed:
+                stats.spot_checks_passed += 1
+            elif not cr.skipped:
+                stats.spot_checks_failed += 1
+        self._recent_batch = []
+
+    def _run_dry(self, catalog: list[dict]) -> RunStats:
         stats = RunStats(total=len(catalog))
-        recent_batch: list[dict] = []
-        db = SessionLocal()
+        for i, entry in enumerate(catalog, 1):
+            logger.info(f"[{i}/{stats.total}] Ingesting: {entry.get('title', _entry_slug(entry))}")
+            result = self.ingest_one(entry, None)
+            stats.results.append(result)
+            stats.succeeded += 1
+        return stats
+
+    def run(self, catalog: list[dict]) -> RunStats:
+        from ingest.downloader import shared_client, DownloadError
+
+        if self.dry_run:
+            return self._run_dry(catalog)
+
+        stats = RunStats(total=len(catalog))
+        os.makedirs(self.work_dir, exist_ok=True)
+        db = self.session_factory()
 
         try:
+            checkpoints = self._load_checkpoints(db, catalog)
+            to_download, to_process, to_embed = [], [], []
             for i, entry in enumerate(catalog, 1):
-                slug = entry.get("slug", entry.get("title", "unknown"))
-                title = entry.get("title", slug)
-                total_label = f"[{i}/{stats.total}]"
+                slug = _entry_slug(entry)
+                cp = checkpoints[slug]
+                self._labels[slug] = f"[{i}/{stats.total}]"
 
-                if self.resume and self._state.get(slug, {}).get("success"):
-                    logger.info(f"{total_label} Skipping (already ingested): {title}")
+                if self.resume and cp.status == "done":
+                    logger.info(f"{self._labels[slug]} Skipping (already ingested): {entry.get('title', slug)}")
                     stats.skipped += 1
                     continue
-
-                logger.info(f"{total_label} Ingesting: {title}")
-                result = self.ingest_one(entry, db)
-                stats.results.append(result)
-
-                if result.success:
-                    stats.succeeded += 1
-                    logger.info(
-                        f"{total_label} OK: {title} — "
-                        f"{result.chunk_count} chunks in {result.duration_s:.1f}s"
-                    )
-                    if not self.dry_run:
-                        self._state[slug] = {
-                            "success": True,
-                            "doc_id": result.doc_id,
-                            "chunk_count": result.chunk_count,
-                            "ingested_at": datetime.now(timezone.utc).isoformat(),
-                        }
-                        _save_state(self._state)
-
-                    recent_batch.append({
-                        "doc_id": result.doc_id,
-                        "title": result.title,
-                        "subject": result.subject,
-                        "curriculum": result.curriculum,
-                    })
+                if not self.resume:
+                    cp.download_path = None
+                    cp.chunks_path = None
+
+                logger.info(f"{self._labels[slug]} Ingesting: {entry.get('title', slug)}")
+                self._started_at[slug] = time.time()
+                cp.attempts = (cp.attempts or 0) + 1
+                cp.error = None
+                if cp.chunks_path and os.path.exists(cp.chunks_path):
+                    to_embed.append(entry)
+                elif cp.download_path and os.path.exists(cp.download_path):
+                    to_process.append(entry)
                 else:
-                    stats.failed += 1
-                    logger.error(f"{total_label} FAILED: {title} — {result.error}")
-                    if not self.dry_run:
-                        self._state[slug] = {
-                            "success": False,
-                            "error": result.error,
-                            "attempted_at": datetime.now(timezone.utc).isoformat(),
-                        }
-                        _save_state(self._state)
-
-                if len(recent_batch) >= VERIFY_EVERY:
-                    logger.info(f"\n--- Spot-checking batch of {len(recent_batch)} docs ---")
-                    check_results = verify.spot_check_batch(recent_batch, sample_rate=0.4, min_checks=2)
-                    stats.spot_checks_run += len(check_results)
-                    for cr in check_results:
-                        if cr.passed:
-                            stats.spot_checks_passed += 1
-                        elif not cr.skipped:
-                            stats.spot_checks_failed += 1
-                    recent_batch = []
+                    cp.status = "pending"
+                    to_download.append(entry)
+            db.commit()
+
+            with shared_client(max_connections=self.download_concurrency) as client, \
+                    ThreadPoolExecutor(max_workers=self.download_concurrency, thread_name_prefix="ingest-download") as downloads, \
+                    self._process_executor() as processing:
+                inflight = {}
+                for entry in to_download:
+                    future = downloads.submit(self._download, client, entry, checkpoints[_entry_slug(entry)].doc_id)
+                    inflight[future] = ("download", entry)
+                for entry in to_process:
+                    inflight[self._submit_process(processing, entry, checkpoints[_entry_slug(entry)])] = ("process", entry)
+                for entry in to_embed:
+                    self._queue_embed(db, entry, checkpoints[_entry_slug(entry)], stats)
+
+                while inflight:
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage, entry = inflight.pop(future)
+                        cp = checkpoints[_entry_slug(entry)]
+                        try:
+                            outcome = future.result()
+                        except DownloadError as e:
+                            self._fail(db, entry, cp, f"Download failed: {e}", stats)
+                            continue
+                        except Exception as e:
+                            label = "Download failed" if stage == "download" else "document_processor error"
+                            self._fail(db, entry, cp, f"{label}: {e}", stats)
+                            continue
+
+                        if stage == "download":
+                            cp.download_path, cp.resolved_url = outcome
+                            cp.status = "downloaded"
+                            db.commit()
+                            inflight[self._submit_process(processing, entry, cp)] = ("process", entry)
+                            continue
+
+                        if outcome.get("error"):
+                            self._fail(db, entry, cp, outcome["error"], stats)
+                            continue
+                        cp.chunks_path = self._artifact_paths(cp.doc_id)[1]
+                        cp.chunk_count = outcome["chunk_count"]
+                        cp.status = "processed"
+                        db.commit()
+                        logger.info(
+                            f"  Extracted {cp.chunk_count} chunks from "
+                            f"{outcome.get('pdf_page_count') or '?'} pages: {entry.get('title')}"
+                        )
+                        self._queue_embed(db, entry, cp, stats)
+
+                self._flush_embeddings(db, stats)
 
         finally:
             db.close()
 
-        if recent_batch:
-            logger.info(f"\n--- Final spot-check on remaining {len(recent_batch)} docs ---")
-            check_results = verify.spot_check_batch(recent_batch, sample_rate=0.5, min_checks=1)
-            stats.spot_checks_run += len(check_results)
-            for cr in check_results:
-                if cr.passed:
-                    stats.spot_checks_passed += 1
-                elif not cr.skipped:
-                    stats.spot_checks_failed += 1
+        if self._recent_batch:
+            logger.info(f"\n--- Final spot-check on remaining {len(self._recent_batch)} docs ---")
+            self._spot_check(stats, sample_rate=0.5, min_checks=1)
 
         return stats
@@ -86,7 +86,7 @@ def main() -> int:
         "--resume",
         action="store_true",
         default=True,
-        help="Skip already-ingested slugs from state.json (default: on)",
+        help="Skip entries already marked done in ingest_checkpoints (default: on)",
     )
     parser.add_argument(
         "--no-resume",
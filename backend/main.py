@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 import logging
@@ -325,13 +326,10 @@ async def lifespan(app: FastAPI):
 
     if startup_embeddings_enabled:
         try:
-            from sentence_transformers import SentenceTransformer
-            try:
-                _embed_model_inst = SentenceTransformer("BAAI/bge-small-en-v1.5")
-                logger.info("Embedding model loaded: BAAI/bge-small-en-v1.5")
-            except Exception:
-                _embed_model_inst = SentenceTransformer("all-MiniLM-L6-v2")
-                logger.info("Embedding model loaded: all-MiniLM-L6-v2 (fallback)")
+            from services import embedding_service
+            _embed_model_inst = embedding_service.get_model(embedding_service.PRIMARY_MODEL)
+            if _embed_model_inst is None:
+                raise RuntimeError("no embedding model could be loaded")
 
             from services import vector_store
             vector_store.initialize(_embed_model_inst, db_url=DATABASE_URL)
@@ -369,6 +367,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Redis cache init failed: {e}")
 
+    try:
+        from services.websocket_manager import configure_backplane
+        backplane = await configure_backplane()
+        logger.info(f"WebSocket backplane: {backplane}")
+    except Exception as e:
+        logger.warning(f"WebSocket backplane init failed: {e}")
+
     if startup_embeddings_enabled:
         try:
             from services.ml_pipeline import ModelRegistry
@@ -391,9 +396,11 @@ async def lifespan(app: FastAPI):
         from services.memory_service import initialize_memory_service
 
         if _vs.available():
+            from services import embedding_service
+
             def _embed_fn(text):
                 try:
-                    return _vs._embed_model.encode(text, normalize_embeddings=True)
+                    return embedding_service.encode_one(_vs._embed_model, text, normalize=True)
                 except Exception:
                     return [0.0] * 384
             initialize_memory_service(_embed_fn)
@@ -434,6 +441,39 @@ async def lifespan(app: FastAPI):
                 max_instances=1,
                 coalesce=True,
             )
+
+            leaderboard_interval_seconds = int(os.getenv("LEADERBOARD_REBUILD_INTERVAL_SECONDS", "3600"))
+
+            def _run_leaderboard_rebuild():
+                from services import leaderboard_service
+                db = SessionLocal()
+                try:
+                    leaderboard_service.rebuild_from_db(db)
+                finally:
+                    db.close()
+
+            _scheduler.add_job(
+                _run_leaderboard_rebuild,
+                "interval",
+                seconds=leaderboard_interval_seconds,
+                id="leaderboard_rebuild",
+                max_instances=1,
+                coalesce=True,
+            )
+
+            from services import reminder_notifications
+
+            async def _run_reminder_materialization():
+                await reminder_notifications.run_materialize_job(SessionLocal)
+
+            _scheduler.add_job(
+                _run_reminder_materialization,
+                "interval",
+                seconds=reminder_notifications.MATERIALIZE_INTERVAL_SECONDS,
+                id="reminder_materialization",
+                max_instances=1,
+                coalesce=True,
+            )
             _scheduler.start()
             logger.info("RL reward measurement scheduler started (%ss interval)", reward_interval_seconds)
     except ImportError:
@@ -441,14 +481,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"RL scheduler init failed: {e}")
 
+    from middleware import event_loop as _event_loop
+    _event_loop.configure_threadpool()
+    _lag_sampler = asyncio.create_task(_event_loop.sample_loop_lag())
+    logger.info("Sync handler threadpool sized to %s threads", _event_loop.SYNC_THREADPOOL_SIZE)
+
     logger.info("Startup complete")
     yield
 
+    _lag_sampler.cancel()
+    try:
+        from services import gamification_pipeline
+        gamification_pipeline.shutdown()
+    except Exception as e:
+        logger.warning(f"Gamification award pipeline shutdown failed: {e}")
+    try:
+        from services import battle_question_pool
+        battle_question_pool.shutdown()
+    except Exception as e:
+        logger.warning(f"Battle question pool shutdown failed: {e}")
     if _scheduler is not None:
         try:
             _scheduler.shutdown(wait=False)
         except Exception:
             pass
+
+    try:
+        from services.websocket_manager import manager as _ws_manager
+        await _ws_manager.stop()
+    except Exception:
+        pass
     _release_rl_scheduler_lock(_scheduler_lock)
 
 app = FastAPI(title="Brainwave Backend API", version="4.0.0", lifespan=lifespan)
@@ -503,6 +565,8 @@ from middleware.rate_limiter import RateLimitMiddleware
 from middleware.token_limit import TokenLimitMiddleware
 from middleware.security_headers import SecurityHeadersMiddleware
 from middleware.body_limit import BodySizeLimitMiddleware
+from middleware.event_loop import EventLoopMonitorMiddleware
+app.add_middleware(EventLoopMonitorMiddleware)
 app.add_middleware(RateLimitMiddleware)
 app.add_middleware(TokenLimitMiddleware)
 app.add_middleware(SecurityHeadersMiddleware)
@@ -521,7 +585,7 @@ app.add_middleware(
     allow_origin_regex=cors_origin_regex,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type", "Accept", "X-Requested-With", "X-User-Id"],
+    allow_headers=["Authorization", "Content-Type", "Accept", "X-Requested-With", "X-User-Id", "If-None-Match"],
     expose_headers=[
         "X-TokenLimit-Limit",
         "X-TokenLimit-Used",
@@ -534,6 +598,9 @@ app.add_middleware(
         "X-AI-Limit-Reset",
         "X-AI-Limit-Reset-After",
         "Retry-After",
+        "ETag",
+        "X-Next-Cursor",
+        "X-Has-More",
     ],
 )
 
@@ -567,6 +634,7 @@ from routes import (
     rate_limits,
     ai_jobs,
     public_share,
+    atlas,
 )
 
 app.include_router(auth.router)
@@ -599,6 +667,7 @@ app.include_router(intelligence.router)
 app.include_router(rate_limits.router)
 app.include_router(ai_jobs.router)
 app.include_router(public_share.router)
+app.include_router(atlas.router)
 
 try:
     from flashcard_api_minimal import register_flashcard_api_minimal
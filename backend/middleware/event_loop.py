@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import dis
+import inspect
+import logging
+import os
+import threading
+import time
+from types import CodeType
+from typing import Any, Callable, Optional
+
+import anyio.to_thread
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+# Most route handlers are `async def` bodies that only make synchronous
+# SQLAlchemy calls, so every query they run stalls the event loop for all
+# other requests on the worker. Two pieces keep that in check:
+#   OffloadRoute                APIRouter route_class. An async handler that
+#                               never awaits and never touches the loop is run
+#                               as a plain function, which FastAPI sends to the
+#                               threadpool (SYNC_THREADPOOL_SIZE threads).
+#   EventLoopMonitorMiddleware  times every synchronous stretch a request
+#                               spends on the loop and logs routes that hold
+#                               it longer than LOOP_BLOCK_WARN_MS; a sampler
+#                               task tracks overall loop lag.
+SYNC_THREADPOOL_SIZE = int(os.getenv("SYNC_THREADPOOL_SIZE", "40"))
+OFFLOAD_ASYNC_HANDLERS = os.getenv("OFFLOAD_ASYNC_HANDLERS", "true").strip().lower() in ("1", "true", "yes", "on")
+LOOP_BLOCK_WARN_MS = float(os.getenv("LOOP_BLOCK_WARN_MS", "100"))
+LOOP_LAG_SAMPLE_MS = float(os.getenv("LOOP_LAG_SAMPLE_MS", "250"))
+
+_SUSPENDING_OPS = {
+    "GET_AWAITABLE", "GET_AITER", "GET_ANEXT", "BEFORE_ASYNC_WITH",
+    "END_ASYNC_FOR", "SEND", "YIELD_VALUE",
+}
+_LOOP_NAMES = {
+    "create_task", "ensure_future", "get_event_loop", "get_running_loop",
+    "run_coroutine_threadsafe", "call_soon", "call_later", "gather",
+}
+
+_lock = threading.Lock()
+_blocking_routes: dict[str, dict] = {}
+_lag = {"samples": 0, "last_ms": 0.0, "max_ms": 0.0, "over_threshold": 0}
+
+
+def configure_threadpool(size: int = SYNC_THREADPOOL_SIZE) -> None:
+    """Size the threadpool FastAPI runs sync handlers and dependencies on.
+    Must be called from the running event loop (app lifespan)."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = max(1, size)
+
+
+def _code_objects(code: CodeType):
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from _code_objects(const)
+
+
+def runs_without_loop(fn: Callable) -> bool:
+    """True for a coroutine function whose body cannot suspend and does not
+    reach for the event loop, so it completes in a single step anywhere."""
+    if not inspect.iscoroutinefunction(fn):
+        return False
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        return False
+    if any(instr.opname in _SUSPENDING_OPS for instr in dis.get_instructions(code)):
+        return False
+    return not any(_LOOP_NAMES & set(c.co_names) for c in _code_objects(code))
+
+
+def as_sync(fn: Callable) -> Callable:
+    """Plain-function twin of a non-suspending coroutine function. The
+    signature is copied rather than wrapped so FastAPI treats it as sync."""
+
+    def handler(*args, **kwargs):
+        coro = fn(*args, **kwargs)
+        try:
+            coro.send(None)
+        except StopIteration as done:
+            return done.value
+        coro.close()
+        raise RuntimeError(f"{fn.__qualname__} suspended and cannot run off the event loop")
+
+    handler.__signature__ = inspect.signature(fn, eval_str=True)
+    handler.__name__ = fn.__name__
+    handler.__qualname__ = fn.__qualname__
+    handler.__module__ = fn.__module__
+    handler.__doc__ = fn.__doc__
+    handler.__offloaded__ = fn
+    return handler
+
+
+class OffloadRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if OFFLOAD_ASYNC_HANDLERS and runs_without_loop(endpoint):
+            endpoint = as_sync(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class _StepTimer:
+    """Drives a coroutine step by step, reporting how long each synchronous
+    stretch (from resume to the next suspension) kept the loop busy."""
+
+    def __init__(self, coro, on_step: Callable[[float], None]):
+        self._coro = coro
+        self._on_step = on_step
+
+    def __await__(self):
+        value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            started = time.perf_counter()
+            try:
+                if error is not None:
+                    yielded = self._coro.throw(error)
+                else:
+                    yielded = self._coro.send(value)
+            except StopIteration as done:
+                self._on_step((time.perf_counter() - started) * 1000)
+                return done.value
+            except BaseException:
+                self._on_step((time.perf_counter() - started) * 1000)
+                raise
+            self._on_step((time.perf_counter() - started) * 1000)
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}"
+
+
+def _record_block(label: str, worst_ms: float, steps_over: int) -> None:
+    with _lock:
+        entry = _blocking_routes.setdefault(label, {"route": label, "count": 0, "max_ms": 0.0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["max_ms"] = max(entry["max_ms"], worst_ms)
+        entry["total_ms"] += worst_ms
+    logger.warning(
+        "Event loop blocked | route=%s longest_step_ms=%.1f steps_over=%d threshold_ms=%.0f",
+        label, worst_ms, steps_over, LOOP_BLOCK_WARN_MS,
+    )
+
+
+class EventLoopMonitorMiddleware:
+    """Pure ASGI so it runs in the same task as the route it measures; add it
+    before any BaseHTTPMiddleware, which hands the request to a new task."""
+
+    def __init__(self, app, threshold_ms: float = LOOP_BLOCK_WARN_MS):
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.threshold_ms <= 0:
+            await self.app(scope, receive, send)
+            return
+        stats = {"worst_ms": 0.0, "over": 0}
+
+        def on_step(elapsed_ms: float) -> None:
+            if elapsed_ms > stats["worst_ms"]:
+                stats["worst_ms"] = elapsed_ms
+            if elapsed_ms >= self.threshold_ms:
+                stats["over"] += 1
+
+        try:
+            await _StepTimer(self.app(scope, receive, send), on_step)
+        finally:
+            if stats["over"]:
+                _record_block(_route_label(scope), stats["worst_ms"], stats["over"])
+
+
+async def sample_loop_lag(interval_ms: float = LOOP_LAG_SAMPLE_MS) -> None:
+    """Sleep for a fixed interval and record how late the loop woke us."""
+    interval = interval_ms / 1000.0
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag_ms = max(0.0, (loop.time() - started - interval) * 1000)
+        with _lock:
+            _lag["samples"] += 1
+            _lag["last_ms"] = lag_ms
+            _lag["max_ms"] = max(_lag["max_ms"], lag_ms)
+            if lag_ms >= LOOP_BLOCK_WARN_MS:
+                _lag["over_threshold"] += 1
+
+
+def get_stats() -> dict:
+    with _lock:
+        routes = sorted(_blocking_routes.values(), key=lambda e: e["max_ms"], reverse=True)
+        return {
+            "threshold_ms": LOOP_BLOCK_WARN_MS,
+            "threadpool_size": SYNC_THREADPOOL_SIZE,
+            "offload_async_handlers": OFFLOAD_ASYNC_HANDLERS,
+            "lag": {k: round(v, 1) if isinstance(v, float) else v for k, v in _lag.items()},
+            "blocking_routes": [
+                {**e, "max_ms": round(e["max_ms"], 1), "avg_ms": round(e["total_ms"] / e["count"], 1)}
+                for e in routes
+            ],
+        }
+
+
+def reset_stats() -> None:
+    with _lock:
+        _blocking_routes.clear()
+        _lag.update({"samples": 0, "last_ms": 0.0, "max_ms": 0.0, "over_threshold": 0})
@@ -37,6 +37,7 @@ _AUTH_TIERS = {"auth_login", "auth_register", "auth_social"}
 _RULES: list[tuple[Optional[frozenset], Optional[str], Optional[str]]] = [
     (None,                          "/api/health",                      None),
     (frozenset(["GET"]),            "/api/get_notifications",           None),
+    (frozenset(["GET"]),            "/api/notifications/poll",          None),
 
     (frozenset(["POST"]),           "/api/token",                       "auth_login"),
     (frozenset(["POST"]),           "/api/token_form",                  "auth_login"),
@@ -60,6 +60,8 @@ from models.flashcards import (
     FlashcardSet,
     Flashcard,
     FlashcardStudySession,
+    FlashcardDueQueue,
+    FlashcardSRCounters,
 )
 
 from models.social import (
@@ -137,6 +139,16 @@ from models.questions import (
 from models.context import (
     ContextFolder,
     ContextDocument,
+    IngestCheckpoint,
+)
+
+from models.atlas import (
+    AtlasWikiPage,
+    AtlasWikiLink,
+    AtlasWikiCompileState,
+    AtlasWikiEvent,
+    AtlasWikiContradiction,
+    AtlasWikiSchema,
 )
 
 from models.ml import (
@@ -159,6 +171,7 @@ from models.imports import (
 
 from models.podcast import (
     PodcastSessionMemory,
+    PodcastSessionMessage,
     PodcastBookmark,
 )
 
@@ -0,0 +1,94 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
+from datetime import datetime, timezone
+from database import Base
+
+
+class AtlasWikiPage(Base):
+    __tablename__ = "atlas_wiki_pages"
+    __table_args__ = (
+        UniqueConstraint("user_id", "path", name="uq_atlas_wiki_pages_user_path"),
+        Index("ix_atlas_wiki_pages_user_updated", "user_id", "updated_at"),
+    )
+
+    id                  = Column(Integer, primary_key=True, index=True)
+    user_id             = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    path                = Column(String(500), nullable=False)
+    title               = Column(String(255), nullable=False, default="")
+    page_type           = Column(String(30), nullable=False, default="concept")
+    content             = Column(Text, default="")
+    summary             = Column(Text, default="")
+    tags                = Column(Text, default="[]")
+    source_doc_ids      = Column(Text, default="[]")
+    source_refs         = Column(Text, default="[]")
+    outbound_links      = Column(Text, default="[]")
+    inbound_links_count = Column(Integer, default=0)
+    last_compiled_at    = Column(DateTime, nullable=True)
+    created_at          = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at          = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class AtlasWikiLink(Base):
+    """One edge of a user's wiki link graph, keyed by page paths so links to
+    pages that do not exist yet are kept and counted once the page appears."""
+    __tablename__ = "atlas_wiki_links"
+    __table_args__ = (
+        Index("ix_atlas_wiki_links_user_target", "user_id", "target_path"),
+    )
+
+    user_id     = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    source_path = Column(String(500), primary_key=True)
+    target_path = Column(String(500), primary_key=True)
+
+
+class AtlasWikiCompileState(Base):
+    """What the last compile produced for one source document: the hash of its
+    inputs, the page written and the topics/entities it contributed, so an
+    unchanged document is not recompiled."""
+    __tablename__ = "atlas_wiki_compile_state"
+
+    user_id      = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    source_key   = Column(String(120), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    page_path    = Column(String(500), nullable=False)
+    name         = Column(String(255), default="")
+    summary      = Column(Text, default="")
+    topics       = Column(Text, default="[]")
+    entities     = Column(Text, default="[]")
+    compiled_at  = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class AtlasWikiEvent(Base):
+    __tablename__ = "atlas_wiki_events"
+
+    id         = Column(Integer, primary_key=True, index=True)
+    user_id    = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    event_type = Column(String(40), nullable=False, default="event")
+    title      = Column(String(255), nullable=False, default="")
+    details    = Column(Text, default="{}")
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+
+class AtlasWikiContradiction(Base):
+    __tablename__ = "atlas_wiki_contradictions"
+
+    id          = Column(Integer, primary_key=True, index=True)
+    user_id     = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    topic       = Column(String(255), nullable=False)
+    page_a_path = Column(String(500), nullable=False)
+    page_b_path = Column(String(500), nullable=False)
+    description = Column(Text, default="")
+    evidence_a  = Column(Text, default="")
+    evidence_b  = Column(Text, default="")
+    status      = Column(String(20), nullable=False, default="open", index=True)
+    created_at  = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    resolved_at = Column(DateTime, nullable=True)
+
+
+class AtlasWikiSchema(Base):
+    __tablename__ = "atlas_wiki_schemas"
+
+    id              = Column(Integer, primary_key=True, index=True)
+    user_id         = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
+    schema_markdown = Column(Text, default="")
+    created_at      = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at      = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -49,3 +49,23 @@ class ContextDocument(Base):
 
     user = relationship("User", backref="context_documents")
     folder = relationship("ContextFolder", back_populates="documents")
+
+
+class IngestCheckpoint(Base):
+    """Per-entry progress of the curriculum ingest pipeline (ingest/pipeline.py).
+
+    status walks pending -> downloaded -> processed -> done (or failed); the
+    artifact paths let a restarted run pick each entry up at its last stage.
+    """
+    __tablename__ = "ingest_checkpoints"
+
+    slug          = Column(String(200), primary_key=True)
+    doc_id        = Column(String(36), nullable=False)
+    status        = Column(String(20), nullable=False, default="pending", index=True)
+    resolved_url  = Column(String(500), nullable=True)
+    download_path = Column(String(500), nullable=True)
+    chunks_path   = Column(String(500), nullable=True)
+    chunk_count   = Column(Integer, default=0)
+    attempts      = Column(Integer, default=0)
+    error         = Column(Text, nullable=True)
+    updated_at    = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -67,3 +67,42 @@ class FlashcardStudySession(Base):
 
     user = relationship("User", back_populates="flashcard_study_sessions")
     flashcard_set = relationship("FlashcardSet", back_populates="study_sessions")
+
+
+class FlashcardDueQueue(Base):
+    __tablename__ = "flashcard_due_queue"
+    __table_args__ = (
+        Index("ix_flashcard_due_queue_user_due", "user_id", "due_at"),
+        Index("ix_flashcard_due_queue_user_lapses", "user_id", "lapses"),
+        Index("ix_flashcard_due_queue_user_state_interval", "user_id", "sr_state", "interval"),
+    )
+
+    card_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    set_id = Column(Integer, nullable=False, index=True)
+    due_at = Column(DateTime, nullable=True)
+    sr_state = Column(String(20), default="new")
+    interval = Column(Float, default=0)
+    lapses = Column(Integer, default=0)
+
+
+class FlashcardSRCounters(Base):
+    __tablename__ = "flashcard_sr_counters"
+
+    user_id = Column(Integer, primary_key=True)
+    total_cards = Column(Integer, default=0)
+    new_count = Column(Integer, default=0)
+    learning_count = Column(Integer, default=0)
+    review_count = Column(Integer, default=0)
+    relearning_count = Column(Integer, default=0)
+    total_reviews = Column(Integer, default=0)
+    total_correct = Column(Integer, default=0)
+    total_lapses = Column(Integer, default=0)
+    ease_hard = Column(Integer, default=0)
+    ease_difficult = Column(Integer, default=0)
+    ease_normal = Column(Integer, default=0)
+    ease_easy = Column(Integer, default=0)
+    ease_very_easy = Column(Integer, default=0)
+    review_interval_sum = Column(Float, default=0)
+    mature_count = Column(Integer, default=0)
+    rebuilt_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, Float, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -6,6 +6,9 @@ from database import Base
 
 class StudentKnowledgeState(Base):
     __tablename__ = "student_knowledge_states"
+    __table_args__ = (
+        Index("ix_student_knowledge_states_user_concept", "user_id", "concept_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -22,6 +25,11 @@ class StudentKnowledgeState(Base):
     last_updated = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # Trigger counters maintained by the context agent alongside the BKT update
+    flashcard_wrong_day = Column(Date, nullable=True)
+    flashcard_wrong_count = Column(Integer, default=0)
+    milestone_notified_at = Column(DateTime, nullable=True)
+
     user = relationship("User")
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship, backref
 from datetime import datetime, timezone
 from database import Base
@@ -6,6 +6,10 @@ from database import Base
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("uq_notifications_reminder_fire_at", "reminder_id", "fire_at", unique=True),
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
@@ -15,6 +19,9 @@ class Notification(Base):
     notification_type = Column(String(50))
     is_read = Column(Boolean, default=False)
 
+    reminder_id = Column(Integer, nullable=True)
+    fire_at = Column(DateTime, nullable=True)
+
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     user = relationship("User")
@@ -42,6 +49,9 @@ class ReminderList(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        Index("ix_reminders_pending_notify_at", "is_notified", "notify_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
@@ -64,6 +74,8 @@ class Reminder(Base):
     is_flagged = Column(Boolean, default=False)
     is_notified = Column(Boolean, default=False)
     notify_before_minutes = Column(Integer, default=15)
+    timezone_offset = Column(Integer, nullable=True)
+    notify_at = Column(DateTime, nullable=True)
 
     recurring = Column(String(20), default="none")
     recurring_interval = Column(Integer, default=1)
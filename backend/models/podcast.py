@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -37,6 +37,22 @@ class PodcastSessionMemory(Base):
     user = relationship("User", back_populates="podcast_sessions")
 
 
+class PodcastSessionMessage(Base):
+    """Append-only conversation log of a podcast session, one row per entry,
+    read back in id order. Replaces the podcast_sessions.conversation blob."""
+    __tablename__ = "podcast_session_messages"
+    __table_args__ = (
+        Index("ix_podcast_session_messages_session_id_id", "session_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(64), ForeignKey("podcast_sessions.session_id"), nullable=False)
+    role = Column(String(20), default="assistant")
+    entry_type = Column(String(30), default="")
+    entry = Column(Text, default="{}")
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
 class PodcastBookmark(Base):
     __tablename__ = "podcast_bookmarks"
 
@@ -1,11 +1,15 @@
+import asyncio
 import io
 import json
 import logging
+import os
 import re
-from typing import Any, Dict, List, Optional
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import PyPDF2
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
 from services.ai_json_parser import parse_json_array_response
 
@@ -130,6 +134,168 @@ TEXT_SPACING_REPAIRS = [
 ]
 
 
+# Default in-flight LLM pipelines per provider and worker; each configured API
+# key in the provider's pool adds the same budget again (capped below).
+# Override with AI_PROVIDER_CONCURRENCY_<PROVIDER>, e.g. AI_PROVIDER_CONCURRENCY_GROQ=6.
+PROVIDER_CONCURRENCY_DEFAULTS = {"groq": 3, "gemini": 4, "openai_compat": 4}
+MAX_PROVIDER_CONCURRENCY = 16
+# Per event loop (a semaphore is bound to the loop it is first used on); the
+# entry goes away with the loop.
+_provider_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def provider_concurrency_limit(unified_ai) -> int:
+    provider = getattr(unified_ai, "primary_ai", "") or "default"
+    override = os.getenv(f"AI_PROVIDER_CONCURRENCY_{provider.upper()}")
+    if override:
+        try:
+            return max(1, int(override))
+        except ValueError:
+            pass
+    base = PROVIDER_CONCURRENCY_DEFAULTS.get(provider, 2)
+    pool = getattr(unified_ai, f"{provider}_key_pool", None)
+    keys = len(getattr(pool, "entries", None) or []) if pool is not None and getattr(pool, "enabled", False) else 1
+    return max(1, min(MAX_PROVIDER_CONCURRENCY, base * max(1, keys)))
+
+
+def provider_semaphore(unified_ai) -> asyncio.Semaphore:
+    """Worker-wide limiter for concurrent LLM work against the client's primary provider."""
+    provider = getattr(unified_ai, "primary_ai", "") or "default"
+    semaphores = _provider_semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(provider)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(provider_concurrency_limit(unified_ai))
+        semaphores[provider] = semaphore
+    return semaphore
+
+
+async def _agenerate(unified_ai, prompt: str, max_tokens: int = 2000, temperature: float = 0.7) -> str:
+    return await run_in_threadpool(unified_ai.generate, prompt, max_tokens, temperature)
+
+
+def _analysis_batch_size() -> int:
+    try:
+        return max(1, int(os.getenv("QB_ANALYSIS_BATCH_SIZE", "8")))
+    except ValueError:
+        return 8
+
+
+async def _run_batched_question_prompts(
+    unified_ai,
+    questions: List[Dict[str, Any]],
+    build_prompt,
+    is_valid,
+    tokens_per_item: int,
+) -> Dict[int, Dict[str, Any]]:
+    """Send questions N per prompt (N = QB_ANALYSIS_BATCH_SIZE) and run the
+    batches concurrently under the provider semaphore.
+
+    Each question is presented with its position as "id"; the model must answer
+    with a JSON array of objects carrying the same ids. Returns {id: item} for
+    items that came back with a known id and pass `is_valid`; callers retry the
+    missing ids one at a time.
+    """
+    batch_size = _analysis_batch_size()
+    semaphore = provider_semaphore(unified_ai)
+
+    async def _run(offset: int, batch: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        entries = [(offset + i, q) for i, q in enumerate(batch)]
+        expected = {item_id for item_id, _ in entries}
+        async with semaphore:
+            try:
+                response = await _agenerate(
+                    unified_ai,
+                    build_prompt(entries),
+                    max_tokens=min(8000, 300 + tokens_per_item * len(entries)),
+                    temperature=0.3,
+                )
+            except Exception as e:
+                logger.error(f"Batched question prompt failed for ids {sorted(expected)}: {e}")
+                return {}
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for item in parse_json_array_response(response or ""):
+            try:
+                item_id = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if item_id in expected and item_id not in parsed and is_valid(item):
+                parsed[item_id] = item
+        return parsed
+
+    results = await asyncio.gather(*[
+        _run(start, questions[start:start + batch_size])
+        for start in range(0, len(questions), batch_size)
+    ])
+    merged: Dict[int, Dict[str, Any]] = {}
+    for result in results:
+        merged.update(result)
+    return merged
+
+
+def _normalize_question_key(text: Any) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]+", " ", str(text or "").lower())).strip()
+
+
+class IncrementalQuestionDeduper:
+    """Accepts questions batch by batch, rejecting near-duplicates of anything
+    already accepted. Uses cosine similarity of sentence embeddings from the
+    shared MiniLM encoder; without an encoder it falls back to normalized-text
+    equality."""
+
+    def __init__(self, threshold: float = 0.9, model: Any = None):
+        self.threshold = threshold
+        self._keys: set = set()
+        self._vectors = None
+        if model is None:
+            try:
+                from services import embedding_service
+                model = embedding_service.get_model(embedding_service.MINILM_MODEL, fallback=None)
+            except Exception as e:
+                logger.debug(f"Embedding dedupe unavailable, using text match: {e}")
+        self._model = model
+
+    def add_batch(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        candidates = []
+        for q in questions or []:
+            key = _normalize_question_key(q.get("question_text", ""))
+            if key and key not in self._keys:
+                candidates.append((key, q))
+        if not candidates:
+            return []
+
+        vectors = None
+        if self._model is not None:
+            try:
+                import numpy as np
+                from services import embedding_service
+                vectors = np.asarray(
+                    embedding_service.encode_many(
+                        self._model, [q.get("question_text", "") for _, q in candidates], normalize=True
+                    ),
+                    dtype=np.float32,
+                )
+            except Exception as e:
+                logger.warning(f"Embedding dedupe failed, using text match: {e}")
+                vectors = None
+
+        accepted = []
+        for idx, (key, q) in enumerate(candidates):
+            if key in self._keys:
+                continue
+            if vectors is not None:
+                import numpy as np
+                vec = vectors[idx]
+                if self._vectors is not None and len(self._vectors):
+                    if float(np.max(self._vectors @ vec)) >= self.threshold:
+                        continue
+                self._vectors = vec[None, :] if self._vectors is None else np.vstack([self._vectors, vec])
+            self._keys.add(key)
+            accepted.append(q)
+        return accepted
+
+
 def repair_text_spacing_artifacts(text: Any) -> str:
     cleaned = str(text or "")
     cleaned = re.sub(r"[\u00a0\u200b\u200c\u200d]", " ", cleaned)
@@ -584,7 +750,7 @@ Return JSON:
 Return ONLY valid JSON."""
 
         try:
-            response = self.unified_ai.generate(prompt, max_tokens=1500, temperature=0.3)
+            response = await _agenerate(self.unified_ai, prompt, max_tokens=1500, temperature=0.3)
 
             if response.startswith('```'):
                 response = re.sub(r'^```(?:json)?\n?', '', response)
@@ -598,10 +764,55 @@ Return ONLY valid JSON."""
             logger.error(f"Question quality scoring error: {e}")
             return {"overall_score": 7, "scores": {}, "improvements": []}
 
+    def _build_batch_prompt(self, entries: List[tuple]) -> str:
+        payload = [{"id": item_id, "question": q} for item_id, q in entries]
+        return f"""Evaluate the quality of each question below.
+
+QUESTIONS:
+{json.dumps(payload, indent=1, default=str)}
+
+For each question score CLARITY, DIFFICULTY_ACCURACY, ANSWER_QUALITY,
+EXPLANATION_QUALITY, RELEVANCE and GRAMMAR from 1-10, then give an overall score.
+
+Return a JSON array with exactly one object per question, using the same "id":
+[
+    {{
+        "id": 0,
+        "overall_score": 8.5,
+        "scores": {{"clarity": 9, "difficulty_accuracy": 8, "answer_quality": 7, "explanation_quality": 8, "relevance": 9, "grammar": 10}},
+        "improvements": ["Specific improvement"]
+    }}
+]
+
+Return ONLY the JSON array."""
+
+    @staticmethod
+    def _valid_batch_item(item: Dict[str, Any]) -> bool:
+        try:
+            score = float(item.get("overall_score"))
+        except (TypeError, ValueError):
+            return False
+        return 0 <= score <= 10
+
     async def batch_score_questions(self, questions: List[Dict]) -> List[Dict]:
+        results = await _run_batched_question_prompts(
+            self.unified_ai, questions, self._build_batch_prompt, self._valid_batch_item, tokens_per_item=220
+        )
+
+        missing = [i for i in range(len(questions)) if i not in results]
+        if missing:
+            logger.info(f"Quality batch scoring: {len(missing)}/{len(questions)} items unparsed, scoring individually")
+            semaphore = provider_semaphore(self.unified_ai)
+
+            async def _single(index: int):
+                async with semaphore:
+                    results[index] = await self.score_question(questions[index])
+
+            await asyncio.gather(*[_single(i) for i in missing])
+
         scored = []
-        for q in questions:
-            score_result = await self.score_question(q)
+        for i, q in enumerate(questions):
+            score_result = results.get(i) or {}
             q['quality_score'] = score_result.get('overall_score', 7)
             q['quality_feedback'] = score_result.get('improvements', [])
             scored.append(q)
@@ -647,7 +858,7 @@ Return JSON:
 Return ONLY valid JSON."""
 
         try:
-            response = self.unified_ai.generate(prompt, max_tokens=800, temperature=0.3)
+            response = await _agenerate(self.unified_ai, prompt, max_tokens=800, temperature=0.3)
 
             if response.startswith('```'):
                 response = re.sub(r'^```(?:json)?\n?', '', response)
@@ -664,9 +875,52 @@ Return ONLY valid JSON."""
             logger.error(f"Bloom taxonomy tagging error: {e}")
             return {"bloom_level": "understand", "confidence": 0.5}
 
+    def _build_batch_prompt(self, entries: List[tuple]) -> str:
+        payload = [{"id": item_id, "question_text": q.get('question_text', '')} for item_id, q in entries]
+        return f"""Classify each question according to Bloom's Taxonomy.
+
+QUESTIONS:
+{json.dumps(payload, indent=1, default=str)}
+
+BLOOM'S TAXONOMY LEVELS (lowest to highest):
+1. REMEMBER - Recall facts (define, list, recall, identify)
+2. UNDERSTAND - Explain ideas (explain, describe, summarize)
+3. APPLY - Use in new situations (use, solve, demonstrate)
+4. ANALYZE - Draw connections (compare, contrast, examine)
+5. EVALUATE - Justify decisions (judge, critique, assess)
+6. CREATE - Produce original work (design, construct, develop)
+
+Return a JSON array with exactly one object per question, using the same "id":
+[
+    {{"id": 0, "bloom_level": "remember|understand|apply|analyze|evaluate|create", "confidence": 0.9}}
+]
+
+Return ONLY the JSON array."""
+
+    def _valid_batch_item(self, item: Dict[str, Any]) -> bool:
+        return str(item.get("bloom_level", "")).strip().lower() in self.BLOOM_LEVELS
+
     async def batch_tag_questions(self, questions: List[Dict]) -> List[Dict]:
-        for q in questions:
-            await self.tag_question(q)
+        results = await _run_batched_question_prompts(
+            self.unified_ai, questions, self._build_batch_prompt, self._valid_batch_item, tokens_per_item=60
+        )
+
+        for i, q in enumerate(questions):
+            result = results.get(i)
+            if result:
+                q['bloom_level'] = str(result.get('bloom_level')).strip().lower()
+                q['bloom_confidence'] = result.get('confidence', 0.5)
+
+        missing = [i for i in range(len(questions)) if i not in results]
+        if missing:
+            logger.info(f"Bloom batch tagging: {len(missing)}/{len(questions)} items unparsed, tagging individually")
+            semaphore = provider_semaphore(self.unified_ai)
+
+            async def _single(index: int):
+                async with semaphore:
+                    await self.tag_question(questions[index])
+
+            await asyncio.gather(*[_single(i) for i in missing])
         return questions
 
 
@@ -932,6 +1186,8 @@ Return ONLY valid JSON."""
 
 
 class QuestionGeneratorAgent:
+    CHUNK_SIZE = 12000
+
     def __init__(self, unified_ai):
         self.unified_ai = unified_ai
 
@@ -950,7 +1206,7 @@ class QuestionGeneratorAgent:
         if reference_content and len(reference_content) > max_ref_chars:
             reference_content = reference_content[:max_ref_chars]
 
-        chunk_size = 12000
+        chunk_size = self.CHUNK_SIZE
 
         if len(content) > chunk_size:
             logger.info(f"Large content detected ({len(content)} chars). Using chunking strategy.")
@@ -964,6 +1220,37 @@ class QuestionGeneratorAgent:
             topics, custom_prompt, reference_content
         )
 
+    async def generate_questions_stream(
+        self,
+        content: str,
+        question_count: int,
+        question_types: List[str],
+        difficulty_distribution: Dict[str, int],
+        topics: List[str] = None,
+        custom_prompt: str = None,
+        reference_content: str = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Like generate_questions, but yields questions in batches as they are ready."""
+
+        max_ref_chars = 5000
+        if reference_content and len(reference_content) > max_ref_chars:
+            reference_content = reference_content[:max_ref_chars]
+
+        if len(content) > self.CHUNK_SIZE:
+            async for batch in self.iter_questions_chunked(
+                content, question_count, question_types, difficulty_distribution,
+                topics, custom_prompt, reference_content, self.CHUNK_SIZE
+            ):
+                yield batch
+            return
+
+        questions = await self._generate_questions_single(
+            content, question_count, question_types, difficulty_distribution,
+            topics, custom_prompt, reference_content
+        )
+        if questions:
+            yield questions
+
     async def _generate_questions_chunked(
         self,
         content: str,
@@ -976,53 +1263,90 @@ class QuestionGeneratorAgent:
         chunk_size: int
     ) -> List[Dict[str, Any]]:
 
+        all_questions = []
+        async for batch in self.iter_questions_chunked(
+            content, question_count, question_types, difficulty_distribution,
+            topics, custom_prompt, reference_content, chunk_size
+        ):
+            all_questions.extend(batch)
+        return all_questions[:question_count]
+
+    async def iter_questions_chunked(
+        self,
+        content: str,
+        question_count: int,
+        question_types: List[str],
+        difficulty_distribution: Dict[str, int],
+        topics: List[str] = None,
+        custom_prompt: str = None,
+        reference_content: str = None,
+        chunk_size: int = 12000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Generate across content chunks concurrently, yielding each chunk's new
+        (deduplicated) questions as soon as that chunk finishes.
+
+        Chunks fan out under the provider semaphore, so a large PDF costs about
+        ceil(chunks / limit) generation rounds instead of one round per chunk.
+        """
+
         chunks = self._split_content_into_chunks(content, chunk_size)
         logger.info(f"Split content into {len(chunks)} chunks")
 
         base_questions_per_chunk = question_count // len(chunks)
         remainder = question_count % len(chunks)
+        semaphore = provider_semaphore(self.unified_ai)
+        deduper = IncrementalQuestionDeduper()
+        accepted = 0
 
-        all_questions = []
-        seen_questions = set()
-
+        async def _run_chunk(index: int, chunk: str, count: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                logger.info(f"Processing chunk {index + 1}/{len(chunks)} ({len(chunk)} chars, {count} questions)")
+                try:
+                    return await self._generate_questions_single(
+                        chunk, count, question_types, difficulty_distribution,
+                        topics, custom_prompt, reference_content
+                    )
+                except Exception as e:
+                    logger.error(f"Chunk {index + 1}/{len(chunks)} question generation failed: {e}")
+                    return []
+
+        tasks = []
         for i, chunk in enumerate(chunks):
             chunk_question_count = base_questions_per_chunk + (remainder if i == len(chunks) - 1 else 0)
-
             if chunk_question_count == 0:
                 continue
+            tasks.append(asyncio.ensure_future(_run_chunk(i, chunk, chunk_question_count)))
 
-            logger.info(f"Processing chunk {i + 1}/{len(chunks)} ({len(chunk)} chars, {chunk_question_count} questions)")
-
-            chunk_questions = await self._generate_questions_single(
-                chunk, chunk_question_count, question_types, difficulty_distribution,
-                topics, custom_prompt, reference_content
-            )
-
-            for q in chunk_questions:
-                q_text = q.get('question_text', '').strip().lower()
-                if q_text and q_text not in seen_questions:
-                    seen_questions.add(q_text)
-                    all_questions.append(q)
-
-        logger.info(f"Generated {len(all_questions)} total questions from {len(chunks)} chunks")
-
-        if len(all_questions) < question_count * 0.7:
-            logger.warning(f"Only got {len(all_questions)} questions, attempting supplementary generation")
-            additional_needed = question_count - len(all_questions)
+        try:
+            for finished in asyncio.as_completed(tasks):
+                chunk_questions = await finished
+                fresh = await run_in_threadpool(deduper.add_batch, chunk_questions)
+                fresh = fresh[:max(0, question_count - accepted)]
+                if fresh:
+                    accepted += len(fresh)
+                    yield fresh
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        logger.info(f"Generated {accepted} total questions from {len(chunks)} chunks")
+
+        if accepted < question_count * 0.7:
+            logger.warning(f"Only got {accepted} questions, attempting supplementary generation")
+            additional_needed = question_count - accepted
 
             summary_content = self._create_content_summary(content, 8000)
-            additional_questions = await self._generate_questions_single(
-                summary_content, additional_needed, question_types, difficulty_distribution,
-                topics, custom_prompt, reference_content
-            )
-
-            for q in additional_questions:
-                q_text = q.get('question_text', '').strip().lower()
-                if q_text and q_text not in seen_questions:
-                    seen_questions.add(q_text)
-                    all_questions.append(q)
+            async with semaphore:
+                additional_questions = await self._generate_questions_single(
+                    summary_content, additional_needed, question_types, difficulty_distribution,
+                    topics, custom_prompt, reference_content
+                )
 
-        return all_questions[:question_count]
+            fresh = await run_in_threadpool(deduper.add_batch, additional_questions)
+            fresh = fresh[:max(0, question_count - accepted)]
+            if fresh:
+                yield fresh
 
     def _split_content_into_chunks(self, content: str, chunk_size: int) -> List[str]:
 
@@ -1202,7 +1526,7 @@ Extract AT LEAST 15-20 testable elements total. Be specific - use exact names, d
 Return ONLY valid JSON."""
 
         try:
-            response = self.unified_ai.generate(analysis_prompt, max_tokens=3000, temperature=0.3)
+            response = await _agenerate(self.unified_ai, analysis_prompt, max_tokens=3000, temperature=0.3)
 
             if response.startswith('```'):
                 response = re.sub(r'^```(?:json)?\n?', '', response)
@@ -1465,7 +1789,7 @@ CRITICAL RULES:
 5. Return ONLY valid JSON array, no other text"""
 
         try:
-            response = self.unified_ai.generate(generation_prompt, max_tokens=6000, temperature=0.4)
+            response = await _agenerate(self.unified_ai, generation_prompt, max_tokens=6000, temperature=0.4)
 
             if response.startswith('```'):
                 response = re.sub(r'^```(?:json)?\n?', '', response)
@@ -1544,7 +1868,7 @@ Rules:
 - Do not include markdown, comments, or text outside the JSON array."""
 
         try:
-            response = self.unified_ai.generate(prompt, max_tokens=5000, temperature=0.35)
+            response = await _agenerate(self.unified_ai, prompt, max_tokens=5000, temperature=0.35)
             questions = self._parse_questions_json(response)
             if questions:
                 logger.info(f"Direct fallback generated {len(questions)} questions")
@@ -2055,7 +2379,7 @@ Requirements:
 Return a JSON object with the same structure as the original."""
 
         try:
-            content = self.unified_ai.generate(prompt, max_tokens=800, temperature=0.8)
+            content = await _agenerate(self.unified_ai, prompt, max_tokens=800, temperature=0.8)
 
             if content.startswith('```'):
                 content = re.sub(r'^```(?:json)?\n?', '', content)
@@ -2096,7 +2420,7 @@ CRITICAL: Each option MUST contain the FULL ANSWER TEXT from the document, not j
 Return a JSON array of questions. If no questions found, return empty array []."""
 
         try:
-            content = self.unified_ai.generate(prompt, max_tokens=4000, temperature=0.3)
+            content = await _agenerate(self.unified_ai, prompt, max_tokens=4000, temperature=0.3)
             logger.info(f"Raw extract_questions response: {content[:200]}")
 
             if content.startswith('```'):
@@ -37,6 +37,7 @@ from .agents import (
     resolve_document_type,
 )
 from .pdf_utils import generate_question_set_pdf
+from services import knowledge_universe, search_index
 from services.storage_service import StorageService
 from .utils import (
     _update_weak_areas,
@@ -525,153 +526,173 @@ def register_question_bank_api(app, unified_ai, get_db_func):
             db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
-    @app.post("/api/qb/generate_from_multiple_pdfs")
-    async def generate_from_multiple_pdfs(
-        request: MultiPDFGenerationRequest,
-        db: Session = Depends(get_db_func)
-    ):
-        try:
-            import models
-            if request.session_id:
-                logger.info(f"QB generate_from_multiple_pdfs session_id={request.session_id}")
+    def _prepare_multi_pdf_generation(models, db: Session, request: MultiPDFGenerationRequest) -> dict:
+        if request.session_id:
+            logger.info(f"QB generate_from_multiple_pdfs session_id={request.session_id}")
 
-            logger.info(f"Generating questions from {len(request.source_ids)} PDFs for user {request.user_id}")
+        logger.info(f"Generating questions from {len(request.source_ids)} PDFs for user {request.user_id}")
 
-            user = _resolve_user_identifier(models, db, request.user_id)
+        user = _resolve_user_identifier(models, db, request.user_id)
 
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
 
-            personalization = _collect_universal_personalization(db, user, models)
-            effective_topics = _merge_request_topics(request.topics, personalization, limit=10)
-            effective_prompt = _build_universal_personalization_prompt(
-                request.custom_prompt,
-                personalization,
-                "multi-PDF question generation"
-            )
+        personalization = _collect_universal_personalization(db, user, models)
+        effective_topics = _merge_request_topics(request.topics, personalization, limit=10)
+        effective_prompt = _build_universal_personalization_prompt(
+            request.custom_prompt,
+            personalization,
+            "multi-PDF question generation"
+        )
 
-            if not request.source_ids or len(request.source_ids) == 0:
-                raise HTTPException(status_code=400, detail="At least one PDF source is required")
+        if not request.source_ids or len(request.source_ids) == 0:
+            raise HTTPException(status_code=400, detail="At least one PDF source is required")
 
-            documents = db.query(models.UploadedDocument).filter(
-                models.UploadedDocument.id.in_(request.source_ids),
-                models.UploadedDocument.user_id == user.id
-            ).all()
+        documents = db.query(models.UploadedDocument).filter(
+            models.UploadedDocument.id.in_(request.source_ids),
+            models.UploadedDocument.user_id == user.id
+        ).all()
 
-            if len(documents) == 0:
-                raise HTTPException(status_code=404, detail="No documents found")
+        if len(documents) == 0:
+            raise HTTPException(status_code=404, detail="No documents found")
 
-            if len(documents) != len(request.source_ids):
-                logger.warning(f"Some documents not found. Requested: {len(request.source_ids)}, Found: {len(documents)}")
+        if len(documents) != len(request.source_ids):
+            logger.warning(f"Some documents not found. Requested: {len(request.source_ids)}, Found: {len(documents)}")
 
-            combined_content_parts = []
-            document_names = []
+        combined_content_parts = []
+        document_names = []
 
-            for doc in documents:
-                document_names.append(doc.filename)
-                combined_content_parts.append(f"=== Document: {doc.filename} ===\n{doc.content}")
+        for doc in documents:
+            document_names.append(doc.filename)
+            combined_content_parts.append(f"=== Document: {doc.filename} ===\n{doc.content}")
 
-            combined_content = "\n\n".join(combined_content_parts)
-            logger.info(f"Combined content from {len(documents)} documents: {len(combined_content)} chars")
-
-            if request.title:
-                title = request.title
-            elif len(document_names) == 1:
-                title = f"Questions from {document_names[0]}"
-            elif len(document_names) <= 3:
-                title = f"Questions from {', '.join(document_names)}"
-            else:
-                title = f"Questions from {len(document_names)} documents"
+        combined_content = "\n\n".join(combined_content_parts)
+        logger.info(f"Combined content from {len(documents)} documents: {len(combined_content)} chars")
 
-            reference_content = None
-            main_content = combined_content
+        if request.title:
+            title = request.title
+        elif len(document_names) == 1:
+            title = f"Questions from {document_names[0]}"
+        elif len(document_names) <= 3:
+            title = f"Questions from {', '.join(document_names)}"
+        else:
+            title = f"Questions from {len(document_names)} documents"
 
-            if request.reference_document_id:
-                reference_doc = next((d for d in documents if d.id == request.reference_document_id), None)
-                if request.content_document_ids:
-                    content_docs = [d for d in documents if d.id in request.content_document_ids]
-                else:
-                    content_docs = [d for d in documents if d.id != request.reference_document_id]
+        reference_content = None
+        main_content = combined_content
 
-                if reference_doc:
-                    reference_content = f"=== Reference: {reference_doc.filename} ===\n{reference_doc.content}"
-                    logger.info(f"Using {reference_doc.filename} as reference/sample questions")
+        if request.reference_document_id:
+            reference_doc = next((d for d in documents if d.id == request.reference_document_id), None)
+            if request.content_document_ids:
+                content_docs = [d for d in documents if d.id in request.content_document_ids]
+            else:
+                content_docs = [d for d in documents if d.id != request.reference_document_id]
 
-                if content_docs:
-                    main_content = "\n\n".join([
-                        f"=== Content: {d.filename} ===\n{d.content}" for d in content_docs
-                    ])
-                    logger.info(f"Using {len(content_docs)} documents as main content")
+            if reference_doc:
+                reference_content = f"=== Reference: {reference_doc.filename} ===\n{reference_doc.content}"
+                logger.info(f"Using {reference_doc.filename} as reference/sample questions")
 
-            if request.custom_prompt:
-                logger.info(f"Custom prompt provided: {request.custom_prompt[:100]}...")
+            if content_docs:
+                main_content = "\n\n".join([
+                    f"=== Content: {d.filename} ===\n{d.content}" for d in content_docs
+                ])
+                logger.info(f"Using {len(content_docs)} documents as main content")
+
+        if request.custom_prompt:
+            logger.info(f"Custom prompt provided: {request.custom_prompt[:100]}...")
+
+        return {
+            "user_id": user.id,
+            "personalization": personalization,
+            "effective_topics": effective_topics,
+            "effective_prompt": effective_prompt,
+            "document_count": len(documents),
+            "document_names": document_names,
+            "title": title,
+            "main_content": main_content,
+            "reference_content": reference_content,
+        }
+
+    def _save_multi_pdf_question_set(models, db: Session, request: MultiPDFGenerationRequest, prepared: dict, questions: list) -> dict:
+        document_names = prepared["document_names"]
+        description_parts = [f"Generated from {prepared['document_count']} PDF documents"]
+        if request.custom_prompt:
+            description_parts.append("with custom instructions")
+        if prepared["reference_content"]:
+            description_parts.append("using reference style")
+        description = f"{'. '.join(description_parts)}: {', '.join(document_names[:3])}{'...' if len(document_names) > 3 else ''}"
+
+        question_set = models.QuestionSet(
+            user_id=prepared["user_id"],
+            title=prepared["title"],
+            description=description,
+            source_type="multi_pdf",
+            source_id=None,
+            total_questions=len(questions)
+        )
+
+        db.add(question_set)
+        db.flush()
+
+        for idx, q in enumerate(questions):
+            q = _clean_question_payload_text(q)
+            question = models.Question(
+                question_set_id=question_set.id,
+                question_text=q.get("question_text"),
+                question_type=q.get("question_type"),
+                difficulty=q.get("difficulty"),
+                topic=q.get("topic"),
+                correct_answer=q.get("correct_answer"),
+                options=json.dumps(q.get("options", [])),
+                explanation=q.get("explanation"),
+                points=q.get("points", 1),
+                order_index=idx
+            )
+            db.add(question)
+
+        db.commit()
+        db.refresh(question_set)
+
+        logger.info(f"Successfully generated {len(questions)} questions from {prepared['document_count']} PDFs")
+
+        personalization = prepared["personalization"]
+        return {
+            "status": "success",
+            "question_set_id": question_set.id,
+            "question_count": len(questions),
+            "title": prepared["title"],
+            "source_documents": document_names,
+            "personalization": {
+                "weak_topics": personalization.get("weak_topics", []),
+                "strong_topics": personalization.get("strong_topics", []),
+                "focus_topics": personalization.get("focus_topics", [])
+            },
+            "session_id": request.session_id
+        }
+
+    @app.post("/api/qb/generate_from_multiple_pdfs")
+    async def generate_from_multiple_pdfs(
+        request: MultiPDFGenerationRequest,
+        db: Session = Depends(get_db_func)
+    ):
+        try:
+            import models
+            prepared = _prepare_multi_pdf_generation(models, db, request)
 
             questions = await agents["question_generator"].generate_questions(
-                main_content,
+                prepared["main_content"],
                 request.question_count,
                 request.question_types,
                 request.difficulty_mix,
-                effective_topics,
-                custom_prompt=effective_prompt,
-                reference_content=reference_content
+                prepared["effective_topics"],
+                custom_prompt=prepared["effective_prompt"],
+                reference_content=prepared["reference_content"]
             )
 
             if not questions:
                 raise HTTPException(status_code=500, detail="Failed to generate questions from the provided documents")
 
-            description_parts = [f"Generated from {len(documents)} PDF documents"]
-            if request.custom_prompt:
-                description_parts.append("with custom instructions")
-            if reference_content:
-                description_parts.append("using reference style")
-            description = f"{'. '.join(description_parts)}: {', '.join(document_names[:3])}{'...' if len(document_names) > 3 else ''}"
-
-            question_set = models.QuestionSet(
-                user_id=user.id,
-                title=title,
-                description=description,
-                source_type="multi_pdf",
-                source_id=None,
-                total_questions=len(questions)
-            )
-
-            db.add(question_set)
-            db.flush()
-
-            for idx, q in enumerate(questions):
-                q = _clean_question_payload_text(q)
-                question = models.Question(
-                    question_set_id=question_set.id,
-                    question_text=q.get("question_text"),
-                    question_type=q.get("question_type"),
-                    difficulty=q.get("difficulty"),
-                    topic=q.get("topic"),
-                    correct_answer=q.get("correct_answer"),
-                    options=json.dumps(q.get("options", [])),
-                    explanation=q.get("explanation"),
-                    points=q.get("points", 1),
-                    order_index=idx
-                )
-                db.add(question)
-
-            db.commit()
-            db.refresh(question_set)
-
-            logger.info(f"Successfully generated {len(questions)} questions from {len(documents)} PDFs")
-
-            return {
-                "status": "success",
-                "question_set_id": question_set.id,
-                "question_count": len(questions),
-                "title": title,
-                "source_documents": document_names,
-                "personalization": {
-                    "weak_topics": personalization.get("weak_topics", []),
-                    "strong_topics": personalization.get("strong_topics", []),
-                    "focus_topics": personalization.get("focus_topics", [])
-                },
-                "session_id": request.session_id
-            }
+            return _save_multi_pdf_question_set(models, db, request, prepared, questions)
 
         except HTTPException as http_e:
             raise http_e
@@ -680,6 +701,65 @@ def register_question_bank_api(app, unified_ai, get_db_func):
             db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
+    @app.post("/api/qb/generate_from_multiple_pdfs/stream")
+    async def generate_from_multiple_pdfs_stream(
+        request: MultiPDFGenerationRequest,
+        db: Session = Depends(get_db_func)
+    ):
+        """NDJSON variant of generate_from_multiple_pdfs: emits a `questions`
+        event as each content chunk finishes, then a `complete` event carrying
+        the saved question set (or an `error` event)."""
+        from fastapi.responses import StreamingResponse
+        import models
+        from database import SessionLocal
+
+        prepared = _prepare_multi_pdf_generation(models, db, request)
+
+        def _event(payload: dict) -> str:
+            return json.dumps(payload, default=str) + "\n"
+
+        async def _events():
+            questions = []
+            try:
+                async for batch in agents["question_generator"].generate_questions_stream(
+                    prepared["main_content"],
+                    request.question_count,
+                    request.question_types,
+                    request.difficulty_mix,
+                    prepared["effective_topics"],
+                    custom_prompt=prepared["effective_prompt"],
+                    reference_content=prepared["reference_content"]
+                ):
+                    batch = [_clean_question_payload_text(q) for q in batch]
+                    questions.extend(batch)
+                    yield _event({
+                        "type": "questions",
+                        "questions": batch,
+                        "generated": len(questions),
+                        "target": request.question_count,
+                    })
+
+                if not questions:
+                    yield _event({"type": "error", "detail": "Failed to generate questions from the provided documents"})
+                    return
+
+                write_db = SessionLocal()
+                try:
+                    result = _save_multi_pdf_question_set(
+                        models, write_db, request, prepared, questions[:request.question_count]
+                    )
+                except Exception:
+                    write_db.rollback()
+                    raise
+                finally:
+                    write_db.close()
+                yield _event({"type": "complete", **result})
+            except Exception as e:
+                logger.error(f"Error streaming questions from multiple PDFs: {e}", exc_info=True)
+                yield _event({"type": "error", "detail": str(e)})
+
+        return StreamingResponse(_events(), media_type="application/x-ndjson")
+
     @app.post("/api/qb/generate_related_from_pdf")
     async def generate_related_from_pdf(
         request: RelatedPDFGenerationRequest,
@@ -1452,6 +1532,7 @@ def register_question_bank_api(app, unified_ai, get_db_func):
             db.query(models.QuestionSession).filter(
                 models.QuestionSession.question_set_id == set_id
             ).delete(synchronize_session=False)
+            knowledge_universe.note_bulk_write(db, question_set.user_id, "quiz_sessions")
 
             db.query(models.Question).filter(
                 models.Question.question_set_id == set_id
@@ -2763,6 +2844,8 @@ def register_question_bank_api(app, unified_ai, get_db_func):
                     db.query(models.QuestionSet).filter(
                         models.QuestionSet.id == set_id
                     ).delete()
+                search_index.remove_documents(db, "question_set", set_ids)
+                knowledge_universe.note_bulk_write(db, user.id, "question_sets")
 
             db.commit()
             db.refresh(merged_set)
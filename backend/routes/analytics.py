@@ -18,6 +18,8 @@ except Exception:
 from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 from services.admin_analytics import check_admin
+from services.context_agent import effective_mastery
+from services import comprehensive_weakness_analyzer, leaderboard_service, search_index
 
 import models
 from database import get_db
@@ -30,6 +32,7 @@ from deps import (
     get_user_by_username,
     unified_ai,
 )
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +40,7 @@ router = APIRouter(
     prefix="/api",
     tags=["analytics"],
     dependencies=[Depends(enforce_request_user_scope)],
+    route_class=OffloadRoute,
 )
 
 DEFAULT_ANALYTICS_TZ = "Asia/Kolkata"
@@ -638,21 +642,15 @@ def get_analytics_history(
 @router.get("/get_global_leaderboard")
 def get_global_leaderboard(limit: int = Query(10), db: Session = Depends(get_db)):
     try:
-        top_users = db.query(models.UserGamificationStats).order_by(
-            models.UserGamificationStats.total_points.desc(),
-            models.UserGamificationStats.user_id.asc(),
-        ).limit(limit).all()
-
-        leaderboard = []
-        for stats in top_users:
-            user = db.query(models.User).filter(models.User.id == stats.user_id).first()
-            if user:
-                leaderboard.append({
-                    "user_id": user.id,
-                    "username": user.username,
-                    "total_points": stats.total_points,
-                    "level": stats.level
-                })
+        leaderboard = [
+            {
+                "user_id": entry["user_id"],
+                "username": entry["username"],
+                "total_points": entry["total_points"],
+                "level": entry["level"]
+            }
+            for entry in leaderboard_service.top(db, leaderboard_service.GLOBAL, limit)
+        ]
 
         return {"leaderboard": leaderboard}
     except Exception as e:
@@ -1127,6 +1125,14 @@ async def admin_rl_live(
         "plan_limits": plan_limits,
     }
 
+
+@router.get("/admin/event-loop/stats")
+async def admin_event_loop_stats(
+    _: str = Depends(check_admin),
+):
+    from middleware.event_loop import get_stats
+    return get_stats()
+
 @router.get("/study_insights/comprehensive")
 async def get_comprehensive_insights(
     user_id: str = Query(...),
@@ -1420,13 +1426,11 @@ async def get_strengths_weaknesses(
     db: Session = Depends(get_db)
 ):
     try:
-        from services.comprehensive_weakness_analyzer import get_comprehensive_weakness_analysis
-
         user = get_user_by_username(db, user_id) or get_user_by_email(db, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        result = get_comprehensive_weakness_analysis(db, user.id, models)
+        result = comprehensive_weakness_analyzer.get_comprehensive_weakness_analysis(db, user.id, models)
         return result
 
     except Exception as e:
@@ -1509,14 +1513,13 @@ async def get_topic_suggestions(
     db: Session = Depends(get_db)
 ):
     try:
-        from services.comprehensive_weakness_analyzer import generate_topic_suggestions
         import json as _json
 
         user = get_user_by_username(db, user_id) or get_user_by_email(db, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        result = generate_topic_suggestions(db, user.id, topic, models, unified_ai)
+        result = comprehensive_weakness_analyzer.generate_topic_suggestions(db, user.id, topic, models, unified_ai)
 
         # Replace generic tips with AI-generated topic-specific ones
         try:
@@ -1565,13 +1568,11 @@ async def get_similar_questions(
     db: Session = Depends(get_db)
 ):
     try:
-        from services.comprehensive_weakness_analyzer import find_similar_questions
-
         user = get_user_by_username(db, user_id) or get_user_by_email(db, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        result = find_similar_questions(db, user.id, topic, models)
+        result = comprehensive_weakness_analyzer.find_similar_questions(db, user.id, topic, models)
         return result
 
     except Exception as e:
@@ -1677,8 +1678,10 @@ async def reset_user_stats(
         for session in sessions:
             db.query(models.ChatMessage).filter(models.ChatMessage.chat_session_id == session.id).delete()
         db.query(models.ChatSession).filter(models.ChatSession.user_id == user.id).delete()
+        search_index.remove_documents(db, "chat", [session.id for session in sessions])
 
         db.query(models.TopicMastery).filter(models.TopicMastery.user_id == user.id).delete()
+        comprehensive_weakness_analyzer.note_bulk_write(db, user.id)
 
         db.query(models.FlashcardStudySession).filter(models.FlashcardStudySession.user_id == user.id).delete()
 
@@ -1878,13 +1881,15 @@ def get_ml_analytics(user_id: str = Query(...), db: Session = Depends(get_db)):
         bkt_states = db.query(models.StudentKnowledgeState).filter_by(user_id=user.id).all()
         bkt_concepts_tracked = len(bkt_states)
         bkt_total_updates = sum(state.interaction_count for state in bkt_states)
-        bkt_avg_mastery = sum(state.p_mastery for state in bkt_states) / len(bkt_states) if bkt_states else 0
+        now = datetime.now(timezone.utc)
+        mastery = {state.id: effective_mastery(state.p_mastery, state.last_updated, now) for state in bkt_states}
+        bkt_avg_mastery = sum(mastery.values()) / len(bkt_states) if bkt_states else 0
         
         top_mastery_concepts = sorted(
             [
                 {
                     "name": state.concept_name or state.concept_id,
-                    "mastery": state.p_mastery,
+                    "mastery": mastery[state.id],
                     "interaction_count": state.interaction_count,
                     "last_updated": state.last_updated.isoformat() if state.last_updated else None
                 }
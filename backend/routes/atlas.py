@@ -0,0 +1,39 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+
+import models
+from database import get_db
+from deps import get_current_user
+from middleware.event_loop import OffloadRoute
+from services import knowledge_universe
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/atlas", tags=["atlas"], route_class=OffloadRoute)
+
+_CLUSTERS = {cid for cid, _, _ in knowledge_universe.CATEGORIES}
+
+
+@router.get("/universe")
+def get_knowledge_universe(
+    request: Request,
+    response: Response,
+    cluster: Optional[str] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(knowledge_universe.PAGE_SIZE, ge=1, le=1000),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # Pages of the materialized graph; follow `next_offset` to load the rest.
+    # The ETag changes only when the composed graph does.
+    if cluster is not None and cluster not in _CLUSTERS:
+        raise HTTPException(status_code=400, detail="Unknown cluster")
+    result = knowledge_universe.page(db, current_user.id, cluster=cluster, offset=offset, limit=limit)
+    etag = result.pop("etag")
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return result
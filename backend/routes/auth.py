@@ -1679,6 +1679,13 @@ async def update_comprehensive_profile(
 
         db.commit()
 
+        try:
+            from services.leaderboard_service import invalidate_profile
+
+            invalidate_profile(user.id)
+        except Exception:
+            pass
+
         if "subscriptionTier" in payload or "billingCycle" in payload or "subscriptionStatus" in payload:
             try:
                 from middleware.rate_limiter import invalidate_subscription_cache
@@ -1,6 +1,4 @@
-import asyncio
 import json
-import random
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import Optional
@@ -12,14 +10,13 @@ from sqlalchemy.orm import Session
 import models
 from database import get_db
 from deps import get_current_user, call_ai, get_user_by_username, get_user_by_email, verify_token
-from services.ai_json_parser import parse_json_array_response
+from services import battle_question_pool
 from services.websocket_manager import manager, notify_battle_challenge, notify_battle_accepted, notify_battle_declined, notify_battle_started, notify_battle_completed
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["battles"])
-
-QUESTION_GENERATION_LOCKS: dict[int, asyncio.Lock] = {}
+router = APIRouter(prefix="/api", tags=["battles"], route_class=OffloadRoute)
 
 
 def _build_question_from_answer_snapshot(answer: dict, index: int) -> Optional[dict]:
@@ -129,6 +126,7 @@ async def create_quiz_battle(
         db.refresh(battle)
 
         logger.info(f"Battle created: ID={battle.id}")
+        battle_question_pool.schedule_refill("battle", subject, battle_question_pool.normalize_difficulty(difficulty))
 
         battle_notification = models.Notification(
             user_id=opponent_id,
@@ -392,6 +390,7 @@ async def create_challenge(
 
         db.add(challenge)
         db.commit()
+        battle_question_pool.schedule_refill("challenge", challenge.subject, challenge.challenge_type or "speed")
 
         return {
             "status": "success",
@@ -611,8 +610,21 @@ async def get_quiz_battle_detail(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _question_payload(q) -> dict:
+    return {
+        "id": q.id,
+        "question": q.question,
+        "options": _safe_json_list(q.options),
+        "correct_answer": q.correct_answer,
+        "explanation": q.explanation
+    }
+
+
+_GENERATION_BUSY = "Questions are still being generated, please retry shortly"
+
+
 @router.post("/generate_battle_questions")
-async def generate_battle_questions(
+def generate_battle_questions(
     payload: dict,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -620,13 +632,8 @@ async def generate_battle_questions(
     try:
         battle_id = payload.get("battle_id")
         subject = payload.get("subject")
-        difficulty = payload.get("difficulty", "intermediate")
+        difficulty = battle_question_pool.normalize_difficulty(payload.get("difficulty", "intermediate"))
         question_count = payload.get("question_count", 10)
-        difficulty = {
-            "easy": "beginner",
-            "medium": "intermediate",
-            "hard": "advanced",
-        }.get(str(difficulty).lower(), str(difficulty).lower())
         try:
             question_count = max(1, min(int(question_count), 50))
         except (TypeError, ValueError):
@@ -642,164 +649,62 @@ async def generate_battle_questions(
         if battle.challenger_id != current_user.id and battle.opponent_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized")
 
-        lock_key = int(battle_id)
-        generation_lock = QUESTION_GENERATION_LOCKS.setdefault(lock_key, asyncio.Lock())
-        generation_lock_acquired = False
-        await generation_lock.acquire()
-        generation_lock_acquired = True
-
-        existing = db.query(models.BattleQuestion).filter(
-            models.BattleQuestion.battle_id == battle_id
-        ).first()
-
-        if existing:
-            questions = db.query(models.BattleQuestion).filter(
+        def saved():
+            db.expire_all()
+            return db.query(models.BattleQuestion).filter(
                 models.BattleQuestion.battle_id == battle_id
             ).all()
 
-            generation_lock.release()
-            generation_lock_acquired = False
-            return {
-                "questions": [{
-                    "id": q.id,
-                    "question": q.question,
-                    "options": _safe_json_list(q.options),
-                    "correct_answer": q.correct_answer,
-                    "explanation": q.explanation
-                } for q in questions]
-            }
+        with battle_question_pool.generation_lock(f"battle:{int(battle_id)}") as lease:
+            questions = saved()
+            if questions:
+                return {"questions": [_question_payload(q) for q in questions]}
+            if not lease:
+                raise HTTPException(status_code=503, detail=_GENERATION_BUSY)
 
-        difficulty_profiles = {
-            "beginner": {
-                "label": "BEGINNER / EASY",
-                "description": (
-                    "Ask direct recall and basic concept questions. Use familiar wording, "
-                    "avoid obscure details, and make distractors clearly wrong to a learner "
-                    "who understands the topic basics."
-                ),
-            },
-            "intermediate": {
-                "label": "INTERMEDIATE / MEDIUM",
-                "description": (
-                    "Ask applied understanding questions. Include cause-effect, chronology, "
-                    "comparisons, and moderately plausible distractors that require more than "
-                    "memorizing a single fact."
-                ),
-            },
-            "advanced": {
-                "label": "ADVANCED / HARD",
-                "description": (
-                    "Ask high-quality analytical questions. Require nuanced reasoning, "
-                    "context, consequences, historiographical or conceptual distinctions, "
-                    "and strong plausible distractors. Avoid simple one-fact recall."
-                ),
-            },
-        }
-        difficulty_profile = difficulty_profiles.get(difficulty, difficulty_profiles["intermediate"])
-
-        prompt = f"""Generate exactly {question_count} multiple choice questions about {subject}.
-Difficulty target: {difficulty_profile["label"]}.
-Difficulty rules: {difficulty_profile["description"]}
-
-Return ONLY a valid JSON array with this exact structure:
-[
-  {{
-    "question": "Question text here?",
-    "options": ["Option A", "Option B", "Option C", "Option D"],
-    "correct_answer": 0,
-    "difficulty": "{difficulty}",
-    "explanation": "Brief explanation of the correct answer"
-  }}
-]
-
-Requirements:
-- Each question must have exactly 4 options
-- correct_answer must be 0, 1, 2, or 3 (index of the correct option)
-- Every question MUST match the requested difficulty target: {difficulty_profile["label"]}
-- Include "difficulty": "{difficulty}" on every question
-- Questions should be clear and unambiguous
-- Do not repeat the same question stem with slightly different options
-- Distractors must be plausible, but exactly one option must be clearly correct
-- Explanations should be concise (1-2 sentences)
-- Make questions engaging and educational
-- Return ONLY the JSON array, no additional text"""
-
-        content = call_ai(prompt, max_tokens=4000, temperature=0.7)
-
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-
-        questions_data = parse_json_array_response(content)
-        if not questions_data:
-            raise ValueError("AI returned empty or invalid questions list")
-        questions_data = questions_data[:question_count]
-
-        for q_data in questions_data:
-            question_text = str(q_data.get("question") or "").strip()
-            if not question_text:
-                raise ValueError("AI returned a question without question text")
-            options = q_data.get("options") or []
-            if isinstance(options, str):
-                options = _safe_json_list(options)
-            options = [str(option).strip() for option in options if str(option).strip()]
-            if len(options) != 4:
-                raise ValueError("AI returned a question without exactly 4 options")
-            try:
-                correct_index = int(q_data.get("correct_answer", 0))
-            except (TypeError, ValueError):
-                correct_index = 0
-            correct_index = max(0, min(correct_index, len(options) - 1))
-            correct_answer_text = options[correct_index]
-            random.shuffle(options)
-            new_correct_index = options.index(correct_answer_text)
-            q_data["options"] = options
-            q_data["correct_answer"] = new_correct_index
-            q_data["difficulty"] = difficulty
-            q_data["question"] = question_text
-
-        saved_questions = []
-        for q_data in questions_data:
-            battle_question = models.BattleQuestion(
-                battle_id=battle_id,
-                question=str(q_data.get("question") or "").strip(),
-                options=json.dumps(q_data["options"]),
-                correct_answer=q_data["correct_answer"],
-                explanation=q_data.get("explanation", "")
-            )
-            db.add(battle_question)
-            db.flush()
-
-            saved_questions.append({
-                "id": battle_question.id,
-                "question": battle_question.question,
-                "options": q_data["options"],
-                "correct_answer": battle_question.correct_answer,
-                "explanation": battle_question.explanation
-            })
+            questions_data = battle_question_pool.acquire_questions("battle", subject, difficulty, question_count)
 
-        if battle.status == "pending":
-            battle.status = "active"
-            battle.started_at = datetime.now(timezone.utc)
+            if not lease.held():
+                questions = saved()
+                battle_question_pool.add_to_pool("battle", subject, difficulty, questions_data)
+                if questions:
+                    return {"questions": [_question_payload(q) for q in questions]}
+                raise HTTPException(status_code=503, detail=_GENERATION_BUSY)
 
-        db.commit()
+            saved_questions = []
+            for q_data in questions_data:
+                battle_question = models.BattleQuestion(
+                    battle_id=battle_id,
+                    question=q_data["question"],
+                    options=json.dumps(q_data["options"]),
+                    correct_answer=q_data["correct_answer"],
+                    explanation=q_data.get("explanation", "")
+                )
+                db.add(battle_question)
+                db.flush()
+
+                saved_questions.append({
+                    "id": battle_question.id,
+                    "question": battle_question.question,
+                    "options": q_data["options"],
+                    "correct_answer": battle_question.correct_answer,
+                    "explanation": battle_question.explanation
+                })
+
+            if battle.status == "pending":
+                battle.status = "active"
+                battle.started_at = datetime.now(timezone.utc)
+
+            db.commit()
 
-        generation_lock.release()
-        generation_lock_acquired = False
         return {"questions": saved_questions}
 
+    except HTTPException:
+        raise
     except json.JSONDecodeError as e:
-        if locals().get("generation_lock_acquired"):
-            generation_lock.release()
         logger.error(f"JSON decode error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
     except Exception as e:
-        if locals().get("generation_lock_acquired"):
-            generation_lock.release()
         db.rollback()
         logger.error(f"Error generating battle questions: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -868,7 +773,7 @@ async def get_challenge_detail(
 
 
 @router.post("/generate_challenge_questions")
-async def generate_challenge_questions(
+def generate_challenge_questions(
     payload: dict,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -878,6 +783,10 @@ async def generate_challenge_questions(
         subject = payload.get("subject", "General Knowledge")
         challenge_type = payload.get("challenge_type", "speed")
         question_count = payload.get("question_count", 10)
+        try:
+            question_count = max(1, min(int(question_count), 50))
+        except (TypeError, ValueError):
+            question_count = 10
 
         challenge = db.query(models.Challenge).filter(
             models.Challenge.id == challenge_id
@@ -896,108 +805,54 @@ async def generate_challenge_questions(
         if not participation:
             raise HTTPException(status_code=403, detail="Not participating in this challenge")
 
-        existing = db.query(models.ChallengeQuestion).filter(
-            models.ChallengeQuestion.challenge_id == challenge_id
-        ).first()
-
-        if existing:
-            questions = db.query(models.ChallengeQuestion).filter(
+        def saved():
+            db.expire_all()
+            return db.query(models.ChallengeQuestion).filter(
                 models.ChallengeQuestion.challenge_id == challenge_id
             ).all()
 
-            return {
-                "questions": [{
-                    "id": q.id,
-                    "question": q.question,
-                    "options": _safe_json_list(q.options),
-                    "correct_answer": q.correct_answer,
-                    "explanation": q.explanation
-                } for q in questions]
-            }
-
-        type_descriptions = {
-            "speed": "fast-paced questions that can be answered quickly",
-            "accuracy": "precise questions requiring careful consideration",
-            "topic_mastery": "comprehensive questions testing deep understanding",
-            "streak": "progressively challenging questions"
-        }
-
-        prompt = f"""Generate exactly {question_count} multiple choice questions about {subject}.
-Challenge type: {challenge_type} - {type_descriptions.get(challenge_type, '')}.
-
-Return ONLY a valid JSON array with this exact structure:
-[
-  {{
-    "question": "Question text here?",
-    "options": ["Option A", "Option B", "Option C", "Option D"],
-    "correct_answer": 0,
-    "explanation": "Brief explanation of the correct answer"
-  }}
-]
-
-Requirements:
-- Each question must have exactly 4 options
-- correct_answer must be 0, 1, 2, or 3 (index of the correct option)
-- Questions should be clear and educational
-- Explanations should be concise (1-2 sentences)
-- Return ONLY the JSON array, no additional text"""
-
-        content = call_ai(prompt, max_tokens=4000, temperature=0.7)
-
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-
-        questions_data = parse_json_array_response(content)
-        if not questions_data:
-            raise ValueError("AI returned empty or invalid questions list")
-
-        for q_data in questions_data:
-            options = q_data.get("options") or []
-            if isinstance(options, str):
-                options = _safe_json_list(options)
-            options = [str(option).strip() for option in options if str(option).strip()]
-            if len(options) != 4:
-                raise ValueError("AI returned a challenge question without exactly 4 options")
-            try:
-                correct_index = int(q_data.get("correct_answer", 0))
-            except (TypeError, ValueError):
-                correct_index = 0
-            correct_index = max(0, min(correct_index, len(options) - 1))
-            correct_answer_text = options[correct_index]
-            random.shuffle(options)
-            new_correct_index = options.index(correct_answer_text)
-            q_data["options"] = options
-            q_data["correct_answer"] = new_correct_index
-
-        saved_questions = []
-        for q_data in questions_data:
-            challenge_question = models.ChallengeQuestion(
-                challenge_id=challenge_id,
-                question=q_data["question"],
-                options=json.dumps(q_data["options"]),
-                correct_answer=q_data["correct_answer"],
-                explanation=q_data.get("explanation", "")
-            )
-            db.add(challenge_question)
-            db.flush()
-
-            saved_questions.append({
-                "id": challenge_question.id,
-                "question": challenge_question.question,
-                "options": q_data["options"],
-                "correct_answer": challenge_question.correct_answer,
-                "explanation": challenge_question.explanation
-            })
+        with battle_question_pool.generation_lock(f"challenge:{int(challenge_id)}") as lease:
+            questions = saved()
+            if questions:
+                return {"questions": [_question_payload(q) for q in questions]}
+            if not lease:
+                raise HTTPException(status_code=503, detail=_GENERATION_BUSY)
+
+            questions_data = battle_question_pool.acquire_questions("challenge", subject, challenge_type, question_count)
+
+            if not lease.held():
+                questions = saved()
+                battle_question_pool.add_to_pool("challenge", subject, challenge_type, questions_data)
+                if questions:
+                    return {"questions": [_question_payload(q) for q in questions]}
+                raise HTTPException(status_code=503, detail=_GENERATION_BUSY)
+
+            saved_questions = []
+            for q_data in questions_data:
+                challenge_question = models.ChallengeQuestion(
+                    challenge_id=challenge_id,
+                    question=q_data["question"],
+                    options=json.dumps(q_data["options"]),
+                    correct_answer=q_data["correct_answer"],
+                    explanation=q_data.get("explanation", "")
+                )
+                db.add(challenge_question)
+                db.flush()
+
+                saved_questions.append({
+                    "id": challenge_question.id,
+                    "question": challenge_question.question,
+                    "options": q_data["options"],
+                    "correct_answer": challenge_question.correct_answer,
+                    "explanation": challenge_question.explanation
+                })
 
-        db.commit()
+            db.commit()
 
         return {"questions": saved_questions}
 
+    except HTTPException:
+        raise
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
@@ -10,9 +10,9 @@ from pathlib import Path
 from typing import List, Optional
 from urllib.parse import urlparse
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
 from pydantic import BaseModel, Field
-from sqlalchemy import and_, text
+from sqlalchemy import and_, func, text
 from sqlalchemy.orm import Session
 from starlette.concurrency import run_in_threadpool
 
@@ -25,6 +25,7 @@ from deps import (
 )
 from services.document_processor import extract_text_from_pdf_detailed
 from services.api_key_pool import ApiKeyPoolExhausted
+from services import redis_cache
 from services.storage_service import StorageService
 from tutor.contract import tutor_contract_instruction
 from uid_utils import resolve_by_id_or_uid
@@ -38,6 +39,7 @@ _SUPPORTED_TEXT_EXTENSIONS = (".txt", ".md", ".markdown")
 _SUPPORTED_TEXT_TYPES = {"text/plain", "text/markdown", "text/x-markdown"}
 _MAX_IMAGE_BYTES = 20 * 1024 * 1024
 _MAX_IMAGES_PER_MESSAGE = 10
+CHAT_HISTORY_MAX_PAGE = 200
 _TUTOR_VISIBLE_OPTION_RE = re.compile(r"(?im)^\s*([A-F])[\).:-]\s+(.{2,220})\s*$")
 _TUTOR_ANSWER_FIELD_RE = re.compile(r'(?is)"answer"\s*:\s*"(.*?)"\s*,\s*"tutor_state"\s*:')
 _TUTOR_STATE_FIELD_RE = re.compile(r'(?is)"tutor_state"\s*:\s*(\{.*?\})\s*,\s*"options"\s*:')
@@ -1170,12 +1172,13 @@ async def ask_ai(
                 )
 
             try:
-                from services.gamification_system import award_points
-                award_points(db, user.id, "ai_chat", {"question": question})
+                from services.gamification_pipeline import enqueue_award
+                enqueue_award(db, user.id, "ai_chat", {"question": question})
             except Exception:
                 pass
 
             db.commit()
+            invalidate_chat_history_cache(chat_id_int)
 
         _intent_result = None
         _computed_confidence = 0.72
@@ -1352,12 +1355,13 @@ async def ask_simple(
                 )
 
             try:
-                from services.gamification_system import award_points
-                award_points(db, user.id, "ai_chat")
+                from services.gamification_pipeline import enqueue_award
+                enqueue_award(db, user.id, "ai_chat")
             except Exception:
                 pass
 
             db.commit()
+            invalidate_chat_history_cache(chat_id_int)
 
         _intent_result = None
         _computed_confidence = 0.72
@@ -1738,12 +1742,13 @@ async def ask_with_files(
                 )
 
             try:
-                from services.gamification_system import award_points
-                award_points(db, user.id, "ai_chat")
+                from services.gamification_pipeline import enqueue_award
+                enqueue_award(db, user.id, "ai_chat")
             except Exception:
                 pass
 
             db.commit()
+            invalidate_chat_history_cache(chat_id_int)
 
         file_summaries = [
             {"file_name": m["filename"], "is_image": m["is_image"], "size": m["size"]}
@@ -1944,12 +1949,66 @@ def get_chat_sessions(
         ]
     }
 
+def _chat_messages_to_entries(messages) -> list[dict]:
+    result = []
+    for msg in messages:
+        result.append({
+            "id": f"user_{msg.id}",
+            "type": "user",
+            "content": msg.user_message,
+            "timestamp": msg.timestamp.isoformat() + "Z",
+        })
+        result.append({
+            "id": f"ai_{msg.id}",
+            "type": "ai",
+            "content": msg.ai_response,
+            "timestamp": msg.timestamp.isoformat() + "Z",
+            "aiConfidence": 0.85,
+        })
+    return result
+
+
+def _attach_tutor_state(result: list[dict], tutor_state_row) -> None:
+    tutor_state_payload = _tutor_state_row_to_payload(tutor_state_row)
+    if not tutor_state_payload:
+        return
+    for entry in reversed(result):
+        if entry.get("type") == "ai":
+            entry["tutorMode"] = True
+            entry["tutorReplyMode"] = tutor_state_row.reply_style or "guided"
+            entry["tutorState"] = tutor_state_payload
+            entry["tutorOptions"] = tutor_state_row.last_options or []
+            break
+
+
+def _chat_messages_etag(session_id: int, last_message_id: int, tutor_state_row, limit, before) -> str:
+    tutor_version = 0
+    if tutor_state_row is not None and tutor_state_row.updated_at is not None:
+        tutor_version = int(tutor_state_row.updated_at.timestamp() * 1000)
+    window = f"{limit}-{before}" if limit else "all"
+    return f'W/"chat-{session_id}-{last_message_id}-{tutor_version}-{window}"'
+
+
+def invalidate_chat_history_cache(session_id: int) -> None:
+    try:
+        redis_cache.invalidate_chat_page(session_id)
+    except Exception as e:
+        logger.debug(f"Chat page cache invalidation failed for session {session_id}: {e}")
+
+
 @router.get("/get_chat_messages")
 def get_chat_messages(
+    request: Request,
+    response: Response,
     chat_id: str = Query(...),
+    limit: Optional[int] = Query(None, ge=1, le=CHAT_HISTORY_MAX_PAGE),
+    before: Optional[int] = Query(None, ge=1),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    # Without `limit` the full history is returned for older clients. With it,
+    # the newest `limit` exchanges come back and X-Next-Cursor is the `before`
+    # id for the previous page. The ETag tracks the session's last message id.
     session = resolve_by_id_or_uid(
         db.query(models.ChatSession).filter(models.ChatSession.user_id == current_user.id),
         models.ChatSession,
@@ -1958,12 +2017,6 @@ def get_chat_messages(
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
 
-    messages = (
-        db.query(models.ChatMessage)
-        .filter(models.ChatMessage.chat_session_id == session.id)
-        .order_by(models.ChatMessage.timestamp.asc())
-        .all()
-    )
     tutor_state_row = (
         db.query(models.ChatTutorState)
         .filter(
@@ -1972,31 +2025,56 @@ def get_chat_messages(
         )
         .first()
     )
-    tutor_state_payload = _tutor_state_row_to_payload(tutor_state_row)
-
-    result = []
-    for msg in messages:
-        result.append({
-            "id": f"user_{msg.id}",
-            "type": "user",
-            "content": msg.user_message,
-            "timestamp": msg.timestamp.isoformat() + "Z",
-        })
-        result.append({
-            "id": f"ai_{msg.id}",
-            "type": "ai",
-            "content": msg.ai_response,
-            "timestamp": msg.timestamp.isoformat() + "Z",
-            "aiConfidence": 0.85,
-        })
-    if tutor_state_payload:
-        for entry in reversed(result):
-            if entry.get("type") == "ai":
-                entry["tutorMode"] = True
-                entry["tutorReplyMode"] = tutor_state_row.reply_style or "guided"
-                entry["tutorState"] = tutor_state_payload
-                entry["tutorOptions"] = tutor_state_row.last_options or []
-                break
+    last_message_id = (
+        db.query(func.max(models.ChatMessage.id))
+        .filter(models.ChatMessage.chat_session_id == session.id)
+        .scalar()
+        or 0
+    )
+    etag = _chat_messages_etag(session.id, last_message_id, tutor_state_row, limit, before)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    if limit is None:
+        messages = (
+            db.query(models.ChatMessage)
+            .filter(models.ChatMessage.chat_session_id == session.id)
+            .order_by(models.ChatMessage.timestamp.asc())
+            .all()
+        )
+        result = _chat_messages_to_entries(messages)
+        _attach_tutor_state(result, tutor_state_row)
+        return result
+
+    latest_page = before is None
+    if latest_page:
+        cached = redis_cache.get_chat_page(session.id)
+        if cached and cached.get("etag") == etag:
+            next_cursor = cached.get("next_cursor")
+            response.headers["X-Has-More"] = "true" if next_cursor else "false"
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = str(next_cursor)
+            return cached["messages"]
+
+    query = db.query(models.ChatMessage).filter(models.ChatMessage.chat_session_id == session.id)
+    if before is not None:
+        query = query.filter(models.ChatMessage.id < before)
+    rows = query.order_by(models.ChatMessage.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+
+    result = _chat_messages_to_entries(rows)
+    next_cursor = rows[0].id if has_more and rows else None
+    if latest_page:
+        _attach_tutor_state(result, tutor_state_row)
+        redis_cache.set_chat_page(session.id, {"etag": etag, "messages": result, "next_cursor": next_cursor})
+
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
     return result
 
 @router.get("/get_chat_history/{session_id}")
@@ -2073,8 +2151,8 @@ def save_chat_message(
         _apply_fallback_chat_title(chat_session, message_data.user_message)
 
     try:
-        from services.gamification_system import award_points
-        award_points(db, chat_session.user_id, "ai_chat")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, chat_session.user_id, "ai_chat")
     except Exception:
         pass
 
@@ -2091,6 +2169,7 @@ def save_chat_message(
         pass
 
     db.commit()
+    invalidate_chat_history_cache(chat_session.id)
     return {"status": "success", "message": "Message saved successfully"}
 
 @router.delete("/delete_chat_session/{session_id}")
@@ -2125,6 +2204,7 @@ def delete_chat_session(
     ).delete(synchronize_session=False)
     db.delete(chat_session)
     db.commit()
+    invalidate_chat_history_cache(session_pk)
 
     return {"status": "success"}
 
@@ -4,6 +4,7 @@ from __future__ import annotations
 import logging
 import uuid
 import json
+from datetime import datetime, timezone
 from pathlib import Path
 from urllib.parse import urlparse, unquote
 import ipaddress
@@ -19,6 +20,7 @@ from sqlalchemy.orm import Session
 
 import models
 from services import context_store
+from services.context_agent import effective_mastery
 from deps import get_db, get_current_user, call_ai
 from services.document_processor import process_upload, CHUNK_SIZE, CHUNK_OVERLAP
 from services.storage_service import StorageService
@@ -335,9 +337,10 @@ def _build_doc_progress_payload(db: Session, user_id: int) -> dict:
     )
     exact_mastery: dict[str, float] = {}
     normalized_states: list[tuple[str, float]] = []
+    now = datetime.now(timezone.utc)
     for state in states:
         key = _normalize_topic_key(state.concept_name or state.concept_id or "")
-        score = float(state.p_mastery or 0.0)
+        score = effective_mastery(state.p_mastery or 0.0, state.last_updated, now)
         if not key:
             continue
         exact_mastery[key] = max(exact_mastery.get(key, -1.0), score)
@@ -7,19 +7,22 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import and_, case, func, or_
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 import models
 from deps import call_ai, enforce_request_user_scope, get_current_user, get_db, get_user_by_email, get_user_by_username, unified_ai
+from services import flashcard_due_queue
 from services.ai_json_parser import parse_json_array_response
 from uid_utils import resolve_by_id_or_uid
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api",
     tags=["flashcards"],
     dependencies=[Depends(enforce_request_user_scope)],
+    route_class=OffloadRoute,
 )
 
 class FlashcardReviewRequest(BaseModel):
@@ -265,6 +268,7 @@ def delete_flashcard_set(
         db.query(models.Flashcard).filter(
             models.Flashcard.set_id == set_pk
         ).delete(synchronize_session=False)
+        flashcard_due_queue.invalidate_user(db, flashcard_set.user_id)
         db.delete(flashcard_set)
         db.commit()
     except Exception as e:
@@ -681,8 +685,8 @@ async def generate_flashcards_endpoint(
         })
 
     try:
-        from services.gamification_system import award_points
-        award_points(db, user.id, "flashcard_created")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, user.id, "flashcard_created")
     except Exception:
         pass
 
@@ -854,30 +858,8 @@ def get_due_flashcards(
 
     now = datetime.now(timezone.utc)
 
-    due_cards = (
-        db.query(models.Flashcard)
-        .join(models.FlashcardSet)
-        .filter(
-            models.FlashcardSet.user_id == user.id,
-            or_(
-                models.Flashcard.next_review_date <= now,
-                and_(
-                    models.Flashcard.next_review_date == None,
-                    or_(
-                        models.Flashcard.sr_state == "new",
-                        models.Flashcard.sr_state == None,
-                    ),
-                ),
-                and_(
-                    models.Flashcard.sr_state.in_(["learning", "relearning"]),
-                    models.Flashcard.next_review_date <= now,
-                ),
-            ),
-        )
-        .order_by(models.Flashcard.next_review_date.asc().nullsfirst())
-        .limit(limit)
-        .all()
-    )
+    due_rows = flashcard_due_queue.due_cards(db, user.id, now, limit)
+    due_cards = [card for card, _ in due_rows]
 
     new_count = sum(1 for c in due_cards if (c.sr_state or "new") == "new")
     review_count = sum(1 for c in due_cards if c.sr_state == "review")
@@ -885,10 +867,7 @@ def get_due_flashcards(
     relearning_count = sum(1 for c in due_cards if c.sr_state == "relearning")
 
     cards_data = []
-    for c in due_cards:
-        fs = db.query(models.FlashcardSet).filter(models.FlashcardSet.id == c.set_id).first()
-        set_title = fs.title if fs else ""
-
+    for c, set_title in due_rows:
         card_state = c.sr_state or "new"
         card_ease = c.ease_factor if c.ease_factor else 2.5
         card_interval = c.interval if c.interval else 0
@@ -903,7 +882,7 @@ def get_due_flashcards(
         cards_data.append({
             "id": c.id,
             "set_id": c.set_id,
-            "set_title": set_title,
+            "set_title": set_title or "",
             "question": c.question,
             "answer": c.answer,
             "difficulty": c.difficulty or "medium",
@@ -969,10 +948,10 @@ async def sr_review(request: SRReviewRequest, db: Session = Depends(get_db)):
     set_title = flashcard_set.title if flashcard_set else ""
 
     try:
-        from services.gamification_system import award_points
-        award_points(db, user.id, "flashcard_reviewed")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, user.id, "flashcard_reviewed")
         if old_state in ("new", "learning") and result["new_state"] == "review":
-            award_points(db, user.id, "flashcard_mastered")
+            enqueue_award(db, user.id, "flashcard_mastered")
     except Exception:
         pass
 
@@ -1027,8 +1006,8 @@ async def sr_review(request: SRReviewRequest, db: Session = Depends(get_db)):
                 concept_id=str(card.set_id),
                 concept_name=_concept_name,
                 correct=_correct,
-                wrong_count=0 if _correct else 1,
-                raw_data={"grade": grade_str, "difficulty": card.difficulty or "medium"},
+                wrong_questions=0 if _correct else 1,
+                raw_data={"grade": grade_str, "difficulty": card.difficulty or "medium", "category": card.category},
             )
             _agent.record_event(db, _event)
     except Exception as _ae:
@@ -1054,14 +1033,9 @@ def get_sr_stats(user_id: str = Query(...), db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    all_cards = (
-        db.query(models.Flashcard)
-        .join(models.FlashcardSet)
-        .filter(models.FlashcardSet.user_id == user.id)
-        .all()
-    )
+    counters = flashcard_due_queue.ensure_user(db, user.id)
 
-    total = len(all_cards)
+    total = (counters.total_cards or 0) if counters else 0
     if total == 0:
         return {
             "total_cards": 0,
@@ -1073,68 +1047,35 @@ def get_sr_stats(user_id: str = Query(...), db: Session = Depends(get_db)):
             "lapse_stats": {"total_lapses": 0, "most_lapsed": []},
         }
 
-    state_dist = {"new": 0, "learning": 0, "review": 0, "relearning": 0}
-    for c in all_cards:
-        state = c.sr_state or "new"
-        if state in state_dist:
-            state_dist[state] += 1
+    state_dist = {
+        "new": counters.new_count or 0,
+        "learning": counters.learning_count or 0,
+        "review": counters.review_count or 0,
+        "relearning": counters.relearning_count or 0,
+    }
 
-    total_reviews = sum(c.times_reviewed or 0 for c in all_cards)
-    total_correct = sum(c.correct_count or 0 for c in all_cards)
+    total_reviews = counters.total_reviews or 0
+    total_correct = counters.total_correct or 0
     retention = round((total_correct / total_reviews * 100), 1) if total_reviews > 0 else 0
 
     ease_buckets = [
-        {"range": "1.3-1.7", "label": "Hard", "count": 0},
-        {"range": "1.7-2.1", "label": "Difficult", "count": 0},
-        {"range": "2.1-2.5", "label": "Normal", "count": 0},
-        {"range": "2.5-2.9", "label": "Easy", "count": 0},
-        {"range": "2.9+", "label": "Very Easy", "count": 0},
+        {"range": "1.3-1.7", "label": "Hard", "count": counters.ease_hard or 0},
+        {"range": "1.7-2.1", "label": "Difficult", "count": counters.ease_difficult or 0},
+        {"range": "2.1-2.5", "label": "Normal", "count": counters.ease_normal or 0},
+        {"range": "2.5-2.9", "label": "Easy", "count": counters.ease_easy or 0},
+        {"range": "2.9+", "label": "Very Easy", "count": counters.ease_very_easy or 0},
     ]
-    for c in all_cards:
-        ease = c.ease_factor or 2.5
-        if ease < 1.7:
-            ease_buckets[0]["count"] += 1
-        elif ease < 2.1:
-            ease_buckets[1]["count"] += 1
-        elif ease < 2.5:
-            ease_buckets[2]["count"] += 1
-        elif ease < 2.9:
-            ease_buckets[3]["count"] += 1
-        else:
-            ease_buckets[4]["count"] += 1
 
     now = datetime.now(timezone.utc)
-    forecast = []
-    for day_offset in range(14):
-        target_date = (now + timedelta(days=day_offset)).date()
-        count = 0
-        for c in all_cards:
-            if c.next_review_date:
-                review_date = c.next_review_date
-                if hasattr(review_date, 'date'):
-                    review_date = review_date.date()
-                if review_date == target_date:
-                    count += 1
-            elif (c.sr_state or "new") == "new" and day_offset == 0:
-                count += 1
-        forecast.append({
-            "date": target_date.isoformat(),
-            "day_label": "Today" if day_offset == 0 else target_date.strftime("%b %d"),
-            "count": count,
-        })
+    forecast = flashcard_due_queue.review_forecast(db, user.id, now)
 
-    review_cards = [c for c in all_cards if c.sr_state == "review"]
-    intervals = [c.interval or 0 for c in review_cards]
-    avg_interval = round(sum(intervals) / len(intervals), 1) if intervals else 0
-    longest = max(intervals) if intervals else 0
-    mature_count = sum(1 for i in intervals if i >= 21)
+    review_card_count = counters.review_count or 0
+    avg_interval = round((counters.review_interval_sum or 0) / review_card_count, 1) if review_card_count else 0
+    longest = flashcard_due_queue.longest_review_interval(db, user.id) if review_card_count else 0
+    mature_count = counters.mature_count or 0
 
-    total_lapses = sum(c.lapses or 0 for c in all_cards)
-    most_lapsed = sorted(
-        [c for c in all_cards if (c.lapses or 0) > 0],
-        key=lambda c: c.lapses or 0,
-        reverse=True,
-    )[:5]
+    total_lapses = counters.total_lapses or 0
+    most_lapsed = flashcard_due_queue.most_lapsed(db, user.id) if total_lapses else []
 
     return {
         "total_cards": total,
@@ -1147,13 +1088,13 @@ def get_sr_stats(user_id: str = Query(...), db: Session = Depends(get_db)):
             "average_interval": avg_interval,
             "mature_count": mature_count,
             "longest_interval": round(longest, 1),
-            "review_card_count": len(review_cards),
+            "review_card_count": review_card_count,
         },
         "lapse_stats": {
             "total_lapses": total_lapses,
             "most_lapsed": [
-                {"card_id": c.id, "question": c.question[:80], "lapses": c.lapses}
-                for c in most_lapsed
+                {"card_id": card_id, "question": question[:80], "lapses": lapses}
+                for card_id, question, lapses in most_lapsed
             ],
         },
     }
@@ -9,11 +9,13 @@ from sqlalchemy.orm import Session
 import models
 from database import get_db
 from deps import get_user_by_username, get_user_by_email, verify_token
+from services import leaderboard_service
 from datetime import datetime, timezone
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["friends"])
+router = APIRouter(prefix="/api", tags=["friends"], route_class=OffloadRoute)
 
 
 @router.get("/search_users")
@@ -580,76 +582,41 @@ async def get_leaderboard(
         if not current_user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        if category == "friends":
-            friendships = db.query(models.Friendship).filter(
-                models.Friendship.user_id == current_user.id
-            ).all()
-            user_ids = [f.friend_id for f in friendships] + [current_user.id]
-        else:
-            user_ids = None
-
-        query = db.query(models.UserGamificationStats, models.User).join(
-            models.User, models.UserGamificationStats.user_id == models.User.id
-        )
-
-        if user_ids:
-            query = query.filter(models.UserGamificationStats.user_id.in_(user_ids))
-
-        results = query.order_by(
-            models.UserGamificationStats.total_points.desc(),
-            models.UserGamificationStats.user_id.asc(),
-        ).limit(limit).all()
-
-        leaderboard = []
-        for rank, (stats, user) in enumerate(results, start=1):
-            leaderboard.append({
-                "rank": rank,
-                "user_id": user.id,
-                "username": user.username,
-                "first_name": user.first_name or "",
-                "last_name": user.last_name or "",
-                "picture_url": user.picture_url or "",
-                "score": stats.total_points or 0,
-                "total_points": stats.total_points or 0,
-                "level": stats.level or 1,
-                "experience": stats.experience or 0,
+        def _row(entry):
+            return {
+                "rank": entry["rank"],
+                "user_id": entry["user_id"],
+                "username": entry["username"],
+                "first_name": entry["first_name"],
+                "last_name": entry["last_name"],
+                "picture_url": entry["picture_url"],
+                "score": entry["total_points"],
+                "total_points": entry["total_points"],
+                "level": entry["level"],
+                "experience": entry["experience"],
                 "metric": "xp",
-                "is_current_user": user.id == current_user.id
-            })
+                "is_current_user": entry["user_id"] == current_user.id
+            }
 
-        current_user_rank = next((item for item in leaderboard if item["is_current_user"]), None)
-        if current_user_rank is None:
-            current_stats = db.query(models.UserGamificationStats).filter(
-                models.UserGamificationStats.user_id == current_user.id
-            ).first()
-            if current_stats and (not user_ids or current_user.id in user_ids):
-                current_points = current_stats.total_points or 0
-                rank_query = db.query(models.UserGamificationStats).filter(
-                    (
-                        models.UserGamificationStats.total_points > current_points
-                    ) | (
-                        (models.UserGamificationStats.total_points == current_points)
-                        & (models.UserGamificationStats.user_id < current_user.id)
-                    )
-                )
-                if user_ids:
-                    rank_query = rank_query.filter(
-                        models.UserGamificationStats.user_id.in_(user_ids)
-                    )
-                current_user_rank = {
-                    "rank": rank_query.count() + 1,
-                    "user_id": current_user.id,
-                    "username": current_user.username,
-                    "first_name": current_user.first_name or "",
-                    "last_name": current_user.last_name or "",
-                    "picture_url": current_user.picture_url or "",
-                    "score": current_points,
-                    "total_points": current_points,
-                    "level": current_stats.level or 1,
-                    "experience": current_stats.experience or 0,
-                    "metric": "xp",
-                    "is_current_user": True,
-                }
+        if category == "friends":
+            friend_ids = [
+                friend_id for (friend_id,) in db.query(models.Friendship.friend_id).filter(
+                    models.Friendship.user_id == current_user.id
+                ).all()
+            ]
+            ranked = leaderboard_service.rank_within(db, friend_ids + [current_user.id])
+            leaderboard = [_row(entry) for entry in ranked[:limit]]
+            current_user_rank = next(
+                (_row(entry) for entry in ranked if entry["user_id"] == current_user.id), None
+            )
+        else:
+            leaderboard = [_row(entry) for entry in leaderboard_service.top(db, leaderboard_service.GLOBAL, limit)]
+            current_user_rank = next((item for item in leaderboard if item["is_current_user"]), None)
+            if current_user_rank is None:
+                rank = leaderboard_service.rank_of(db, current_user.id)
+                profile = leaderboard_service.profiles(db, [current_user.id]).get(current_user.id)
+                if rank is not None and profile is not None:
+                    current_user_rank = _row({**profile, "rank": rank})
 
         return {
             "leaderboard": leaderboard,
@@ -12,6 +12,7 @@ except Exception:
     def _cache_set(key, value, ttl=60): pass
 
 import models
+from services import leaderboard_service
 from deps import (
     calculate_day_streak,
     enforce_request_user_scope,
@@ -21,12 +22,14 @@ from deps import (
     get_user_by_username,
     verify_token,
 )
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api",
     tags=["gamification"],
     dependencies=[Depends(enforce_request_user_scope)],
+    route_class=OffloadRoute,
 )
 
 
@@ -538,34 +541,22 @@ async def get_leaderboard(
     db: Session = Depends(get_db)
 ):
     try:
-        leaderboard_query = db.query(
-            models.User,
-            models.UserGamificationStats
-        ).join(
-            models.UserGamificationStats,
-            models.User.id == models.UserGamificationStats.user_id
-        ).order_by(
-            models.UserGamificationStats.total_points.desc(),
-            models.UserGamificationStats.user_id.asc(),
-        ).limit(limit)
-
-        results = leaderboard_query.all()
-
-        leaderboard = []
-        for rank, (user, stats) in enumerate(results, 1):
-            leaderboard.append({
-                "rank": rank,
-                "user_id": user.id,
-                "username": user.username,
-                "first_name": user.first_name or "",
-                "last_name": user.last_name or "",
-                "picture_url": user.picture_url or "",
-                "total_points": stats.total_points,
-                "level": stats.level,
-                "experience": stats.experience,
-                "weekly_points": stats.weekly_points,
-                "current_streak": stats.current_streak
-            })
+        leaderboard = [
+            {
+                "rank": entry["rank"],
+                "user_id": entry["user_id"],
+                "username": entry["username"],
+                "first_name": entry["first_name"],
+                "last_name": entry["last_name"],
+                "picture_url": entry["picture_url"],
+                "total_points": entry["total_points"],
+                "level": entry["level"],
+                "experience": entry["experience"],
+                "weekly_points": entry["weekly_points"],
+                "current_streak": entry["current_streak"]
+            }
+            for entry in leaderboard_service.top(db, leaderboard_service.GLOBAL, limit)
+        ]
 
         return {"leaderboard": leaderboard}
 
@@ -6,7 +6,7 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 import models
@@ -38,6 +38,7 @@ def intelligence_status():
     from services.memory_service import get_memory_service
     from services.context_agent import get_context_agent
     from services.ml_pipeline import ModelRegistry
+    from services import embedding_service
 
     reg = ModelRegistry.get()
     return {
@@ -45,6 +46,7 @@ def intelligence_status():
         "context_agent": get_context_agent() is not None,
         "embedding_model": reg._embed_model is not None,
         "cross_encoder": reg._cross_encoder is not None,
+        "embedding_runtime": embedding_service.memory_report(),
     }
 
 @router.get("/weakness/profile")
@@ -57,7 +59,7 @@ async def get_weakness_profile(
         user = _resolve_user(db, user_id)
         student_id = user.id
 
-        from services.context_agent import get_context_agent
+        from services.context_agent import effective_mastery, get_context_agent
 
         agent = get_context_agent()
         profile = agent.get_student_profile(db, student_id) if agent else None
@@ -77,12 +79,10 @@ async def get_weakness_profile(
             .all()
         )
 
-        bkt_states = (
-            db.query(models.StudentKnowledgeState)
-            .filter_by(user_id=student_id)
-            .order_by(models.StudentKnowledgeState.p_mastery.asc())
-            .all()
-        )
+        now = datetime.now(timezone.utc)
+        bkt_states = db.query(models.StudentKnowledgeState).filter_by(user_id=student_id).all()
+        mastery = {s.id: effective_mastery(s.p_mastery, s.last_updated, now) for s in bkt_states}
+        bkt_states.sort(key=lambda s: mastery[s.id])
 
         today = date.today()
         daily_metrics = (
@@ -138,20 +138,20 @@ async def get_weakness_profile(
                 weak_out.append({
                     "concept_id": s.concept_id,
                     "concept_name": s.concept_name,
-                    "p_mastery": round(s.p_mastery, 3),
+                    "p_mastery": round(mastery[s.id], 3),
                     "mastery_trend": round(trend, 3),
                     "mastery_trend_label": trend_label,
                     "struggle_sources": [],
                     "interaction_count": s.interaction_count,
                     "last_seen": _safe_isoformat(s.last_updated),
-                    "recommended_action": "review_flashcards" if s.p_mastery < 0.4 else "try_a_quiz",
+                    "recommended_action": "review_flashcards" if mastery[s.id] < 0.4 else "try_a_quiz",
                 })
 
         total_pts = gstats.total_points if gstats else 0
         weekly_pts = gstats.weekly_points if gstats else 0
         streak = gstats.current_streak if gstats else 0
-        mastered_count = len([s for s in bkt_states if s.p_mastery > 0.85])
-        in_progress = len([s for s in bkt_states if 0.3 < s.p_mastery <= 0.85])
+        mastered_count = len([s for s in bkt_states if mastery[s.id] > 0.85])
+        in_progress = len([s for s in bkt_states if 0.3 < mastery[s.id] <= 0.85])
 
         total_mins = sum(m.time_spent_minutes for m in daily_metrics)
         total_study_hours = round(total_mins / 60.0, 1)
@@ -199,8 +199,8 @@ async def get_weakness_profile(
             {
                 "concept_id": s.concept_id,
                 "concept_name": s.concept_name,
-                "p_mastery": round(s.p_mastery, 3),
-                "color": _mastery_color(s.p_mastery),
+                "p_mastery": round(mastery[s.id], 3),
+                "color": _mastery_color(mastery[s.id]),
             }
             for s in bkt_states
         ]
@@ -244,20 +244,18 @@ async def get_weakness_recommendations(
 ):
     try:
         user = _resolve_user(db, user_id)
+        from services.context_agent import effective_mastery
 
-        bkt_states = (
-            db.query(models.StudentKnowledgeState)
-            .filter_by(user_id=user.id)
-            .order_by(models.StudentKnowledgeState.p_mastery.asc())
-            .limit(10)
-            .all()
-        )
+        now = datetime.now(timezone.utc)
+        bkt_states = db.query(models.StudentKnowledgeState).filter_by(user_id=user.id).all()
+        mastery = {s.id: effective_mastery(s.p_mastery, s.last_updated, now) for s in bkt_states}
+        bkt_states.sort(key=lambda s: mastery[s.id])
 
         recommendations = []
         for s in bkt_states[:3]:
             hist = s.mastery_history or []
             trend = (hist[-1] - hist[-2]) if len(hist) >= 2 else 0.0
-            p = s.p_mastery
+            p = mastery[s.id]
             resource = "ask_tutor" if p < 0.3 else ("review_flashcards" if p < 0.6 else "try_a_quiz")
             recommendations.append({
                 "concept_id": s.concept_id,
@@ -299,6 +297,41 @@ class RecordEventRequest(BaseModel):
     intent: str = ""
     message: str = ""
 
+# Capped so every student_id in the body is covered by the user-scope check.
+MAX_EVENT_BATCH = 200
+
+class RecordEventBatchRequest(BaseModel):
+    events: List[RecordEventRequest] = Field(..., min_length=1, max_length=MAX_EVENT_BATCH)
+
+def _learning_event(request: RecordEventRequest):
+    from services.context_agent import LearningEvent
+
+    return LearningEvent(
+        student_id=request.student_id,
+        source=request.source,
+        event_type=request.event_type,
+        concept_id=request.concept_id,
+        concept_name=request.concept_name,
+        session_id=request.session_id,
+        correct=request.correct,
+        score=request.score,
+        wrong_questions=request.wrong_questions,
+        time_seconds=request.time_seconds,
+        frustration=request.frustration,
+        intent=request.intent,
+        message=request.message,
+    )
+
+def _decision_payload(decision) -> dict:
+    return {
+        "triggers_fired": decision.triggers_fired,
+        "inject_concept_to_chat": decision.inject_concept_to_chat,
+        "add_flashcard_reps": decision.add_flashcard_reps,
+        "flashcard_reps_count": decision.flashcard_reps_count,
+        "dim_roadmap_concept": decision.dim_roadmap_concept,
+        "milestone_notification": decision.milestone_notification,
+    }
+
 @router.post("/events/record")
 async def record_event(
     request: RecordEventRequest,
@@ -306,42 +339,42 @@ async def record_event(
     token: str = Depends(verify_token),
 ):
     try:
-        from services.context_agent import get_context_agent, LearningEvent
+        from services.context_agent import get_context_agent
 
         agent = get_context_agent()
         if not agent:
             return JSONResponse(content={"status": "ok", "message": "agent not ready"})
 
-        event = LearningEvent(
-            student_id=request.student_id,
-            source=request.source,
-            event_type=request.event_type,
-            concept_id=request.concept_id,
-            concept_name=request.concept_name,
-            session_id=request.session_id,
-            correct=request.correct,
-            score=request.score,
-            wrong_questions=request.wrong_questions,
-            time_seconds=request.time_seconds,
-            frustration=request.frustration,
-            intent=request.intent,
-            message=request.message,
-        )
+        decision = agent.record_event(db, _learning_event(request))
 
-        decision = agent.record_event(db, event)
+        return JSONResponse(content={"status": "success", **_decision_payload(decision)})
+
+    except Exception as e:
+        logger.error(f"[Intelligence] record event failed: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": "Internal server error"})
+
+@router.post("/events/record/batch")
+async def record_events(
+    request: RecordEventBatchRequest,
+    db: Session = Depends(get_db),
+    token: str = Depends(verify_token),
+):
+    try:
+        from services.context_agent import get_context_agent
+
+        agent = get_context_agent()
+        if not agent:
+            return JSONResponse(content={"status": "ok", "message": "agent not ready"})
+
+        decisions = agent.record_events(db, [_learning_event(e) for e in request.events])
 
         return JSONResponse(content={
             "status": "success",
-            "triggers_fired": decision.triggers_fired,
-            "inject_concept_to_chat": decision.inject_concept_to_chat,
-            "add_flashcard_reps": decision.add_flashcard_reps,
-            "flashcard_reps_count": decision.flashcard_reps_count,
-            "dim_roadmap_concept": decision.dim_roadmap_concept,
-            "milestone_notification": decision.milestone_notification,
+            "decisions": [_decision_payload(d) for d in decisions],
         })
 
     except Exception as e:
-        logger.error(f"[Intelligence] record event failed: {e}")
+        logger.error(f"[Intelligence] record events failed: {e}")
         return JSONResponse(status_code=500, content={"status": "error", "error": "Internal server error"})
 
 @router.get("/session/brief")
@@ -356,7 +389,6 @@ async def get_session_brief(
 
         agent = get_context_agent()
         if agent:
-            agent.apply_forgetting_curve(db, user.id)
             profile = agent.get_student_profile(db, user.id)
             return JSONResponse(content={
                 "status": "success",
@@ -7,6 +7,7 @@ import json
 import logging
 import tempfile
 import traceback
+import shutil
 import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
@@ -14,7 +15,7 @@ from typing import List, Optional
 from urllib.parse import urlparse
 
 import PyPDF2
-from fastapi import APIRouter, Body, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Body, Depends, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
@@ -23,6 +24,7 @@ import models
 from database import get_db
 from deps import call_ai, call_ai_async, get_current_user, get_user_by_email, get_user_by_username, optional_security, SECRET_KEY, ALGORITHM, JWT_AUDIENCE
 from services.api_key_pool import ApiKeyPoolExhausted, is_provider_quota_error, provider_limit_exhausted
+from services import slide_render_cache
 from services.document_processor import extract_text_from_pdf_detailed
 from services.storage_service import StorageService
 
@@ -590,8 +592,8 @@ async def save_media_notes(
 
             db.commit()
 
-        from services.gamification_system import award_points
-        award_points(db, user.id, "note_created")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, user.id, "note_created")
 
         return {
             "success": True,
@@ -1148,11 +1150,83 @@ async def get_slide_file(
         logger.error(f"Error serving slide file: {str(e)}")
         raise HTTPException(status_code=500, detail="Error serving slide file")
 
+async def _converted_slide_pdf(file_path: Path) -> Optional[Path]:
+    """Convert a PowerPoint deck to PDF once per document hash; None when
+    LibreOffice is unavailable or the conversion fails."""
+    doc_hash = await asyncio.to_thread(slide_render_cache.document_hash, file_path)
+    target = SLIDE_CACHE_DIR / f"converted_{doc_hash}.pdf"
+    if target.exists() and target.stat().st_size > 0:
+        return target
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            await asyncio.to_thread(
+                subprocess.run,
+                [
+                    "soffice",
+                    "--headless",
+                    "--convert-to",
+                    "pdf",
+                    "--outdir",
+                    temp_dir,
+                    str(file_path),
+                ],
+                capture_output=True,
+                timeout=60,
+            )
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return None
+        converted_files = [f for f in os.listdir(temp_dir) if f.endswith(".pdf")]
+        if not converted_files:
+            return None
+        shutil.move(os.path.join(temp_dir, converted_files[0]), target)
+    return target
+
+async def _slide_page_response(
+    request: Request,
+    pdf_path: Path,
+    page_number: int,
+    scale: str,
+    image_format: str,
+) -> Response:
+    if scale not in slide_render_cache.SCALES:
+        raise HTTPException(status_code=400, detail=f"Unknown scale. Use one of: {', '.join(slide_render_cache.SCALES)}")
+    fmt = slide_render_cache.negotiate_format(image_format, request.headers.get("accept", ""))
+    doc_hash = await asyncio.to_thread(slide_render_cache.document_hash, pdf_path)
+    try:
+        total_pages = await asyncio.to_thread(slide_render_cache.page_count, pdf_path, doc_hash)
+    except ImportError:
+        raise HTTPException(status_code=500, detail="PyMuPDF not installed for PDF rendering")
+    if page_number < 1 or page_number > total_pages:
+        raise HTTPException(status_code=400, detail=f"Invalid page number. File has {total_pages} pages.")
+
+    etag = slide_render_cache.etag_for(doc_hash, page_number, scale, fmt)
+    headers = {"ETag": etag, "Cache-Control": slide_render_cache.CACHE_CONTROL}
+    if (image_format or "").lower() == "auto":
+        headers["Vary"] = "Accept"
+
+    slide_render_cache.schedule_prerender(pdf_path, doc_hash, page_number, total_pages, scale, fmt)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        content = await asyncio.to_thread(
+            slide_render_cache.get_or_render, pdf_path, doc_hash, page_number, scale, fmt
+        )
+    except slide_render_cache.PageOutOfRange as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error rendering PDF page: {e}")
+        raise HTTPException(status_code=500, detail="Error rendering PDF")
+    return Response(content=content, media_type=slide_render_cache.MEDIA_TYPES[fmt], headers=headers)
+
 @router.get("/slide_image/{slide_id}/{page_number}")
 async def get_slide_image(
+    request: Request,
     slide_id: int,
     page_number: int,
     token: Optional[str] = Query(default=None),
+    scale: str = Query("full"),
+    image_format: str = Query("png", alias="format"),
     credentials=Depends(optional_security),
     db: Session = Depends(get_db),
 ):
@@ -1185,72 +1259,13 @@ async def get_slide_image(
         file_path = _ensure_local_slide_file(slide)
 
         if slide.original_filename.lower().endswith(".pdf"):
-            try:
-                import fitz
-                doc = fitz.open(str(file_path))
-
-                if page_number < 1 or page_number > len(doc):
-                    doc.close()
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Invalid page number. File has {len(doc)} pages.",
-                    )
-
-                page = doc[page_number - 1]
-                mat = fitz.Matrix(2.0, 2.0)
-                pix = page.get_pixmap(matrix=mat)
-                img_bytes = pix.tobytes("png")
-                doc.close()
-
-                return Response(content=img_bytes, media_type="image/png")
-
-            except ImportError:
-                raise HTTPException(status_code=500, detail="PyMuPDF not installed for PDF rendering")
-            except HTTPException:
-                raise
-            except Exception as e:
-                logger.error(f"Error rendering PDF page: {e}")
-                raise HTTPException(status_code=500, detail="Error rendering PDF")
+            return await _slide_page_response(request, file_path, page_number, scale, image_format)
 
         elif slide.original_filename.lower().endswith((".ppt", ".pptx")):
             try:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    try:
-                        result = await asyncio.to_thread(
-                            subprocess.run,
-                            [
-                                "soffice",
-                                "--headless",
-                                "--convert-to",
-                                "pdf",
-                                "--outdir",
-                                temp_dir,
-                                str(file_path),
-                            ],
-                            capture_output=True,
-                            timeout=60,
-                        )
-
-                        converted_files = [f for f in os.listdir(temp_dir) if f.endswith(".pdf")]
-                        if converted_files:
-                            pdf_path = os.path.join(temp_dir, converted_files[0])
-
-                            import fitz
-                            doc = fitz.open(pdf_path)
-
-                            if page_number < 1 or page_number > len(doc):
-                                doc.close()
-                                raise HTTPException(status_code=400, detail="Invalid page number")
-
-                            page = doc[page_number - 1]
-                            mat = fitz.Matrix(2.0, 2.0)
-                            pix = page.get_pixmap(matrix=mat)
-                            img_bytes = pix.tobytes("png")
-                            doc.close()
-
-                            return Response(content=img_bytes, media_type="image/png")
-                    except (subprocess.TimeoutExpired, FileNotFoundError):
-                        pass
+                pdf_path = await _converted_slide_pdf(file_path)
+                if pdf_path is not None:
+                    return await _slide_page_response(request, pdf_path, page_number, scale, image_format)
 
                 try:
                     from pptx import Presentation as PptxPresentation
@@ -542,8 +542,8 @@ def create_note(note_data: NoteCreate, db: Session = Depends(get_db)):
     db.commit()
 
     try:
-        from services.gamification_system import award_points
-        award_points(db, user.id, "note_created")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, user.id, "note_created")
         db.commit()
     except Exception:
         pass
@@ -659,8 +659,8 @@ async def create_note_from_context_docs(
     db.refresh(new_note)
 
     try:
-        from services.gamification_system import award_points
-        award_points(db, user.id, "note_created")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, user.id, "note_created")
         db.commit()
     except Exception:
         pass
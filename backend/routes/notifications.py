@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from datetime import datetime, timedelta, timezone
@@ -9,10 +10,12 @@ from sqlalchemy.orm import Session
 import models
 from database import get_db
 from deps import get_current_user
+from services import reminder_notifications
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api", tags=["notifications"])
+router = APIRouter(prefix="/api", tags=["notifications"], route_class=OffloadRoute)
 
 def _assert_user_matches_request(user_id: Optional[str], current_user: models.User) -> None:
     if user_id is None:
@@ -37,22 +40,6 @@ def _parse_hours_list(raw: str) -> List[float]:
             continue
     return sorted(set(hours))
 
-def _normalize_dt(dt: Optional[datetime]) -> Optional[datetime]:
-    if not dt:
-        return None
-    if dt.tzinfo is not None:
-        return dt.astimezone(timezone.utc).replace(tzinfo=None)
-    return dt
-
-def _safe_notify_before_minutes(reminder: models.Reminder, default: int = 15) -> int:
-    try:
-        value = reminder.notify_before_minutes
-        if value is None:
-            return default
-        return int(value)
-    except Exception:
-        return default
-
 def _format_offline_duration(hours: float) -> str:
     if hours < 24:
         rounded = max(1, int(hours))
@@ -60,22 +47,12 @@ def _format_offline_duration(hours: float) -> str:
     days = int(hours // 24)
     return f"{days} day{'s' if days != 1 else ''}"
 
-def _get_reminder_notif_meta(reminder: models.Reminder) -> tuple[str, str]:
-    notif_type = "calendar_event" if reminder.reminder_type in ("event", "calendar_event") else "reminder"
-    title_prefix = "Event" if notif_type == "calendar_event" else "Reminder"
-    return notif_type, title_prefix
-
-def _reminder_notification_marker(reminder_id: int) -> str:
-    return f"[reminder_id:{reminder_id}]"
-
-def _reminder_due_at_marker(reminder_dt: datetime) -> str:
-    return f"[reminder_due_at:{reminder_dt.isoformat()}]"
-
 @router.get("/get_notifications")
 async def get_notifications(
     user_id: str = Query(...),
     timezone_offset: int = Query(0),
     limit: int = Query(50, ge=1, le=200),
+    since: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -83,78 +60,24 @@ async def get_notifications(
         _assert_user_matches_request(user_id, current_user)
         user = current_user
 
-        now = _normalize_dt(datetime.now(timezone.utc))
-        reminder_now = now - timedelta(minutes=timezone_offset)
         try:
-            reminder_candidates = db.query(models.Reminder).filter(
-                models.Reminder.user_id == user.id,
-                models.Reminder.is_completed == False,
-                models.Reminder.reminder_date != None
-            ).all()
-
-            for reminder in reminder_candidates:
-                notif_type, title_prefix = _get_reminder_notif_meta(reminder)
-                reminder_dt = _normalize_dt(reminder.reminder_date)
-                if not reminder_dt:
-                    continue
-                time_until = reminder_dt - reminder_now
-                minutes_until = time_until.total_seconds() / 60
-                notify_before = _safe_notify_before_minutes(reminder)
-
-                if minutes_until <= notify_before:
-                    notification_title = f"{title_prefix}: {reminder.title}"
-                    notification_marker = _reminder_notification_marker(reminder.id)
-                    due_at_marker = _reminder_due_at_marker(reminder_dt)
-                    existing = db.query(models.Notification).filter(
-                        models.Notification.user_id == user.id,
-                        models.Notification.notification_type == notif_type,
-                        models.Notification.message.contains(notification_marker)
-                    ).first()
-
-                    if existing:
-                        if not reminder.is_notified:
-                            reminder.is_notified = True
-                            db.commit()
-                        continue
-
-                    claimed_reminder = False
-                    if not reminder.is_notified:
-                        claimed_reminder = db.query(models.Reminder).filter(
-                            models.Reminder.id == reminder.id,
-                            models.Reminder.user_id == user.id,
-                            models.Reminder.is_notified == False,
-                        ).update({"is_notified": True}, synchronize_session=False) == 1
-
-                    if claimed_reminder:
-                        reminder_time = reminder_dt.strftime("%I:%M %p")
-                        notification = models.Notification(
-                            user_id=user.id,
-                            title=notification_title,
-                            message=f"{reminder.description or 'Upcoming reminder'} - Due at {reminder_time} {notification_marker} {due_at_marker}",
-                            notification_type=notif_type
-                        )
-                        db.add(notification)
-                        logger.info(f"Created reminder notification for: {reminder.title}")
-                    db.commit()
+            reminder_notifications.adopt_client_offset(db, user.id, timezone_offset)
         except Exception as e:
-            logger.error(f"Error generating reminder notifications: {str(e)}", exc_info=True)
+            db.rollback()
+            logger.error(f"Error scheduling legacy reminders: {str(e)}", exc_info=True)
 
-        notifications = db.query(models.Notification).filter(
-            models.Notification.user_id == user.id
-        ).order_by(models.Notification.created_at.desc()).limit(limit).all()
+        if since is not None:
+            notifications = reminder_notifications.unread_since(db, user.id, since, limit)
+            cursor = notifications[-1].id if notifications else since
+        else:
+            notifications = db.query(models.Notification).filter(
+                models.Notification.user_id == user.id
+            ).order_by(models.Notification.created_at.desc()).limit(limit).all()
+            cursor = max((n.id for n in notifications), default=0)
 
         return {
-            "notifications": [
-                {
-                    "id": n.id,
-                    "title": n.title,
-                    "message": n.message,
-                    "notification_type": n.notification_type,
-                    "is_read": n.is_read,
-                    "created_at": n.created_at.isoformat() + 'Z'
-                }
-                for n in notifications
-            ]
+            "notifications": [reminder_notifications.serialize(n) for n in notifications],
+            "cursor": cursor,
         }
     except HTTPException as he:
         logger.error(f"HTTPException in get_notifications: {he.detail}")
@@ -163,6 +86,36 @@ async def get_notifications(
         logger.error(f"Error getting notifications: {str(e)}", exc_info=True)
         return {"notifications": []}
 
+@router.get("/notifications/poll")
+async def poll_notifications(
+    since: int = Query(0, ge=0),
+    timeout: int = Query(25, ge=0, le=55),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        notifications = [
+            reminder_notifications.serialize(n)
+            for n in reminder_notifications.unread_since(db, current_user.id, since, limit)
+        ]
+        # End the read transaction so an idle long-poll does not pin a pooled connection.
+        db.rollback()
+        remaining = deadline - loop.time()
+        if notifications or remaining <= 0:
+            break
+        await reminder_notifications.wait_for_notifications(
+            current_user.id,
+            min(remaining, reminder_notifications.LONG_POLL_RECHECK_SECONDS),
+        )
+
+    return {
+        "notifications": notifications,
+        "cursor": notifications[-1]["id"] if notifications else since,
+    }
+
 @router.put("/mark_notification_read/{notification_id}")
 async def mark_notification_read(
     notification_id: int,
@@ -370,107 +323,28 @@ async def check_reminder_notifications(
         _assert_user_matches_request(user_id, current_user)
         user = current_user
 
-        if current_time:
-            try:
-                now = datetime.fromisoformat(current_time.replace('Z', '').replace('+00:00', ''))
-                logger.info(f"Using client time: {now}")
-            except Exception:
-                now = datetime.now(timezone.utc)
-                logger.info(f"Failed to parse client time, using server time: {now}")
-        else:
-            now = datetime.now(timezone.utc)
-            logger.info(f"No client time provided, using server time: {now}")
-        now = _normalize_dt(now)
-
-        notifications_created = []
-
-        pending_reminders = db.query(models.Reminder).filter(
-            models.Reminder.user_id == user.id,
-            models.Reminder.is_completed == False,
-            models.Reminder.is_notified == False,
-            models.Reminder.reminder_date != None
-        ).all()
-
-        logger.info(f"Found {len(pending_reminders)} pending reminders for user {user_id}")
-
-        for reminder in pending_reminders:
-            reminder_dt = _normalize_dt(reminder.reminder_date)
-            if not reminder_dt:
-                continue
-
-            time_until = reminder_dt - now
-            minutes_until = time_until.total_seconds() / 60
-
-            notify_before = _safe_notify_before_minutes(reminder)
-            logger.info(f"Reminder '{reminder.title}': scheduled={reminder_dt}, now={now}, minutes_until={minutes_until:.1f}, notify_before={notify_before}")
-
-            notify_window_start = notify_before
-            is_in_notify_window = minutes_until <= notify_window_start and minutes_until >= -30
-
-            if is_in_notify_window:
-                notif_type, title_prefix = _get_reminder_notif_meta(reminder)
-                existing_notification = db.query(models.Notification).filter(
-                    models.Notification.user_id == user.id,
-                    models.Notification.notification_type == notif_type,
-                    models.Notification.title.contains(reminder.title),
-                    models.Notification.created_at >= datetime.now(timezone.utc) - timedelta(hours=1)
-                ).first()
-
-                if existing_notification:
-                    logger.info(f"Skipping duplicate notification for: {reminder.title}")
-                    continue
-
-                reminder_time = reminder.reminder_date.strftime('%I:%M %p')
-                reminder_date_str = reminder.reminder_date.strftime('%B %d, %Y at %I:%M %p')
-
-                base_title = f"{title_prefix}: {reminder.title}"
-                if minutes_until <= 0:
-                    notification = models.Notification(
-                        user_id=user.id,
-                        title=f"{base_title} - NOW!",
-                        message=f"{reminder.description or 'Your event is happening now!'} - Scheduled for {reminder_time}",
-                        notification_type=notif_type
-                    )
-                elif minutes_until <= 5:
-                    notification = models.Notification(
-                        user_id=user.id,
-                        title=f"{base_title} - In {int(minutes_until)} min!",
-                        message=f"{reminder.description or 'Your reminder is coming up!'} - Due at {reminder_time}",
-                        notification_type=notif_type
-                    )
-                else:
-                    notification = models.Notification(
-                        user_id=user.id,
-                        title=f"{base_title}",
-                        message=f"{reminder.description or 'Your scheduled reminder'} - Due at {reminder_time} (in {int(minutes_until)} min)",
-                        notification_type=notif_type
-                    )
-
-                db.add(notification)
-                reminder.is_notified = True
-
-                notifications_created.append({
-                    "reminder_id": reminder.id,
-                    "title": reminder.title,
-                    "minutes_until": round(minutes_until),
-                    "reminder_time": reminder_date_str
-                })
-
-                logger.info(f"Created reminder notification for: {reminder.title} at {reminder_date_str}")
-
-        if notifications_created:
-            db.commit()
-            logger.info(f"Created {len(notifications_created)} reminder notifications")
+        # Reminders are scheduled in UTC via notify_at, so the client clock is
+        # only echoed back for debugging.
+        created = reminder_notifications.materialize_due(db, user_id=user.id)
+        details = [
+            {
+                "reminder_id": n.reminder_id,
+                "title": n.title,
+                "fire_at": n.fire_at.isoformat() + "Z" if n.fire_at else None,
+            }
+            for n in created
+        ]
+        if created:
+            logger.info(f"Created {len(created)} reminder notifications")
 
         return {
             "status": "success",
-            "notifications_created": len(notifications_created),
-            "details": notifications_created,
+            "notifications_created": len(created),
+            "details": details,
             "server_time": datetime.now(timezone.utc).isoformat(),
             "client_time_received": current_time
         }
     except Exception as e:
-        logger.error(f"Error checking reminder notifications: {str(e)}")
         logger.error("reminder notification check error: %s", e, exc_info=True)
         db.rollback()
         return {"status": "error", "message": "Internal server error", "notifications_created": 0}
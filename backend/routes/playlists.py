@@ -10,9 +10,10 @@ from sqlalchemy.orm import Session
 import models
 from deps import get_current_user, get_db, get_user_by_email, get_user_by_username
 from uid_utils import resolve_by_id_or_uid
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api", tags=["playlists"])
+router = APIRouter(prefix="/api", tags=["playlists"], route_class=OffloadRoute)
 
 
 def _resolve_playlist(db: Session, playlist_id: str) -> models.LearningPlaylist:
@@ -16,12 +16,14 @@ from deps import (
     get_user_by_email,
     get_user_by_username,
 )
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api",
     tags=["reviews"],
     dependencies=[Depends(enforce_request_user_scope)],
+    route_class=OffloadRoute,
 )
 
 @router.get("/get_learning_reviews")
@@ -536,6 +538,12 @@ async def update_comprehensive_profile(
 
         db.commit()
 
+        try:
+            from services.leaderboard_service import invalidate_profile
+            invalidate_profile(user.id)
+        except Exception:
+            pass
+
         try:
             from caching.db_cache import invalidate_user_cache
             invalidate_user_cache(user.id)
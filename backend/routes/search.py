@@ -12,6 +12,7 @@ from sqlalchemy import func, and_, or_
 import models
 from database import get_db
 from deps import call_ai, call_ai_async, get_current_user, get_user_by_username, get_user_by_email
+from services import search_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["search"])
@@ -259,6 +260,239 @@ def _clean_prompt_topic(text: str) -> str:
     cleaned = _re.sub(r"^(ai generated:|cerbyl:|flashcards?:|notes?:|chats?:|new chat)\s*", "", (text or ""), flags=_re.IGNORECASE)
     return cleaned.strip()
 
+def _legacy_search_results(db: Session, user_id: int, query: str, expanded_terms: list, enabled_types: list,
+                           date_from_obj: Optional[datetime], date_to_obj: Optional[datetime]) -> list:
+    """LIKE scan per content type; used when the search index is not installed."""
+    results = []
+
+    def build_search_conditions(column, terms):
+        conditions = []
+        for term in terms:
+            search_term = f"%{term.lower()}%"
+            conditions.append(func.lower(column).like(search_term))
+        return or_(*conditions) if conditions else func.lower(column).like(f"%{query.lower()}%")
+
+    if "flashcard_set" in enabled_types:
+        try:
+            title_conditions = build_search_conditions(models.FlashcardSet.title, expanded_terms)
+            desc_conditions = build_search_conditions(models.FlashcardSet.description, expanded_terms)
+
+            query_builder = db.query(models.FlashcardSet).filter(
+                and_(
+                    or_(title_conditions, desc_conditions),
+                    or_(
+                        models.FlashcardSet.user_id == user_id,
+                        models.FlashcardSet.is_public == True
+                    )
+                )
+            )
+
+            if date_from_obj:
+                query_builder = query_builder.filter(models.FlashcardSet.created_at >= date_from_obj)
+            if date_to_obj:
+                query_builder = query_builder.filter(models.FlashcardSet.created_at <= date_to_obj)
+
+            flashcard_sets = query_builder.all()
+
+            for fset in flashcard_sets:
+                card_count = db.query(models.Flashcard).filter(
+                    models.Flashcard.set_id == fset.id
+                ).count()
+
+                author = db.query(models.User).filter(models.User.id == fset.user_id).first()
+                author_name = author.username if author else "Unknown"
+
+                results.append({
+                    "id": fset.id,
+                    "uid": fset.public_token,
+                    "type": "flashcard_set",
+                    "title": fset.title or "Untitled Set",
+                    "description": fset.description or "",
+                    "created_at": fset.created_at.isoformat() if fset.created_at else None,
+                    "card_count": card_count,
+                    "source_type": fset.source_type,
+                    "author": author_name,
+                    "author_id": fset.user_id,
+                    "is_public": fset.is_public,
+                    "is_own": fset.user_id == user_id
+                })
+        except Exception as e:
+            logger.error(f"Error searching flashcard sets: {str(e)}")
+
+    if "flashcard" in enabled_types:
+        try:
+            question_conditions = build_search_conditions(models.Flashcard.question, expanded_terms)
+            answer_conditions = build_search_conditions(models.Flashcard.answer, expanded_terms)
+
+            query_builder = db.query(models.Flashcard).join(
+                models.FlashcardSet
+            ).filter(
+                and_(
+                    or_(question_conditions, answer_conditions),
+                    or_(
+                        models.FlashcardSet.user_id == user_id,
+                        models.FlashcardSet.is_public == True
+                    )
+                )
+            )
+
+            if date_from_obj:
+                query_builder = query_builder.filter(models.Flashcard.created_at >= date_from_obj)
+            if date_to_obj:
+                query_builder = query_builder.filter(models.Flashcard.created_at <= date_to_obj)
+
+            flashcards = query_builder.limit(50).all()
+            logger.info(f"Found {len(flashcards)} individual flashcards (own + public)")
+
+            for card in flashcards:
+                fset = db.query(models.FlashcardSet).filter(
+                    models.FlashcardSet.id == card.set_id
+                ).first()
+
+                author = db.query(models.User).filter(models.User.id == fset.user_id).first() if fset else None
+                author_name = author.username if author else "Unknown"
+
+                results.append({
+                    "id": card.id,
+                    "type": "flashcard",
+                    "title": card.question[:100] if card.question else "Flashcard",
+                    "description": card.answer[:200] if card.answer else "",
+                    "created_at": card.created_at.isoformat() if card.created_at else None,
+                    "set_name": fset.title if fset else None,
+                    "set_id": card.set_id,
+                    "set_uid": fset.public_token if fset else None,
+                    "difficulty": card.difficulty,
+                    "author": author_name,
+                    "author_id": fset.user_id if fset else None,
+                    "is_public": fset.is_public if fset else False,
+                    "is_own": fset.user_id == user_id if fset else False
+                })
+        except Exception as e:
+            logger.error(f"Error searching flashcards: {str(e)}")
+
+    if "note" in enabled_types:
+        try:
+            title_conditions = build_search_conditions(models.Note.title, expanded_terms)
+            content_conditions = build_search_conditions(models.Note.content, expanded_terms)
+
+            query_builder = db.query(models.Note).filter(
+                and_(
+                    models.Note.is_deleted == False,
+                    or_(title_conditions, content_conditions),
+                    or_(
+                        models.Note.user_id == user_id,
+                        models.Note.is_public == True
+                    )
+                )
+            )
+
+            if date_from_obj:
+                query_builder = query_builder.filter(models.Note.created_at >= date_from_obj)
+            if date_to_obj:
+                query_builder = query_builder.filter(models.Note.created_at <= date_to_obj)
+
+            notes = query_builder.limit(50).all()
+            logger.info(f"Found {len(notes)} notes (own + public)")
+
+            for note in notes:
+                author = db.query(models.User).filter(models.User.id == note.user_id).first()
+                author_name = author.username if author else "Unknown"
+
+                results.append({
+                    "id": note.id,
+                    "uid": note.uid,
+                    "type": "note",
+                    "title": note.title if note.title else "Untitled Note",
+                    "description": note.content[:200] if note.content else "",
+                    "created_at": note.created_at.isoformat() if note.created_at else None,
+                    "is_favorite": note.is_favorite,
+                    "folder_id": note.folder_id,
+                    "author": author_name,
+                    "author_id": note.user_id,
+                    "is_public": note.is_public,
+                    "is_own": note.user_id == user_id
+                })
+        except Exception as e:
+            logger.error(f"Error searching notes: {str(e)}")
+
+    if "chat" in enabled_types:
+        try:
+            title_conditions = build_search_conditions(models.ChatSession.title, expanded_terms)
+
+            query_builder = db.query(models.ChatSession).filter(
+                and_(
+                    models.ChatSession.user_id == user_id,
+                    title_conditions
+                )
+            )
+
+            if date_from_obj:
+                query_builder = query_builder.filter(models.ChatSession.created_at >= date_from_obj)
+            if date_to_obj:
+                query_builder = query_builder.filter(models.ChatSession.created_at <= date_to_obj)
+
+            chats = query_builder.limit(50).all()
+            logger.info(f"Found {len(chats)} chat sessions")
+
+            for chat in chats:
+                message_count = db.query(models.ChatMessage).filter(
+                    models.ChatMessage.chat_session_id == chat.id
+                ).count()
+
+                results.append({
+                    "id": chat.id,
+                    "uid": chat.public_token,
+                    "type": "chat",
+                    "title": chat.title or "Untitled Chat",
+                    "description": f"{message_count} messages",
+                    "created_at": chat.created_at.isoformat() if chat.created_at else None,
+                    "updated_at": chat.updated_at.isoformat() if chat.updated_at else None,
+                    "message_count": message_count,
+                    "folder_id": chat.folder_id
+                })
+        except Exception as e:
+            logger.error(f"Error searching chats: {str(e)}")
+
+    if "question_set" in enabled_types:
+        try:
+            title_conditions = build_search_conditions(models.QuestionSet.title, expanded_terms)
+            desc_conditions = build_search_conditions(models.QuestionSet.description, expanded_terms)
+
+            query_builder = db.query(models.QuestionSet).filter(
+                and_(
+                    models.QuestionSet.user_id == user_id,
+                    or_(title_conditions, desc_conditions)
+                )
+            )
+
+            if date_from_obj:
+                query_builder = query_builder.filter(models.QuestionSet.created_at >= date_from_obj)
+            if date_to_obj:
+                query_builder = query_builder.filter(models.QuestionSet.created_at <= date_to_obj)
+
+            question_sets = query_builder.limit(50).all()
+            logger.info(f"Found {len(question_sets)} question sets")
+
+            for qset in question_sets:
+                question_count = db.query(models.Question).filter(
+                    models.Question.question_set_id == qset.id
+                ).count()
+
+                results.append({
+                    "id": qset.id,
+                    "type": "question_set",
+                    "title": qset.title,
+                    "description": qset.description or "",
+                    "created_at": qset.created_at.isoformat() if qset.created_at else None,
+                    "question_count": question_count,
+                    "difficulty": None,
+                    "subject": None
+                })
+        except Exception as e:
+            logger.error(f"Error searching question sets: {str(e)}")
+
+    return results
+
 @router.post("/search_content")
 async def search_content(
     user_id: str = Form(...),
@@ -277,7 +511,6 @@ async def search_content(
             return {"results": [], "total": 0, "message": "User not found"}
 
         actual_user_id = user.id
-        results = []
 
         expanded_terms = await get_expanded_search_terms(query)
         logger.info(f"Expanded search terms: {expanded_terms}")
@@ -302,231 +535,14 @@ async def search_content(
             except Exception:
                 pass
 
-        def build_search_conditions(column, terms):
-            conditions = []
-            for term in terms:
-                search_term = f"%{term.lower()}%"
-                conditions.append(func.lower(column).like(search_term))
-            return or_(*conditions) if conditions else func.lower(column).like(f"%{query.lower()}%")
-
-        if "flashcard_set" in enabled_types:
-            try:
-                title_conditions = build_search_conditions(models.FlashcardSet.title, expanded_terms)
-                desc_conditions = build_search_conditions(models.FlashcardSet.description, expanded_terms)
-
-                query_builder = db.query(models.FlashcardSet).filter(
-                    and_(
-                        or_(title_conditions, desc_conditions),
-                        or_(
-                            models.FlashcardSet.user_id == actual_user_id,
-                            models.FlashcardSet.is_public == True
-                        )
-                    )
-                )
-
-                if date_from_obj:
-                    query_builder = query_builder.filter(models.FlashcardSet.created_at >= date_from_obj)
-                if date_to_obj:
-                    query_builder = query_builder.filter(models.FlashcardSet.created_at <= date_to_obj)
-
-                flashcard_sets = query_builder.all()
-
-                for fset in flashcard_sets:
-                    card_count = db.query(models.Flashcard).filter(
-                        models.Flashcard.set_id == fset.id
-                    ).count()
-
-                    author = db.query(models.User).filter(models.User.id == fset.user_id).first()
-                    author_name = author.username if author else "Unknown"
-
-                    results.append({
-                        "id": fset.id,
-                        "uid": fset.public_token,
-                        "type": "flashcard_set",
-                        "title": fset.title or "Untitled Set",
-                        "description": fset.description or "",
-                        "created_at": fset.created_at.isoformat() if fset.created_at else None,
-                        "card_count": card_count,
-                        "source_type": fset.source_type,
-                        "author": author_name,
-                        "author_id": fset.user_id,
-                        "is_public": fset.is_public,
-                        "is_own": fset.user_id == actual_user_id
-                    })
-            except Exception as e:
-                logger.error(f"Error searching flashcard sets: {str(e)}")
-
-        if "flashcard" in enabled_types:
-            try:
-                question_conditions = build_search_conditions(models.Flashcard.question, expanded_terms)
-                answer_conditions = build_search_conditions(models.Flashcard.answer, expanded_terms)
-
-                query_builder = db.query(models.Flashcard).join(
-                    models.FlashcardSet
-                ).filter(
-                    and_(
-                        or_(question_conditions, answer_conditions),
-                        or_(
-                            models.FlashcardSet.user_id == actual_user_id,
-                            models.FlashcardSet.is_public == True
-                        )
-                    )
-                )
-
-                if date_from_obj:
-                    query_builder = query_builder.filter(models.Flashcard.created_at >= date_from_obj)
-                if date_to_obj:
-                    query_builder = query_builder.filter(models.Flashcard.created_at <= date_to_obj)
-
-                flashcards = query_builder.limit(50).all()
-                logger.info(f"Found {len(flashcards)} individual flashcards (own + public)")
-
-                for card in flashcards:
-                    fset = db.query(models.FlashcardSet).filter(
-                        models.FlashcardSet.id == card.set_id
-                    ).first()
-
-                    author = db.query(models.User).filter(models.User.id == fset.user_id).first() if fset else None
-                    author_name = author.username if author else "Unknown"
-
-                    results.append({
-                        "id": card.id,
-                        "type": "flashcard",
-                        "title": card.question[:100] if card.question else "Flashcard",
-                        "description": card.answer[:200] if card.answer else "",
-                        "created_at": card.created_at.isoformat() if card.created_at else None,
-                        "set_name": fset.title if fset else None,
-                        "set_id": card.set_id,
-                        "set_uid": fset.public_token if fset else None,
-                        "difficulty": card.difficulty,
-                        "author": author_name,
-                        "author_id": fset.user_id if fset else None,
-                        "is_public": fset.is_public if fset else False,
-                        "is_own": fset.user_id == actual_user_id if fset else False
-                    })
-            except Exception as e:
-                logger.error(f"Error searching flashcards: {str(e)}")
-
-        if "note" in enabled_types:
-            try:
-                title_conditions = build_search_conditions(models.Note.title, expanded_terms)
-                content_conditions = build_search_conditions(models.Note.content, expanded_terms)
-
-                query_builder = db.query(models.Note).filter(
-                    and_(
-                        models.Note.is_deleted == False,
-                        or_(title_conditions, content_conditions),
-                        or_(
-                            models.Note.user_id == actual_user_id,
-                            models.Note.is_public == True
-                        )
-                    )
-                )
-
-                if date_from_obj:
-                    query_builder = query_builder.filter(models.Note.created_at >= date_from_obj)
-                if date_to_obj:
-                    query_builder = query_builder.filter(models.Note.created_at <= date_to_obj)
-
-                notes = query_builder.limit(50).all()
-                logger.info(f"Found {len(notes)} notes (own + public)")
-
-                for note in notes:
-                    author = db.query(models.User).filter(models.User.id == note.user_id).first()
-                    author_name = author.username if author else "Unknown"
-
-                    results.append({
-                        "id": note.id,
-                        "uid": note.uid,
-                        "type": "note",
-                        "title": note.title if note.title else "Untitled Note",
-                        "description": note.content[:200] if note.content else "",
-                        "created_at": note.created_at.isoformat() if note.created_at else None,
-                        "is_favorite": note.is_favorite,
-                        "folder_id": note.folder_id,
-                        "author": author_name,
-                        "author_id": note.user_id,
-                        "is_public": note.is_public,
-                        "is_own": note.user_id == actual_user_id
-                    })
-            except Exception as e:
-                logger.error(f"Error searching notes: {str(e)}")
-
-        if "chat" in enabled_types:
-            try:
-                title_conditions = build_search_conditions(models.ChatSession.title, expanded_terms)
-
-                query_builder = db.query(models.ChatSession).filter(
-                    and_(
-                        models.ChatSession.user_id == actual_user_id,
-                        title_conditions
-                    )
-                )
-
-                if date_from_obj:
-                    query_builder = query_builder.filter(models.ChatSession.created_at >= date_from_obj)
-                if date_to_obj:
-                    query_builder = query_builder.filter(models.ChatSession.created_at <= date_to_obj)
-
-                chats = query_builder.limit(50).all()
-                logger.info(f"Found {len(chats)} chat sessions")
-
-                for chat in chats:
-                    message_count = db.query(models.ChatMessage).filter(
-                        models.ChatMessage.chat_session_id == chat.id
-                    ).count()
-
-                    results.append({
-                        "id": chat.id,
-                        "uid": chat.public_token,
-                        "type": "chat",
-                        "title": chat.title or "Untitled Chat",
-                        "description": f"{message_count} messages",
-                        "created_at": chat.created_at.isoformat() if chat.created_at else None,
-                        "updated_at": chat.updated_at.isoformat() if chat.updated_at else None,
-                        "message_count": message_count,
-                        "folder_id": chat.folder_id
-                    })
-            except Exception as e:
-                logger.error(f"Error searching chats: {str(e)}")
-
-        if "question_set" in enabled_types:
-            try:
-                title_conditions = build_search_conditions(models.QuestionSet.title, expanded_terms)
-                desc_conditions = build_search_conditions(models.QuestionSet.description, expanded_terms)
-
-                query_builder = db.query(models.QuestionSet).filter(
-                    and_(
-                        models.QuestionSet.user_id == actual_user_id,
-                        or_(title_conditions, desc_conditions)
-                    )
-                )
-
-                if date_from_obj:
-                    query_builder = query_builder.filter(models.QuestionSet.created_at >= date_from_obj)
-                if date_to_obj:
-                    query_builder = query_builder.filter(models.QuestionSet.created_at <= date_to_obj)
-
-                question_sets = query_builder.limit(50).all()
-                logger.info(f"Found {len(question_sets)} question sets")
-
-                for qset in question_sets:
-                    question_count = db.query(models.Question).filter(
-                        models.Question.set_id == qset.id
-                    ).count()
-
-                    results.append({
-                        "id": qset.id,
-                        "type": "question_set",
-                        "title": qset.title,
-                        "description": qset.description or "",
-                        "created_at": qset.created_at.isoformat() if qset.created_at else None,
-                        "question_count": question_count,
-                        "difficulty": qset.difficulty_level,
-                        "subject": qset.subject
-                    })
-            except Exception as e:
-                logger.error(f"Error searching question sets: {str(e)}")
+        ranked = search_index.available(db)
+        if ranked:
+            rows = search_index.search(db, actual_user_id, expanded_terms, enabled_types, date_from_obj, date_to_obj)
+            results = [search_index.to_result(row, actual_user_id) for row in rows]
+        else:
+            results = _legacy_search_results(
+                db, actual_user_id, query, expanded_terms, enabled_types, date_from_obj, date_to_obj
+            )
 
         if sort_by == "date_desc":
             results.sort(key=lambda x: x.get('created_at', ''), reverse=True)
@@ -536,7 +552,7 @@ async def search_content(
             results.sort(key=lambda x: x.get('title', '').lower())
         elif sort_by == "title_desc":
             results.sort(key=lambda x: x.get('title', '').lower(), reverse=True)
-        else:
+        elif not ranked:
             results.sort(key=lambda x: x.get('created_at', ''), reverse=True)
 
         logger.info(f"Total results: {len(results)}")
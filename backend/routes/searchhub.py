@@ -324,8 +324,8 @@ async def _create_note_with_ai(
     db.refresh(new_note)
 
     try:
-        from services.gamification_system import award_points
-        award_points(db, user.id, "note_created")
+        from services.gamification_pipeline import enqueue_award
+        enqueue_award(db, user.id, "note_created")
         db.commit()
     except Exception:
         pass
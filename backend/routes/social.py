@@ -330,6 +330,8 @@ async def complete_solo_quiz(
 @router.get("/debug/websocket-connections")
 async def debug_websocket_connections(username: str = Depends(verify_token)):
     return {
+        "node_id": manager.node_id,
+        "backplane": type(manager.backplane).__name__,
         "active_connections": list(manager.active_connections.keys()),
         "total_connections": len(manager.active_connections),
         "requesting_user": username
@@ -486,7 +488,7 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
 
     finally:
         if user_id and manager.active_connections.get(user_id) is websocket:
-            del manager.active_connections[user_id]
+            await manager.disconnect(websocket, user_id)
             logger.info(f"User {user_id} cleaned up")
 
         if db:
@@ -17,12 +17,14 @@ from deps import (
     get_user_by_username,
     verify_token,
 )
+from middleware.event_loop import OffloadRoute
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api",
     tags=["weakness"],
     dependencies=[Depends(enforce_request_user_scope)],
+    route_class=OffloadRoute,
 )
 
 def _get_topic_mastery(db: Session, user_id: int) -> list[dict]:
@@ -51,6 +51,7 @@ except ImportError:
     AudioSegment = None
     PYDUB_AVAILABLE = False
 
+from services import audio_chunking
 from services.youtube_api_service import youtube_service
 from services.rate_limiter import rate_limiter
 from services.ytdlp_utils import (
@@ -469,43 +470,58 @@ class AIMediaProcessor:
             shutil.rmtree(temp_dir, ignore_errors=True)
             return {"success": False, "error": str(e), "error_code": "exception"}
     
+    def _groq_transcription(self, audio_path: str) -> Dict:
+        with open(audio_path, "rb") as audio_file:
+            transcription = self.groq_client.audio.transcriptions.create(
+                file=audio_file,
+                model="whisper-large-v3",
+                response_format="verbose_json",
+                temperature=0.0
+            )
+
+        segments = []
+        if hasattr(transcription, 'segments'):
+            for seg in transcription.segments:
+                segments.append({
+                    "start": seg.get('start', 0),
+                    "end": seg.get('end', 0),
+                    "text": seg.get('text', ''),
+                    "confidence": seg.get('confidence', 0.0)
+                })
+
+        language = transcription.language if hasattr(transcription, 'language') else 'en'
+
+        duration = 0
+        if segments:
+            duration = int(segments[-1].get("end", 0))
+
+        return {
+            "success": True,
+            "transcript": transcription.text,
+            "segments": segments,
+            "language": language,
+            "duration": duration,
+            "has_timestamps": len(segments) > 0
+        }
+
+    async def _transcribe_chunk_groq(self, chunk: audio_chunking.AudioChunk) -> Dict:
+        return await asyncio.to_thread(self._groq_transcription, chunk.path)
+
     async def transcribe_audio_groq(self, audio_path: str) -> Dict:
         try:
             if not self.groq_client:
                 raise ValueError("Groq client not available - check GROQ_API_KEY")
-            
-            with open(audio_path, "rb") as audio_file:
-                transcription = self.groq_client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-large-v3",
-                    response_format="verbose_json",
-                    temperature=0.0
-                )
-            
-            segments = []
-            if hasattr(transcription, 'segments'):
-                for seg in transcription.segments:
-                    segments.append({
-                        "start": seg.get('start', 0),
-                        "end": seg.get('end', 0),
-                        "text": seg.get('text', ''),
-                        "confidence": seg.get('confidence', 0.0)
-                    })
-            
-            language = transcription.language if hasattr(transcription, 'language') else 'en'
-            
-            duration = 0
-            if segments:
-                duration = int(segments[-1].get("end", 0))
-            
-            return {
-                "success": True,
-                "transcript": transcription.text,
-                "segments": segments,
-                "language": language,
-                "duration": duration,
-                "has_timestamps": len(segments) > 0
-            }
+
+            # Long or large recordings go through silence-aware chunking so no
+            # single upload hits the provider's size/time limits.
+            if audio_chunking.ffmpeg_binary():
+                analysis = await asyncio.to_thread(audio_chunking.analyze_audio, audio_path)
+                if audio_chunking.should_chunk(audio_path, analysis[0]):
+                    return await audio_chunking.transcribe_chunked(
+                        audio_path, self._transcribe_chunk_groq, "groq", analysis=analysis,
+                    )
+
+            return await asyncio.to_thread(self._groq_transcription, audio_path)
             
         except Exception as e:
             if self._is_groq_quota_error(e):
@@ -40,6 +40,27 @@ def semantic_cache_status() -> dict[str, Any]:
     }
 
 
+def _build_vectorizer(model_name: str) -> Any:
+    """Vectorize through the worker's shared encoder rather than a private
+    HFTextVectorizer copy; falls back to HFTextVectorizer if the shared model
+    or redisvl's custom vectorizer is unavailable."""
+    try:
+        from redisvl.utils.vectorize import CustomTextVectorizer
+        from services import embedding_service
+
+        model = embedding_service.get_model(model_name, fallback=None)
+        if model is not None:
+            return CustomTextVectorizer(
+                embed=lambda text: embedding_service.encode_one(model, text),
+                embed_many=lambda texts: embedding_service.encode_many(model, list(texts)),
+            )
+    except Exception as exc:
+        logger.debug("Shared semantic cache vectorizer unavailable: %s", exc)
+
+    from redisvl.utils.vectorize import HFTextVectorizer
+    return HFTextVectorizer(model=model_name)
+
+
 def _init_semantic_cache() -> Any | None:
     global _semantic_cache, _semantic_cache_ready, _semantic_cache_error
 
@@ -50,10 +71,9 @@ def _init_semantic_cache() -> Any | None:
 
     try:
         from redisvl.extensions.llmcache import SemanticCache
-        from redisvl.utils.vectorize import HFTextVectorizer
 
-        vectorizer = HFTextVectorizer(
-            model=os.getenv("AI_SEMANTIC_CACHE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        vectorizer = _build_vectorizer(
+            os.getenv("AI_SEMANTIC_CACHE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
         )
         _semantic_cache = SemanticCache(
             name=os.getenv("AI_SEMANTIC_CACHE_INDEX", "brainwave_ai_semantic_cache"),
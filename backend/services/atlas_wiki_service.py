@@ -7,9 +7,11 @@ import hashlib
 from datetime import datetime, timezone, timedelta
 from typing import Any, Optional
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 import models
+from services import search_index
 
 CORE_PAGES = {
     "overview.md",
@@ -39,6 +41,16 @@ Atlas follows a 3-layer model:
 - `analyses/<timestamp>-<slug>.md`
 """
 
+# Link counts, backlinks and index.md are maintained as pages are written:
+# upsert_page diffs a page's outbound links into atlas_wiki_links, recounts
+# inbound links only for the paths that gained or lost an edge, and patches
+# the page's line in index.md. Page text is searched through search_index
+# (entity_type "wiki_page"). refresh_link_counts and build_index_page remain
+# as full rebuilds for repair.
+INDEX_PATH = "index.md"
+INDEX_GROUPS = ["overview", "concept", "entity", "source", "analysis", "system"]
+_INDEX_ENTRY_RE = re.compile(r"^- \[(.*)\]\(([^)]*)\) -(?: (.*))?$")
+
 def _now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -157,6 +169,7 @@ def _ensure_page(db: Session, user_id: int, path: str, title: str, page_type: st
     if existing:
         return existing
 
+    links = _extract_links(content)
     page = models.AtlasWikiPage(
         user_id=user_id,
         path=p,
@@ -164,13 +177,16 @@ def _ensure_page(db: Session, user_id: int, path: str, title: str, page_type: st
         page_type=page_type[:30],
         content=content,
         summary=_summary_from_content(content),
-        outbound_links=_dumps(_extract_links(content)),
+        outbound_links=_dumps(links),
         tags="[]",
         source_doc_ids="[]",
         source_refs="[]",
         inbound_links_count=0,
     )
     db.add(page)
+    _sync_links(db, user_id, p, set(), set(links), created=True)
+    if p != INDEX_PATH:
+        _patch_index(db, user_id, page)
     db.commit()
     return page
 
@@ -184,18 +200,18 @@ def ensure_user_wiki(db: Session, user_id: int) -> None:
     _ensure_page(
         db,
         user_id,
-        "overview.md",
-        "Overview",
-        "overview",
-        "# Overview\n\nYour Atlas wiki compiles knowledge from sources, queries, and maintenance passes.",
+        INDEX_PATH,
+        "Index",
+        "system",
+        "# Index\n\nThis page is auto-generated.",
     )
     _ensure_page(
         db,
         user_id,
-        "index.md",
-        "Index",
-        "system",
-        "# Index\n\nThis page is auto-generated.",
+        "overview.md",
+        "Overview",
+        "overview",
+        "# Overview\n\nYour Atlas wiki compiles knowledge from sources, queries, and maintenance passes.",
     )
     _ensure_page(
         db,
@@ -213,23 +229,115 @@ def ensure_user_wiki(db: Session, user_id: int) -> None:
         "system",
         DEFAULT_SCHEMA,
     )
-    refresh_link_counts(db, user_id)
 
-def refresh_link_counts(db: Session, user_id: int) -> None:
-    pages = db.query(models.AtlasWikiPage).filter(models.AtlasWikiPage.user_id == user_id).all()
-    path_to_page = {p.path: p for p in pages}
-    inbound: dict[str, int] = {p.path: 0 for p in pages}
+def _recount_inbound(db: Session, user_id: int, paths: Optional[set[str]] = None) -> None:
+    """Set inbound_links_count from atlas_wiki_links in one UPDATE, for the
+    given paths only, or for every page of the user when paths is None."""
+    Page, Link = models.AtlasWikiPage, models.AtlasWikiLink
+    count = (
+        db.query(func.count())
+        .select_from(Link)
+        .filter(Link.user_id == user_id, Link.target_path == Page.path)
+        .scalar_subquery()
+    )
+    q = db.query(Page).filter(Page.user_id == user_id)
+    if paths is not None:
+        if not paths:
+            return
+        q = q.filter(Page.path.in_(paths))
+    q.update({Page.inbound_links_count: count}, synchronize_session="fetch")
+
+def _sync_links(db: Session, user_id: int, path: str, old: set[str], new: set[str], created: bool = False) -> None:
+    """Apply one page's outbound-link diff to the link graph and recount the
+    pages whose inbound edges changed (plus the page itself when new)."""
+    Link = models.AtlasWikiLink
+    removed, added = old - new, new - old
+    if removed:
+        db.query(Link).filter(
+            Link.user_id == user_id,
+            Link.source_path == path,
+            Link.target_path.in_(removed),
+        ).delete(synchronize_session=False)
+    for target in added:
+        db.merge(Link(user_id=user_id, source_path=path, target_path=target))
+    affected = removed | added
+    if created:
+        affected.add(path)
+    if affected:
+        db.flush()
+        _recount_inbound(db, user_id, affected)
 
-    for p in pages:
-        out = _loads_list(p.outbound_links)
-        for target in out:
-            if target in inbound:
-                inbound[target] += 1
+def refresh_link_counts(db: Session, user_id: int) -> None:
+    """Rebuild the user's link graph from every page's outbound_links. Writes
+    keep the graph current; this is the repair path."""
+    Page, Link = models.AtlasWikiPage, models.AtlasWikiLink
+    rows = db.query(Page.path, Page.outbound_links).filter(Page.user_id == user_id).all()
+    db.query(Link).filter(Link.user_id == user_id).delete(synchronize_session=False)
+    edges = {(path, target) for path, out in rows for target in _loads_list(out)}
+    db.bulk_insert_mappings(Link, [
+        {"user_id": user_id, "source_path": source, "target_path": target} for source, target in edges
+    ])
+    db.flush()
+    _recount_inbound(db, user_id)
+    db.commit()
 
-    for p in pages:
-        p.inbound_links_count = inbound.get(p.path, 0)
+def _index_line(title: str, path: str, summary: str) -> str:
+    return f"- [{title}]({path}) - {(summary or '')[:120]}"
 
-    db.commit()
+def _render_index(entries: dict[str, list[tuple[str, str, str]]]) -> str:
+    lines = ["# Index", "", "Auto-generated atlas index.", ""]
+    for gt in INDEX_GROUPS:
+        items = sorted(entries.get(gt, []), key=lambda x: x[0].lower())
+        if not items:
+            continue
+        lines.append(f"## {gt.title()} Pages")
+        lines.append("")
+        for title, path, summary in items:
+            lines.append(_index_line(title, path, summary))
+        lines.append("")
+    return "\n".join(lines).strip() + "\n"
+
+def _parse_index(content: str) -> dict[str, list[tuple[str, str, str]]]:
+    headings = {f"## {gt.title()} Pages": gt for gt in INDEX_GROUPS}
+    entries: dict[str, list[tuple[str, str, str]]] = {}
+    group = None
+    for line in (content or "").splitlines():
+        if line.startswith("## "):
+            group = headings.get(line.strip())
+            continue
+        m = _INDEX_ENTRY_RE.match(line)
+        if group and m:
+            entries.setdefault(group, []).append((m.group(1), m.group(2), m.group(3) or ""))
+    return entries
+
+def _write_index(db: Session, user_id: int, index: models.AtlasWikiPage, content: str) -> None:
+    old_links = set(_loads_list(index.outbound_links))
+    links = _extract_links(content)
+    index.content = content
+    index.summary = _summary_from_content(content)
+    index.outbound_links = _dumps(links)
+    index.last_compiled_at = _now()
+    _sync_links(db, user_id, index.path, old_links, set(links))
+
+def _patch_index(db: Session, user_id: int, page: models.AtlasWikiPage) -> None:
+    """Replace this page's line in index.md without reading any other page."""
+    if page.page_type not in INDEX_GROUPS:
+        return
+    index = (
+        db.query(models.AtlasWikiPage)
+        .filter(models.AtlasWikiPage.user_id == user_id, models.AtlasWikiPage.path == INDEX_PATH)
+        .first()
+    )
+    if not index:
+        return
+    entries = _parse_index(index.content)
+    for group in entries:
+        entries[group] = [e for e in entries[group] if e[1] != page.path]
+    entry = (page.title, page.path, (page.summary or "")[:120])
+    entries.setdefault(page.page_type, []).append(entry)
+    content = _render_index(entries)
+    if content != (index.content or ""):
+        _write_index(db, user_id, index, content)
 
 def upsert_page(
     db: Session,
@@ -254,23 +362,38 @@ def upsert_page(
         .filter(models.AtlasWikiPage.user_id == user_id, models.AtlasWikiPage.path == p)
         .first()
     )
-    if not row:
-        row = models.AtlasWikiPage(user_id=user_id, path=p)
+    created = row is None
+    if created:
+        row = models.AtlasWikiPage(user_id=user_id, path=p, inbound_links_count=0)
         db.add(row)
 
-    row.title = (title or p).strip()[:255]
-    row.page_type = (page_type or "concept")[:30]
-    row.content = content or ""
-    row.summary = _summary_from_content(row.content)
-    row.tags = _dumps(tags)
-    row.source_doc_ids = _dumps(source_doc_ids)
-    row.source_refs = _dumps(source_refs)
-    row.outbound_links = _dumps(_extract_links(row.content))
+    content = content or ""
+    links = _extract_links(content)
+    values = {
+        "title": (title or p).strip()[:255],
+        "page_type": (page_type or "concept")[:30],
+        "content": content,
+        "summary": _summary_from_content(content),
+        "tags": _dumps(tags),
+        "source_doc_ids": _dumps(source_doc_ids),
+        "source_refs": _dumps(source_refs),
+        "outbound_links": _dumps(links),
+    }
+    if not created and all(getattr(row, k) == v for k, v in values.items()):
+        # Recompiling an unchanged page: no write, no link or index work.
+        return _to_page_dict(row)
+
+    old_links = set() if created else set(_loads_list(row.outbound_links))
+    listed = None if created else (row.title, row.page_type, row.summary)
+    for k, v in values.items():
+        setattr(row, k, v)
     if compiled:
         row.last_compiled_at = now
 
+    _sync_links(db, user_id, p, old_links, set(links), created=created)
+    if p != INDEX_PATH and (row.title, row.page_type, row.summary) != listed:
+        _patch_index(db, user_id, row)
     db.commit()
-    refresh_link_counts(db, user_id)
     return _to_page_dict(row)
 
 def get_page(db: Session, user_id: int, path: str) -> Optional[dict[str, Any]]:
@@ -284,15 +407,16 @@ def get_page(db: Session, user_id: int, path: str) -> Optional[dict[str, Any]]:
         return None
     data = _to_page_dict(row)
 
+    Page, Link = models.AtlasWikiPage, models.AtlasWikiLink
     backlinks = (
-        db.query(models.AtlasWikiPage)
-        .filter(models.AtlasWikiPage.user_id == user_id)
+        db.query(Page.path, Page.title, Page.page_type)
+        .join(Link, (Link.user_id == Page.user_id) & (Link.source_path == Page.path))
+        .filter(Link.user_id == user_id, Link.target_path == p)
         .all()
     )
     data["backlinks"] = [
-        {"path": b.path, "title": b.title, "page_type": b.page_type}
-        for b in backlinks
-        if p in _loads_list(b.outbound_links)
+        {"path": path, "title": title, "page_type": page_type}
+        for path, title, page_type in backlinks
     ]
     return data
 
@@ -323,7 +447,25 @@ def search_pages(db: Session, user_id: int, query: str, limit: int = 6) -> list[
     tokens = [t for t in re.findall(r"[a-zA-Z0-9]{2,}", (query or "").lower()) if t]
     if not tokens:
         return []
+    limit = max(1, min(limit, 20))
 
+    if search_index.available(db):
+        ranked = search_index.search(db, user_id, tokens, ["wiki_page"], limit=limit)
+        ids = [r["entity_id"] for r in ranked]
+        if not ids:
+            return []
+        pages = {
+            r.id: r
+            for r in db.query(models.AtlasWikiPage)
+            .filter(models.AtlasWikiPage.user_id == user_id, models.AtlasWikiPage.id.in_(ids))
+            .all()
+        }
+        return [_to_page_dict(pages[i]) for i in ids if i in pages]
+
+    return _scan_search_pages(db, user_id, tokens, limit)
+
+def _scan_search_pages(db: Session, user_id: int, tokens: list[str], limit: int) -> list[dict[str, Any]]:
+    """Substring scoring over every page; used when the search index is not installed."""
     rows = db.query(models.AtlasWikiPage).filter(models.AtlasWikiPage.user_id == user_id).all()
     scored: list[tuple[float, models.AtlasWikiPage]] = []
 
@@ -344,7 +486,7 @@ def search_pages(db: Session, user_id: int, query: str, limit: int = 6) -> list[
 
     scored.sort(key=lambda x: x[0], reverse=True)
     out = []
-    for _, r in scored[: max(1, min(limit, 20))]:
+    for _, r in scored[:limit]:
         out.append(_to_page_dict(r))
     return out
 
@@ -507,39 +649,39 @@ def _detect_contradictions(
     return created
 
 def build_index_page(db: Session, user_id: int) -> dict[str, Any]:
-    pages = db.query(models.AtlasWikiPage).filter(models.AtlasWikiPage.user_id == user_id).all()
-    groups: dict[str, list[models.AtlasWikiPage]] = {
-        "overview": [],
-        "concept": [],
-        "entity": [],
-        "source": [],
-        "analysis": [],
-        "system": [],
-    }
-    for p in pages:
-        groups.setdefault(p.page_type, []).append(p)
-
-    lines = ["# Index", "", "Auto-generated atlas index.", ""]
-    for gt in ["overview", "concept", "entity", "source", "analysis", "system"]:
-        items = sorted(groups.get(gt, []), key=lambda x: x.title.lower())
-        if not items:
-            continue
-        lines.append(f"## {gt.title()} Pages")
-        lines.append("")
-        for p in items:
-            lines.append(f"- [{p.title}]({p.path}) - {p.summary[:120]}")
-        lines.append("")
+    """Regenerate index.md from every page's title and summary. upsert_page
+    keeps the index current line by line; this is the repair path."""
+    Page = models.AtlasWikiPage
+    rows = (
+        db.query(Page.title, Page.path, Page.summary, Page.page_type)
+        .filter(Page.user_id == user_id, Page.path != INDEX_PATH, Page.page_type.in_(INDEX_GROUPS))
+        .all()
+    )
+    entries: dict[str, list[tuple[str, str, str]]] = {}
+    for title, path, summary, page_type in rows:
+        entries.setdefault(page_type, []).append((title, path, (summary or "")[:120]))
 
     return upsert_page(
         db,
         user_id,
-        path="index.md",
+        path=INDEX_PATH,
         title="Index",
         page_type="system",
-        content="\n".join(lines).strip() + "\n",
+        content=_render_index(entries),
         compiled=True,
     )
 
+# Bump when the source page template changes so every document recompiles.
+_DOC_COMPILE_VERSION = 1
+
+def _doc_fingerprint(doc: models.ContextDocument) -> str:
+    """Hash of the document fields a source page is compiled from."""
+    parts = [
+        _DOC_COMPILE_VERSION, doc.doc_id, doc.filename, doc.subject, doc.grade_level,
+        doc.source_name, doc.chunk_count, doc.ai_summary, doc.key_concepts, doc.topic_tags,
+    ]
+    return hashlib.sha256(_dumps([str(p) if p is not None else None for p in parts]).encode("utf-8")).hexdigest()
+
 def compile_from_documents(
     db: Session,
     user_id: int,
@@ -570,12 +712,37 @@ def compile_from_documents(
         "uploaded_documents": 0,
     }
 
+    states = {
+        st.source_key: st
+        for st in db.query(models.AtlasWikiCompileState)
+        .filter(models.AtlasWikiCompileState.user_id == user_id)
+        .all()
+    }
+    recompiled_docs = 0
     for d in docs:
+        key = f"doc:{d.doc_id}"
+        fingerprint = _doc_fingerprint(d)
+        state = states.get(key)
+        platform_counts["documents"] += 1
+        if state is not None and state.content_hash == fingerprint:
+            source_paths.append(state.page_path)
+            _extend_topic_maps(
+                topic_to_sources=topic_to_sources,
+                entity_to_sources=entity_to_sources,
+                topic_claims=topic_claims,
+                topics=_loads_list(state.topics),
+                entities=_loads_list(state.entities),
+                path=state.page_path,
+                name=state.name or "",
+                summary=state.summary or "",
+            )
+            continue
+
         doc_name = re.sub(r"\.[^.]+$", "", d.filename or "Document")
         src_slug = _slugify(doc_name)
         src_path = f"sources/{src_slug}-{(d.doc_id or '')[:8]}.md"
         source_paths.append(src_path)
-        platform_counts["documents"] += 1
+        recompiled_docs += 1
 
         tags = _doc_topic_tags(d)
         concepts = _doc_key_concepts(d)
@@ -629,6 +796,29 @@ def compile_from_documents(
             summary=summary,
         )
 
+        if state is None:
+            state = models.AtlasWikiCompileState(user_id=user_id, source_key=key)
+            db.add(state)
+            states[key] = state
+        state.content_hash = fingerprint
+        state.page_path = src_path
+        state.name = doc_name[:255]
+        state.summary = summary
+        state.topics = _dumps(tags)
+        state.entities = _dumps(concepts)
+        state.compiled_at = _now()
+        db.commit()
+
+    if not doc_ids:
+        current = {f"doc:{d.doc_id}" for d in docs}
+        stale = [k for k in states if k.startswith("doc:") and k not in current]
+        if stale:
+            db.query(models.AtlasWikiCompileState).filter(
+                models.AtlasWikiCompileState.user_id == user_id,
+                models.AtlasWikiCompileState.source_key.in_(stale),
+            ).delete(synchronize_session=False)
+            db.commit()
+
     if include_platform:
         note_rows = (
             db.query(models.Note)
@@ -984,10 +1174,14 @@ def compile_from_documents(
         "",
         "## Recent Sources",
     ]
+    recent_titles = dict(
+        db.query(models.AtlasWikiPage.path, models.AtlasWikiPage.title)
+        .filter(models.AtlasWikiPage.user_id == user_id, models.AtlasWikiPage.path.in_(source_paths[:10]))
+        .all()
+    )
     for sp in source_paths[:10]:
-        page = get_page(db, user_id, sp)
-        if page:
-            overview_lines.append(f"- [{page['title']}]({sp})")
+        if sp in recent_titles:
+            overview_lines.append(f"- [{recent_titles[sp]}]({sp})")
     overview_lines.append("")
 
     upsert_page(
@@ -1000,9 +1194,7 @@ def compile_from_documents(
         compiled=True,
     )
 
-    build_index_page(db, user_id)
     contradictions = _detect_contradictions(db, user_id, topic_claims)
-    refresh_link_counts(db, user_id)
 
     append_event(
         db,
@@ -1011,6 +1203,7 @@ def compile_from_documents(
         "Wiki compile completed",
         {
             "compiled_docs": platform_counts["documents"],
+            "recompiled_docs": recompiled_docs,
             "source_pages": total_compiled_sources,
             "concept_pages": concept_pages,
             "entity_pages": entity_pages,
@@ -1021,6 +1214,7 @@ def compile_from_documents(
 
     return {
         "compiled": total_compiled_sources,
+        "recompiled_docs": recompiled_docs,
         "source_pages": total_compiled_sources,
         "concept_pages": concept_pages,
         "entity_pages": entity_pages,
@@ -1115,278 +1309,64 @@ def build_knowledge_universe_graph(
     user_id: int,
     max_nodes: int = 480,
 ) -> dict[str, Any]:
-    ensure_user_wiki(db, user_id)
-
-    nodes: list[dict[str, Any]] = []
-    edges: list[dict[str, Any]] = []
-    node_map: dict[str, dict[str, Any]] = {}
-    edge_seen: set[str] = set()
-
-    def add_node(node_id: str, label: str, node_type: str, size: float = 1.0):
-        if node_id in node_map:
-            return
-        if len(node_map) >= max_nodes:
-            return
-        x, y, z = _stable_pos(node_id)
-        row = {
-            "id": node_id,
-            "label": (label or node_id)[:120],
-            "type": node_type,
-            "size": size,
-            "x": x,
-            "y": y,
-            "z": z,
-        }
-        node_map[node_id] = row
-        nodes.append(row)
-
-    def add_edge(a: str, b: str, edge_type: str = "related", weight: float = 1.0):
-        if a == b or a not in node_map or b not in node_map:
-            return
-        key = f"{a}|{b}|{edge_type}" if a < b else f"{b}|{a}|{edge_type}"
-        if key in edge_seen:
-            return
-        edge_seen.add(key)
-        edges.append({"source": a, "target": b, "type": edge_type, "weight": weight})
-
-    add_node("hub:atlas", "Atlas", "hub", 2.2)
-    add_node("hub:vault", "Vault", "hub", 1.8)
-    add_node("hub:oracle", "Oracle", "hub", 1.8)
-    add_node("hub:archive", "Archive", "hub", 1.8)
-    add_node("hub:wiki", "Wiki", "hub", 1.8)
-    for sub in ["hub:vault", "hub:oracle", "hub:archive", "hub:wiki"]:
-        add_edge("hub:atlas", sub, "contains", 1.8)
-
-    category_defs = [
-        ("cat:documents", "Documents", "hub:vault"),
-        ("cat:notes", "Notes", "hub:vault"),
-        ("cat:flashcards", "Flashcards", "hub:vault"),
-        ("cat:question_sets", "Question Sets", "hub:archive"),
-        ("cat:quiz_history", "Quiz History", "hub:archive"),
-        ("cat:wiki_pages", "Wiki Pages", "hub:wiki"),
-        ("cat:concepts", "Concepts", "hub:wiki"),
-    ]
-    for cid, lbl, parent in category_defs:
-        add_node(cid, lbl, "category", 1.4)
-        add_edge(parent, cid, "contains", 1.3)
-
-    docs = (
-        db.query(models.ContextDocument)
-        .filter(models.ContextDocument.user_id == user_id, models.ContextDocument.status == "ready")
-        .order_by(models.ContextDocument.updated_at.desc())
-        .limit(140)
-        .all()
-    )
-    for d in docs:
-        did = f"doc:{d.doc_id}"
-        add_node(did, d.filename or "Document", "document", 1.0)
-        add_edge("cat:documents", did, "contains", 1.1)
-        if d.subject:
-            cid = f"concept:{_slugify(d.subject)}"
-            add_node(cid, d.subject, "concept", 0.95)
-            add_edge(did, cid, "about", 1.0)
-
-        for t in (_loads_list(d.topic_tags)[:6] if d.topic_tags else []):
-            cid = f"concept:{_slugify(t)}"
-            add_node(cid, t, "concept", 0.9)
-            add_edge(did, cid, "tagged", 0.9)
-
-    notes = (
-        db.query(models.Note)
-        .filter(models.Note.user_id == user_id, models.Note.is_deleted == False)
-        .order_by(models.Note.updated_at.desc())
-        .limit(140)
-        .all()
-    )
-    for n in notes:
-        nid = f"note:{n.id}"
-        title = (n.title or f"Note {n.id}")
-        add_node(nid, title, "note", 0.95)
-        add_edge("cat:notes", nid, "contains", 1.0)
-        topics = _topic_candidates_from_text(f"{title}. {n.content or ''}", limit=5)
-        for t in topics:
-            cid = f"concept:{_slugify(t)}"
-            add_node(cid, t, "concept", 0.9)
-            add_edge(nid, cid, "mentions", 0.9)
-
-    sets = (
-        db.query(models.FlashcardSet)
-        .filter(models.FlashcardSet.user_id == user_id)
-        .order_by(models.FlashcardSet.updated_at.desc())
-        .limit(120)
-        .all()
-    )
-    for fs in sets:
-        sid = f"fset:{fs.id}"
-        add_node(sid, fs.title or f"Flashcards {fs.id}", "flashcard_set", 1.0)
-        add_edge("cat:flashcards", sid, "contains", 1.0)
-        for c in (fs.flashcards[:26] if fs.flashcards else []):
-            if c.category:
-                cid = f"concept:{_slugify(c.category)}"
-                add_node(cid, c.category, "concept", 0.9)
-                add_edge(sid, cid, "covers", 0.9)
-            question_topics = _topic_candidates_from_text(c.question or "", limit=2)
-            for qt in question_topics:
-                cid = f"concept:{_slugify(qt)}"
-                add_node(cid, qt, "concept", 0.88)
-                add_edge(sid, cid, "mentions", 0.8)
-
-    qsets = (
-        db.query(models.QuestionSet)
-        .filter(models.QuestionSet.user_id == user_id)
-        .order_by(models.QuestionSet.updated_at.desc())
-        .limit(120)
-        .all()
-    )
-    for qs in qsets:
-        qid = f"qset:{qs.id}"
-        add_node(qid, qs.title or f"Question Set {qs.id}", "question_set", 1.0)
-        add_edge("cat:question_sets", qid, "contains", 1.0)
-        for q in (qs.questions[:30] if qs.questions else []):
-            if q.topic:
-                cid = f"concept:{_slugify(q.topic)}"
-                add_node(cid, q.topic, "concept", 0.9)
-                add_edge(qid, cid, "tests", 0.95)
-
-    sessions = (
-        db.query(models.QuestionSession)
-        .filter(models.QuestionSession.user_id == user_id)
-        .order_by(models.QuestionSession.completed_at.desc())
-        .limit(100)
-        .all()
-    )
-    for s in sessions:
-        sid = f"qsession:{s.id}"
-        add_node(sid, f"Session {s.id}", "quiz_session", 0.92)
-        add_edge("cat:quiz_history", sid, "contains", 0.95)
-        if s.question_set_id:
-            qid = f"qset:{s.question_set_id}"
-            if qid in node_map:
-                add_edge(sid, qid, "from_set", 0.85)
-
-    activities = (
-        db.query(models.Activity)
-        .filter(models.Activity.user_id == user_id)
-        .order_by(models.Activity.timestamp.desc())
-        .limit(150)
-        .all()
-    )
-    for a in activities:
-        aid = f"quiz:{a.id}"
-        add_node(aid, a.topic or f"Quiz {a.id}", "quiz_activity", 0.9)
-        add_edge("cat:quiz_history", aid, "contains", 0.9)
-        if a.topic:
-            cid = f"concept:{_slugify(a.topic)}"
-            add_node(cid, a.topic, "concept", 0.9)
-            add_edge(aid, cid, "about", 0.85)
-
-    pages = (
-        db.query(models.AtlasWikiPage)
-        .filter(models.AtlasWikiPage.user_id == user_id)
-        .order_by(models.AtlasWikiPage.updated_at.desc())
-        .limit(220)
-        .all()
-    )
-    for p in pages:
-        pid = f"wiki:{p.path}"
-        add_node(pid, p.title or p.path, "wiki_page", 0.95)
-        add_edge("cat:wiki_pages", pid, "contains", 1.0)
-        add_edge("hub:oracle", pid, "consults", 0.8)
-
-        if p.page_type == "concept":
-            cid = f"concept:{_slugify(p.title or p.path)}"
-            add_node(cid, p.title or p.path, "concept", 1.0)
-            add_edge("cat:concepts", cid, "contains", 1.0)
-            add_edge(pid, cid, "defines", 1.0)
-
-        for out in _loads_list(p.outbound_links)[:20]:
-            tid = f"wiki:{out}"
-            if tid in node_map:
-                add_edge(pid, tid, "links", 0.6)
-
-        for t in _loads_list(p.tags)[:8]:
-            cid = f"concept:{_slugify(t)}"
-            add_node(cid, t, "concept", 0.9)
-            add_edge(pid, cid, "mentions", 0.7)
-
-    concept_nodes = [n for n in nodes if n["type"] == "concept"]
-    concept_labels = [(n["id"], n["label"].lower().split()) for n in concept_nodes]
-    for i in range(len(concept_labels)):
-        a_id, a_toks = concept_labels[i]
-        if not a_toks:
-            continue
-        for j in range(i + 1, min(i + 16, len(concept_labels))):
-            b_id, b_toks = concept_labels[j]
-            if not b_toks:
-                continue
-            if set(a_toks) & set(b_toks):
-                add_edge(a_id, b_id, "related", 0.45)
+    # Materialized and refreshed per content part in services/knowledge_universe;
+    # use knowledge_universe.page() to load larger graphs progressively.
+    from services import knowledge_universe
 
-    return {
-        "nodes": nodes,
-        "edges": edges,
-        "counts": {
-            "nodes": len(nodes),
-            "edges": len(edges),
-            "documents": len(docs),
-            "notes": len(notes),
-            "flashcard_sets": len(sets),
-            "question_sets": len(qsets),
-            "activities": len(activities),
-            "wiki_pages": len(pages),
-        },
-    }
+    return knowledge_universe.graph(db, user_id, max_nodes=max_nodes)
 
 def lint_wiki(db: Session, user_id: int) -> dict[str, Any]:
     ensure_user_wiki(db, user_id)
-    refresh_link_counts(db, user_id)
 
-    pages = db.query(models.AtlasWikiPage).filter(models.AtlasWikiPage.user_id == user_id).all()
+    Page = models.AtlasWikiPage
     now = _now()
     stale_cutoff = now - timedelta(days=30)
+    compiled_types = ["concept", "entity", "source", "analysis"]
+    base = db.query(Page.path, Page.title).filter(Page.user_id == user_id)
+    total_pages = db.query(func.count(Page.id)).filter(Page.user_id == user_id).scalar() or 0
 
     issues: list[dict[str, Any]] = []
-    orphan_count = 0
-    stale_count = 0
-    weak_links_count = 0
-
-    for p in pages:
-        if p.path not in CORE_PAGES and (p.inbound_links_count or 0) == 0:
-            orphan_count += 1
-            issues.append(
-                {
-                    "type": "orphan",
-                    "severity": "medium",
-                    "path": p.path,
-                    "title": p.title,
-                    "message": "Page has no inbound links.",
-                }
-            )
+    orphans = base.filter(
+        func.coalesce(Page.inbound_links_count, 0) == 0, Page.path.notin_(CORE_PAGES)
+    ).all()
+    for path, title in orphans:
+        issues.append(
+            {
+                "type": "orphan",
+                "severity": "medium",
+                "path": path,
+                "title": title,
+                "message": "Page has no inbound links.",
+            }
+        )
 
-        out = _loads_list(p.outbound_links)
-        if p.page_type in {"concept", "entity", "source", "analysis"} and len(out) == 0:
-            weak_links_count += 1
-            issues.append(
-                {
-                    "type": "missing_crossrefs",
-                    "severity": "low",
-                    "path": p.path,
-                    "title": p.title,
-                    "message": "Page has no outbound cross-references.",
-                }
-            )
+    unlinked = base.filter(
+        Page.page_type.in_(compiled_types),
+        func.coalesce(Page.outbound_links, "[]").in_(["[]", ""]),
+    ).all()
+    for path, title in unlinked:
+        issues.append(
+            {
+                "type": "missing_crossrefs",
+                "severity": "low",
+                "path": path,
+                "title": title,
+                "message": "Page has no outbound cross-references.",
+            }
+        )
 
-        if p.page_type in {"source", "concept", "entity", "analysis"} and p.updated_at and p.updated_at < stale_cutoff:
-            stale_count += 1
-            issues.append(
-                {
-                    "type": "stale",
-                    "severity": "low",
-                    "path": p.path,
-                    "title": p.title,
-                    "message": "Page is older than 30 days.",
-                }
-            )
+    stale = base.filter(Page.page_type.in_(compiled_types), Page.updated_at < stale_cutoff).all()
+    for path, title in stale:
+        issues.append(
+            {
+                "type": "stale",
+                "severity": "low",
+                "path": path,
+                "title": title,
+                "message": "Page is older than 30 days.",
+            }
+        )
+    orphan_count, weak_links_count, stale_count = len(orphans), len(unlinked), len(stale)
 
     open_contradictions = (
         db.query(models.AtlasWikiContradiction)
@@ -1437,7 +1417,7 @@ def lint_wiki(db: Session, user_id: int) -> dict[str, Any]:
     return {
         "issues": issues,
         "summary": {
-            "total_pages": len(pages),
+            "total_pages": total_pages,
             "orphan_pages": orphan_count,
             "stale_pages": stale_count,
             "weak_links": weak_links_count,
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import weakref
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Long recordings are transcribed as overlapping pieces instead of one upload:
+#   1. one ffmpeg silencedetect pass yields the duration and the silent spans
+#   2. cut points are placed on the longest silence near each TARGET_SECONDS
+#      boundary (hard cut if there is none), and every piece is padded by
+#      OVERLAP_SECONDS on both sides so words at a cut are heard whole
+#   3. pieces are encoded to 16 kHz mono FLAC and transcribed concurrently,
+#      at most PROVIDER_CONCURRENCY[provider] requests in flight per provider
+#   4. segment timestamps are shifted back to the recording's timeline, each
+#      piece keeps only segments whose midpoint falls in its own core span,
+#      and words repeated across a boundary are dropped once
+TARGET_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "600"))
+OVERLAP_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", "2"))
+SEARCH_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_SILENCE_WINDOW_SECONDS", "60"))
+SILENCE_NOISE_DB = float(os.getenv("TRANSCRIBE_SILENCE_NOISE_DB", "-35"))
+SILENCE_MIN_SECONDS = float(os.getenv("TRANSCRIBE_SILENCE_MIN_SECONDS", "0.4"))
+CHUNK_THRESHOLD_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_THRESHOLD_SECONDS", "900"))
+CHUNK_THRESHOLD_BYTES = int(os.getenv("TRANSCRIBE_CHUNK_THRESHOLD_MB", "20")) * 1024 * 1024
+PROVIDER_CONCURRENCY = {
+    "groq": int(os.getenv("TRANSCRIBE_GROQ_CONCURRENCY", "4")),
+    "local": int(os.getenv("TRANSCRIBE_LOCAL_CONCURRENCY", "8")),
+}
+MAX_BOUNDARY_OVERLAP_WORDS = 12
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?\d+(?:\.\d+)?)")
+_WORD_RE = re.compile(r"[\w']+")
+
+# Per event loop, released with it.
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    start: float
+    end: float
+    core_start: float
+    core_end: float
+    path: str = ""
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+Transcriber = Callable[[AudioChunk], Awaitable[Dict]]
+
+
+def ffmpeg_binary() -> Optional[str]:
+    return os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+
+
+def analyze_audio(path: str, noise_db: float = SILENCE_NOISE_DB, min_silence: float = SILENCE_MIN_SECONDS) -> tuple[float, list[tuple[float, float]]]:
+    """Duration and silent spans from a single ffmpeg silencedetect pass."""
+    ffmpeg = ffmpeg_binary()
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not installed")
+    process = subprocess.run(
+        [ffmpeg, "-hide_banner", "-nostats", "-i", path,
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True,
+        text=True,
+        timeout=600,
+    )
+    return parse_silencedetect(process.stderr)
+
+
+def parse_silencedetect(stderr: str) -> tuple[float, list[tuple[float, float]]]:
+    duration = 0.0
+    match = _DURATION_RE.search(stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    silences = []
+    pending_start = None
+    for line in stderr.splitlines():
+        start_match = _SILENCE_START_RE.search(line)
+        if start_match:
+            pending_start = max(0.0, float(start_match.group(1)))
+            continue
+        end_match = _SILENCE_END_RE.search(line)
+        if end_match and pending_start is not None:
+            silences.append((pending_start, float(end_match.group(1))))
+            pending_start = None
+    if pending_start is not None and duration:
+        silences.append((pending_start, duration))
+    return duration, silences
+
+
+def plan_chunks(
+    duration: float,
+    silences: list[tuple[float, float]],
+    target: float = TARGET_SECONDS,
+    overlap: float = OVERLAP_SECONDS,
+    window: float = SEARCH_WINDOW_SECONDS,
+) -> list[AudioChunk]:
+    """Cut points on the longest silence within `window` of each target
+    boundary, closest to the boundary on ties; a hard cut when none is near."""
+    if duration <= 0:
+        return []
+    cuts = [0.0]
+    while duration - cuts[-1] > target + window:
+        boundary = cuts[-1] + target
+        candidates = [
+            (end - start, -abs((start + end) / 2 - boundary), (start + end) / 2)
+            for start, end in silences
+            if abs((start + end) / 2 - boundary) <= window and (start + end) / 2 > cuts[-1] + overlap
+        ]
+        cuts.append(max(candidates)[2] if candidates else boundary)
+    cuts.append(duration)
+
+    chunks = []
+    for index in range(len(cuts) - 1):
+        core_start, core_end = cuts[index], cuts[index + 1]
+        chunks.append(AudioChunk(
+            index=index,
+            start=max(0.0, core_start - overlap),
+            end=min(duration, core_end + overlap),
+            core_start=core_start,
+            core_end=core_end,
+        ))
+    return chunks
+
+
+def extract_chunk(source_path: str, chunk: AudioChunk, out_dir: str) -> str:
+    ffmpeg = ffmpeg_binary()
+    out_path = os.path.join(out_dir, f"chunk_{chunk.index:04d}.flac")
+    subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+         "-ss", f"{chunk.start:.3f}", "-t", f"{chunk.duration:.3f}", "-i", source_path,
+         "-ac", "1", "-ar", "16000", "-c:a", "flac", out_path],
+        check=True,
+        capture_output=True,
+        timeout=600,
+    )
+    return out_path
+
+
+def _words(text: str) -> list[str]:
+    return [w.lower() for w in _WORD_RE.findall(text or "")]
+
+
+def _boundary_overlap(previous_text: str, next_text: str) -> int:
+    """Number of leading words of next_text that repeat the tail of previous_text."""
+    tail = _words(previous_text)[-MAX_BOUNDARY_OVERLAP_WORDS:]
+    head = _words(next_text)[:MAX_BOUNDARY_OVERLAP_WORDS]
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] == head[:size]:
+            return size
+    return 0
+
+
+def _drop_leading_words(text: str, count: int) -> str:
+    matches = list(_WORD_RE.finditer(text))
+    if count >= len(matches):
+        return ""
+    return text[matches[count].start():].strip()
+
+
+def stitch(chunk_results: list[tuple[AudioChunk, Dict]]) -> Dict:
+    """Merge per-chunk results (timestamps relative to each chunk) into one
+    transcript on the recording's timeline."""
+    segments: list[Dict] = []
+    languages = Counter()
+    for chunk, result in sorted(chunk_results, key=lambda item: item[0].index):
+        if result.get("language"):
+            languages[result["language"]] += 1
+        chunk_segments = result.get("segments") or []
+        if not chunk_segments and result.get("transcript"):
+            chunk_segments = [{"start": 0.0, "end": chunk.duration, "text": result["transcript"]}]
+        at_boundary = bool(segments)
+        for seg in chunk_segments:
+            start = chunk.start + float(seg.get("start", 0))
+            end = chunk.start + float(seg.get("end", 0))
+            midpoint = (start + end) / 2
+            if not (chunk.core_start <= midpoint < chunk.core_end):
+                continue
+            text = (seg.get("text") or "").strip()
+            if at_boundary and start < segments[-1]["end"] + OVERLAP_SECONDS:
+                text = _drop_leading_words(text, _boundary_overlap(segments[-1]["text"], text))
+            at_boundary = False
+            if not text:
+                continue
+            segments.append({
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "text": text,
+                "confidence": seg.get("confidence", 0.0),
+            })
+
+    duration = max((chunk.core_end for chunk, _ in chunk_results), default=0)
+    return {
+        "success": True,
+        "transcript": " ".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": languages.most_common(1)[0][0] if languages else "en",
+        "duration": int(duration),
+        "has_timestamps": len(segments) > 0,
+        "chunks": len(chunk_results),
+    }
+
+
+def _provider_semaphore(provider: str) -> asyncio.Semaphore:
+    semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(provider)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, PROVIDER_CONCURRENCY.get(provider, 2)))
+        semaphores[provider] = semaphore
+    return semaphore
+
+
+def should_chunk(path: str, duration: float) -> bool:
+    try:
+        too_large = os.path.getsize(path) > CHUNK_THRESHOLD_BYTES
+    except OSError:
+        too_large = False
+    return too_large or duration > CHUNK_THRESHOLD_SECONDS
+
+
+async def transcribe_chunked(
+    path: str,
+    transcriber: Transcriber,
+    provider: str,
+    target: float = TARGET_SECONDS,
+    overlap: float = OVERLAP_SECONDS,
+    analysis: Optional[tuple[float, list[tuple[float, float]]]] = None,
+) -> Dict:
+    duration, silences = analysis or await asyncio.to_thread(analyze_audio, path)
+    chunks = plan_chunks(duration, silences, target=target, overlap=overlap)
+    if not chunks:
+        return {"success": False, "error": "Could not read audio duration"}
+    semaphore = _provider_semaphore(provider)
+    work_dir = tempfile.mkdtemp(prefix="transcribe_chunks_")
+
+    async def run(chunk: AudioChunk) -> tuple[AudioChunk, Dict]:
+        chunk.path = await asyncio.to_thread(extract_chunk, path, chunk, work_dir)
+        async with semaphore:
+            result = await transcriber(chunk)
+        if not result.get("success", True):
+            raise RuntimeError(f"chunk {chunk.index} failed: {result.get('error')}")
+        return chunk, result
+
+    try:
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    logger.info(f"Transcribed {duration:.0f}s of audio in {len(chunks)} chunks via {provider}")
+    return stitch(results)
+
+
+class ScriptTranscriber:
+    """Offline stand-in for a speech-to-text provider. Given the script of a
+    generated recording (absolute start, end, text), it returns the lines the
+    chunk overlaps with chunk-relative timestamps, cut-off lines included, the
+    way a real model hears a word clipped by the chunk edge. `seconds_per_audio_second`
+    simulates provider latency."""
+
+    def __init__(self, script: List[tuple[float, float, str]], seconds_per_audio_second: float = 0.0):
+        self.script = script
+        self.latency = seconds_per_audio_second
+        self.calls = 0
+
+    async def __call__(self, chunk: AudioChunk) -> Dict:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(chunk.duration * self.latency)
+        segments = [
+            {
+                "start": max(0.0, start - chunk.start),
+                "end": min(chunk.duration, end - chunk.start),
+                "text": text,
+            }
+            for start, end, text in self.script
+            if end > chunk.start and start < chunk.end
+        ]
+        return {
+            "success": True,
+            "transcript": " ".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": "en",
+        }
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+from services import redis_cache
+from services.ai_json_parser import parse_json_array_response
+
+logger = logging.getLogger(__name__)
+
+# Battle and challenge questions are generated by the LLM, which takes long
+# enough that two players opening the same battle on different workers used to
+# both trigger a full generation. Two pieces fix that:
+#   generation_lock  Redis SET NX lock (token-checked release) per battle or
+#                    challenge, so one worker generates and the others wait and
+#                    then read the saved rows; a per-process lock stands in
+#                    when Redis is not configured.
+#   pools            pre-generated questions per (kind, subject, difficulty or
+#                    challenge type) in a Redis list (a deque per worker without
+#                    Redis). Battles take from the pool and only generate the
+#                    shortfall inline; a background refill tops the pool back
+#                    up to BATTLE_POOL_TARGET under its own lock.
+POOL_TARGET = max(0, int(os.getenv("BATTLE_POOL_TARGET", "40")))
+POOL_REFILL_BATCH = max(1, int(os.getenv("BATTLE_POOL_REFILL_BATCH", "20")))
+POOL_TTL_SECONDS = int(os.getenv("BATTLE_POOL_TTL_SECONDS", str(7 * 86_400)))
+REFILL_WORKERS = max(1, int(os.getenv("BATTLE_POOL_REFILL_WORKERS", "2")))
+LOCK_TTL_SECONDS = int(os.getenv("BATTLE_GENERATION_LOCK_TTL_SECONDS", "120"))
+LOCK_WAIT_SECONDS = float(os.getenv("BATTLE_GENERATION_LOCK_WAIT_SECONDS", "90"))
+LOCK_POLL_SECONDS = 0.1
+
+DIFFICULTY_ALIASES = {
+    "easy": "beginner",
+    "medium": "intermediate",
+    "hard": "advanced",
+}
+DIFFICULTY_PROFILES = {
+    "beginner": {
+        "label": "BEGINNER / EASY",
+        "description": (
+            "Ask direct recall and basic concept questions. Use familiar wording, "
+            "avoid obscure details, and make distractors clearly wrong to a learner "
+            "who understands the topic basics."
+        ),
+    },
+    "intermediate": {
+        "label": "INTERMEDIATE / MEDIUM",
+        "description": (
+            "Ask applied understanding questions. Include cause-effect, chronology, "
+            "comparisons, and moderately plausible distractors that require more than "
+            "memorizing a single fact."
+        ),
+    },
+    "advanced": {
+        "label": "ADVANCED / HARD",
+        "description": (
+            "Ask high-quality analytical questions. Require nuanced reasoning, "
+            "context, consequences, historiographical or conceptual distinctions, "
+            "and strong plausible distractors. Avoid simple one-fact recall."
+        ),
+    },
+}
+CHALLENGE_TYPE_DESCRIPTIONS = {
+    "speed": "fast-paced questions that can be answered quickly",
+    "accuracy": "precise questions requiring careful consideration",
+    "topic_mastery": "comprehensive questions testing deep understanding",
+    "streak": "progressively challenging questions",
+}
+
+# key -> [lock, holders and waiters]; the entry is dropped with its last user.
+_local_locks: dict[str, list] = {}
+_memory_pools: dict[str, deque] = {}
+_inflight: set[str] = set()
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_stats = {
+    "pool_hits": 0, "pool_misses": 0, "generated_inline": 0,
+    "generated_refill": 0, "refill_errors": 0, "lock_timeouts": 0,
+}
+
+
+def normalize_difficulty(difficulty) -> str:
+    value = str(difficulty or "intermediate").lower()
+    return DIFFICULTY_ALIASES.get(value, value)
+
+
+def _pool_key(kind: str, subject: str, variant: str) -> str:
+    subject_norm = " ".join(str(subject or "").lower().split())
+    digest = hashlib.sha256(f"{subject_norm}|{str(variant or '').lower()}".encode()).hexdigest()[:24]
+    return f"bw:battle:pool:{kind}:{digest}"
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=REFILL_WORKERS, thread_name_prefix="battle-pool")
+    return _executor
+
+
+def _release(client, key: str, token: str) -> None:
+    """Delete the lock only while it still holds our token, so a holder whose
+    TTL lapsed cannot release a lock another worker has since taken."""
+    with client.pipeline() as pipe:
+        pipe.watch(key)
+        if pipe.get(key) == token:
+            pipe.multi()
+            pipe.delete(key)
+            pipe.execute()
+        else:
+            pipe.unwatch()
+
+
+def _extend(client, key: str, token: str, ttl: int) -> bool:
+    """Push the lock's expiry out by `ttl` if it still holds our token."""
+    with client.pipeline() as pipe:
+        pipe.watch(key)
+        if pipe.get(key) != token:
+            pipe.unwatch()
+            return False
+        pipe.multi()
+        pipe.pexpire(key, int(ttl * 1000))
+        pipe.execute()
+        return True
+
+
+class Lease:
+    """Truthy when the lock was acquired. `held()` re-checks ownership right
+    before results are written: a Redis lock whose TTL lapsed during a slow
+    LLM call may have been taken by another worker, which then generates too."""
+
+    def __init__(self, acquired: bool, client=None, key: str = "", token: str = "", ttl: int = 0):
+        self.acquired = acquired
+        self._client = client
+        self._key = key
+        self._token = token
+        self._ttl = ttl
+
+    def __bool__(self) -> bool:
+        return self.acquired
+
+    def held(self) -> bool:
+        if not self.acquired:
+            return False
+        if self._client is None:
+            return True
+        try:
+            return _extend(self._client, self._key, self._token, self._ttl)
+        except Exception as e:
+            logger.warning("Redis lock check failed for %s: %s", self._key, e)
+            return False
+
+
+@contextmanager
+def generation_lock(name: str, wait: float = LOCK_WAIT_SECONDS, ttl: int = LOCK_TTL_SECONDS):
+    """Hold a cross-worker lock for `name`; yields a Lease, truthy when the
+    lock was acquired. Callers re-check for saved questions once inside, so a
+    waiter that gets the lock after another worker finished generating does no
+    LLM work, and check `lease.held()` again before saving generated ones."""
+    client = redis_cache._redis_client
+    key = f"bw:lock:{name}"
+    if client is not None:
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        acquired = False
+        try:
+            while True:
+                if client.set(key, token, nx=True, px=int(ttl * 1000)):
+                    acquired = True
+                    break
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(LOCK_POLL_SECONDS)
+        except Exception as e:
+            logger.warning("Redis lock %s unavailable (%s); using a local lock", name, e)
+            client = None
+        if client is not None:
+            if not acquired:
+                _stats["lock_timeouts"] += 1
+            try:
+                yield Lease(acquired, client, key, token, ttl)
+            finally:
+                if acquired:
+                    try:
+                        _release(client, key, token)
+                    except Exception as e:
+                        logger.debug("Redis lock release failed for %s: %s", name, e)
+            return
+
+    with _lock:
+        entry = _local_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    local = entry[0]
+    try:
+        acquired = local.acquire(timeout=wait) if wait > 0 else local.acquire(blocking=False)
+        if not acquired:
+            _stats["lock_timeouts"] += 1
+        try:
+            yield Lease(acquired)
+        finally:
+            if acquired:
+                local.release()
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if not entry[1]:
+                _local_locks.pop(key, None)
+
+
+def pool_size(kind: str, subject: str, variant: str) -> int:
+    key = _pool_key(kind, subject, variant)
+    client = redis_cache._redis_client
+    if client is not None:
+        try:
+            return int(client.llen(key))
+        except Exception as e:
+            logger.debug("Redis LLEN failed for %s: %s", key, e)
+            return 0
+    with _lock:
+        return len(_memory_pools.get(key, ()))
+
+
+def add_to_pool(kind: str, subject: str, variant: str, questions: list[dict]) -> None:
+    if not questions:
+        return
+    key = _pool_key(kind, subject, variant)
+    client = redis_cache._redis_client
+    if client is not None:
+        try:
+            pipe = client.pipeline()
+            pipe.rpush(key, *[json.dumps(q) for q in questions])
+            pipe.ltrim(key, -max(POOL_TARGET * 2, len(questions)), -1)
+            pipe.expire(key, POOL_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.debug("Redis pool push failed for %s: %s", key, e)
+        return
+    with _lock:
+        pool = _memory_pools.setdefault(key, deque(maxlen=max(POOL_TARGET * 2, 1)))
+        pool.extend(questions)
+
+
+def take_from_pool(kind: str, subject: str, variant: str, count: int) -> list[dict]:
+    if count <= 0:
+        return []
+    key = _pool_key(kind, subject, variant)
+    client = redis_cache._redis_client
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.lrange(key, 0, count - 1)
+            pipe.ltrim(key, count, -1)
+            raw, _ = pipe.execute()
+            return [json.loads(item) for item in raw or ()]
+        except Exception as e:
+            logger.debug("Redis pool pop failed for %s: %s", key, e)
+            return []
+    with _lock:
+        pool = _memory_pools.get(key)
+        if not pool:
+            return []
+        return [pool.popleft() for _ in range(min(count, len(pool)))]
+
+
+def _battle_prompt(subject: str, difficulty: str, count: int) -> str:
+    profile = DIFFICULTY_PROFILES.get(difficulty, DIFFICULTY_PROFILES["intermediate"])
+    return f"""Generate exactly {count} multiple choice questions about {subject}.
+Difficulty target: {profile["label"]}.
+Difficulty rules: {profile["description"]}
+
+Return ONLY a valid JSON array with this exact structure:
+[
+  {{
+    "question": "Question text here?",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "correct_answer": 0,
+    "difficulty": "{difficulty}",
+    "explanation": "Brief explanation of the correct answer"
+  }}
+]
+
+Requirements:
+- Each question must have exactly 4 options
+- correct_answer must be 0, 1, 2, or 3 (index of the correct option)
+- Every question MUST match the requested difficulty target: {profile["label"]}
+- Include "difficulty": "{difficulty}" on every question
+- Questions should be clear and unambiguous
+- Do not repeat the same question stem with slightly different options
+- Distractors must be plausible, but exactly one option must be clearly correct
+- Explanations should be concise (1-2 sentences)
+- Make questions engaging and educational
+- Return ONLY the JSON array, no additional text"""
+
+
+def _challenge_prompt(subject: str, challenge_type: str, count: int) -> str:
+    return f"""Generate exactly {count} multiple choice questions about {subject}.
+Challenge type: {challenge_type} - {CHALLENGE_TYPE_DESCRIPTIONS.get(challenge_type, '')}.
+
+Return ONLY a valid JSON array with this exact structure:
+[
+  {{
+    "question": "Question text here?",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "correct_answer": 0,
+    "explanation": "Brief explanation of the correct answer"
+  }}
+]
+
+Requirements:
+- Each question must have exactly 4 options
+- correct_answer must be 0, 1, 2, or 3 (index of the correct option)
+- Questions should be clear and educational
+- Explanations should be concise (1-2 sentences)
+- Return ONLY the JSON array, no additional text"""
+
+
+def _safe_options(value) -> list:
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = json.loads(value or "[]")
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def generate_questions(kind: str, subject: str, variant: str, count: int) -> list[dict]:
+    """Ask the LLM for `count` questions and normalize them: four options,
+    shuffled, with correct_answer re-pointed at the correct option's new index.
+    Raises ValueError when the response is unusable."""
+    from deps import call_ai
+
+    if kind == "battle":
+        prompt = _battle_prompt(subject, variant, count)
+    else:
+        prompt = _challenge_prompt(subject, variant, count)
+    content = call_ai(prompt, max_tokens=4000, temperature=0.7)
+
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    content = content.strip()
+
+    questions_data = parse_json_array_response(content)
+    if not questions_data:
+        raise ValueError("AI returned empty or invalid questions list")
+
+    questions = []
+    for q_data in questions_data[:count]:
+        question_text = str(q_data.get("question") or "").strip()
+        if not question_text:
+            raise ValueError("AI returned a question without question text")
+        options = [str(option).strip() for option in _safe_options(q_data.get("options")) if str(option).strip()]
+        if len(options) != 4:
+            raise ValueError("AI returned a question without exactly 4 options")
+        try:
+            correct_index = int(q_data.get("correct_answer", 0))
+        except (TypeError, ValueError):
+            correct_index = 0
+        correct_index = max(0, min(correct_index, len(options) - 1))
+        correct_answer_text = options[correct_index]
+        random.shuffle(options)
+        question = {
+            "question": question_text,
+            "options": options,
+            "correct_answer": options.index(correct_answer_text),
+            "explanation": q_data.get("explanation", ""),
+        }
+        if kind == "battle":
+            question["difficulty"] = variant
+        questions.append(question)
+    return questions
+
+
+def acquire_questions(kind: str, subject: str, variant: str, count: int) -> list[dict]:
+    """`count` questions for a new battle or challenge: pooled questions
+    first, the shortfall generated inline, then a background top-up."""
+    questions = take_from_pool(kind, subject, variant, count)
+    if len(questions) >= count:
+        _stats["pool_hits"] += 1
+    else:
+        _stats["pool_misses"] += 1
+        missing = count - len(questions)
+        questions.extend(generate_questions(kind, subject, variant, missing))
+        _stats["generated_inline"] += missing
+    schedule_refill(kind, subject, variant)
+    return questions
+
+
+def schedule_refill(kind: str, subject: str, variant: str) -> bool:
+    """Top the pool up to POOL_TARGET in the background. At most one refill
+    per pool runs per process, and the refill lock keeps it to one cluster-wide."""
+    if POOL_TARGET <= 0 or not subject:
+        return False
+    key = _pool_key(kind, subject, variant)
+    with _lock:
+        if key in _inflight:
+            return False
+        _inflight.add(key)
+    try:
+        _get_executor().submit(_refill, kind, subject, variant, key)
+    except RuntimeError:
+        with _lock:
+            _inflight.discard(key)
+        return False
+    return True
+
+
+def _refill(kind: str, subject: str, variant: str, key: str) -> int:
+    added = 0
+    try:
+        with generation_lock(f"refill:{key}", wait=0, ttl=LOCK_TTL_SECONDS * 3) as acquired:
+            if not acquired:
+                return 0
+            needed = POOL_TARGET - pool_size(kind, subject, variant)
+            while added < needed:
+                questions = generate_questions(kind, subject, variant, min(POOL_REFILL_BATCH, needed - added))
+                if not questions:
+                    break
+                add_to_pool(kind, subject, variant, questions)
+                added += len(questions)
+                _stats["generated_refill"] += len(questions)
+    except Exception as e:
+        _stats["refill_errors"] += 1
+        logger.warning("Battle question pool refill failed for %s/%s: %s", kind, subject, e)
+    finally:
+        with _lock:
+            _inflight.discard(key)
+    return added
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "backend": "redis" if redis_cache._redis_client is not None else "memory",
+            "refills_inflight": len(_inflight),
+            "memory_pools": len(_memory_pools),
+        }
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,10 +1,14 @@
 import logging
+from collections import deque
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import func
+from sqlalchemy import event, func
 from sqlalchemy.orm import Session
 
+from services import redis_cache
+
 logger = logging.getLogger(__name__)
 
 def _normalize_topic(topic: Optional[str]) -> str:
@@ -49,7 +53,7 @@ def _build_area_payload(
     priority: Optional[int] = None,
     status: Optional[str] = None,
     improvement_rate: Optional[float] = None,
-    last_practiced: Optional[datetime] = None,
+    last_practiced: Optional[Any] = None,
     sources: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
     return {
@@ -62,57 +66,352 @@ def _build_area_payload(
         "priority": priority or 0,
         "status": status or "needs_practice",
         "improvement_rate": round(improvement_rate, 2) if isinstance(improvement_rate, (int, float)) else 0.0,
-        "last_practiced": last_practiced.isoformat() if last_practiced else None,
+        "last_practiced": last_practiced.isoformat() if isinstance(last_practiced, datetime) else last_practiced,
         "sources": sources or [],
         "chat_analysis": {"is_doubtful": False, "mentions": 0},
         "flashcard_performance": {"is_weak": False, "struggling_cards": [], "total_cards": 0},
     }
 
-def get_comprehensive_weakness_analysis(db: Session, user_id: int, models) -> Dict[str, Any]:
-    areas_by_topic: Dict[str, Dict[str, Any]] = {}
+class TopicMatcher:
+    """Aho-Corasick automaton over a fixed set of lowercased topics.
+
+    `find(text)` walks the text once and returns every topic that occurs in
+    it as a substring, so counting mentions across a chat window costs one
+    pass over the messages however many topics there are."""
+
+    def __init__(self, topics):
+        self.topics = sorted({t for t in topics if t})
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        for index, topic in enumerate(self.topics):
+            node = 0
+            for ch in topic:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (index,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        found = set()
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return {self.topics[i] for i in found}
+
+@lru_cache(maxsize=256)
+def _matcher_for(topics: tuple) -> TopicMatcher:
+    return TopicMatcher(topics)
+
+# The analysis is materialized per user (redis_cache, in-memory without
+# Redis) as the inputs it is composed from plus the composed result:
+#   weak_areas / mastery  the user's UserWeakArea and TopicMastery rows
+#   cards                 per-topic flashcard review aggregates
+#   chat                  the last CHAT_WINDOW messages, lowercased, each with
+#                         the topics it mentions
+# Learning events (context_agent.record_event) mark the parts they touch
+# dirty; the next read refreshes only those parts — a review reloads one
+# card topic, a chat event fetches messages newer than the window — and
+# recomposes. Committed UserWeakArea/TopicMastery writes, from any path
+# (tutor verdicts, question bank, edits), mark "weak_areas" through the
+# session hooks below. WEAKNESS_SNAPSHOT_TTL_SECONDS bounds staleness from
+# writes that bypass the ORM.
+SNAPSHOT_VERSION = 1
+CHAT_WINDOW = 400
+CHAT_TEXT_CHARS = 4000
+_IGNORED_CARD_TOPICS = ("general", "misc", "default")
+_PENDING_KEY = "weakness_dirty_users"
+_SKIP_KEY = "weakness_snapshot_refresh"
+
+def note_learning_event(event) -> None:
+    """Mark the parts of a user's snapshot a learning event changed."""
+    try:
+        user_id = int(event.student_id)
+    except (TypeError, ValueError):
+        return
+    source = (event.source or "").lower()
+    if source == "flashcard":
+        topic = _normalize_topic((event.raw_data or {}).get("category"))
+        redis_cache.mark_weakness_dirty(user_id, f"cards:{topic}" if topic else "cards:*")
+    elif source == "chat":
+        redis_cache.mark_weakness_dirty(user_id, "chat")
+    elif source in ("quiz", "question", "questions", "exam"):
+        redis_cache.mark_weakness_dirty(user_id, "quiz")
+
+@event.listens_for(Session, "after_flush")
+def _collect_weak_area_writes(session, flush_context):
+    import models
+
+    if session.info.get(_SKIP_KEY):
+        return
+    pending: set = session.info.setdefault(_PENDING_KEY, set())
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            if isinstance(obj, (models.UserWeakArea, models.TopicMastery)) and obj.user_id is not None:
+                pending.add(int(obj.user_id))
+
+def note_bulk_write(session: Session, user_id: int) -> None:
+    """Queue a refresh for weak-area or mastery rows removed or changed with a
+    query-level statement, which the flush hook never sees."""
+    if user_id is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(int(user_id))
+
+@event.listens_for(Session, "after_commit")
+def _publish_weak_area_writes(session):
+    for user_id in session.info.pop(_PENDING_KEY, None) or ():
+        redis_cache.mark_weakness_dirty(user_id, "weak_areas")
+
+@event.listens_for(Session, "after_rollback")
+def _drop_weak_area_writes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _weak_area_row(wa) -> Dict[str, Any]:
+    return {
+        "topic": wa.topic,
+        "total_questions": wa.total_questions,
+        "correct_count": wa.correct_count,
+        "incorrect_count": wa.incorrect_count,
+        "accuracy": wa.accuracy,
+        "weakness_score": wa.weakness_score,
+        "priority": wa.priority,
+        "status": wa.status,
+        "improvement_rate": wa.improvement_rate,
+        "last_practiced": _iso(wa.last_practiced),
+    }
 
-    weak_areas = db.query(models.UserWeakArea).filter(
-        models.UserWeakArea.user_id == user_id,
-        models.UserWeakArea.status != "mastered",
-    ).order_by(
-        models.UserWeakArea.priority.desc(),
-        models.UserWeakArea.weakness_score.desc(),
-    ).all()
+def _mastery_row(tm) -> Dict[str, Any]:
+    return {
+        "topic_name": tm.topic_name,
+        "questions_asked": tm.questions_asked,
+        "correct_answers": tm.correct_answers,
+        "mastery_level": tm.mastery_level,
+        "last_practiced": _iso(tm.last_practiced),
+    }
+
+def _card_topic_stats(cards) -> Dict[str, Any]:
+    reviewed = [c for c in cards if c.times_reviewed and c.times_reviewed >= 2]
+    struggling = []
+    for card in reviewed:
+        accuracy = (card.correct_count or 0) / card.times_reviewed
+        if accuracy < 0.6:
+            struggling.append({"id": card.id, "question": card.question, "accuracy": round(accuracy * 100, 1)})
+    return {
+        "cards": len(cards),
+        "reviews": sum(c.times_reviewed for c in reviewed),
+        "correct": sum(c.correct_count or 0 for c in reviewed),
+        "struggling": struggling,
+    }
+
+def _refresh_cards(db: Session, user_id: int, models, snapshot: Dict[str, Any], topics: Optional[set]) -> List[str]:
+    """Reload card aggregates for `topics` (all topics when None) with one
+    query; returns the topic keys whose aggregates were rebuilt."""
+    query = db.query(
+        models.Flashcard.id,
+        models.Flashcard.category,
+        models.Flashcard.question,
+        models.Flashcard.times_reviewed,
+        models.Flashcard.correct_count,
+    ).join(
+        models.FlashcardSet,
+        models.Flashcard.set_id == models.FlashcardSet.id,
+    ).filter(
+        models.FlashcardSet.user_id == user_id
+    )
+    if topics is not None:
+        query = query.filter(func.lower(func.trim(models.Flashcard.category)).in_(list(topics)))
+    try:
+        rows = query.order_by(models.Flashcard.id).all()
+    except Exception:
+        rows = []
 
+    by_topic: Dict[str, List[Any]] = {}
+    for card in rows:
+        topic_key = _normalize_topic(card.category)
+        if not topic_key or topic_key in _IGNORED_CARD_TOPICS:
+            continue
+        by_topic.setdefault(topic_key, []).append(card)
+
+    cards = snapshot.setdefault("cards", {})
+    if topics is None:
+        cards.clear()
+    else:
+        for topic_key in topics:
+            cards.pop(topic_key, None)
+    for topic_key, topic_cards in by_topic.items():
+        cards[topic_key] = _card_topic_stats(topic_cards)
+    return list(by_topic)
+
+def _persist_flashcard_weakness(db: Session, user_id: int, models, cards: Dict[str, Any],
+                                topics: List[str], weak_areas: List[Any]) -> None:
+    """Write struggling flashcard topics into UserWeakArea so they persist."""
+    by_topic: Dict[str, Any] = {}
     for wa in weak_areas:
-        topic = (wa.topic or "").strip()
+        by_topic.setdefault(wa.topic, wa)
+    changed = False
+    for topic_key in topics:
+        stats = cards.get(topic_key) or {}
+        total_reviews = stats.get("reviews", 0)
+        if not total_reviews:
+            continue
+        total_correct = stats.get("correct", 0)
+        acc = round((total_correct / total_reviews) * 100, 1)
+        if acc >= 70:
+            continue
+        existing = by_topic.get(topic_key)
+        if existing:
+            if (existing.accuracy or 100) > acc:
+                existing.accuracy = acc
+                existing.weakness_score = max(existing.weakness_score or 0, round((100 - acc) * 0.7, 1))
+                existing.status = "needs_practice"
+                changed = True
+        else:
+            wa = models.UserWeakArea(
+                user_id=user_id,
+                topic=topic_key,
+                total_questions=total_reviews,
+                correct_count=total_correct,
+                incorrect_count=total_reviews - total_correct,
+                accuracy=acc,
+                weakness_score=round((100 - acc) * 0.7, 1),
+                status="needs_practice",
+                priority=4,
+            )
+            db.add(wa)
+            weak_areas.append(wa)
+            by_topic[topic_key] = wa
+            changed = True
+    if not changed:
+        return
+    # The snapshot being refreshed already holds these rows.
+    db.info[_SKIP_KEY] = True
+    try:
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Persisting flashcard weak areas failed for user {user_id}: {e}")
+        db.rollback()
+    finally:
+        db.info.pop(_SKIP_KEY, None)
+
+def _refresh_chat(db: Session, user_id: int, models, snapshot: Dict[str, Any]) -> None:
+    window = snapshot.setdefault("chat", [])
+    query = db.query(models.ChatMessage.id, models.ChatMessage.user_message).filter(
+        models.ChatMessage.user_id == user_id
+    )
+    if window:
+        query = query.filter(models.ChatMessage.id > window[0]["id"])
+    try:
+        rows = query.order_by(models.ChatMessage.id.desc()).limit(CHAT_WINDOW).all()
+    except Exception:
+        rows = []
+    fresh = [{"id": r.id, "text": (r.user_message or "").lower()[:CHAT_TEXT_CHARS]} for r in rows]
+    snapshot["chat"] = (fresh + window)[:CHAT_WINDOW]
+
+def _refresh_snapshot(db: Session, user_id: int, models, snapshot: Optional[Dict[str, Any]], dirty: set) -> Dict[str, Any]:
+    full = not snapshot or snapshot.get("v") != SNAPSHOT_VERSION or "*" in dirty
+    if full:
+        snapshot = {"v": SNAPSHOT_VERSION, "cards": {}, "chat": []}
+        card_topics: Optional[set] = None
+    elif "cards:*" in dirty:
+        card_topics = None
+    else:
+        card_topics = {mark[len("cards:"):] for mark in dirty if mark.startswith("cards:")}
+    refresh_cards = full or card_topics is None or bool(card_topics)
+
+    if full or refresh_cards or "quiz" in dirty or "weak_areas" in dirty:
+        weak_areas = db.query(models.UserWeakArea).filter(
+            models.UserWeakArea.user_id == user_id,
+        ).order_by(
+            models.UserWeakArea.priority.desc(),
+            models.UserWeakArea.weakness_score.desc(),
+        ).all()
+        if refresh_cards:
+            rebuilt = _refresh_cards(db, user_id, models, snapshot, card_topics)
+            _persist_flashcard_weakness(db, user_id, models, snapshot["cards"], rebuilt, weak_areas)
+        rows = [_weak_area_row(wa) for wa in weak_areas if wa.status != "mastered"]
+        rows.sort(key=lambda r: (-(r["priority"] or 0), -(r["weakness_score"] or 0)))
+        snapshot["weak_areas"] = rows
+        snapshot["mastery"] = [
+            _mastery_row(tm)
+            for tm in db.query(models.TopicMastery).filter(models.TopicMastery.user_id == user_id).all()
+        ]
+
+    if full or "chat" in dirty:
+        _refresh_chat(db, user_id, models, snapshot)
+    return snapshot
+
+def _chat_mentions(snapshot: Dict[str, Any], topics: List[str]) -> Dict[str, int]:
+    """Messages mentioning each topic. Per-message hits are kept in the
+    snapshot and only recomputed for new messages or a changed topic set."""
+    topic_key = sorted({t.lower() for t in topics if t})
+    window = snapshot.get("chat") or []
+    matcher = _matcher_for(tuple(topic_key))
+    rescan = snapshot.get("chat_topics") != topic_key
+    counts: Dict[str, int] = {}
+    for message in window:
+        if rescan or "hits" not in message:
+            message["hits"] = sorted(matcher.find(message["text"])) if message["text"] else []
+        for topic in message["hits"]:
+            counts[topic] = counts.get(topic, 0) + 1
+    snapshot["chat_topics"] = topic_key
+    return counts
+
+def _compose(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    areas_by_topic: Dict[str, Dict[str, Any]] = {}
+
+    for wa in snapshot.get("weak_areas", []):
+        topic = (wa["topic"] or "").strip()
         if not topic:
             continue
 
-        total_attempts = wa.total_questions or (wa.correct_count or 0) + (wa.incorrect_count or 0)
-        correct = wa.correct_count or max(total_attempts - (wa.incorrect_count or 0), 0)
-        accuracy = wa.accuracy if wa.accuracy is not None else _calc_accuracy(correct, total_attempts)
+        total_attempts = wa["total_questions"] or (wa["correct_count"] or 0) + (wa["incorrect_count"] or 0)
+        correct = wa["correct_count"] or max(total_attempts - (wa["incorrect_count"] or 0), 0)
+        accuracy = wa["accuracy"] if wa["accuracy"] is not None else _calc_accuracy(correct, total_attempts)
 
-        payload = _build_area_payload(
+        areas_by_topic[topic] = _build_area_payload(
             topic=topic,
             accuracy=accuracy,
             total_attempts=total_attempts,
-            total_wrong=wa.incorrect_count or 0,
-            weakness_score=wa.weakness_score,
-            priority=wa.priority,
-            status=wa.status,
-            improvement_rate=wa.improvement_rate,
-            last_practiced=wa.last_practiced,
+            total_wrong=wa["incorrect_count"] or 0,
+            weakness_score=wa["weakness_score"],
+            priority=wa["priority"],
+            status=wa["status"],
+            improvement_rate=wa["improvement_rate"],
+            last_practiced=wa["last_practiced"],
             sources=["quiz"],
         )
-        areas_by_topic[topic] = payload
-
-    mastery_records = db.query(models.TopicMastery).filter(
-        models.TopicMastery.user_id == user_id
-    ).all()
 
+    mastery_records = snapshot.get("mastery", [])
     for tm in mastery_records:
-        topic = (tm.topic_name or "").strip()
+        topic = (tm["topic_name"] or "").strip()
         if not topic:
             continue
 
-        attempts = tm.questions_asked or 0
-        accuracy = _calc_accuracy(tm.correct_answers or 0, attempts) if attempts else None
+        attempts = tm["questions_asked"] or 0
+        accuracy = _calc_accuracy(tm["correct_answers"] or 0, attempts) if attempts else None
 
         if topic in areas_by_topic:
             existing = areas_by_topic[topic]
@@ -133,135 +432,46 @@ def get_comprehensive_weakness_analysis(db: Session, user_id: int, models) -> Di
         if attempts < 3:
             continue
 
-        mastery_level = tm.mastery_level or 0.0
+        mastery_level = tm["mastery_level"] or 0.0
         if mastery_level >= 0.75 and (accuracy is None or accuracy >= 80):
             continue
 
-        weakness_score = round((1 - mastery_level) * 100, 1)
-        payload = _build_area_payload(
+        areas_by_topic[topic] = _build_area_payload(
             topic=topic,
             accuracy=accuracy,
             total_attempts=attempts,
-            total_wrong=max(attempts - (tm.correct_answers or 0), 0),
-            weakness_score=weakness_score,
+            total_wrong=max(attempts - (tm["correct_answers"] or 0), 0),
+            weakness_score=round((1 - mastery_level) * 100, 1),
             priority=5,
             status="needs_practice",
             improvement_rate=0.0,
-            last_practiced=tm.last_practiced,
+            last_practiced=tm["last_practiced"],
             sources=["quiz"],
         )
-        areas_by_topic[topic] = payload
-
-    try:
-        flashcards = db.query(models.Flashcard).join(
-            models.FlashcardSet,
-            models.Flashcard.set_id == models.FlashcardSet.id,
-        ).filter(
-            models.FlashcardSet.user_id == user_id
-        ).all()
-    except Exception:
-        flashcards = []
-
-    flashcards_by_topic: Dict[str, List[Any]] = {}
-    for card in flashcards:
-        topic_key = _normalize_topic(card.category)
-        if not topic_key or topic_key in ("general", "misc", "default"):
-            continue
-        flashcards_by_topic.setdefault(topic_key, []).append(card)
-
-    # Write struggling flashcard topics into UserWeakArea so they persist
-    for topic_key, cards in flashcards_by_topic.items():
-        reviewed = [c for c in cards if c.times_reviewed and c.times_reviewed >= 2]
-        if not reviewed:
-            continue
-        total_reviews = sum(c.times_reviewed for c in reviewed)
-        total_correct = sum(c.correct_count or 0 for c in reviewed)
-        acc = round((total_correct / total_reviews) * 100, 1) if total_reviews else None
-        if acc is None or acc >= 70:
-            continue
-        try:
-            existing = db.query(models.UserWeakArea).filter(
-                models.UserWeakArea.user_id == user_id,
-                models.UserWeakArea.topic == topic_key,
-            ).first()
-            if existing:
-                if (existing.accuracy or 100) > acc:
-                    existing.accuracy = acc
-                    existing.weakness_score = max(existing.weakness_score or 0, round((100 - acc) * 0.7, 1))
-                    existing.status = "needs_practice"
-                    db.commit()
-            else:
-                wa = models.UserWeakArea(
-                    user_id=user_id,
-                    topic=topic_key,
-                    total_questions=total_reviews,
-                    correct_count=total_correct,
-                    incorrect_count=total_reviews - total_correct,
-                    accuracy=acc,
-                    weakness_score=round((100 - acc) * 0.7, 1),
-                    status="needs_practice",
-                    priority=4,
-                )
-                db.add(wa)
-                db.commit()
-            if topic_key not in areas_by_topic:
-                areas_by_topic[topic_key] = _build_area_payload(
-                    topic=topic_key,
-                    accuracy=acc,
-                    total_attempts=total_reviews,
-                    total_wrong=total_reviews - total_correct,
-                    weakness_score=round((100 - acc) * 0.7, 1),
-                    priority=4,
-                    status="needs_practice",
-                    sources=["flashcard"],
-                )
-        except Exception:
-            pass
 
+    cards = snapshot.get("cards", {})
     for topic, area in areas_by_topic.items():
-        topic_key = _normalize_topic(topic)
-        cards = flashcards_by_topic.get(topic_key, [])
-        if not cards:
+        stats = cards.get(_normalize_topic(topic))
+        if not stats:
             continue
-
-        struggling_cards = []
-        for card in cards:
-            if card.times_reviewed and card.times_reviewed >= 2:
-                accuracy = (card.correct_count or 0) / card.times_reviewed
-                if accuracy < 0.6:
-                    struggling_cards.append({
-                        "id": card.id,
-                        "question": card.question,
-                        "accuracy": round(accuracy * 100, 1),
-                    })
-
         area["flashcard_performance"] = {
-            "is_weak": len(struggling_cards) > 0,
-            "struggling_cards": struggling_cards,
-            "total_cards": len(cards),
+            "is_weak": len(stats["struggling"]) > 0,
+            "struggling_cards": [dict(card) for card in stats["struggling"]],
+            "total_cards": stats["cards"],
         }
         if "flashcard" not in area["sources"]:
             area["sources"].append("flashcard")
 
-    try:
-        messages = db.query(models.ChatMessage).filter(
-            models.ChatMessage.user_id == user_id
-        ).order_by(models.ChatMessage.timestamp.desc()).limit(400).all()
-    except Exception:
-        messages = []
-
-    if messages:
-        message_texts = [m.user_message.lower() for m in messages if m.user_message]
-        for topic, area in areas_by_topic.items():
-            t = topic.lower()
-            mentions = sum(1 for text in message_texts if t in text)
-            if mentions > 0:
-                area["chat_analysis"] = {
-                    "is_doubtful": mentions >= 2 or area["category"] != "improving",
-                    "mentions": mentions,
-                }
-                if "chat" not in area["sources"]:
-                    area["sources"].append("chat")
+    mentions_by_topic = _chat_mentions(snapshot, list(areas_by_topic))
+    for topic, area in areas_by_topic.items():
+        mentions = mentions_by_topic.get(topic.lower(), 0)
+        if mentions > 0:
+            area["chat_analysis"] = {
+                "is_doubtful": mentions >= 2 or area["category"] != "improving",
+                "mentions": mentions,
+            }
+            if "chat" not in area["sources"]:
+                area["sources"].append("chat")
 
     weak_areas_by_category = {"critical": [], "needs_practice": [], "improving": []}
     for area in areas_by_topic.values():
@@ -276,23 +486,23 @@ def get_comprehensive_weakness_analysis(db: Session, user_id: int, models) -> Di
     for category in weak_areas_by_category:
         weak_areas_by_category[category] = sorted(weak_areas_by_category[category], key=_sort_key)
 
-    total_q = sum((tm.questions_asked or 0) for tm in mastery_records)
-    total_c = sum((tm.correct_answers or 0) for tm in mastery_records)
+    total_q = sum((tm["questions_asked"] or 0) for tm in mastery_records)
+    total_c = sum((tm["correct_answers"] or 0) for tm in mastery_records)
     overall_accuracy = round((total_c / total_q) * 100, 1) if total_q > 0 else 0.0
 
     strengths = []
     for tm in mastery_records:
-        attempts = tm.questions_asked or 0
+        attempts = tm["questions_asked"] or 0
         if attempts < 3:
             continue
-        accuracy = _calc_accuracy(tm.correct_answers or 0, attempts) or 0.0
-        if (tm.mastery_level or 0.0) >= 0.8 or accuracy >= 85:
+        accuracy = _calc_accuracy(tm["correct_answers"] or 0, attempts) or 0.0
+        if (tm["mastery_level"] or 0.0) >= 0.8 or accuracy >= 85:
             strengths.append({
-                "topic": tm.topic_name,
-                "mastery_level": round(tm.mastery_level or 0.0, 2),
+                "topic": tm["topic_name"],
+                "mastery_level": round(tm["mastery_level"] or 0.0, 2),
                 "accuracy": accuracy,
                 "questions_asked": attempts,
-                "last_practiced": tm.last_practiced.isoformat() if tm.last_practiced else None,
+                "last_practiced": tm["last_practiced"],
             })
 
     strengths = sorted(strengths, key=lambda s: (s["mastery_level"], s["accuracy"]), reverse=True)[:10]
@@ -307,13 +517,29 @@ def get_comprehensive_weakness_analysis(db: Session, user_id: int, models) -> Di
     }
 
     return {
-        "status": "success",
-        "user_id": user_id,
         "weak_areas": weak_areas_by_category,
         "strengths": strengths,
         "summary": summary,
     }
 
+def get_comprehensive_weakness_analysis(db: Session, user_id: int, models) -> Dict[str, Any]:
+    dirty = redis_cache.pop_weakness_dirty(user_id)
+    snapshot = redis_cache.get_weakness_snapshot(user_id)
+    if not dirty and snapshot and snapshot.get("v") == SNAPSHOT_VERSION and snapshot.get("result"):
+        analysis = snapshot["result"]
+    else:
+        try:
+            snapshot = _refresh_snapshot(db, user_id, models, snapshot, dirty)
+            analysis = _compose(snapshot)
+            snapshot["result"] = analysis
+            redis_cache.set_weakness_snapshot(user_id, snapshot)
+        except Exception:
+            # The marks were popped up front; put them back so the next read
+            # rebuilds those parts instead of serving the stale snapshot.
+            redis_cache.mark_weakness_dirty(user_id, *sorted(dirty))
+            raise
+    return {"status": "success", "user_id": user_id, **analysis}
+
 def _get_topic_performance(db: Session, user_id: int, topic: str, models) -> Dict[str, Any]:
     topic_normalized = _normalize_topic(topic)
     if not topic_normalized:
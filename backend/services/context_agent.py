@@ -86,72 +86,117 @@ class CentralContextAgent:
         self._memory_svc = memory_svc
 
     def record_event(self, db, event: LearningEvent) -> AgentDecision:
-        decision = AgentDecision()
+        return self.record_events(db, [event])[0]
 
+    def record_events(self, db, events: List[LearningEvent]) -> List[AgentDecision]:
+        """Apply BKT updates, evaluate triggers and log a batch of events in
+        one transaction. Events are applied in order, so several events on
+        the same concept update the same state row in turn."""
+        decisions = [AgentDecision() for _ in events]
+        if not events:
+            return decisions
+
+        now = datetime.now(timezone.utc)
         try:
-            self._update_bkt(db, event)
+            states = self._load_states(db, events)
+            for event, decision in zip(events, decisions):
+                state = self._update_bkt(db, event, states, now)
+                try:
+                    self._evaluate_triggers(db, event, decision, state, now)
+                except Exception as e:
+                    logger.warning(f"[Agent] trigger evaluation failed: {e}")
+            db.add_all(self._event_rows(events, decisions))
+            db.commit()
         except Exception as e:
             logger.warning(f"[Agent] BKT update failed: {e}")
             db.rollback()
-
-        if self._memory_svc:
             try:
-                from services.memory_service import MemoryEvent
-                me = MemoryEvent(
-                    source=event.source,
-                    concept_id=event.concept_id,
-                    concept_name=event.concept_name,
-                    correct=event.correct,
-                    wrong_count=event.wrong_questions,
-                    difficulty=event.raw_data.get("difficulty", "medium"),
-                    intent=event.intent,
-                    frustration=event.frustration,
-                    message=event.message,
-                    score=event.score,
-                    wrong_questions=event.wrong_questions,
-                    time_seconds=event.time_seconds,
-                    p_mastery=event.p_mastery,
-                )
-                self._memory_svc.write_memory(db, event.student_id, me)
+                db.add_all(self._event_rows(events, decisions))
+                db.commit()
             except Exception as e:
-                logger.warning(f"[Agent] memory write failed: {e}")
-
-        try:
-            self._evaluate_triggers(db, event, decision)
-        except Exception as e:
-            logger.warning(f"[Agent] trigger evaluation failed: {e}")
+                logger.warning(f"[Agent] event logging failed: {e}")
+                db.rollback()
+
+        for event in events:
+            if self._memory_svc:
+                try:
+                    from services.memory_service import MemoryEvent
+                    me = MemoryEvent(
+                        source=event.source,
+                        concept_id=event.concept_id,
+                        concept_name=event.concept_name,
+                        correct=event.correct,
+                        wrong_count=event.wrong_questions,
+                        difficulty=event.raw_data.get("difficulty", "medium"),
+                        intent=event.intent,
+                        frustration=event.frustration,
+                        message=event.message,
+                        score=event.score,
+                        wrong_questions=event.wrong_questions,
+                        time_seconds=event.time_seconds,
+                        p_mastery=event.p_mastery,
+                    )
+                    self._memory_svc.write_memory(db, event.student_id, me)
+                except Exception as e:
+                    logger.warning(f"[Agent] memory write failed: {e}")
 
-        try:
-            self._log_event(db, event, decision)
-        except Exception as e:
-            logger.warning(f"[Agent] event logging failed: {e}")
-            db.rollback()
+            try:
+                from services.comprehensive_weakness_analyzer import note_learning_event
+                note_learning_event(event)
+            except Exception as e:
+                logger.warning(f"[Agent] weakness snapshot update failed: {e}")
 
-        return decision
+        return decisions
 
-    def _update_bkt(self, db, event: LearningEvent):
-        if not event.concept_id:
-            return
+    def _load_states(self, db, events: List[LearningEvent]) -> Dict[tuple, Any]:
         import models
 
-        user_id = int(event.student_id)
-        state = db.query(models.StudentKnowledgeState).filter_by(
-            user_id=user_id, concept_id=event.concept_id
-        ).first()
+        names: Dict[tuple, str] = {}
+        for event in events:
+            user_id = _user_id(event)
+            if user_id is not None and event.concept_id:
+                names.setdefault((user_id, event.concept_id), event.concept_name)
+        if not names:
+            return {}
+        SKS = models.StudentKnowledgeState
+        rows = (
+            db.query(SKS)
+            .filter(
+                SKS.user_id.in_({uid for uid, _ in names}),
+                SKS.concept_id.in_({cid for _, cid in names}),
+            )
+            .order_by(SKS.id)
+            .all()
+        )
+        states: Dict[tuple, Any] = {}
+        for row in rows:
+            states.setdefault((row.user_id, row.concept_id), row)
 
-        if not state:
-            state = models.StudentKnowledgeState(
+        missing = [key for key in names if key not in states]
+        for user_id, concept_id in missing:
+            state = SKS(
                 user_id=user_id,
-                concept_id=event.concept_id,
-                concept_name=event.concept_name or event.concept_id,
+                concept_id=concept_id,
+                concept_name=names.get((user_id, concept_id)) or concept_id,
                 p_mastery=0.1,
             )
             db.add(state)
+            states[(user_id, concept_id)] = state
+        if missing:
             db.flush()
+        return states
+
+    def _update_bkt(self, db, event: LearningEvent, states: Dict[tuple, Any], now: datetime):
+        state = states.get((_user_id(event), event.concept_id)) if event.concept_id else None
+        if state is None:
+            return None
 
+        # The stored mastery is as of last_updated; decay it to now before
+        # applying the observation.
+        p_mastery = effective_mastery(state.p_mastery, state.last_updated, now)
         if event.source in ("flashcard", "quiz"):
             pl, ps, pg = state.p_learn, state.p_slip, state.p_guess
-            p = state.p_mastery
+            p = p_mastery
             observed_correct = bool(event.correct)
             if event.source == "quiz" and event.correct is None:
                 observed_correct = (event.score or 0.0) >= 0.65
@@ -161,42 +206,36 @@ class CentralContextAgent:
             else:
                 p_update = (p * ps) / max((p * ps + (1 - p) * (1 - pg)), 1e-9)
             p_next = p_update + (1 - p_update) * pl
-            state.p_mastery = min(max(p_next, 0.01), 0.99)
+            p_mastery = min(max(p_next, 0.01), 0.99)
 
             if event.source == "quiz":
                 score = max(0.0, min(float(event.score or 0.0), 1.0))
                 score_target = 0.05 + (0.9 * score)
-                blended = (state.p_mastery * 0.45) + (score_target * 0.55)
-                state.p_mastery = min(max(blended, 0.01), 0.99)
+                blended = (p_mastery * 0.45) + (score_target * 0.55)
+                p_mastery = min(max(blended, 0.01), 0.99)
                 if score >= 0.8:
-                    state.p_mastery = max(state.p_mastery, 0.78)
+                    p_mastery = max(p_mastery, 0.78)
                 elif score <= 0.45:
-                    state.p_mastery = min(state.p_mastery, 0.45)
+                    p_mastery = min(p_mastery, 0.45)
         elif event.source == "chat":
             delta = 0.01 if event.frustration < 0.3 else -0.005
-            state.p_mastery = min(max(state.p_mastery + delta, 0.01), 0.99)
+            p_mastery = min(max(p_mastery + delta, 0.01), 0.99)
 
-        state.interaction_count += 1
-        state.last_updated = datetime.now(timezone.utc)
-        hist = state.mastery_history or []
-        hist.append(round(state.p_mastery, 3))
-        state.mastery_history = hist[-30:]
-        event.p_mastery = state.p_mastery
-        db.commit()
+        state.p_mastery = p_mastery
+        state.interaction_count = (state.interaction_count or 0) + 1
+        state.last_updated = now
+        state.mastery_history = (list(state.mastery_history or []) + [round(p_mastery, 3)])[-30:]
+        event.p_mastery = p_mastery
+        return state
 
-    def _evaluate_triggers(self, db, event: LearningEvent, decision: AgentDecision):
+    def _evaluate_triggers(self, db, event: LearningEvent, decision: AgentDecision, state, now: datetime):
         import models
 
-        user_id = int(event.student_id)
-
-        if event.source == "flashcard" and event.correct is False:
-            wrong_today = (
-                db.query(models.AgentEvent)
-                .filter_by(user_id=user_id, concept_id=event.concept_id, source="flashcard")
-                .filter(models.AgentEvent.correct == False)
-                .filter(models.AgentEvent.timestamp >= _today_start())
-                .count()
-            )
+        if event.source == "flashcard" and event.correct is False and state is not None:
+            today = _today_start().date()
+            wrong_today = (state.flashcard_wrong_count or 0) if state.flashcard_wrong_day == today else 0
+            state.flashcard_wrong_day = today
+            state.flashcard_wrong_count = wrong_today + 1
             if wrong_today >= 2:
                 chat_memory = None
                 if self._memory_svc:
@@ -217,55 +256,47 @@ class CentralContextAgent:
             decision.dim_roadmap_concept = event.concept_id
             decision.triggers_fired.append("rule3_quiz_fail_dim_roadmap")
 
-        if event.source in ("flashcard", "quiz", "chat") and event.concept_id:
-            state = db.query(models.StudentKnowledgeState).filter_by(
-                user_id=user_id, concept_id=event.concept_id
-            ).first()
-            if state and state.p_mastery > 0.85 and state.interaction_count >= 3:
-                already_notified = (
-                    db.query(models.AgentEvent)
-                    .filter_by(
-                        user_id=user_id,
-                        concept_id=event.concept_id,
-                        event_type="mastery_milestone",
-                    )
-                    .count()
-                )
-                if not already_notified:
-                    decision.milestone_notification = (
-                        f"You've mastered {event.concept_name}! Keep it up!"
-                    )
-                    decision.triggers_fired.append("rule4_mastery_milestone")
-                    try:
-                        notif = models.Notification(
-                            user_id=user_id,
-                            title="Concept Mastered!",
-                            message=decision.milestone_notification,
-                            notification_type="milestone",
-                        )
-                        db.add(notif)
-                        db.commit()
-                    except Exception:
-                        db.rollback()
-
-    def _log_event(self, db, event: LearningEvent, decision: AgentDecision):
+        if (
+            event.source in ("flashcard", "quiz", "chat")
+            and state is not None
+            and state.p_mastery > 0.85
+            and state.interaction_count >= 3
+            and state.milestone_notified_at is None
+        ):
+            state.milestone_notified_at = now
+            decision.milestone_notification = (
+                f"You've mastered {event.concept_name}! Keep it up!"
+            )
+            decision.triggers_fired.append("rule4_mastery_milestone")
+            db.add(models.Notification(
+                user_id=state.user_id,
+                title="Concept Mastered!",
+                message=decision.milestone_notification,
+                notification_type="milestone",
+            ))
+
+    def _event_rows(self, events: List[LearningEvent], decisions: List[AgentDecision]) -> list:
         import models
 
-        row = models.AgentEvent(
-            user_id=int(event.student_id),
-            session_id=event.session_id,
-            timestamp=datetime.now(timezone.utc),
-            source=event.source,
-            event_type=event.event_type,
-            concept_id=event.concept_id or None,
-            concept_name=event.concept_name or None,
-            correct=event.correct,
-            confidence_signal=event.score if event.source == "quiz" else None,
-            triggers_fired=decision.triggers_fired,
-            raw_data=event.raw_data,
-        )
-        db.add(row)
-        db.commit()
+        rows = []
+        for event, decision in zip(events, decisions):
+            user_id = _user_id(event)
+            if user_id is None:
+                continue
+            rows.append(models.AgentEvent(
+                user_id=user_id,
+                session_id=event.session_id,
+                timestamp=datetime.now(timezone.utc),
+                source=event.source,
+                event_type=event.event_type,
+                concept_id=event.concept_id or None,
+                concept_name=event.concept_name or None,
+                correct=event.correct,
+                confidence_signal=event.score if event.source == "quiz" else None,
+                triggers_fired=list(decision.triggers_fired),
+                raw_data=event.raw_data,
+            ))
+        return rows
 
     def get_student_profile(self, db, user_id: int) -> StudentProfile:
         import models
@@ -281,14 +312,17 @@ class CentralContextAgent:
         weak_concepts: List[WeakConcept] = []
         strong_concepts: List[WeakConcept] = []
         try:
-            states = (
-                db.query(models.StudentKnowledgeState)
-                .filter_by(user_id=user_id)
-                .order_by(models.StudentKnowledgeState.p_mastery.asc())
-                .limit(30)
-                .all()
-            )
+            SKS = models.StudentKnowledgeState
+            now = datetime.now(timezone.utc)
+            mastery = {
+                row.id: effective_mastery(row.p_mastery, row.last_updated, now)
+                for row in db.query(SKS.id, SKS.p_mastery, SKS.last_updated).filter(SKS.user_id == user_id)
+            }
+            ids = sorted(mastery, key=mastery.get)[:30]
+            states = sorted(db.query(SKS).filter(SKS.id.in_(ids)).all(), key=lambda s: mastery[s.id]) if ids else []
+            struggle_sources = _get_struggle_sources(db, user_id, [s.concept_id for s in states])
             for s in states:
+                p_mastery = mastery[s.id]
                 hist = s.mastery_history or []
                 trend = 0.0
                 trend_label = "stable"
@@ -296,22 +330,22 @@ class CentralContextAgent:
                     trend = hist[-1] - hist[-2]
                     trend_label = "improving" if trend > 0.02 else ("declining" if trend < -0.02 else "stable")
 
-                sources = _get_struggle_sources(db, user_id, s.concept_id)
-                action = _recommend_action(s.p_mastery, sources)
+                sources = struggle_sources.get(s.concept_id, [])
+                action = _recommend_action(p_mastery, sources)
 
                 wc = WeakConcept(
                     concept_id=s.concept_id,
                     concept_name=s.concept_name,
-                    p_mastery=s.p_mastery,
+                    p_mastery=p_mastery,
                     trend=trend,
                     trend_label=trend_label,
                     struggle_sources=sources,
                     interaction_count=s.interaction_count,
                     last_seen=s.last_updated,
                     recommended_action=action,
-                    importance_score=min(1.0, (1 - s.p_mastery) + (0.1 if "chat" in sources else 0)),
+                    importance_score=min(1.0, (1 - p_mastery) + (0.1 if "chat" in sources else 0)),
                 )
-                if s.p_mastery < 0.5:
+                if p_mastery < 0.5:
                     weak_concepts.append(wc)
                 else:
                     strong_concepts.append(wc)
@@ -393,43 +427,51 @@ class CentralContextAgent:
             weekly_stats=weekly_stats,
         )
 
-    def apply_forgetting_curve(self, db, user_id: int):
-        import models
-
-        try:
-            states = db.query(models.StudentKnowledgeState).filter_by(user_id=user_id).all()
-            for s in states:
-                if s.last_updated:
-                    lu = s.last_updated.replace(tzinfo=timezone.utc) if s.last_updated.tzinfo is None else s.last_updated
-                    days = max(0, (datetime.now(timezone.utc) - lu).days)
-                    if days > 0:
-                        s.p_mastery = max(s.p_mastery * (0.95 ** days), 0.1)
-            db.commit()
-        except Exception as e:
-            logger.warning(f"[Agent] forgetting curve failed: {e}")
-            db.rollback()
+# Forgetting curve: mastery decays by FORGETTING_RATE per whole day since the
+# state was last updated. It is applied when mastery is read or updated, so
+# idle concepts never need a write.
+FORGETTING_RATE = 0.95
+FORGETTING_FLOOR = 0.1
+
+def effective_mastery(p_mastery: Optional[float], last_updated: Optional[datetime], now: Optional[datetime] = None) -> float:
+    p = float(p_mastery if p_mastery is not None else 0.1)
+    if not last_updated:
+        return p
+    if last_updated.tzinfo is None:
+        last_updated = last_updated.replace(tzinfo=timezone.utc)
+    days = max(0, ((now or datetime.now(timezone.utc)) - last_updated).days)
+    if days == 0:
+        return p
+    return max(p * (FORGETTING_RATE ** days), min(p, FORGETTING_FLOOR))
+
+def _user_id(event: LearningEvent) -> Optional[int]:
+    try:
+        return int(event.student_id)
+    except (TypeError, ValueError):
+        return None
 
 def _today_start() -> datetime:
     today = date.today()
     return datetime(today.year, today.month, today.day, tzinfo=timezone.utc)
 
-def _get_struggle_sources(db, user_id: int, concept_id: str) -> List[str]:
+def _get_struggle_sources(db, user_id: int, concept_ids: List[str]) -> Dict[str, List[str]]:
     import models
+    from sqlalchemy import func
 
-    sources: List[str] = []
+    sources: Dict[str, List[str]] = {}
+    if not concept_ids:
+        return sources
     try:
-        events = (
-            db.query(models.AgentEvent)
-            .filter_by(user_id=user_id, concept_id=concept_id)
-            .filter(models.AgentEvent.correct == False)
-            .distinct(models.AgentEvent.source)
+        AE = models.AgentEvent
+        rows = (
+            db.query(AE.concept_id, AE.source)
+            .filter(AE.user_id == user_id, AE.concept_id.in_(set(concept_ids)), AE.correct == False)
+            .group_by(AE.concept_id, AE.source)
+            .order_by(func.min(AE.id))
             .all()
         )
-        seen = set()
-        for e in events:
-            if e.source not in seen:
-                sources.append(e.source)
-                seen.add(e.source)
+        for concept_id, source in rows:
+            sources.setdefault(concept_id, []).append(source)
     except Exception:
         pass
     return sources
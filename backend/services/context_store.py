@@ -128,6 +128,65 @@ def initialize(*args, **kwargs):
 def available() -> bool:
     return vs.available()
 
+def _chunk_base_metadata(
+    doc_id: str,
+    filename: str,
+    user_id: str,
+    subject: str,
+    grade_level: str,
+    scope: str,
+    source_url: str,
+    source_name: str,
+    license: str,
+    curriculum: str,
+    source_type: str,
+    book_title: str,
+) -> dict:
+    clean_subject = canonicalize_subject(subject) if subject else ""
+    clean_grade = (grade_level or "").strip()
+    clean_book_title = (book_title or filename.replace(".pdf", "").replace(".txt", "").replace(".md", "")).strip()[:200]
+    return {
+        "doc_id": doc_id,
+        "filename": filename[:200],
+        "book_title": clean_book_title,
+        "subject": clean_subject[:100] if clean_subject else "",
+        "grade_level": clean_grade[:50] if clean_grade else "",
+        "scope": scope,
+        "user_id": str(user_id),
+        "source_url": source_url[:300] if source_url else "",
+        "source_name": source_name[:120] if source_name else "",
+        "license": license[:60] if license else "",
+        "curriculum": curriculum[:20] if curriculum else "",
+        "source_type": source_type[:40] if source_type else "",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+def _chunk_rows(
+    base_meta: dict,
+    chunks: list[str],
+    embeddings: list[list[float]],
+    chunk_pages: list[dict] | None,
+    col_name: str,
+    uid: Optional[str],
+) -> list[dict]:
+    rows = []
+    for i, chunk in enumerate(chunks):
+        meta = {**base_meta, "chunk_index": str(i), "page_number": "", "page_start": "", "page_end": ""}
+        if chunk_pages and i < len(chunk_pages):
+            pg = chunk_pages[i]
+            meta["page_number"] = str(pg.get("page_label") or pg.get("page_start") or "")
+            meta["page_start"] = str(pg.get("page_start") or "")
+            meta["page_end"] = str(pg.get("page_end") or "")
+        rows.append({
+            "id": f"{base_meta['doc_id']}_{i}",
+            "collection": col_name,
+            "user_id": uid,
+            "content": chunk,
+            "embedding": embeddings[i],
+            "metadata": meta,
+        })
+    return rows
+
 def add_document_chunks(
     user_id: str,
     doc_id: str,
@@ -150,29 +209,16 @@ def add_document_chunks(
     if not chunks:
         raise ValueError("No chunks provided")
 
-    timestamp = datetime.now(timezone.utc).isoformat()
-    clean_subject = canonicalize_subject(subject) if subject else ""
-    clean_grade = (grade_level or "").strip()
-    clean_book_title = (book_title or filename.replace(".pdf", "").replace(".txt", "").replace(".md", "")).strip()[:200]
     cleaned_chunks = [c.strip() for c in chunks if c and c.strip()]
     if not cleaned_chunks:
         raise ValueError("No non-empty chunks provided")
 
-    def _encode_chunks(payload: list[str]) -> list[list[float]]:
-        try:
-            from services.vector_store import _embed_model
-            vectors = _embed_model.encode(payload, batch_size=32, show_progress_bar=False)
-        except TypeError:
-            from services.vector_store import _embed_model
-            vectors = _embed_model.encode(payload)
-        if hasattr(vectors, "tolist"):
-            vectors = vectors.tolist()
-        out: list[list[float]] = []
-        for vector in vectors:
-            out.append(vector.tolist() if hasattr(vector, "tolist") else list(vector))
-        return out
-
-    embeddings = _encode_chunks(cleaned_chunks)
+    from services import embedding_service
+    embeddings = embedding_service.encode_many(vs._embed_model, cleaned_chunks)
+    base_meta = _chunk_base_metadata(
+        doc_id, filename, user_id, subject, grade_level, scope, source_url,
+        source_name, license, curriculum, source_type, book_title,
+    )
 
     def _write_to(col_name: str, uid: Optional[str]) -> int:
         if replace_existing:
@@ -181,41 +227,7 @@ def add_document_chunks(
             except Exception as e:
                 logger.warning(f"replace_existing delete failed for {doc_id} in {col_name}: {e}")
 
-        rows = []
-        for i, chunk in enumerate(cleaned_chunks):
-            meta: dict = {
-                "doc_id": doc_id,
-                "filename": filename[:200],
-                "book_title": clean_book_title,
-                "subject": clean_subject[:100] if clean_subject else "",
-                "grade_level": clean_grade[:50] if clean_grade else "",
-                "scope": scope,
-                "user_id": str(user_id),
-                "chunk_index": str(i),
-                "page_number": "",
-                "page_start": "",
-                "page_end": "",
-                "source_url": source_url[:300] if source_url else "",
-                "source_name": source_name[:120] if source_name else "",
-                "license": license[:60] if license else "",
-                "curriculum": curriculum[:20] if curriculum else "",
-                "source_type": source_type[:40] if source_type else "",
-                "timestamp": timestamp,
-            }
-            if chunk_pages and i < len(chunk_pages):
-                pg = chunk_pages[i]
-                meta["page_number"] = str(pg.get("page_label") or pg.get("page_start") or "")
-                meta["page_start"] = str(pg.get("page_start") or "")
-                meta["page_end"] = str(pg.get("page_end") or "")
-            rows.append({
-                "id": f"{doc_id}_{i}",
-                "collection": col_name,
-                "user_id": uid,
-                "content": chunk,
-                "embedding": embeddings[i],
-                "metadata": meta,
-            })
-
+        rows = _chunk_rows(base_meta, cleaned_chunks, embeddings, chunk_pages, col_name, uid)
         inserted = vs.bulk_upsert(rows)
         return inserted
 
@@ -234,6 +246,72 @@ def add_document_chunks(
 
     return stored
 
+def add_documents_chunks(documents: list[dict]) -> list[int]:
+    """Batched add_document_chunks for bulk ingest: every document's chunks go
+    through one encode_many call and one bulk_upsert per collection. Each dict
+    takes add_document_chunks' keyword arguments; returns the chunk count
+    stored in user_docs per document, in order, so a caller can tell a
+    partly written document from a complete one."""
+    if not available():
+        raise RuntimeError("context_store not initialized")
+    prepared = []
+    all_chunks: list[str] = []
+    for doc in documents:
+        cleaned = [c.strip() for c in doc.get("chunks", []) if c and c.strip()]
+        prepared.append((doc, cleaned, len(all_chunks)))
+        all_chunks.extend(cleaned)
+    if not all_chunks:
+        return [0] * len(documents)
+
+    from services import embedding_service
+    embeddings = embedding_service.encode_many(vs._embed_model, all_chunks)
+
+    user_rows: list[dict] = []
+    row_owners: list[int] = []
+    hs_rows: list[dict] = []
+    for index, (doc, cleaned, offset) in enumerate(prepared):
+        if not cleaned:
+            continue
+        doc_id = doc["doc_id"]
+        uid = str(doc["user_id"])
+        base_meta = _chunk_base_metadata(
+            doc_id, doc["filename"], doc["user_id"], doc.get("subject", ""), doc.get("grade_level", ""),
+            doc.get("scope", "private"), doc.get("source_url", ""), doc.get("source_name", ""),
+            doc.get("license", ""), doc.get("curriculum", ""), doc.get("source_type", ""), doc.get("book_title", ""),
+        )
+        doc_embeddings = embeddings[offset: offset + len(cleaned)]
+        targets = [("user_docs", uid, user_rows)]
+        if doc.get("scope") == "hs_shared":
+            targets.append((HS_CURRICULUM_COLLECTION, None, hs_rows))
+        for col_name, col_uid, rows in targets:
+            if doc.get("replace_existing"):
+                try:
+                    vs.delete(col_name, doc_id=doc_id, user_id=col_uid)
+                except Exception as e:
+                    logger.warning(f"replace_existing delete failed for {doc_id} in {col_name}: {e}")
+            rows.extend(_chunk_rows(base_meta, cleaned, doc_embeddings, doc.get("chunk_pages"), col_name, col_uid))
+        row_owners.extend([index] * len(cleaned))
+
+    failed: list[int] = []
+    inserted = vs.bulk_upsert(user_rows, failed=failed)
+    if inserted < len(user_rows):
+        logger.warning(f"Batched chunk write stored {inserted}/{len(user_rows)} rows")
+    stored = [len(cleaned) for _, cleaned, _ in prepared]
+    for position in failed:
+        stored[row_owners[position]] -= 1
+    if hs_rows:
+        try:
+            vs.bulk_upsert(hs_rows)
+        except Exception as e:
+            logger.warning(f"HS curriculum batched write failed: {e}")
+
+    for uid in {str(doc["user_id"]) for doc, cleaned, _ in prepared if cleaned}:
+        try:
+            redis_cache.invalidate_user_search(uid)
+        except Exception:
+            pass
+    return stored
+
 def search_context(
     query: str,
     user_id: str,
@@ -260,7 +338,7 @@ def search_context(
     if cached is not None:
         return cached
 
-    query_embedding: list[float] | None = redis_cache.get_embedding(query)
+    query_embedding: list[float] | None = vs.memoized_embedding(query) or redis_cache.get_embedding(query)
     if query_embedding is None:
         try:
             query_embedding = vs.embed(query)
@@ -4,7 +4,10 @@ from __future__ import annotations
 import io
 import importlib.util
 import logging
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -14,6 +17,14 @@ CHUNK_OVERLAP = 150
 MIN_CHUNK_LEN = 80
 MAX_HEADING_LEN = 90
 
+PDF_EXTRACTION_MODE = os.getenv("PDF_EXTRACTION_MODE", "adaptive").strip().lower()
+PDF_SAMPLE_PAGES = max(2, int(os.getenv("PDF_SAMPLE_PAGES", "5")))
+PDF_MIN_PAGE_CHARS = 40
+PDF_MIN_ALPHA_RATIO = 0.45
+PDF_PARALLEL_MIN_PAGES = max(1, int(os.getenv("PDF_PARALLEL_MIN_PAGES", "48")))
+PDF_PAGES_PER_TASK = max(1, int(os.getenv("PDF_PAGES_PER_TASK", "16")))
+PDF_EXTRACT_WORKERS = max(1, int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))))
+
 @dataclass
 class PDFExtractionCandidate:
     parser: str
@@ -70,6 +81,14 @@ def _strip_repeating_page_artifacts(page_texts: list[str]) -> list[str]:
         cleaned_pages.append("\n".join(kept).strip())
     return cleaned_pages
 
+def _pymupdf_page_text(page) -> str:
+    blocks = page.get_text("blocks", sort=True)
+    block_lines = []
+    for block in blocks:
+        if len(block) > 4 and str(block[4]).strip():
+            block_lines.append(str(block[4]).strip())
+    return "\n".join(block_lines) if block_lines else (page.get_text("text", sort=True) or "")
+
 def _score_pdf_candidate(candidate: PDFExtractionCandidate) -> float:
     text = candidate.text or ""
     if not text.strip():
@@ -127,15 +146,7 @@ def _extract_with_pymupdf(file_bytes: bytes) -> PDFExtractionCandidate | None:
     doc = None
     try:
         doc = fitz.open(stream=file_bytes, filetype="pdf")
-        page_texts: list[str] = []
-        for page in doc:
-            blocks = page.get_text("blocks", sort=True)
-            block_lines = []
-            for block in blocks:
-                if len(block) > 4 and str(block[4]).strip():
-                    block_lines.append(str(block[4]).strip())
-            page_text = "\n".join(block_lines) if block_lines else (page.get_text("text", sort=True) or "")
-            page_texts.append(_clean_pdf_page_text(page_text))
+        page_texts = [_clean_pdf_page_text(_pymupdf_page_text(page)) for page in doc]
 
         cleaned_pages = _strip_repeating_page_artifacts(page_texts)
         return PDFExtractionCandidate(
@@ -202,7 +213,7 @@ def _extract_with_pypdf2(file_bytes: bytes) -> PDFExtractionCandidate | None:
         logger.warning(f"PyPDF2 extraction failed: {e}")
         return None
 
-def extract_text_from_pdf_detailed(file_bytes: bytes) -> dict:
+def _extract_text_exhaustive(file_bytes: bytes) -> dict:
     candidates: list[PDFExtractionCandidate] = []
     warnings: list[str] = []
 
@@ -264,6 +275,13 @@ def extract_text_from_pdf_detailed(file_bytes: bytes) -> dict:
         "warnings": sorted(set(warnings)),
     }
 
+def extract_text_from_pdf_detailed(file_bytes: bytes) -> dict:
+    if PDF_EXTRACTION_MODE != "exhaustive":
+        result = _extract_text_adaptive(file_bytes)
+        if result is not None:
+            return result
+    return _extract_text_exhaustive(file_bytes)
+
 def extract_text_from_pdf(file_bytes: bytes) -> str:
     return extract_text_from_pdf_detailed(file_bytes).get("text", "")
 
@@ -277,13 +295,7 @@ def _extract_pages_with_pymupdf(file_bytes: bytes) -> list[dict] | None:
         doc = fitz.open(stream=file_bytes, filetype="pdf")
         pages = []
         for i, page in enumerate(doc):
-            blocks = page.get_text("blocks", sort=True)
-            block_lines = []
-            for block in blocks:
-                if len(block) > 4 and str(block[4]).strip():
-                    block_lines.append(str(block[4]).strip())
-            page_text = "\n".join(block_lines) if block_lines else (page.get_text("text", sort=True) or "")
-            cleaned = _clean_pdf_page_text(page_text)
+            cleaned = _clean_pdf_page_text(_pymupdf_page_text(page))
             pages.append({"page_num": i + 1, "text": cleaned, "char_count": len(cleaned)})
         return pages
     except Exception as e:
@@ -336,7 +348,7 @@ def _score_pages(pages: list[dict]) -> float:
     alpha_ratio = (sum(c.isalpha() for c in all_text) / max(1, len(all_text))) if all_text else 0.0
     return min(total_chars, 400_000) * 0.55 + alpha_ratio * 4_000 + coverage * 8_000
 
-def extract_pages_from_pdf(file_bytes: bytes) -> list[dict]:
+def _extract_pages_exhaustive(file_bytes: bytes) -> list[dict]:
     candidates: list[tuple[str, list[dict]]] = []
     for name, extractor in [
         ("pymupdf", _extract_pages_with_pymupdf),
@@ -371,6 +383,219 @@ def extract_pages_from_pdf(file_bytes: bytes) -> list[dict]:
         })
     return result
 
+def extract_pages_from_pdf(file_bytes: bytes) -> list[dict]:
+    if PDF_EXTRACTION_MODE != "exhaustive":
+        pages = _extract_pages_adaptive(file_bytes)
+        if pages is not None:
+            return pages
+    return _extract_pages_exhaustive(file_bytes)
+
+# Adaptive extraction: one PyMuPDF pass per page, classified up front from a
+# handful of sampled pages. Only pages whose text fails _page_text_ok are
+# re-read with pdfplumber/PyPDF2, scanned documents exit without trying parsers
+# that read the same (missing) text layer, and complex layouts go to
+# pymupdf4llm for whole-document text. PDF_EXTRACTION_MODE=exhaustive restores
+# the run-every-parser path, which is also the fallback when PyMuPDF is absent.
+def _page_text_ok(text: str) -> bool:
+    if len(text) < PDF_MIN_PAGE_CHARS:
+        return False
+    if "(cid:" in text or text.count("\ufffd") > 3:
+        return False
+    alpha_ratio = sum(ch.isalpha() for ch in text) / max(1, len(text))
+    return alpha_ratio >= PDF_MIN_ALPHA_RATIO
+
+def _score_page_text(text: str) -> float:
+    if not text:
+        return -1.0
+    alpha_ratio = sum(ch.isalpha() for ch in text) / max(1, len(text))
+    penalty = text.count("(cid:") * 50 + text.count("\ufffd") * 20
+    return min(len(text), 20_000) * 0.55 + alpha_ratio * 400 - penalty
+
+def _sample_page_indexes(page_count: int) -> list[int]:
+    if page_count <= PDF_SAMPLE_PAGES:
+        return list(range(page_count))
+    step = (page_count - 1) / (PDF_SAMPLE_PAGES - 1)
+    return sorted({round(i * step) for i in range(PDF_SAMPLE_PAGES)})
+
+def _classify_pdf(doc) -> str:
+    """'text', 'scanned' or 'complex', from a few evenly spaced pages."""
+    sampled = _sample_page_indexes(doc.page_count)
+    if not sampled:
+        return "text"
+    text_pages = 0
+    image_pages = 0
+    complex_pages = 0
+    for index in sampled:
+        page = doc[index]
+        text = _clean_pdf_page_text(page.get_text("text") or "")
+        page_area = max(1.0, abs(page.rect))
+        image_area = sum(abs(page.rect & info["bbox"]) for info in page.get_image_info())
+        if len(text) < PDF_MIN_PAGE_CHARS:
+            if image_area / page_area >= 0.5:
+                image_pages += 1
+            continue
+        text_pages += 1
+        blocks = page.get_text("blocks")
+        columns = {round(block[0] / max(1.0, page.rect.width) * 4) for block in blocks if len(block) > 4}
+        if not _page_text_ok(text) or (len(blocks) > 40 and len(columns) >= 3):
+            complex_pages += 1
+    if text_pages == 0 and image_pages * 2 >= len(sampled):
+        return "scanned"
+    if complex_pages * 2 > len(sampled):
+        return "complex"
+    return "text"
+
+def _fallback_page_text(file_bytes: bytes, index: int, readers: dict) -> tuple[str, str]:
+    best_parser, best_text = "", ""
+    try:
+        if "pdfplumber" not in readers:
+            import pdfplumber
+            readers["pdfplumber"] = pdfplumber.open(io.BytesIO(file_bytes))
+        page = readers["pdfplumber"].pages[index]
+        text = _clean_pdf_page_text(page.extract_text(x_tolerance=2, y_tolerance=3, layout=False) or "")
+        best_parser, best_text = "pdfplumber", text
+        if _page_text_ok(text):
+            return best_parser, best_text
+    except Exception as e:
+        logger.debug(f"pdfplumber page fallback failed on page {index + 1}: {e}")
+    try:
+        if "pypdf2" not in readers:
+            import PyPDF2
+            readers["pypdf2"] = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+        text = _clean_pdf_page_text(readers["pypdf2"].pages[index].extract_text() or "")
+        if _score_page_text(text) > _score_page_text(best_text):
+            best_parser, best_text = "pypdf2", text
+    except Exception as e:
+        logger.debug(f"PyPDF2 page fallback failed on page {index + 1}: {e}")
+    return best_parser, best_text
+
+def _extract_page_range(file_bytes: bytes, start: int, end: int, layout: str) -> list[dict]:
+    """Pages [start, end) with PyMuPDF, re-reading only pages that fail the
+    quality check. Top-level so ProcessPoolExecutor workers can run it."""
+    import fitz
+
+    readers: dict = {}
+    pages = []
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        for index in range(start, end):
+            text = _clean_pdf_page_text(_pymupdf_page_text(doc[index]))
+            parser = "pymupdf"
+            if layout != "scanned" and not _page_text_ok(text):
+                fallback_parser, fallback_text = _fallback_page_text(file_bytes, index, readers)
+                if _score_page_text(fallback_text) > _score_page_text(text):
+                    parser, text = fallback_parser, fallback_text
+            pages.append({"page_num": index + 1, "text": text, "char_count": len(text), "parser": parser})
+    finally:
+        doc.close()
+        if "pdfplumber" in readers:
+            readers["pdfplumber"].close()
+    return pages
+
+_process_pool: ProcessPoolExecutor | None = None
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: forking a threaded server process is unsafe with MuPDF state.
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+def _extract_pages_parallel(file_bytes: bytes, page_count: int, layout: str) -> list[dict]:
+    span = max(PDF_PAGES_PER_TASK, -(-page_count // (PDF_EXTRACT_WORKERS * 2)))
+    ranges = [(start, min(page_count, start + span)) for start in range(0, page_count, span)]
+    try:
+        pool = _get_process_pool()
+        futures = [pool.submit(_extract_page_range, file_bytes, start, end, layout) for start, end in ranges]
+        return [page for future in futures for page in future.result()]
+    except Exception as e:
+        logger.warning(f"Parallel PDF extraction failed, continuing in-process: {e}")
+        return _extract_page_range(file_bytes, 0, page_count, layout)
+
+def _open_and_classify(file_bytes: bytes) -> tuple[int, str] | None:
+    try:
+        import fitz
+    except Exception:
+        return None
+    try:
+        doc = fitz.open(stream=file_bytes, filetype="pdf")
+    except Exception as e:
+        logger.warning(f"PyMuPDF could not open PDF: {e}")
+        return None
+    try:
+        return doc.page_count, _classify_pdf(doc)
+    finally:
+        doc.close()
+
+def _adaptive_pages(file_bytes: bytes, opened: tuple[int, str] | None = None) -> tuple[list[dict], str] | None:
+    opened = opened or _open_and_classify(file_bytes)
+    if opened is None:
+        return None
+    page_count, layout = opened
+    try:
+        if page_count >= PDF_PARALLEL_MIN_PAGES and PDF_EXTRACT_WORKERS > 1:
+            raw_pages = _extract_pages_parallel(file_bytes, page_count, layout)
+        else:
+            raw_pages = _extract_page_range(file_bytes, 0, page_count, layout)
+    except Exception as e:
+        logger.warning(f"Adaptive PDF extraction failed: {e}")
+        return None
+
+    cleaned_texts = _strip_repeating_page_artifacts([p["text"] for p in raw_pages])
+    pages = []
+    for page, text in zip(raw_pages, cleaned_texts):
+        pages.append({**page, "text": text, "char_count": len(text)})
+    fallback_pages = sum(1 for p in pages if p["parser"] != "pymupdf")
+    logger.info(
+        "Adaptive PDF extraction layout=%s pages=%d fallback_pages=%d",
+        layout, page_count, fallback_pages,
+    )
+    return pages, layout
+
+def _extract_pages_adaptive(file_bytes: bytes) -> list[dict] | None:
+    result = _adaptive_pages(file_bytes)
+    if result is None:
+        return None
+    pages, _ = result
+    return pages if any(p["text"] for p in pages) else []
+
+def _extract_text_adaptive(file_bytes: bytes) -> dict | None:
+    # Complex layouts are read whole by pymupdf4llm; the per-page pass only
+    # runs when that is not the layout or pymupdf4llm comes back empty.
+    opened = _open_and_classify(file_bytes)
+    if opened is None:
+        return None
+    if opened[1] == "complex":
+        candidate = _extract_with_pymupdf4llm(file_bytes)
+        if candidate is not None and candidate.text:
+            return {
+                "text": candidate.text,
+                "parser": candidate.parser,
+                "page_count": candidate.page_count,
+                "non_empty_pages": candidate.non_empty_pages,
+                "warnings": candidate.warnings,
+            }
+    result = _adaptive_pages(file_bytes, opened)
+    if result is None:
+        return None
+    pages, layout = result
+    warnings: list[str] = []
+
+    if layout == "scanned":
+        warnings.append("No text layer found on sampled pages; the PDF appears to be scanned")
+
+    parsers = sorted({p["parser"] for p in pages if p["text"]}) or ["pymupdf"]
+    return {
+        "text": _clean_pdf_page_text("\n\n".join(p["text"] for p in pages if p["text"])),
+        "parser": "+".join(parsers),
+        "page_count": len(pages),
+        "non_empty_pages": sum(1 for p in pages if p["text"]),
+        "warnings": warnings,
+    }
+
 def chunk_pages_with_tracking(
     pages: list[dict],
     chunk_size: int = CHUNK_SIZE,
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# One copy of each sentence-transformer per worker process. vector_store,
+# ml_pipeline, dkt.language_analyzer and the semantic AI cache all resolve
+# their encoder through get_model() instead of constructing their own.
+PRIMARY_MODEL = "BAAI/bge-small-en-v1.5"
+MINILM_MODEL = "all-MiniLM-L6-v2"
+
+_MODEL_ALIASES = {
+    "sentence-transformers/all-MiniLM-L6-v2": MINILM_MODEL,
+    "BAAI/bge-small-en-v1.5": PRIMARY_MODEL,
+}
+
+# Encoder backends, selected per process with EMBED_BACKEND:
+#   torch      eager PyTorch SentenceTransformer (default)
+#   onnx       ONNX Runtime export of the same weights
+#   onnx-int8  dynamically int8-quantized ONNX export; exported once into
+#              EMBED_ONNX_CACHE_DIR on first load if the hub repo lacks one
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_models: dict[str, Any] = {}
+_failed: set[str] = set()
+_models_lock = threading.Lock()
+_batchers: dict[tuple[int, bool], "EncodeBatcher"] = {}
+_batchers_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def batching_enabled() -> bool:
+    return os.getenv("EMBED_BATCHING_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def canonical_model_name(name: str) -> str:
+    return _MODEL_ALIASES.get(name, name)
+
+
+def encoder_backend() -> str:
+    backend = os.getenv("EMBED_BACKEND", "torch").strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown EMBED_BACKEND={backend!r}; using torch")
+        return "torch"
+    return backend
+
+
+def _onnx_cache_dir() -> Path:
+    return Path(os.getenv("EMBED_ONNX_CACHE_DIR", str(Path.home() / ".cache" / "brainwave" / "onnx")))
+
+
+def _quantized_export(name: str):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    config = os.getenv("EMBED_ONNX_QUANT_CONFIG", "avx2").strip().lower()
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    target = _onnx_cache_dir() / name.replace("/", "__")
+    if not (target / file_name).exists():
+        logger.info("Exporting int8 ONNX encoder for %s (%s) to %s", name, config, target)
+        onnx_model = SentenceTransformer(name, backend="onnx")
+        onnx_model.save_pretrained(str(target))
+        export_dynamic_quantized_onnx_model(onnx_model, config, str(target))
+    return SentenceTransformer(str(target), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_encoder(name: str, backend: Optional[str] = None):
+    """Construct an encoder for `name` on the requested backend. All backends
+    expose the SentenceTransformer `encode` API, so callers are backend-agnostic."""
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or encoder_backend()
+    if backend == "onnx":
+        return SentenceTransformer(name, backend="onnx")
+    if backend == "onnx-int8":
+        return _quantized_export(name)
+    return SentenceTransformer(name)
+
+
+def _load(name: str):
+    backend = encoder_backend()
+    if backend == "torch":
+        return load_encoder(name, "torch")
+    try:
+        return load_encoder(name, backend)
+    except Exception as e:
+        # Missing onnxruntime/optimum must not take embeddings down with it.
+        logger.warning(f"{backend} encoder for {name} unavailable ({e}); falling back to torch")
+        return load_encoder(name, "torch")
+
+
+def get_model(name: str = PRIMARY_MODEL, fallback: Optional[str] = MINILM_MODEL):
+    """Return the process-wide encoder for `name`, loading it on first use.
+
+    When `name` cannot be loaded, `fallback` is tried and cached under both
+    names so later callers don't retry the failed download on every request.
+    """
+    key = canonical_model_name(name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+        if key not in _failed:
+            try:
+                model = _load(key)
+                _models[key] = model
+                logger.info("Embedding model loaded: %s (worker rss=%.1f MB)", key, _rss_mb())
+                return model
+            except Exception as e:
+                _failed.add(key)
+                logger.warning(f"Embedding model {key} unavailable: {e}")
+        if fallback and canonical_model_name(fallback) != key:
+            fallback_key = canonical_model_name(fallback)
+            model = _models.get(fallback_key)
+            if model is None and fallback_key not in _failed:
+                try:
+                    model = _load(fallback_key)
+                    _models[fallback_key] = model
+                    logger.info(
+                        "Embedding model loaded: %s (fallback for %s, worker rss=%.1f MB)",
+                        fallback_key, key, _rss_mb(),
+                    )
+                except Exception as e:
+                    _failed.add(fallback_key)
+                    logger.warning(f"Embedding model {fallback_key} unavailable: {e}")
+            if model is not None:
+                _models[key] = model
+        return model
+
+
+def register_model(name: str, model) -> None:
+    """Adopt an encoder constructed elsewhere (e.g. at startup) as the shared copy."""
+    if model is None:
+        return
+    with _models_lock:
+        _models.setdefault(canonical_model_name(name), model)
+
+
+def loaded_model_name(model) -> Optional[str]:
+    for name, candidate in _models.items():
+        if candidate is model:
+            return name
+    return None
+
+
+def _to_rows(vectors) -> list[list[float]]:
+    if hasattr(vectors, "tolist"):
+        vectors = vectors.tolist()
+    return [v.tolist() if hasattr(v, "tolist") else list(v) for v in vectors]
+
+
+def encode_many(model, texts: list[str], normalize: bool = False) -> list[list[float]]:
+    if not texts:
+        return []
+    try:
+        vectors = model.encode(
+            texts,
+            batch_size=min(64, len(texts)),
+            show_progress_bar=False,
+            normalize_embeddings=normalize,
+        )
+    except TypeError:
+        vectors = model.encode(texts)
+    return _to_rows(vectors)
+
+
+class EncodeBatcher:
+    """Coalesces concurrent single-text encode calls into batched forward passes.
+
+    Callers on any thread (request threadpool, graph executors) or coroutine
+    submit one text and wait on a Future; a daemon thread drains the queue,
+    waiting at most `max_wait_ms` after the first item for others to arrive,
+    and resolves every Future from one `model.encode(list)` call.
+    """
+
+    def __init__(self, model, normalize: bool = False, max_batch: int | None = None, max_wait_ms: int | None = None):
+        self._model = model
+        self._normalize = normalize
+        self._max_batch = max_batch or _env_int("EMBED_MAX_BATCH", 32)
+        self._max_wait = (max_wait_ms if max_wait_ms is not None else _env_int("EMBED_BATCH_WAIT_MS", 5)) / 1000.0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, text_: str) -> Future:
+        fut: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text_, fut))
+        return fut
+
+    def encode_one(self, text_: str) -> list[float]:
+        return self.submit(text_).result()
+
+    async def aencode(self, text_: str) -> list[float]:
+        return await asyncio.wrap_future(self.submit(text_))
+
+    def _collect(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_wait
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            unique = list(dict.fromkeys(t for t, _ in batch))
+            try:
+                vectors = encode_many(self._model, unique, normalize=self._normalize)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            by_text = dict(zip(unique, vectors))
+            for text_, fut in batch:
+                if not fut.done():
+                    fut.set_result(by_text[text_])
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+def batcher_for(model, normalize: bool = False) -> EncodeBatcher:
+    key = (id(model), normalize)
+    batcher = _batchers.get(key)
+    if batcher is not None:
+        return batcher
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = EncodeBatcher(model, normalize=normalize)
+            _batchers[key] = batcher
+        return batcher
+
+
+def encode_one(model, text_: str, normalize: bool = False) -> list[float]:
+    if not batching_enabled():
+        return encode_many(model, [text_], normalize=normalize)[0]
+    return batcher_for(model, normalize).encode_one(text_)
+
+
+async def aencode_one(model, text_: str, normalize: bool = False) -> list[float]:
+    if not batching_enabled():
+        return (await asyncio.to_thread(encode_many, model, [text_], normalize))[0]
+    return await batcher_for(model, normalize).aencode(text_)
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def _param_mb(model) -> Optional[float]:
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        return round(total / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def memory_report() -> dict:
+    """Per-worker view of the shared encoders: RSS plus parameter memory per model."""
+    seen: dict[int, str] = {}
+    models = {}
+    for name, model in list(_models.items()):
+        shared_with = seen.get(id(model))
+        if shared_with:
+            models[name] = {"shared_with": shared_with}
+            continue
+        seen[id(model)] = name
+        models[name] = {"param_mb": _param_mb(model)}
+    return {
+        "pid": os.getpid(),
+        "backend": encoder_backend(),
+        "rss_mb": round(_rss_mb(), 1),
+        "distinct_models": len(seen),
+        "models": models,
+        "batching": batching_enabled(),
+        "batchers": {
+            f"{loaded_model_name(b._model) or 'custom'}{'/normalized' if b._normalize else ''}": b.stats()
+            for b in list(_batchers.values())
+        },
+    }
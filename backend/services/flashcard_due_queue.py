@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# Materialized spaced-repetition view per user:
+#   flashcard_due_queue    one narrow row per card keyed for (user_id, due_at)
+#                          range reads; never-scheduled new cards sort first
+#                          via UNSCHEDULED_DUE, matching nullsfirst ordering
+#   flashcard_sr_counters  running totals behind /flashcards/sr_stats
+# Both are kept current by mapper events on Flashcard, so every ORM write path
+# (sr_review, edits, set deletes with cascade) updates them in the same
+# transaction. A user's rows are built lazily on first read and rebuilt after
+# REBUILD_AFTER as a backstop for bulk query-level writes that skip events.
+UNSCHEDULED_DUE = datetime(1970, 1, 1)
+REBUILD_AFTER = timedelta(hours=int(os.getenv("FLASHCARD_COUNTERS_REBUILD_HOURS", "24")))
+
+STATES = ("new", "learning", "review", "relearning")
+EASE_COLUMNS = ("ease_hard", "ease_difficult", "ease_normal", "ease_easy", "ease_very_easy")
+COUNTER_COLUMNS = (
+    "total_cards",
+    "new_count",
+    "learning_count",
+    "review_count",
+    "relearning_count",
+    "total_reviews",
+    "total_correct",
+    "total_lapses",
+    *EASE_COLUMNS,
+    "review_interval_sum",
+    "mature_count",
+)
+_TRACKED_FIELDS = (
+    "set_id",
+    "sr_state",
+    "next_review_date",
+    "ease_factor",
+    "interval",
+    "lapses",
+    "times_reviewed",
+    "correct_count",
+)
+
+_Queue = models.FlashcardDueQueue
+_Counters = models.FlashcardSRCounters
+
+
+def _ease_column(ease) -> str:
+    ease = ease or 2.5
+    if ease < 1.7:
+        return "ease_hard"
+    if ease < 2.1:
+        return "ease_difficult"
+    if ease < 2.5:
+        return "ease_normal"
+    if ease < 2.9:
+        return "ease_easy"
+    return "ease_very_easy"
+
+
+def due_at_for(sr_state, next_review_date):
+    if next_review_date is not None:
+        return next_review_date
+    if (sr_state or "new") == "new":
+        return UNSCHEDULED_DUE
+    return None
+
+
+def _contribution(values: dict) -> dict:
+    state = values.get("sr_state") or "new"
+    interval = values.get("interval") or 0
+    counts = dict.fromkeys(COUNTER_COLUMNS, 0)
+    counts["total_cards"] = 1
+    if state in STATES:
+        counts[f"{state}_count"] = 1
+    counts["total_reviews"] = values.get("times_reviewed") or 0
+    counts["total_correct"] = values.get("correct_count") or 0
+    counts["total_lapses"] = values.get("lapses") or 0
+    counts[_ease_column(values.get("ease_factor"))] = 1
+    if state == "review":
+        counts["review_interval_sum"] = interval
+        if interval >= 21:
+            counts["mature_count"] = 1
+    return counts
+
+
+def _queue_row(card_id: int, user_id: int, values: dict) -> dict:
+    return {
+        "card_id": card_id,
+        "user_id": user_id,
+        "set_id": values.get("set_id"),
+        "due_at": due_at_for(values.get("sr_state"), values.get("next_review_date")),
+        "sr_state": values.get("sr_state") or "new",
+        "interval": values.get("interval") or 0,
+        "lapses": values.get("lapses") or 0,
+    }
+
+
+def _set_owner(connection, set_id) -> Optional[int]:
+    if set_id is None:
+        return None
+    return connection.execute(
+        select(models.FlashcardSet.user_id).where(models.FlashcardSet.id == set_id)
+    ).scalar()
+
+
+def _apply_counters(connection, user_id: int, values: dict, sign: int) -> bool:
+    """Add (sign=1) or remove (sign=-1) one card's contribution. False when the
+    user has not been materialized yet, in which case the queue is left alone."""
+    deltas = {k: v for k, v in _contribution(values).items() if v}
+    result = connection.execute(
+        update(_Counters)
+        .where(_Counters.user_id == user_id)
+        .values({col: getattr(_Counters, col) + sign * delta for col, delta in deltas.items()})
+    )
+    return result.rowcount > 0
+
+
+def _upsert_queue_row(connection, row: dict) -> None:
+    fields = {k: v for k, v in row.items() if k != "card_id"}
+    result = connection.execute(update(_Queue).where(_Queue.card_id == row["card_id"]).values(fields))
+    if result.rowcount == 0:
+        connection.execute(insert(_Queue).values(row))
+
+
+def _current_values(target) -> dict:
+    return {field: getattr(target, field) for field in _TRACKED_FIELDS}
+
+
+def _previous_values(target) -> Optional[dict]:
+    changed = False
+    previous = {}
+    for field in _TRACKED_FIELDS:
+        history = get_history(target, field)
+        if history.deleted:
+            changed = True
+            previous[field] = history.deleted[0]
+        else:
+            previous[field] = getattr(target, field)
+    return previous if changed else None
+
+
+@event.listens_for(models.Flashcard, "after_insert")
+def _on_card_insert(mapper, connection, target):
+    values = _current_values(target)
+    user_id = _set_owner(connection, values["set_id"])
+    if user_id is not None and _apply_counters(connection, user_id, values, 1):
+        connection.execute(insert(_Queue).values(_queue_row(target.id, user_id, values)))
+
+
+@event.listens_for(models.Flashcard, "after_update")
+def _on_card_update(mapper, connection, target):
+    previous = _previous_values(target)
+    if previous is None:
+        return
+    current = _current_values(target)
+    old_user = _set_owner(connection, previous["set_id"])
+    new_user = old_user if previous["set_id"] == current["set_id"] else _set_owner(connection, current["set_id"])
+    if old_user is not None and _apply_counters(connection, old_user, previous, -1) and old_user != new_user:
+        connection.execute(delete(_Queue).where(_Queue.card_id == target.id))
+    if new_user is not None and _apply_counters(connection, new_user, current, 1):
+        _upsert_queue_row(connection, _queue_row(target.id, new_user, current))
+
+
+@event.listens_for(models.Flashcard, "after_delete")
+def _on_card_delete(mapper, connection, target):
+    values = _current_values(target)
+    user_id = _set_owner(connection, values["set_id"])
+    if user_id is not None:
+        _apply_counters(connection, user_id, values, -1)
+    connection.execute(delete(_Queue).where(_Queue.card_id == target.id))
+
+
+def invalidate_user(db: Session, user_id: int) -> None:
+    """Drop a user's materialized rows; the next read rebuilds them. Call this
+    around query-level bulk writes to flashcards, which bypass mapper events."""
+    db.execute(delete(_Queue).where(_Queue.user_id == user_id))
+    db.execute(delete(_Counters).where(_Counters.user_id == user_id))
+
+
+def invalidate_all(db: Session) -> None:
+    db.execute(delete(_Queue))
+    db.execute(delete(_Counters))
+
+
+def rebuild_user(db: Session, user_id: int):
+    cards = (
+        db.query(models.Flashcard.id, *[getattr(models.Flashcard, f) for f in _TRACKED_FIELDS])
+        .join(models.FlashcardSet, models.FlashcardSet.id == models.Flashcard.set_id)
+        .filter(models.FlashcardSet.user_id == user_id)
+        .all()
+    )
+    totals = dict.fromkeys(COUNTER_COLUMNS, 0)
+    rows = []
+    for card in cards:
+        values = dict(zip(_TRACKED_FIELDS, card[1:]))
+        for col, delta in _contribution(values).items():
+            totals[col] += delta
+        rows.append(_queue_row(card[0], user_id, values))
+
+    invalidate_user(db, user_id)
+    if rows:
+        db.execute(insert(_Queue), rows)
+    counters = _Counters(user_id=user_id, rebuilt_at=datetime.now(timezone.utc), **totals)
+    db.add(counters)
+    db.commit()
+    logger.info("Rebuilt flashcard due queue for user %s (%d cards)", user_id, len(rows))
+    return counters
+
+
+def _is_stale(counters) -> bool:
+    rebuilt_at = counters.rebuilt_at
+    if rebuilt_at is None:
+        return True
+    if rebuilt_at.tzinfo is None:
+        rebuilt_at = rebuilt_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - rebuilt_at > REBUILD_AFTER
+
+
+def ensure_user(db: Session, user_id: int):
+    """Return the user's counters row, building the queue first if needed."""
+    counters = db.get(_Counters, user_id)
+    if counters is not None and not _is_stale(counters):
+        return counters
+    try:
+        return rebuild_user(db, user_id)
+    except IntegrityError:
+        # Another worker materialized the same user concurrently.
+        db.rollback()
+        return db.get(_Counters, user_id)
+
+
+def due_cards(db: Session, user_id: int, now: datetime, limit: int) -> list:
+    """(Flashcard, set title) pairs due at `now`, soonest first, in one range read."""
+    ensure_user(db, user_id)
+    return (
+        db.query(models.Flashcard, models.FlashcardSet.title)
+        .join(_Queue, _Queue.card_id == models.Flashcard.id)
+        .join(models.FlashcardSet, models.FlashcardSet.id == models.Flashcard.set_id)
+        .filter(_Queue.user_id == user_id, _Queue.due_at <= now)
+        .order_by(_Queue.due_at.asc(), _Queue.card_id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def review_forecast(db: Session, user_id: int, now: datetime, days: int = 14) -> list[dict]:
+    today = now.date()
+    start = datetime.combine(today, time.min).replace(tzinfo=now.tzinfo)
+    buckets = {today + timedelta(days=offset): 0 for offset in range(days)}
+    for (due_at,) in (
+        db.query(_Queue.due_at)
+        .filter(
+            _Queue.user_id == user_id,
+            _Queue.due_at >= start,
+            _Queue.due_at < start + timedelta(days=days),
+        )
+    ):
+        day = due_at.date()
+        if day in buckets:
+            buckets[day] += 1
+    buckets[today] += (
+        db.query(func.count(_Queue.card_id))
+        .filter(_Queue.user_id == user_id, _Queue.due_at == UNSCHEDULED_DUE)
+        .scalar()
+        or 0
+    )
+    return [
+        {
+            "date": day.isoformat(),
+            "day_label": "Today" if day == today else day.strftime("%b %d"),
+            "count": count,
+        }
+        for day, count in buckets.items()
+    ]
+
+
+def longest_review_interval(db: Session, user_id: int) -> float:
+    return (
+        db.query(func.max(_Queue.interval))
+        .filter(_Queue.user_id == user_id, _Queue.sr_state == "review")
+        .scalar()
+        or 0
+    )
+
+
+def most_lapsed(db: Session, user_id: int, limit: int = 5) -> list:
+    return (
+        db.query(models.Flashcard.id, models.Flashcard.question, _Queue.lapses)
+        .join(_Queue, _Queue.card_id == models.Flashcard.id)
+        .filter(_Queue.user_id == user_id, _Queue.lapses > 0)
+        .order_by(_Queue.lapses.desc(), _Queue.card_id.asc())
+        .limit(limit)
+        .all()
+    )
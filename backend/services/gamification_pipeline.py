@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from services import gamification_system as gs
+
+logger = logging.getLogger(__name__)
+
+# Fire-and-forget awards (a chat message, a new note, a flashcard review) do
+# not need their result, so instead of running award_points inline — user
+# check, duplicate query, milestone checks and a commit per award — the route
+# enqueues the event. A daemon thread per engine drains the queue, waits up
+# to GAMIFICATION_AWARD_FLUSH_MS for more events, and applies a batch in one
+# transaction: one query for the users, their stats rows and their recent
+# transactions, every event folded into its user's row in order, one commit.
+# Counters stay incremental; recalculate_all_stats is only a repair job.
+# Callers that show the awarded points (quizzes, learning paths) still call
+# award_points directly.
+_ENABLED_VALUES = {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def pipeline_enabled() -> bool:
+    return os.getenv("GAMIFICATION_AWARD_PIPELINE", "true").strip().lower() in _ENABLED_VALUES
+
+
+@dataclass
+class AwardEvent:
+    user_id: int
+    activity_type: str
+    metadata: dict = field(default_factory=dict)
+    at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class AwardPipeline:
+    """Queues award events and applies them in batched transactions.
+
+    `submit` never blocks: it returns False when the queue is full so the
+    caller can fall back to award_points. `flush` drains synchronously (used
+    on shutdown and by tests); the worker thread calls the same path.
+    """
+
+    def __init__(self, session_factory, max_batch: int | None = None, flush_ms: int | None = None,
+                 max_queue: int | None = None):
+        self._session_factory = session_factory
+        self._max_batch = max_batch or _env_int("GAMIFICATION_AWARD_BATCH", 500)
+        self._flush_wait = (flush_ms if flush_ms is not None else _env_int("GAMIFICATION_AWARD_FLUSH_MS", 200)) / 1000.0
+        self._queue: "queue.Queue[AwardEvent]" = queue.Queue(maxsize=max_queue or _env_int("GAMIFICATION_AWARD_QUEUE", 50_000))
+        self._apply_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.batches = 0
+        self.applied = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="gamification-awards", daemon=True)
+            self._thread.start()
+
+    def submit(self, user_id: int, activity_type: str, metadata: Optional[dict] = None, start: bool = True) -> bool:
+        try:
+            self._queue.put_nowait(AwardEvent(user_id, activity_type, dict(metadata or {})))
+        except queue.Full:
+            self.rejected += 1
+            return False
+        if start:
+            self._ensure_worker()
+        return True
+
+    def _collect(self, block: bool) -> list[AwardEvent]:
+        try:
+            batch = [self._queue.get(timeout=0.5) if block else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + (self._flush_wait if block else 0)
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._collect(block=True)
+            if batch:
+                self._apply_safely(batch)
+
+    def flush(self) -> int:
+        """Apply everything queued so far on the calling thread."""
+        applied = 0
+        while True:
+            batch = self._collect(block=False)
+            if not batch:
+                return applied
+            applied += self._apply_safely(batch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _apply_safely(self, batch: list[AwardEvent]) -> int:
+        with self._apply_lock:
+            try:
+                try:
+                    return self._apply(batch)
+                except IntegrityError:
+                    # A request created one of the stats rows first; the
+                    # retry finds it.
+                    return self._apply(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.error("Gamification award batch of %d events failed: %s", len(batch), e)
+                return 0
+
+    def _apply(self, batch: list[AwardEvent]) -> int:
+        by_user: "OrderedDict[int, list[AwardEvent]]" = OrderedDict()
+        for event in batch:
+            by_user.setdefault(event.user_id, []).append(event)
+
+        db: Session = self._session_factory()
+        try:
+            user_ids = set(
+                uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(list(by_user))).all()
+            )
+            # Counters are published only once the batch commits, so an
+            # IntegrityError retry of the same batch does not count twice.
+            missing = [uid for uid in by_user if uid not in user_ids]
+            dropped = 0
+            if missing:
+                logger.warning("Skipping gamification awards for missing users: %s", missing[:20])
+                dropped = sum(len(by_user.pop(uid)) for uid in missing)
+            if not by_user:
+                self.dropped += dropped
+                return 0
+
+            stats_query = db.query(models.UserGamificationStats).filter(
+                models.UserGamificationStats.user_id.in_(list(by_user))
+            ).order_by(models.UserGamificationStats.user_id)
+            if db.get_bind().dialect.name == "postgresql":
+                stats_query = stats_query.with_for_update()
+            stats_by_user = {s.user_id: s for s in stats_query.all()}
+            week_start = datetime.combine(gs.get_week_start(), datetime.min.time()).replace(tzinfo=timezone.utc)
+            for uid in by_user:
+                if uid not in stats_by_user:
+                    stats = models.UserGamificationStats(user_id=uid, week_start_date=week_start)
+                    db.add(stats)
+                    stats_by_user[uid] = stats
+            db.flush()
+
+            last_seen = self._recent_awards(db, list(by_user), min(e.at for e in batch))
+            applied = duplicates = 0
+            for uid, events in by_user.items():
+                stats = stats_by_user[uid]
+                gs._ensure_powerup_baseline(stats)
+                gs.check_and_reset_weekly_stats(stats)
+                for event in events:
+                    key = (uid, gs.duplicate_types(event.activity_type)[0])
+                    previous = last_seen.get(key)
+                    if previous is not None and abs(event.at - previous) < gs.DUPLICATE_WINDOW:
+                        duplicates += 1
+                        continue
+                    transaction = gs._apply_award(db, stats, event.activity_type, event.metadata)
+                    transaction.created_at = event.at
+                    last_seen[key] = event.at
+                    applied += 1
+            totals = {uid: (s.total_points, s.weekly_points) for uid, s in stats_by_user.items()}
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        try:
+            from services import leaderboard_service
+            for uid, (total_points, weekly_points) in totals.items():
+                leaderboard_service.record_points(uid, total_points, weekly_points)
+        except Exception as e:
+            logger.warning(f"Leaderboard sync after award batch failed: {e}")
+        self.batches += 1
+        self.applied += applied
+        self.duplicates += duplicates
+        self.dropped += dropped
+        return applied
+
+    @staticmethod
+    def _recent_awards(db: Session, user_ids: list[int], since: datetime) -> dict:
+        """Latest committed award per (user, duplicate group) inside the
+        duplicate window before this batch — one query for the whole batch."""
+        rows = (
+            db.query(
+                models.PointTransaction.user_id,
+                models.PointTransaction.activity_type,
+                func.max(models.PointTransaction.created_at),
+            )
+            .filter(
+                models.PointTransaction.user_id.in_(user_ids),
+                models.PointTransaction.created_at >= since - gs.DUPLICATE_WINDOW,
+            )
+            .group_by(models.PointTransaction.user_id, models.PointTransaction.activity_type)
+            .all()
+        )
+        seen: dict = {}
+        for user_id, activity_type, created_at in rows:
+            key = (user_id, gs.duplicate_types(activity_type)[0])
+            created_at = gs._normalize_datetime(created_at)
+            if key not in seen or created_at > seen[key]:
+                seen[key] = created_at
+        return seen
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "applied": self.applied,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "avg_batch": round(self.applied / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+_pipelines: dict[int, AwardPipeline] = {}
+_pipelines_lock = threading.Lock()
+
+
+def pipeline_for(engine) -> Optional[AwardPipeline]:
+    """The pipeline writing through `engine`, or None when the engine's pool
+    hands every thread the same connection and a worker cannot share it."""
+    if isinstance(engine.pool, StaticPool):
+        return None
+    key = id(engine)
+    pipeline = _pipelines.get(key)
+    if pipeline is not None:
+        return pipeline
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            pipeline = AwardPipeline(sessionmaker(bind=engine, autocommit=False, autoflush=False))
+            _pipelines[key] = pipeline
+        return pipeline
+
+
+def enqueue_award(db: Session, user_id: int, activity_type: str, metadata: Optional[dict] = None) -> bool:
+    """Queue an award whose result the caller does not need. Falls back to
+    award_points on `db` when the pipeline is off, unusable or full. Returns
+    True when the event was queued."""
+    pipeline = pipeline_for(db.get_bind()) if pipeline_enabled() else None
+    if pipeline is not None and pipeline.submit(user_id, activity_type, metadata):
+        return True
+    gs.award_points(db, user_id, activity_type, metadata)
+    return False
+
+
+def shutdown(timeout: float = 5.0) -> None:
+    with _pipelines_lock:
+        pipelines = list(_pipelines.values())
+    for pipeline in pipelines:
+        try:
+            pipeline.stop(timeout)
+        except Exception as e:
+            logger.warning(f"Gamification award pipeline shutdown failed: {e}")
+
+
+def get_stats() -> list[dict]:
+    with _pipelines_lock:
+        return [pipeline.stats() for pipeline in _pipelines.values()]
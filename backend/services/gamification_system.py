@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import and_, func, or_
+from sqlalchemy import DateTime, and_, case, exists, func, literal, or_, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import logging
@@ -38,6 +38,8 @@ MILESTONE_COUNTS = {
 
 STUDY_TIME_MILESTONES_MINUTES = [30, 60, 120, 300, 600, 1200]
 
+DUPLICATE_WINDOW = timedelta(seconds=2)
+
 def _add_notification(db: Session, user_id: int, title: str, message: str, notification_type: str):
     notification = models.Notification(
         user_id=user_id,
@@ -238,45 +240,24 @@ def check_and_reset_weekly_stats(stats):
     else:
         logger.debug(f" Weekly stats current for user {stats.user_id} (week_start: {stats.week_start_date}, current_week: {week_start})")
 
-def award_points(db: Session, user_id: int, activity_type: str, metadata: dict = None):
-    if metadata is None:
-        metadata = {}
-
-    user_exists = db.query(models.User.id).filter(models.User.id == user_id).first()
-    if not user_exists:
-        logger.warning("Skipping gamification award for missing user FK: user_id=%s activity=%s", user_id, activity_type)
-        return {
-            "points_earned": 0,
-            "total_points": 0,
-            "level": 1,
-            "experience": 0,
-            "description": "Missing user (skipped)",
-        }
-    
-    stats = get_or_create_stats(db, user_id)
-    _ensure_powerup_baseline(stats)
-    check_and_reset_weekly_stats(stats)
-    
-    from datetime import datetime, timedelta, timezone
-    duplicate_types = [activity_type]
+def _sync_leaderboard(stats):
+    try:
+        from services import leaderboard_service
+        leaderboard_service.record_points(stats.user_id, stats.total_points, stats.weekly_points)
+    except Exception as e:
+        logger.warning(f"Leaderboard sync failed for user {stats.user_id}: {e}")
+
+def duplicate_types(activity_type: str) -> list:
+    """Activity types that count as repeats of `activity_type` inside
+    DUPLICATE_WINDOW (creating a set is reported under both names)."""
     if activity_type in ("flashcard_set", "flashcard_created"):
-        duplicate_types = ["flashcard_set", "flashcard_created"]
-    recent_transaction = db.query(PointTransaction).filter(
-        PointTransaction.user_id == user_id,
-        PointTransaction.activity_type.in_(duplicate_types),
-        PointTransaction.created_at >= datetime.now(timezone.utc) - timedelta(seconds=2)
-    ).first()
-    
-    if recent_transaction:
-        logger.info(f"  Duplicate {activity_type} detected within 2 seconds - skipping")
-        return {
-            "points_earned": 0,
-            "total_points": stats.total_points,
-            "level": stats.level,
-            "experience": stats.experience,
-            "description": f"Duplicate {activity_type} (skipped)"
-        }
-    
+        return ["flashcard_set", "flashcard_created"]
+    return [activity_type]
+
+def _apply_award(db: Session, stats, activity_type: str, metadata: dict):
+    """Apply one award to a loaded stats row: counters, milestones, boost,
+    level, streak and the PointTransaction. Adds rows but does not commit."""
+    user_id = stats.user_id
     points_earned = 0
     description = ""
     
@@ -590,8 +571,46 @@ def award_points(db: Session, user_id: int, activity_type: str, metadata: dict =
         activity_metadata=str(metadata) if metadata else None
     )
     db.add(transaction)
+    return transaction
+
+def award_points(db: Session, user_id: int, activity_type: str, metadata: dict = None):
+    if metadata is None:
+        metadata = {}
+
+    user_exists = db.query(models.User.id).filter(models.User.id == user_id).first()
+    if not user_exists:
+        logger.warning("Skipping gamification award for missing user FK: user_id=%s activity=%s", user_id, activity_type)
+        return {
+            "points_earned": 0,
+            "total_points": 0,
+            "level": 1,
+            "experience": 0,
+            "description": "Missing user (skipped)",
+        }
+    
+    stats = get_or_create_stats(db, user_id)
+    _ensure_powerup_baseline(stats)
+    check_and_reset_weekly_stats(stats)
+    
+    recent_transaction = db.query(PointTransaction).filter(
+        PointTransaction.user_id == user_id,
+        PointTransaction.activity_type.in_(duplicate_types(activity_type)),
+        PointTransaction.created_at >= datetime.now(timezone.utc) - DUPLICATE_WINDOW
+    ).first()
+    
+    if recent_transaction:
+        logger.info(f"  Duplicate {activity_type} detected within 2 seconds - skipping")
+        return {
+            "points_earned": 0,
+            "total_points": stats.total_points,
+            "level": stats.level,
+            "experience": stats.experience,
+            "description": f"Duplicate {activity_type} (skipped)"
+        }
+    
+    transaction = _apply_award(db, stats, activity_type, metadata)
     result_payload = {
-        "points_earned": points_earned,
+        "points_earned": transaction.points_earned,
         "total_points": stats.total_points,
         "level": stats.level,
         "experience": stats.experience
@@ -614,34 +633,45 @@ def award_points(db: Session, user_id: int, activity_type: str, metadata: dict =
             "description": "Integrity failure (skipped)",
         }
 
+    _sync_leaderboard(stats)
     return result_payload
 
-def get_user_stats(db: Session, user_id: int):
-    stats = get_or_create_stats(db, user_id)
-    _ensure_powerup_baseline(stats)
-    check_and_reset_weekly_stats(stats)
-    _expire_stale_streak(stats)
-
-    if db.new or db.dirty:
-        db.commit()
-    
-    next_level_xp = get_xp_for_level(stats.level + 1)
-    xp_to_next_level = next_level_xp - stats.experience
-    
-    rank = (
+def _count_rank(db: Session, stats) -> int:
+    return (
         db.query(func.count(models.UserGamificationStats.user_id))
         .filter(
             or_(
                 models.UserGamificationStats.total_points > stats.total_points,
                 and_(
                     models.UserGamificationStats.total_points == stats.total_points,
-                    models.UserGamificationStats.user_id < user_id,
+                    models.UserGamificationStats.user_id < stats.user_id,
                 ),
             )
         )
         .scalar()
         or 0
     ) + 1
+
+def get_user_stats(db: Session, user_id: int):
+    stats = get_or_create_stats(db, user_id)
+    _ensure_powerup_baseline(stats)
+    check_and_reset_weekly_stats(stats)
+    _expire_stale_streak(stats)
+
+    if db.new or db.dirty:
+        db.commit()
+    
+    next_level_xp = get_xp_for_level(stats.level + 1)
+    xp_to_next_level = next_level_xp - stats.experience
+    
+    try:
+        from services import leaderboard_service
+        rank = leaderboard_service.rank_of(db, user_id)
+    except Exception as e:
+        logger.warning(f"Leaderboard rank lookup failed for user {user_id}: {e}")
+        rank = None
+    if rank is None:
+        rank = _count_rank(db, stats)
     
     total_chat_sessions = db.query(func.count(func.distinct(models.ChatSession.id))).join(
         models.ChatMessage, models.ChatMessage.chat_session_id == models.ChatSession.id
@@ -779,79 +809,109 @@ def use_xp_powerup(db: Session, user_id: int, powerup_id: str) -> dict:
 
     stats.updated_at = now
     db.commit()
+    if powerup == "vault":
+        _sync_leaderboard(stats)
     return {
         "status": "success",
         "message": message,
         "stats": get_user_stats(db, user_id),
     }
 
+def _level_expr(xp):
+    """calculate_level_from_xp as a SQL expression."""
+    whens = [(xp < threshold, max(1, level)) for level, threshold in enumerate(LEVEL_THRESHOLDS)]
+    return case(*whens, else_=len(LEVEL_THRESHOLDS) + (xp - LEVEL_THRESHOLDS[-1]) // 1000)
+
+def _activity_counts(user_col, created_col, since):
+    return (
+        select(
+            user_col.label("user_id"),
+            func.count().label("total"),
+            func.sum(case((created_col >= since, 1), else_=0)).label("weekly"),
+        )
+        .where(user_col.isnot(None))
+        .group_by(user_col)
+        .subquery()
+    )
+
 def recalculate_all_stats(db: Session):
-    users = db.query(models.User).all()
+    """Rebuild every user's counters from chats, notes and flashcard sets.
+
+    award_points and the award pipeline keep the counters current, so this is
+    a repair job. It runs as three GROUP BY aggregates and one UPDATE ... FROM
+    over all users rather than a query loop per user."""
+    stats_table = models.UserGamificationStats.__table__
+    now = datetime.now(timezone.utc)
     week_start_datetime = datetime.combine(get_week_start(), datetime.min.time()).replace(tzinfo=timezone.utc)
-    
-    for user in users:
-        stats = get_or_create_stats(db, user.id)
-        
-        stats.total_points = 0
-        stats.weekly_points = 0
-        stats.total_ai_chats = 0
-        stats.weekly_ai_chats = 0
-        stats.total_notes_created = 0
-        stats.weekly_notes_created = 0
-        stats.total_questions_answered = 0
-        stats.weekly_questions_answered = 0
-        stats.total_quizzes_completed = 0
-        stats.weekly_quizzes_completed = 0
-        stats.total_flashcards_created = 0
-        stats.weekly_flashcards_created = 0
-        stats.total_study_minutes = 0
-        stats.weekly_study_minutes = 0
-        stats.total_battles_won = 0
-        stats.weekly_battles_won = 0
-        
-        total_chats = db.query(func.count(models.ChatMessage.id)).filter(
-            models.ChatMessage.user_id == user.id
-        ).scalar() or 0
-        weekly_chats = db.query(func.count(models.ChatMessage.id)).filter(
-            models.ChatMessage.user_id == user.id,
-            models.ChatMessage.timestamp >= week_start_datetime
-        ).scalar() or 0
-        
-        stats.total_ai_chats = total_chats
-        stats.weekly_ai_chats = weekly_chats
-        stats.total_points += total_chats * POINT_VALUES["ai_chat"]
-        stats.weekly_points += weekly_chats * POINT_VALUES["ai_chat"]
-        
-        total_notes = db.query(func.count(models.Note.id)).filter(
-            models.Note.user_id == user.id
-        ).scalar() or 0
-        weekly_notes = db.query(func.count(models.Note.id)).filter(
-            models.Note.user_id == user.id,
-            models.Note.created_at >= week_start_datetime
-        ).scalar() or 0
-        
-        stats.total_notes_created = total_notes
-        stats.weekly_notes_created = weekly_notes
-        stats.total_points += total_notes * POINT_VALUES["note_created"]
-        stats.weekly_points += weekly_notes * POINT_VALUES["note_created"]
-        
-        total_flashcards = db.query(func.count(models.FlashcardSet.id)).filter(
-            models.FlashcardSet.user_id == user.id
-        ).scalar() or 0
-        weekly_flashcards = db.query(func.count(models.FlashcardSet.id)).filter(
-            models.FlashcardSet.user_id == user.id,
-            models.FlashcardSet.created_at >= week_start_datetime
-        ).scalar() or 0
-        
-        stats.total_flashcards_created = total_flashcards
-        stats.weekly_flashcards_created = weekly_flashcards
-        stats.total_points += total_flashcards * POINT_VALUES["flashcard_set"]
-        stats.weekly_points += weekly_flashcards * POINT_VALUES["flashcard_set"]
-        
-        stats.experience = stats.total_points
-        stats.level = calculate_level_from_xp(stats.experience)
-        stats.week_start_date = week_start_datetime
-        stats.last_activity_date = datetime.now(timezone.utc)
-    
+
+    missing = select(
+        models.User.id,
+        literal(week_start_datetime, DateTime),
+        literal(now, DateTime),
+        literal(now, DateTime),
+    ).where(~exists().where(stats_table.c.user_id == models.User.id))
+    db.execute(
+        stats_table.insert().from_select(["user_id", "week_start_date", "created_at", "updated_at"], missing)
+    )
+
+    chats = _activity_counts(models.ChatMessage.user_id, models.ChatMessage.timestamp, week_start_datetime)
+    notes = _activity_counts(models.Note.user_id, models.Note.created_at, week_start_datetime)
+    sets = _activity_counts(models.FlashcardSet.user_id, models.FlashcardSet.created_at, week_start_datetime)
+    counts = {
+        name: (func.coalesce(sub.c.total, 0), func.coalesce(sub.c.weekly, 0))
+        for name, sub in (("chats", chats), ("notes", notes), ("sets", sets))
+    }
+    totals = (
+        select(
+            models.User.id.label("user_id"),
+            *(counts[name][0].label(f"total_{name}") for name in counts),
+            *(counts[name][1].label(f"weekly_{name}") for name in counts),
+        )
+        .select_from(models.User)
+        .outerjoin(chats, chats.c.user_id == models.User.id)
+        .outerjoin(notes, notes.c.user_id == models.User.id)
+        .outerjoin(sets, sets.c.user_id == models.User.id)
+        .subquery()
+    )
+
+    def points(scope):
+        return (
+            totals.c[f"{scope}_chats"] * POINT_VALUES["ai_chat"]
+            + totals.c[f"{scope}_notes"] * POINT_VALUES["note_created"]
+            + totals.c[f"{scope}_sets"] * POINT_VALUES["flashcard_set"]
+        )
+
+    zeroed = (
+        "total_questions_answered", "weekly_questions_answered",
+        "total_quizzes_completed", "weekly_quizzes_completed",
+        "total_study_minutes", "weekly_study_minutes",
+        "total_battles_won", "weekly_battles_won",
+    )
+    db.execute(
+        update(stats_table)
+        .where(stats_table.c.user_id == totals.c.user_id)
+        .values(
+            total_ai_chats=totals.c.total_chats,
+            weekly_ai_chats=totals.c.weekly_chats,
+            total_notes_created=totals.c.total_notes,
+            weekly_notes_created=totals.c.weekly_notes,
+            total_flashcards_created=totals.c.total_sets,
+            weekly_flashcards_created=totals.c.weekly_sets,
+            total_points=points("total"),
+            weekly_points=points("weekly"),
+            experience=points("total"),
+            level=_level_expr(points("total")),
+            week_start_date=week_start_datetime,
+            last_activity_date=now,
+            updated_at=now,
+            **{column: 0 for column in zeroed},
+        )
+    )
     db.commit()
-    return len(users)
+    db.expire_all()
+    try:
+        from services import leaderboard_service
+        leaderboard_service.rebuild_from_db(db)
+    except Exception as e:
+        logger.warning(f"Leaderboard rebuild after recalculation failed: {e}")
+    return db.query(func.count(models.User.id)).scalar() or 0
@@ -0,0 +1,498 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Optional
+
+from sqlalchemy import event, func, inspect as sa_inspect, select
+from sqlalchemy.orm import Session
+
+import models
+from services import atlas_wiki_service as wiki
+from services import redis_cache
+
+logger = logging.getLogger(__name__)
+
+# The knowledge-universe graph is materialized per user (redis_cache,
+# in-memory without Redis) as one node/edge list per content part plus the
+# composed graph and its ETag. Writes to the models below mark the owning
+# user's part dirty when the session commits; the next read re-queries only
+# the dirty parts and recomposes. Changes that only reorder content (a set
+# touched by a review, a document re-saved unchanged) are not tracked, so the
+# per-part "most recent N" windows may lag by up to KNOWLEDGE_GRAPH_TTL_SECONDS.
+GRAPH_VERSION = 1
+MAX_NODES = int(os.getenv("KNOWLEDGE_GRAPH_MAX_NODES", "1500"))
+PAGE_SIZE = int(os.getenv("KNOWLEDGE_GRAPH_PAGE_SIZE", "200"))
+
+CORE_CLUSTER = "core"
+CONCEPT_CLUSTER = "cat:concepts"
+HUBS = [
+    ("hub:atlas", "Atlas", 2.2),
+    ("hub:vault", "Vault", 1.8),
+    ("hub:oracle", "Oracle", 1.8),
+    ("hub:archive", "Archive", 1.8),
+    ("hub:wiki", "Wiki", 1.8),
+]
+CATEGORIES = [
+    ("cat:documents", "Documents", "hub:vault"),
+    ("cat:notes", "Notes", "hub:vault"),
+    ("cat:flashcards", "Flashcards", "hub:vault"),
+    ("cat:question_sets", "Question Sets", "hub:archive"),
+    ("cat:quiz_history", "Quiz History", "hub:archive"),
+    ("cat:wiki_pages", "Wiki Pages", "hub:wiki"),
+    ("cat:concepts", "Concepts", "hub:wiki"),
+]
+# part -> (cluster its own nodes belong to, counts key)
+PARTS = {
+    "documents": ("cat:documents", "documents"),
+    "notes": ("cat:notes", "notes"),
+    "flashcards": ("cat:flashcards", "flashcard_sets"),
+    "question_sets": ("cat:question_sets", "question_sets"),
+    "quiz_sessions": ("cat:quiz_history", "quiz_sessions"),
+    "activities": ("cat:quiz_history", "activities"),
+    "wiki": ("cat:wiki_pages", "wiki_pages"),
+}
+
+
+class _Part:
+    def __init__(self, cluster: str):
+        self.cluster = cluster
+        self.nodes: list[dict[str, Any]] = []
+        self.edges: list[list[Any]] = []
+        self._seen: set[str] = set()
+        self.count = 0
+
+    def node(self, node_id: str, label: str, node_type: str, size: float) -> None:
+        if node_id in self._seen:
+            return
+        self._seen.add(node_id)
+        x, y, z = wiki._stable_pos(node_id)
+        self.nodes.append({
+            "id": node_id,
+            "label": (label or node_id)[:120],
+            "type": node_type,
+            "size": size,
+            "x": x,
+            "y": y,
+            "z": z,
+            "cluster": CONCEPT_CLUSTER if node_type == "concept" else self.cluster,
+        })
+
+    def concept(self, name: str, size: float) -> str:
+        cid = f"concept:{wiki._slugify(name)}"
+        self.node(cid, name, "concept", size)
+        return cid
+
+    def edge(self, a: str, b: str, edge_type: str, weight: float) -> None:
+        self.edges.append([a, b, edge_type, weight])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"nodes": self.nodes, "edges": self.edges, "count": self.count}
+
+
+def _first_rows_per_parent(db: Session, columns, parent_col, order_col, parent_ids, per_parent: int):
+    if not parent_ids:
+        return []
+    rn = func.row_number().over(partition_by=parent_col, order_by=order_col).label("rn")
+    ranked = select(*columns, rn).where(parent_col.in_(parent_ids)).subquery()
+    return db.execute(
+        select(*[ranked.c[c.key] for c in columns])
+        .where(ranked.c.rn <= per_parent)
+        .order_by(ranked.c[parent_col.key], ranked.c.rn)
+    ).all()
+
+
+def _documents_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["documents"][0])
+    D = models.ContextDocument
+    rows = (
+        db.query(D.doc_id, D.filename, D.subject, D.topic_tags)
+        .filter(D.user_id == user_id, D.status == "ready")
+        .order_by(D.updated_at.desc())
+        .limit(140)
+        .all()
+    )
+    part.count = len(rows)
+    for doc_id, filename, subject, topic_tags in rows:
+        did = f"doc:{doc_id}"
+        part.node(did, filename or "Document", "document", 1.0)
+        part.edge("cat:documents", did, "contains", 1.1)
+        if subject:
+            part.edge(did, part.concept(subject, 0.95), "about", 1.0)
+        for t in (wiki._loads_list(topic_tags)[:6] if topic_tags else []):
+            part.edge(did, part.concept(t, 0.9), "tagged", 0.9)
+    return part
+
+
+def _notes_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["notes"][0])
+    N = models.Note
+    rows = (
+        db.query(N.id, N.title, N.content)
+        .filter(N.user_id == user_id, N.is_deleted == False)
+        .order_by(N.updated_at.desc())
+        .limit(140)
+        .all()
+    )
+    part.count = len(rows)
+    for note_id, title, content in rows:
+        nid = f"note:{note_id}"
+        title = title or f"Note {note_id}"
+        part.node(nid, title, "note", 0.95)
+        part.edge("cat:notes", nid, "contains", 1.0)
+        for t in wiki._topic_candidates_from_text(f"{title}. {content or ''}", limit=5):
+            part.edge(nid, part.concept(t, 0.9), "mentions", 0.9)
+    return part
+
+
+def _flashcards_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["flashcards"][0])
+    S, C = models.FlashcardSet, models.Flashcard
+    sets = (
+        db.query(S.id, S.title)
+        .filter(S.user_id == user_id)
+        .order_by(S.updated_at.desc())
+        .limit(120)
+        .all()
+    )
+    part.count = len(sets)
+    cards: dict[int, list] = {}
+    for set_id, category, question in _first_rows_per_parent(
+        db, [C.set_id, C.category, C.question], C.set_id, C.id, [s.id for s in sets], 26
+    ):
+        cards.setdefault(set_id, []).append((category, question))
+    for set_id, title in sets:
+        sid = f"fset:{set_id}"
+        part.node(sid, title or f"Flashcards {set_id}", "flashcard_set", 1.0)
+        part.edge("cat:flashcards", sid, "contains", 1.0)
+        for category, question in cards.get(set_id, []):
+            if category:
+                part.edge(sid, part.concept(category, 0.9), "covers", 0.9)
+            for qt in wiki._topic_candidates_from_text(question or "", limit=2):
+                part.edge(sid, part.concept(qt, 0.88), "mentions", 0.8)
+    return part
+
+
+def _question_sets_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["question_sets"][0])
+    S, Q = models.QuestionSet, models.Question
+    qsets = (
+        db.query(S.id, S.title)
+        .filter(S.user_id == user_id)
+        .order_by(S.updated_at.desc())
+        .limit(120)
+        .all()
+    )
+    part.count = len(qsets)
+    topics: dict[int, list[str]] = {}
+    for set_id, topic in _first_rows_per_parent(
+        db, [Q.question_set_id, Q.topic], Q.question_set_id, Q.id, [s.id for s in qsets], 30
+    ):
+        if topic:
+            topics.setdefault(set_id, []).append(topic)
+    for set_id, title in qsets:
+        qid = f"qset:{set_id}"
+        part.node(qid, title or f"Question Set {set_id}", "question_set", 1.0)
+        part.edge("cat:question_sets", qid, "contains", 1.0)
+        for topic in topics.get(set_id, []):
+            part.edge(qid, part.concept(topic, 0.9), "tests", 0.95)
+    return part
+
+
+def _quiz_sessions_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["quiz_sessions"][0])
+    QS = models.QuestionSession
+    rows = (
+        db.query(QS.id, QS.question_set_id)
+        .filter(QS.user_id == user_id)
+        .order_by(QS.completed_at.desc())
+        .limit(100)
+        .all()
+    )
+    part.count = len(rows)
+    for session_id, question_set_id in rows:
+        sid = f"qsession:{session_id}"
+        part.node(sid, f"Session {session_id}", "quiz_session", 0.92)
+        part.edge("cat:quiz_history", sid, "contains", 0.95)
+        if question_set_id:
+            part.edge(sid, f"qset:{question_set_id}", "from_set", 0.85)
+    return part
+
+
+def _activities_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["activities"][0])
+    A = models.Activity
+    rows = (
+        db.query(A.id, A.topic)
+        .filter(A.user_id == user_id)
+        .order_by(A.timestamp.desc())
+        .limit(150)
+        .all()
+    )
+    part.count = len(rows)
+    for activity_id, topic in rows:
+        aid = f"quiz:{activity_id}"
+        part.node(aid, topic or f"Quiz {activity_id}", "quiz_activity", 0.9)
+        part.edge("cat:quiz_history", aid, "contains", 0.9)
+        if topic:
+            part.edge(aid, part.concept(topic, 0.9), "about", 0.85)
+    return part
+
+
+def _wiki_part(db: Session, user_id: int) -> _Part:
+    part = _Part(PARTS["wiki"][0])
+    P = models.AtlasWikiPage
+    rows = (
+        db.query(P.path, P.title, P.page_type, P.outbound_links, P.tags)
+        .filter(P.user_id == user_id)
+        .order_by(P.updated_at.desc())
+        .limit(220)
+        .all()
+    )
+    part.count = len(rows)
+    for path, title, page_type, outbound_links, tags in rows:
+        pid = f"wiki:{path}"
+        part.node(pid, title or path, "wiki_page", 0.95)
+        part.edge("cat:wiki_pages", pid, "contains", 1.0)
+        part.edge("hub:oracle", pid, "consults", 0.8)
+        if page_type == "concept":
+            cid = part.concept(title or path, 1.0)
+            part.edge("cat:concepts", cid, "contains", 1.0)
+            part.edge(pid, cid, "defines", 1.0)
+        for out in wiki._loads_list(outbound_links)[:20]:
+            part.edge(pid, f"wiki:{out}", "links", 0.6)
+        for t in wiki._loads_list(tags)[:8]:
+            part.edge(pid, part.concept(t, 0.9), "mentions", 0.7)
+    return part
+
+
+_BUILDERS = {
+    "documents": _documents_part,
+    "notes": _notes_part,
+    "flashcards": _flashcards_part,
+    "question_sets": _question_sets_part,
+    "quiz_sessions": _quiz_sessions_part,
+    "activities": _activities_part,
+    "wiki": _wiki_part,
+}
+
+
+def _compose(parts: dict[str, dict[str, Any]], max_nodes: int) -> dict[str, Any]:
+    core = _Part(CORE_CLUSTER)
+    for node_id, label, size in HUBS:
+        core.node(node_id, label, "hub", size)
+    for sub in ["hub:vault", "hub:oracle", "hub:archive", "hub:wiki"]:
+        core.edge("hub:atlas", sub, "contains", 1.8)
+    for cid, label, parent in CATEGORIES:
+        core.node(cid, label, "category", 1.4)
+        core.edge(parent, cid, "contains", 1.3)
+
+    ordered = [core.to_dict()] + [parts[name] for name in PARTS]
+    nodes: list[dict[str, Any]] = []
+    node_ids: set[str] = set()
+    for part in ordered:
+        for node in part["nodes"]:
+            if len(nodes) >= max_nodes:
+                break
+            if node["id"] not in node_ids:
+                node_ids.add(node["id"])
+                nodes.append(node)
+
+    edges: list[dict[str, Any]] = []
+    edge_seen: set[str] = set()
+
+    def add_edge(a: str, b: str, edge_type: str, weight: float) -> None:
+        if a == b or a not in node_ids or b not in node_ids:
+            return
+        key = f"{a}|{b}|{edge_type}" if a < b else f"{b}|{a}|{edge_type}"
+        if key in edge_seen:
+            return
+        edge_seen.add(key)
+        edges.append({"source": a, "target": b, "type": edge_type, "weight": weight})
+
+    for part in ordered:
+        for a, b, edge_type, weight in part["edges"]:
+            add_edge(a, b, edge_type, weight)
+
+    concept_labels = [(n["id"], set(n["label"].lower().split())) for n in nodes if n["type"] == "concept"]
+    for i, (a_id, a_toks) in enumerate(concept_labels):
+        if not a_toks:
+            continue
+        for b_id, b_toks in concept_labels[i + 1:i + 16]:
+            if a_toks & b_toks:
+                add_edge(a_id, b_id, "related", 0.45)
+
+    counts = {"nodes": len(nodes), "edges": len(edges)}
+    counts.update({PARTS[name][1]: parts[name]["count"] for name in PARTS})
+    digest = hashlib.sha1(
+        json.dumps([nodes, edges], sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()[:20]
+    return {"nodes": nodes, "edges": edges, "counts": counts, "digest": digest}
+
+
+def _load(db: Session, user_id: int) -> dict[str, Any]:
+    snapshot = redis_cache.get_knowledge_graph(user_id)
+    if not snapshot or snapshot.get("version") != GRAPH_VERSION:
+        wiki.ensure_user_wiki(db, user_id)
+        redis_cache.pop_knowledge_graph_dirty(user_id)
+        dirty = set(PARTS)
+        parts: dict[str, Any] = {}
+    else:
+        dirty = redis_cache.pop_knowledge_graph_dirty(user_id)
+        if "*" in dirty:
+            dirty = set(PARTS)
+        dirty &= set(PARTS)
+        if not dirty:
+            return snapshot
+        parts = dict(snapshot["parts"])
+
+    for name in PARTS:
+        if name in dirty:
+            parts[name] = _BUILDERS[name](db, user_id).to_dict()
+    snapshot = {"version": GRAPH_VERSION, "parts": parts, "graph": _compose(parts, MAX_NODES)}
+    redis_cache.set_knowledge_graph(user_id, snapshot)
+    return snapshot
+
+
+def etag_for(digest: str, *window: Any) -> str:
+    return 'W/"kgraph-{}-{}"'.format(digest, "-".join(str(w) for w in window))
+
+
+def graph(db: Session, user_id: int, max_nodes: Optional[int] = None) -> dict[str, Any]:
+    """The whole graph (or its first max_nodes nodes) with an ETag."""
+    composed = _load(db, user_id)["graph"]
+    nodes, edges = composed["nodes"], composed["edges"]
+    if max_nodes is not None and len(nodes) > max_nodes:
+        nodes = nodes[:max_nodes]
+        kept = {n["id"] for n in nodes}
+        edges = [e for e in edges if e["source"] in kept and e["target"] in kept]
+    counts = dict(composed["counts"], nodes=len(nodes), edges=len(edges))
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "counts": counts,
+        "etag": etag_for(composed["digest"], "all", max_nodes or 0),
+    }
+
+
+def page(
+    db: Session,
+    user_id: int,
+    cluster: Optional[str] = None,
+    offset: int = 0,
+    limit: int = PAGE_SIZE,
+) -> dict[str, Any]:
+    """One page of the graph for progressive loading.
+
+    Nodes are ordered hubs and categories first, then by part; with `cluster`
+    only that cluster's nodes follow the core ones. Each edge is returned
+    with the page holding its later endpoint in that order, so reading pages
+    in sequence yields every edge once and after both of its nodes. Edges to
+    another cluster come with the page of their in-cluster endpoint.
+    """
+    composed = _load(db, user_id)["graph"]
+    order = [n for n in composed["nodes"] if cluster is None or n["cluster"] in (CORE_CLUSTER, cluster)]
+    position = {n["id"]: i for i, n in enumerate(order)}
+    end = offset + limit
+    edges = []
+    for e in composed["edges"]:
+        known = [position[k] for k in (e["source"], e["target"]) if k in position]
+        if known and offset <= max(known) < end:
+            edges.append(e)
+    clusters: dict[str, int] = {}
+    for n in composed["nodes"]:
+        clusters[n["cluster"]] = clusters.get(n["cluster"], 0) + 1
+    return {
+        "nodes": order[offset:end],
+        "edges": edges,
+        "offset": offset,
+        "next_offset": end if end < len(order) else None,
+        "total": len(order),
+        "clusters": clusters,
+        "counts": composed["counts"],
+        "etag": etag_for(composed["digest"], cluster or "all", offset, limit),
+    }
+
+
+# Which part a write touches, and for updates the columns the graph reads.
+_OWNED = {
+    models.ContextDocument: ("documents", ("doc_id", "filename", "subject", "topic_tags", "status", "user_id")),
+    models.Note: ("notes", ("title", "content", "is_deleted", "user_id")),
+    models.FlashcardSet: ("flashcards", ("title", "user_id")),
+    models.QuestionSet: ("question_sets", ("title", "user_id")),
+    models.QuestionSession: ("quiz_sessions", ("question_set_id", "user_id")),
+    models.Activity: ("activities", ("topic", "user_id")),
+    models.AtlasWikiPage: ("wiki", ("path", "title", "page_type", "outbound_links", "tags", "user_id")),
+}
+_CHILDREN = {
+    models.Flashcard: ("flashcards", "set_id", models.FlashcardSet, ("set_id", "category", "question")),
+    models.Question: ("question_sets", "question_set_id", models.QuestionSet, ("question_set_id", "topic")),
+}
+_PENDING_KEY = "knowledge_graph_dirty"
+
+
+def _changed(obj, columns) -> bool:
+    attrs = sa_inspect(obj).attrs
+    return any(attrs[c].history.has_changes() for c in columns)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_dirty_parts(session, flush_context):
+    pending: dict[int, set[str]] = session.info.setdefault(_PENDING_KEY, {})
+    parents: dict[tuple[type, int], str] = {}
+
+    def mark(user_id, part):
+        if user_id is not None:
+            pending.setdefault(int(user_id), set()).add(part)
+
+    for objects, updated in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+        for obj in objects:
+            owned = _OWNED.get(type(obj))
+            if owned:
+                if not updated or _changed(obj, owned[1]):
+                    mark(obj.user_id, owned[0])
+                continue
+            child = _CHILDREN.get(type(obj))
+            if child and (not updated or _changed(obj, child[3])):
+                parent_id = getattr(obj, child[1])
+                if parent_id is not None:
+                    parents[(child[2], parent_id)] = child[0]
+
+    missing: dict[type, set[int]] = {}
+    for (parent_model, parent_id), part in parents.items():
+        parent = session.identity_map.get((parent_model, (parent_id,), None))
+        if parent is not None:
+            mark(parent.user_id, part)
+        else:
+            missing.setdefault(parent_model, set()).add(parent_id)
+    for parent_model, ids in missing.items():
+        part = _OWNED[parent_model][0]
+        try:
+            rows = session.connection().execute(
+                select(parent_model.user_id).where(parent_model.id.in_(ids)).distinct()
+            )
+            for (user_id,) in rows:
+                mark(user_id, part)
+        except Exception as e:
+            logger.debug(f"Knowledge graph owner lookup failed: {e}")
+
+
+def note_bulk_write(session: Session, user_id: int, *parts: str) -> None:
+    """Queue parts touched by a query-level delete or update, which the flush
+    hook never sees; published or dropped with the session's transaction."""
+    if user_id is not None and parts:
+        session.info.setdefault(_PENDING_KEY, {}).setdefault(int(user_id), set()).update(parts)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_dirty_parts(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    for user_id, parts in (pending or {}).items():
+        redis_cache.mark_knowledge_graph_dirty(user_id, *sorted(parts))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_dirty_parts(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+import models
+from services import redis_cache
+
+logger = logging.getLogger(__name__)
+
+# Leaderboards live in Redis sorted sets so reads are O(log n + limit) instead
+# of sorting user_gamification_stats on every request:
+#   bw:lb:global              total_points for every user with stats
+#   bw:lb:weekly:<monday>     weekly_points for users active this week
+# Members are the user id inverted and zero-padded, so equal scores fall back
+# to ascending user_id under ZREVRANGE/ZREVRANK — the same tie-break the SQL
+# ordering used. award_points keeps the sets current; rebuild_from_db() is the
+# source-of-truth resync (startup, scheduler, recalculate_all_stats). Without
+# Redis each worker keeps an in-process copy that it re-reads from the DB
+# every MEMORY_REFRESH_SECONDS, since it cannot see other workers' awards.
+GLOBAL = "global"
+WEEKLY = "weekly"
+
+_PREFIX = "bw:lb"
+_BUILT_KEY = f"{_PREFIX}:built"
+_REBUILD_LOCK_KEY = f"{_PREFIX}:rebuild_lock"
+_PROFILE_PREFIX = f"{_PREFIX}:profile"
+_ID_CEIL = 10 ** 12
+_ZADD_BATCH = 1_000
+
+PROFILE_TTL = int(os.getenv("LEADERBOARD_PROFILE_TTL_SECONDS", "300"))
+REBUILD_TTL = int(os.getenv("LEADERBOARD_REBUILD_TTL_SECONDS", "21600"))
+MEMORY_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_MEMORY_REFRESH_SECONDS", "60"))
+REBUILD_LOCK_SECONDS = int(os.getenv("LEADERBOARD_REBUILD_LOCK_SECONDS", "120"))
+WEEKLY_KEY_TTL = 8 * 86_400
+
+
+def _week_start() -> date:
+    from services.gamification_system import get_week_start
+    return get_week_start()
+
+
+def _key(board: str, week: Optional[date] = None) -> str:
+    if board == WEEKLY:
+        return f"{_PREFIX}:weekly:{(week or _week_start()).isoformat()}"
+    return f"{_PREFIX}:global"
+
+
+def _member(user_id: int) -> str:
+    return f"{_ID_CEIL - int(user_id):012d}"
+
+
+def _user_id(member: str) -> int:
+    return _ID_CEIL - int(member)
+
+
+class _MemoryBoard:
+    """Sorted (-points, user_id) list with a score map; bisect gives O(log n) rank."""
+
+    def __init__(self):
+        self._scores: dict[int, int] = {}
+        self._order: list[tuple[int, int]] = []
+        self.built_at = 0.0
+
+    def set(self, user_id: int, points: int) -> None:
+        previous = self._scores.get(user_id)
+        if previous is not None:
+            idx = bisect.bisect_left(self._order, (-previous, user_id))
+            if idx < len(self._order) and self._order[idx] == (-previous, user_id):
+                self._order.pop(idx)
+        self._scores[user_id] = points
+        bisect.insort(self._order, (-points, user_id))
+
+    def replace(self, scores: dict[int, int]) -> None:
+        self._scores = dict(scores)
+        self._order = sorted((-points, uid) for uid, points in self._scores.items())
+        self.built_at = time.monotonic()
+
+    def top(self, limit: int) -> list[tuple[int, int]]:
+        return [(uid, -neg) for neg, uid in self._order[:limit]]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        points = self._scores.get(user_id)
+        if points is None:
+            return None
+        return bisect.bisect_left(self._order, (-points, user_id))
+
+    def scores(self, user_ids: Iterable[int]) -> dict[int, int]:
+        return {uid: self._scores[uid] for uid in user_ids if uid in self._scores}
+
+
+_memory_boards: dict[str, _MemoryBoard] = {}
+_memory_profiles: dict[int, tuple[dict, float]] = {}
+_memory_lock = threading.RLock()
+
+
+def backend() -> str:
+    return "redis" if redis_cache._redis_client is not None else "memory"
+
+
+def _load_scores(db: Session) -> tuple[dict[int, int], dict[int, int]]:
+    week = _week_start()
+    totals: dict[int, int] = {}
+    weekly: dict[int, int] = {}
+    rows = (
+        db.query(
+            models.UserGamificationStats.user_id,
+            models.UserGamificationStats.total_points,
+            models.UserGamificationStats.weekly_points,
+            models.UserGamificationStats.week_start_date,
+        )
+        .join(models.User, models.User.id == models.UserGamificationStats.user_id)
+        .yield_per(5_000)
+    )
+    for user_id, total_points, weekly_points, week_start_date in rows:
+        totals[user_id] = total_points or 0
+        if week_start_date is None:
+            continue
+        started = week_start_date.date() if hasattr(week_start_date, "date") else week_start_date
+        if started >= week and weekly_points:
+            weekly[user_id] = weekly_points
+    return totals, weekly
+
+
+def _redis_replace(key: str, scores: dict[int, int], ttl: Optional[int] = None) -> None:
+    client = redis_cache._redis_client
+    tmp = f"{key}:tmp:{uuid.uuid4().hex[:8]}"
+    items = list(scores.items())
+    pipe = client.pipeline(transaction=False)
+    for start in range(0, len(items), _ZADD_BATCH):
+        pipe.zadd(tmp, {_member(uid): points for uid, points in items[start:start + _ZADD_BATCH]})
+    pipe.execute()
+    if items:
+        client.rename(tmp, key)
+        if ttl:
+            client.expire(key, ttl)
+    else:
+        client.delete(key)
+
+
+def rebuild_from_db(db: Session) -> int:
+    """Resync the global and current-week boards from user_gamification_stats."""
+    totals, weekly = _load_scores(db)
+    if redis_cache._redis_client is not None:
+        try:
+            _redis_replace(_key(GLOBAL), totals)
+            _redis_replace(_key(WEEKLY), weekly, ttl=WEEKLY_KEY_TTL)
+            redis_cache._redis_client.set(_BUILT_KEY, str(int(time.time())), ex=REBUILD_TTL)
+            logger.info("Leaderboards rebuilt in Redis: %d users, %d active this week", len(totals), len(weekly))
+            return len(totals)
+        except Exception as e:
+            logger.warning(f"Redis leaderboard rebuild failed, using in-process boards: {e}")
+    with _memory_lock:
+        _memory_boards.clear()
+        _memory_boards.setdefault(_key(GLOBAL), _MemoryBoard()).replace(totals)
+        _memory_boards.setdefault(_key(WEEKLY), _MemoryBoard()).replace(weekly)
+    return len(totals)
+
+
+def _memory_board(db: Session, key: str) -> _MemoryBoard:
+    with _memory_lock:
+        board = _memory_boards.get(key)
+        fresh = board is not None and time.monotonic() - board.built_at < MEMORY_REFRESH_SECONDS
+    if not fresh:
+        totals, weekly = _load_scores(db)
+        with _memory_lock:
+            for board_key in [k for k in _memory_boards if k.startswith(f"{_PREFIX}:weekly:") and k != _key(WEEKLY)]:
+                del _memory_boards[board_key]
+            _memory_boards.setdefault(_key(GLOBAL), _MemoryBoard()).replace(totals)
+            _memory_boards.setdefault(_key(WEEKLY), _MemoryBoard()).replace(weekly)
+    with _memory_lock:
+        return _memory_boards.setdefault(key, _MemoryBoard())
+
+
+def _ensure_redis_built(db: Session) -> None:
+    """Lazily rebuild the boards when the build marker has expired. Only the
+    request holding the SET NX lock rebuilds; the others read the sets as they
+    stand (rebuilds RENAME into place, so they never see a half-written one)."""
+    client = redis_cache._redis_client
+    if client.exists(_BUILT_KEY):
+        return
+    token = uuid.uuid4().hex
+    if not client.set(_REBUILD_LOCK_KEY, token, nx=True, ex=REBUILD_LOCK_SECONDS):
+        return
+    try:
+        rebuild_from_db(db)
+    finally:
+        if client.get(_REBUILD_LOCK_KEY) == token:
+            client.delete(_REBUILD_LOCK_KEY)
+
+
+def record_points(user_id: int, total_points: int, weekly_points: int, week: Optional[date] = None) -> None:
+    """Write a user's committed totals into both boards and drop their cached profile."""
+    total_points = int(total_points or 0)
+    weekly_points = int(weekly_points or 0)
+    week = week or _week_start()
+    client = redis_cache._redis_client
+    if client is not None:
+        try:
+            weekly_key = _key(WEEKLY, week)
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(_key(GLOBAL), {_member(user_id): total_points})
+            if weekly_points:
+                pipe.zadd(weekly_key, {_member(user_id): weekly_points})
+                pipe.expire(weekly_key, WEEKLY_KEY_TTL)
+            else:
+                pipe.zrem(weekly_key, _member(user_id))
+            pipe.delete(f"{_PROFILE_PREFIX}:{user_id}")
+            pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Leaderboard update failed for user {user_id}: {e}")
+    with _memory_lock:
+        _memory_profiles.pop(user_id, None)
+        global_board = _memory_boards.get(_key(GLOBAL))
+        if global_board is not None:
+            global_board.set(user_id, total_points)
+        weekly_board = _memory_boards.get(_key(WEEKLY, week))
+        if weekly_board is not None and weekly_points:
+            weekly_board.set(user_id, weekly_points)
+
+
+def invalidate_profile(user_id: int) -> None:
+    if redis_cache._redis_client is not None:
+        try:
+            redis_cache._redis_client.delete(f"{_PROFILE_PREFIX}:{user_id}")
+        except Exception as e:
+            logger.warning(f"Leaderboard profile invalidation failed for user {user_id}: {e}")
+    with _memory_lock:
+        _memory_profiles.pop(user_id, None)
+
+
+def _profile_row(user, stats) -> dict:
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "first_name": user.first_name or "",
+        "last_name": user.last_name or "",
+        "picture_url": user.picture_url or "",
+        "total_points": stats.total_points or 0,
+        "level": stats.level or 1,
+        "experience": stats.experience or 0,
+        "weekly_points": stats.weekly_points or 0,
+        "current_streak": stats.current_streak or 0,
+    }
+
+
+def profiles(db: Session, user_ids: list[int]) -> dict[int, dict]:
+    """Display fields for `user_ids`: one MGET, then one DB query for the misses."""
+    found: dict[int, dict] = {}
+    client = redis_cache._redis_client
+    if client is not None and user_ids:
+        try:
+            raw = client.mget([f"{_PROFILE_PREFIX}:{uid}" for uid in user_ids])
+            for uid, value in zip(user_ids, raw):
+                if value:
+                    found[uid] = json.loads(value)
+        except Exception as e:
+            logger.warning(f"Leaderboard profile cache read failed: {e}")
+            client = None
+    elif user_ids:
+        now = time.monotonic()
+        with _memory_lock:
+            for uid in user_ids:
+                item = _memory_profiles.get(uid)
+                if item and item[1] > now:
+                    found[uid] = item[0]
+
+    missing = [uid for uid in user_ids if uid not in found]
+    if not missing:
+        return found
+    rows = (
+        db.query(models.User, models.UserGamificationStats)
+        .join(models.UserGamificationStats, models.User.id == models.UserGamificationStats.user_id)
+        .filter(models.User.id.in_(missing))
+        .all()
+    )
+    fetched = {user.id: _profile_row(user, stats) for user, stats in rows}
+    found.update(fetched)
+    if client is not None and fetched:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for uid, profile in fetched.items():
+                pipe.set(f"{_PROFILE_PREFIX}:{uid}", json.dumps(profile), ex=PROFILE_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Leaderboard profile cache write failed: {e}")
+    elif fetched:
+        expiry = time.monotonic() + PROFILE_TTL
+        with _memory_lock:
+            for uid, profile in fetched.items():
+                _memory_profiles[uid] = (profile, expiry)
+    return found
+
+
+def _hydrate(db: Session, ranked: list[tuple[int, int]], board: str) -> list[dict]:
+    by_id = profiles(db, [uid for uid, _ in ranked])
+    points_field = "weekly_points" if board == WEEKLY else "total_points"
+    entries = []
+    for uid, points in ranked:
+        profile = by_id.get(uid)
+        if profile is None:
+            continue
+        entries.append({**profile, points_field: points, "points": points, "rank": len(entries) + 1})
+    return entries
+
+
+def _top_ids(db: Session, board: str, limit: int) -> list[tuple[int, int]]:
+    key = _key(board)
+    if redis_cache._redis_client is not None:
+        try:
+            _ensure_redis_built(db)
+            rows = redis_cache._redis_client.zrevrange(key, 0, max(0, limit - 1), withscores=True)
+            return [(_user_id(member), int(score)) for member, score in rows]
+        except Exception as e:
+            logger.warning(f"Redis leaderboard read failed, using in-process board: {e}")
+    return _memory_board(db, key).top(limit)
+
+
+def top(db: Session, board: str = GLOBAL, limit: int = 50) -> list[dict]:
+    """Ranked, profile-hydrated leaderboard rows (1-based `rank`, board score in `points`)."""
+    if limit <= 0:
+        return []
+    return _hydrate(db, _top_ids(db, board, limit), board)
+
+
+def rank_of(db: Session, user_id: int, board: str = GLOBAL) -> Optional[int]:
+    """1-based position of `user_id` on `board`, or None if they are not on it."""
+    key = _key(board)
+    if redis_cache._redis_client is not None:
+        try:
+            _ensure_redis_built(db)
+            position = redis_cache._redis_client.zrevrank(key, _member(user_id))
+            return None if position is None else int(position) + 1
+        except Exception as e:
+            logger.warning(f"Redis leaderboard rank failed, using in-process board: {e}")
+    position = _memory_board(db, key).rank(user_id)
+    return None if position is None else position + 1
+
+
+def scores(db: Session, user_ids: list[int], board: str = GLOBAL) -> dict[int, int]:
+    key = _key(board)
+    if redis_cache._redis_client is not None and user_ids:
+        try:
+            _ensure_redis_built(db)
+            values = redis_cache._redis_client.zmscore(key, [_member(uid) for uid in user_ids])
+            return {uid: int(v) for uid, v in zip(user_ids, values) if v is not None}
+        except Exception as e:
+            logger.warning(f"Redis leaderboard score lookup failed, using in-process board: {e}")
+    return _memory_board(db, key).scores(user_ids)
+
+
+def rank_within(db: Session, user_ids: list[int], board: str = GLOBAL) -> list[dict]:
+    """Leaderboard restricted to `user_ids` (e.g. a friend group), merged client-side
+    from one ZMSCORE round trip rather than a ZINTERSTORE temp key per request."""
+    found = scores(db, list(dict.fromkeys(user_ids)), board)
+    ranked = sorted(found.items(), key=lambda item: (-item[1], item[0]))
+    return _hydrate(db, ranked, board)
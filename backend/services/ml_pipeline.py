@@ -81,12 +81,12 @@ class ModelRegistry:
     def load(self):
         if self._ready:
             return
-        try:
-            from sentence_transformers import SentenceTransformer
-            self._embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-            logger.info("[ML] all-MiniLM-L6-v2 loaded")
-        except Exception as e:
-            logger.warning(f"[ML] Embedding model unavailable: {e}")
+        from services import embedding_service
+        self._embed_model = embedding_service.get_model(embedding_service.MINILM_MODEL, fallback=None)
+        if self._embed_model is not None:
+            logger.info("[ML] all-MiniLM-L6-v2 ready (shared embedding runtime)")
+        else:
+            logger.warning("[ML] Embedding model unavailable")
 
         try:
             from sentence_transformers import CrossEncoder
@@ -101,8 +101,8 @@ class ModelRegistry:
         if not self._embed_model:
             return None
         try:
-            vec = self._embed_model.encode(text, normalize_embeddings=True)
-            return vec.tolist()
+            from services import embedding_service
+            return embedding_service.encode_one(self._embed_model, text, normalize=True)
         except Exception as e:
             logger.warning(f"[ML] embed failed: {e}")
             return None
@@ -112,7 +112,8 @@ class ModelRegistry:
             if not self._embed_model:
                 return [0.0] * 384
             try:
-                return self._embed_model.encode(text, normalize_embeddings=True)
+                from services import embedding_service
+                return embedding_service.encode_one(self._embed_model, text, normalize=True)
             except Exception:
                 return [0.0] * 384
         return _fn
@@ -233,6 +234,7 @@ class MessageMLPipeline:
         self, db, user_id: int, concept_ids: List[str], intent: str
     ) -> Tuple[float, float, Dict, Dict]:
         import models
+        from services.context_agent import effective_mastery
 
         CONFIDENCE = {
             "exploration": 0.5,
@@ -259,6 +261,7 @@ class MessageMLPipeline:
             p_learn_default = archetype_p_learn.get(archetype, 0.09)
 
             masteries: List[float] = []
+            now = datetime.now(timezone.utc)
             for cid in concept_ids[:2]:
                 state = db.query(models.StudentKnowledgeState).filter_by(
                     user_id=user_id, concept_id=cid
@@ -279,7 +282,8 @@ class MessageMLPipeline:
                 pl = state.p_learn
                 ps = state.p_slip
                 pg = state.p_guess
-                p = state.p_mastery
+                # Stored mastery is as of last_updated; decay it to now first.
+                p = effective_mastery(state.p_mastery, state.last_updated, now)
 
                 kt_before[cid] = p
 
@@ -291,7 +295,7 @@ class MessageMLPipeline:
 
                 state.p_mastery = min(max(p_next, 0.01), 0.99)
                 state.interaction_count += 1
-                state.last_updated = datetime.now(timezone.utc)
+                state.last_updated = now
 
                 history = state.mastery_history or []
                 history.append(round(p_next, 3))
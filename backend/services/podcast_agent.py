@@ -6,10 +6,11 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 
 import models
 from deps import call_ai
+from services import redis_cache
 
 logger = logging.getLogger(__name__)
 
@@ -118,6 +119,28 @@ DIFFICULTY_LEVELS: Dict[str, Dict[str, str]] = {
     },
 }
 
+# The transcript, analysis and generated script are written when a session
+# starts or its script is regenerated, and cached (redis_cache) for workers
+# that load the session; every other interaction updates only the small
+# columns that changed and appends its conversation entries as rows.
+_CONTENT_COLUMNS = ("transcript", "analysis", "key_takeaways", "chapters")
+_STATE_COLUMNS = (
+    "session_id",
+    "user_id",
+    "title",
+    "source_type",
+    "voice_mode",
+    "voice_persona",
+    "difficulty",
+    "answer_language",
+    "mcq_state",
+    "session_options",
+    "current_index",
+    "is_ended",
+    "created_at",
+    "updated_at",
+)
+
 def _safe_json_loads(value: Optional[str], fallback: Any):
     if not value:
         return fallback
@@ -126,6 +149,11 @@ def _safe_json_loads(value: Optional[str], fallback: Any):
     except Exception:
         return fallback
 
+def _as_utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
 @dataclass
 class PodcastSession:
     session_id: str
@@ -147,6 +175,13 @@ class PodcastSession:
     started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     ended: bool = False
+    # Persistence bookkeeping: what the podcast_sessions row already holds and
+    # how many conversation entries are stored in podcast_session_messages.
+    stored: bool = False
+    content_dirty: bool = True
+    legacy_conversation: bool = False
+    persisted_fields: Dict[str, Any] = field(default_factory=dict, repr=False)
+    persisted_messages: int = 0
 
 class PodcastAgentService:
     def __init__(self):
@@ -769,6 +804,7 @@ Rules:
     def list_user_sessions(self, *, db: Session, user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
         records = (
             db.query(models.PodcastSessionMemory)
+            .options(load_only(*[getattr(models.PodcastSessionMemory, c) for c in _STATE_COLUMNS]))
             .filter(models.PodcastSessionMemory.user_id == user_id)
             .order_by(models.PodcastSessionMemory.updated_at.desc())
             .limit(max(1, min(100, limit)))
@@ -901,6 +937,7 @@ Rules:
 
         session.chapters = chapters
         session.key_takeaways = build_result.get("key_takeaways", session.key_takeaways)
+        session.content_dirty = True
         session.current_index = min(previous_index, len(chapters) - 1)
         session.ended = False
         session.conversation.append(
@@ -1276,42 +1313,132 @@ Return strict JSON:
             "timestamp_label": self._format_time(int(record.timestamp_seconds or 0)),
         }
 
+    def _state_values(self, session: PodcastSession) -> Dict[str, Any]:
+        return {
+            "title": session.title,
+            "source_type": session.source_type,
+            "voice_mode": session.voice_mode,
+            "voice_persona": session.voice_persona,
+            "difficulty": session.difficulty,
+            "answer_language": session.answer_language,
+            "mcq_state": json.dumps(session.mcq_state or {}, ensure_ascii=False),
+            "session_options": json.dumps(session.session_options or {}, ensure_ascii=False),
+            "current_index": session.current_index,
+            "is_active": not session.ended,
+            "is_ended": session.ended,
+        }
+
+    def _content_payload(self, session: PodcastSession) -> Dict[str, Any]:
+        return {
+            "transcript": session.transcript,
+            "analysis": session.analysis or {},
+            "key_takeaways": session.key_takeaways or [],
+            "chapters": session.chapters or [],
+        }
+
     def _persist_session(self, db: Session, session: PodcastSession):
-        record = (
-            db.query(models.PodcastSessionMemory)
-            .filter(models.PodcastSessionMemory.session_id == session.session_id, models.PodcastSessionMemory.user_id == session.user_id)
-            .first()
-        )
-        if not record:
-            record = models.PodcastSessionMemory(
-                session_id=session.session_id,
-                user_id=session.user_id,
-                created_at=datetime.now(timezone.utc),
+        now = datetime.now(timezone.utc)
+        state = self._state_values(session)
+        values = {
+            key: value
+            for key, value in state.items()
+            if key not in session.persisted_fields or session.persisted_fields[key] != value
+        }
+        content = self._content_payload(session) if session.content_dirty else None
+        if content is not None:
+            values["transcript"] = content["transcript"]
+            for column in ("analysis", "key_takeaways", "chapters"):
+                values[column] = json.dumps(content[column], ensure_ascii=False)
+        if session.legacy_conversation:
+            values["conversation"] = "[]"
+        values["last_accessed_at"] = now
+        values["updated_at"] = now
+
+        if session.stored:
+            (
+                db.query(models.PodcastSessionMemory)
+                .filter(models.PodcastSessionMemory.session_id == session.session_id, models.PodcastSessionMemory.user_id == session.user_id)
+                .update(values, synchronize_session=False)
+            )
+        else:
+            db.add(
+                models.PodcastSessionMemory(
+                    session_id=session.session_id,
+                    user_id=session.user_id,
+                    conversation="[]",
+                    created_at=now,
+                    **values,
+                )
+            )
+
+        new_entries = session.conversation[session.persisted_messages:]
+        if new_entries:
+            db.add_all(
+                [
+                    models.PodcastSessionMessage(
+                        session_id=session.session_id,
+                        role=str(entry.get("role", "assistant"))[:20],
+                        entry_type=str(entry.get("type", ""))[:30],
+                        entry=json.dumps(entry, ensure_ascii=False),
+                        created_at=now,
+                    )
+                    for entry in new_entries
+                ]
             )
-            db.add(record)
-
-        record.title = session.title
-        record.source_type = session.source_type
-        record.voice_mode = session.voice_mode
-        record.voice_persona = session.voice_persona
-        record.difficulty = session.difficulty
-        record.answer_language = session.answer_language
-        record.transcript = session.transcript
-        record.analysis = json.dumps(session.analysis or {}, ensure_ascii=False)
-        record.key_takeaways = json.dumps(session.key_takeaways or [], ensure_ascii=False)
-        record.chapters = json.dumps(session.chapters or [], ensure_ascii=False)
-        record.conversation = json.dumps(session.conversation or [], ensure_ascii=False)
-        record.mcq_state = json.dumps(session.mcq_state or {}, ensure_ascii=False)
-        record.session_options = json.dumps(session.session_options or {}, ensure_ascii=False)
-        record.current_index = session.current_index
-        record.is_active = not session.ended
-        record.is_ended = session.ended
-        record.last_accessed_at = datetime.now(timezone.utc)
-        record.updated_at = datetime.now(timezone.utc)
 
         db.commit()
+        session.stored = True
+        session.content_dirty = False
+        session.legacy_conversation = False
+        session.persisted_fields = state
+        session.persisted_messages = len(session.conversation)
+        if content is not None:
+            redis_cache.set_podcast_content(session.session_id, content)
+
+    def _load_content(self, db: Session, session_id: str) -> Dict[str, Any]:
+        content = redis_cache.get_podcast_content(session_id)
+        if content:
+            return content
+        row = (
+            db.query(*[getattr(models.PodcastSessionMemory, c) for c in _CONTENT_COLUMNS])
+            .filter(models.PodcastSessionMemory.session_id == session_id)
+            .first()
+        )
+        content = {
+            "transcript": (row.transcript if row else "") or "",
+            "analysis": _safe_json_loads(row.analysis if row else None, {}),
+            "key_takeaways": _safe_json_loads(row.key_takeaways if row else None, []),
+            "chapters": _safe_json_loads(row.chapters if row else None, []),
+        }
+        redis_cache.set_podcast_content(session_id, content)
+        return content
+
+    def _load_conversation(self, db: Session, session_id: str) -> tuple[List[Dict[str, Any]], bool]:
+        """Stored conversation entries, and whether they came from the legacy
+        podcast_sessions.conversation blob (not yet moved to message rows)."""
+        rows = (
+            db.query(models.PodcastSessionMessage.entry)
+            .filter(models.PodcastSessionMessage.session_id == session_id)
+            .order_by(models.PodcastSessionMessage.id.asc())
+            .all()
+        )
+        if rows:
+            return [_safe_json_loads(entry, {}) for (entry,) in rows], False
+        legacy = (
+            db.query(models.PodcastSessionMemory.conversation)
+            .filter(models.PodcastSessionMemory.session_id == session_id)
+            .scalar()
+        )
+        entries = _safe_json_loads(legacy, [])
+        return (entries, True) if entries else ([], False)
 
-    def _hydrate_session(self, record: models.PodcastSessionMemory) -> PodcastSession:
+    def _hydrate_session(
+        self,
+        record: models.PodcastSessionMemory,
+        content: Dict[str, Any],
+        conversation: List[Dict[str, Any]],
+        legacy_conversation: bool = False,
+    ) -> PodcastSession:
         session = PodcastSession(
             session_id=record.session_id,
             user_id=record.user_id,
@@ -1321,29 +1448,37 @@ Return strict JSON:
             voice_persona=record.voice_persona or "mentor",
             difficulty=record.difficulty or "intermediate",
             answer_language=self._normalize_language(record.answer_language or "en"),
-            transcript=record.transcript or "",
-            analysis=_safe_json_loads(record.analysis, {}),
-            key_takeaways=_safe_json_loads(record.key_takeaways, []),
-            chapters=_safe_json_loads(record.chapters, []),
-            current_index=int(record.current_index or -1),
-            conversation=_safe_json_loads(record.conversation, []),
+            transcript=content.get("transcript") or "",
+            analysis=content.get("analysis") or {},
+            key_takeaways=content.get("key_takeaways") or [],
+            chapters=content.get("chapters") or [],
+            current_index=int(record.current_index if record.current_index is not None else -1),
+            conversation=conversation,
             mcq_state=_safe_json_loads(record.mcq_state, {}),
             session_options=_safe_json_loads(record.session_options, {}),
-            started_at=record.created_at or datetime.now(timezone.utc),
-            updated_at=record.updated_at or datetime.now(timezone.utc),
+            started_at=_as_utc(record.created_at),
+            updated_at=_as_utc(record.updated_at),
             ended=bool(record.is_ended),
+            stored=True,
+            content_dirty=False,
+            legacy_conversation=legacy_conversation,
+            persisted_messages=0 if legacy_conversation else len(conversation),
         )
+        session.persisted_fields = self._state_values(session)
         return session
 
     def _load_session_from_db(self, *, db: Session, session_id: str, user_id: int) -> Optional[PodcastSession]:
         record = (
             db.query(models.PodcastSessionMemory)
+            .options(load_only(*[getattr(models.PodcastSessionMemory, c) for c in _STATE_COLUMNS]))
             .filter(models.PodcastSessionMemory.session_id == session_id, models.PodcastSessionMemory.user_id == user_id)
             .first()
         )
         if not record:
             return None
-        return self._hydrate_session(record)
+        content = self._load_content(db, session_id)
+        conversation, legacy = self._load_conversation(db, session_id)
+        return self._hydrate_session(record, content, conversation, legacy)
 
     def _get_session(self, *, db: Session, session_id: str, user_id: int) -> PodcastSession:
         self._cleanup_expired_sessions()
@@ -184,6 +184,165 @@ def invalidate_analytics(user_id: str) -> None:
             for k in [k for k in list(_fallback.keys()) if k.startswith("bw:analytics:")]:
                 del _fallback[k]
 
+CHAT_PAGE_TTL: int = 600
+
+def _chat_page_key(session_id: int) -> str:
+    return f"bw:chat:latest:{session_id}"
+
+def get_chat_page(session_id: int) -> Any | None:
+    key = _chat_page_key(session_id)
+    return _redis_get(key) if _redis_client else _fallback_get(key)
+
+def set_chat_page(session_id: int, page: Any, ttl: int = CHAT_PAGE_TTL) -> None:
+    key = _chat_page_key(session_id)
+    if _redis_client:
+        _redis_set(key, page, ttl)
+    else:
+        _fallback_set(key, page, ttl)
+
+def invalidate_chat_page(session_id: int) -> None:
+    key = _chat_page_key(session_id)
+    if _redis_client:
+        try:
+            _redis_client.delete(key)
+        except Exception as e:
+            logger.debug("Cache invalidate_chat_page failed: %s", e)
+    else:
+        with _lock:
+            _fallback.pop(key, None)
+
+WEAKNESS_TTL: int = int(os.getenv("WEAKNESS_SNAPSHOT_TTL_SECONDS", "900"))
+
+def _weakness_key(user_id: int) -> str:
+    return f"bw:weakness:{user_id}"
+
+def _weakness_dirty_key(user_id: int) -> str:
+    return f"bw:weakness:dirty:{user_id}"
+
+def get_weakness_snapshot(user_id: int) -> Any | None:
+    key = _weakness_key(user_id)
+    return _redis_get(key) if _redis_client else _fallback_get(key)
+
+def set_weakness_snapshot(user_id: int, snapshot: Any, ttl: int = WEAKNESS_TTL) -> None:
+    key = _weakness_key(user_id)
+    if _redis_client:
+        _redis_set(key, snapshot, ttl)
+    else:
+        _fallback_set(key, snapshot, ttl)
+
+def _mark_dirty(key: str, parts: tuple[str, ...], ttl: int) -> None:
+    if _redis_client:
+        try:
+            pipe = _redis_client.pipeline()
+            pipe.sadd(key, *parts)
+            pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.debug("Cache mark dirty %s failed: %s", key, e)
+        return
+    with _lock:
+        item = _fallback.get(key)
+        marks = item[0] if item and time.monotonic() <= item[1] else set()
+        marks.update(parts)
+        _evict_fallback()
+        _fallback[key] = (marks, time.monotonic() + ttl)
+
+def _pop_dirty(key: str) -> set[str]:
+    """Return and clear a dirty set; {"*"} when Redis fails, so callers rebuild."""
+    if _redis_client:
+        try:
+            pipe = _redis_client.pipeline(transaction=True)
+            pipe.smembers(key)
+            pipe.delete(key)
+            members, _ = pipe.execute()
+            return set(members or ())
+        except Exception as e:
+            logger.debug("Cache pop dirty %s failed: %s", key, e)
+            return {"*"}
+    with _lock:
+        item = _fallback.pop(key, None)
+    if item is None or time.monotonic() > item[1]:
+        return set()
+    return set(item[0])
+
+def mark_weakness_dirty(user_id: int, *parts: str) -> None:
+    """Record which parts of a user's weakness snapshot an event touched."""
+    if parts:
+        _mark_dirty(_weakness_dirty_key(user_id), parts, WEAKNESS_TTL)
+
+def pop_weakness_dirty(user_id: int) -> set[str]:
+    return _pop_dirty(_weakness_dirty_key(user_id))
+
+SUGGESTION_CONTEXT_TTL: int = int(os.getenv("SUGGESTION_CONTEXT_TTL_SECONDS", "120"))
+
+def _suggestion_context_key(user_id: str) -> str:
+    return f"bw:suggest:ctx:{user_id}"
+
+def get_suggestion_context(user_id: str) -> Any | None:
+    key = _suggestion_context_key(user_id)
+    return _redis_get(key) if _redis_client else _fallback_get(key)
+
+def set_suggestion_context(user_id: str, context: Any, ttl: int = SUGGESTION_CONTEXT_TTL) -> None:
+    key = _suggestion_context_key(user_id)
+    if _redis_client:
+        _redis_set(key, context, ttl)
+    else:
+        _fallback_set(key, context, ttl)
+
+def invalidate_suggestion_context(user_id: str) -> None:
+    key = _suggestion_context_key(user_id)
+    if _redis_client:
+        try:
+            _redis_client.delete(key)
+        except Exception as e:
+            logger.debug("Cache invalidate_suggestion_context failed: %s", e)
+    else:
+        with _lock:
+            _fallback.pop(key, None)
+
+KNOWLEDGE_GRAPH_TTL: int = int(os.getenv("KNOWLEDGE_GRAPH_TTL_SECONDS", "1800"))
+
+def _knowledge_graph_key(user_id: int) -> str:
+    return f"bw:kgraph:{user_id}"
+
+def _knowledge_graph_dirty_key(user_id: int) -> str:
+    return f"bw:kgraph:dirty:{user_id}"
+
+def get_knowledge_graph(user_id: int) -> Any | None:
+    key = _knowledge_graph_key(user_id)
+    return _redis_get(key) if _redis_client else _fallback_get(key)
+
+def set_knowledge_graph(user_id: int, snapshot: Any, ttl: int = KNOWLEDGE_GRAPH_TTL) -> None:
+    key = _knowledge_graph_key(user_id)
+    if _redis_client:
+        _redis_set(key, snapshot, ttl)
+    else:
+        _fallback_set(key, snapshot, ttl)
+
+def mark_knowledge_graph_dirty(user_id: int, *parts: str) -> None:
+    """Record which parts of a user's knowledge-universe graph a write touched."""
+    if parts:
+        _mark_dirty(_knowledge_graph_dirty_key(user_id), parts, KNOWLEDGE_GRAPH_TTL)
+
+def pop_knowledge_graph_dirty(user_id: int) -> set[str]:
+    return _pop_dirty(_knowledge_graph_dirty_key(user_id))
+
+PODCAST_CONTENT_TTL: int = int(os.getenv("PODCAST_CONTENT_TTL_SECONDS", "28800"))
+
+def _podcast_content_key(session_id: str) -> str:
+    return f"bw:podcast:content:{session_id}"
+
+def get_podcast_content(session_id: str) -> Any | None:
+    key = _podcast_content_key(session_id)
+    return _redis_get(key) if _redis_client else _fallback_get(key)
+
+def set_podcast_content(session_id: str, content: Any, ttl: int = PODCAST_CONTENT_TTL) -> None:
+    key = _podcast_content_key(session_id)
+    if _redis_client:
+        _redis_set(key, content, ttl)
+    else:
+        _fallback_set(key, content, ttl)
+
 def cache_stats() -> dict:
     stats: dict[str, Any] = {
         "backend": "redis" if _redis_client else "memory",
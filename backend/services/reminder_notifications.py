@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# Reminder notifications are materialized ahead of the poll instead of during
+# it. Every reminder carries notify_at, the UTC instant its notification should
+# fire (reminder_date is stored as the user's local wall time, so the client's
+# getTimezoneOffset() is saved alongside it). A scheduler job inserts due
+# notifications keyed by (reminder_id, fire_at); the unique constraint is the
+# dedupe, so a second worker or the create/update path racing the job simply
+# hits IntegrityError. Clients then read "unread since cursor" or long-poll.
+MATERIALIZE_INTERVAL_SECONDS = int(os.getenv("REMINDER_MATERIALIZE_INTERVAL_SECONDS", "30"))
+MATERIALIZE_BATCH = int(os.getenv("REMINDER_MATERIALIZE_BATCH", "500"))
+LONG_POLL_RECHECK_SECONDS = float(os.getenv("NOTIFICATION_LONG_POLL_RECHECK_SECONDS", "5"))
+OFFSET_ADOPTED_TTL_SECONDS = int(os.getenv("REMINDER_OFFSET_ADOPTED_TTL_SECONDS", "3600"))
+
+_listeners: dict[int, set[asyncio.Event]] = defaultdict(set)
+# user_id -> monotonic expiry. One TTL for every entry keeps insertion order
+# equal to expiry order, so expired users are popped from the front.
+_offset_adopted: OrderedDict[int, float] = OrderedDict()
+
+
+def _normalize_dt(dt: Optional[datetime]) -> Optional[datetime]:
+    if not dt:
+        return None
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def safe_notify_before_minutes(reminder: models.Reminder, default: int = 15) -> int:
+    try:
+        return int(reminder.notify_before_minutes if reminder.notify_before_minutes is not None else default)
+    except Exception:
+        return default
+
+
+def reminder_notif_meta(reminder: models.Reminder) -> tuple[str, str]:
+    notif_type = "calendar_event" if reminder.reminder_type in ("event", "calendar_event") else "reminder"
+    title_prefix = "Event" if notif_type == "calendar_event" else "Reminder"
+    return notif_type, title_prefix
+
+
+def reminder_notification_marker(reminder_id: int) -> str:
+    return f"[reminder_id:{reminder_id}]"
+
+
+def reminder_due_at_marker(reminder_dt: datetime) -> str:
+    return f"[reminder_due_at:{reminder_dt.isoformat()}]"
+
+
+def compute_notify_at(reminder: models.Reminder) -> Optional[datetime]:
+    reminder_dt = _normalize_dt(reminder.reminder_date)
+    if reminder_dt is None or reminder.timezone_offset is None:
+        return None
+    return reminder_dt + timedelta(minutes=reminder.timezone_offset - safe_notify_before_minutes(reminder))
+
+
+@event.listens_for(models.Reminder, "before_insert")
+@event.listens_for(models.Reminder, "before_update")
+def _schedule_reminder(mapper, connection, target):
+    target.notify_at = compute_notify_at(target)
+
+
+def adopt_client_offset(db: Session, user_id: int, timezone_offset: int) -> int:
+    """Schedule reminders saved before notify_at existed, using the offset the
+    client reports while polling. Runs at most once per user per process
+    every OFFSET_ADOPTED_TTL_SECONDS."""
+    now = time.monotonic()
+    while _offset_adopted and next(iter(_offset_adopted.values())) <= now:
+        _offset_adopted.popitem(last=False)
+    if user_id in _offset_adopted:
+        return 0
+    pending = db.query(models.Reminder).filter(
+        models.Reminder.user_id == user_id,
+        models.Reminder.timezone_offset == None,
+        models.Reminder.is_completed == False,
+        models.Reminder.reminder_date != None,
+    ).all()
+    for reminder in pending:
+        reminder.timezone_offset = timezone_offset
+    if pending:
+        db.commit()
+    _offset_adopted[user_id] = now + OFFSET_ADOPTED_TTL_SECONDS
+    return len(pending)
+
+
+def _build_notification(reminder: models.Reminder, now: datetime) -> models.Notification:
+    reminder_dt = _normalize_dt(reminder.reminder_date)
+    due_utc = reminder_dt + timedelta(minutes=reminder.timezone_offset or 0)
+    minutes_until = (due_utc - now).total_seconds() / 60
+    notif_type, title_prefix = reminder_notif_meta(reminder)
+
+    base_title = f"{title_prefix}: {reminder.title}"
+    reminder_time = reminder_dt.strftime("%I:%M %p")
+    if minutes_until <= 0:
+        title = f"{base_title} - NOW!"
+        message = f"{reminder.description or 'Your reminder is due now.'} - Scheduled for {reminder_time}"
+    elif minutes_until <= 5:
+        title = f"{base_title} - In {max(1, int(minutes_until))} min!"
+        message = f"{reminder.description or 'Your reminder is coming up.'} - Due at {reminder_time}"
+    else:
+        title = base_title
+        message = f"{reminder.description or 'Your scheduled reminder'} - Due at {reminder_time} (in {int(minutes_until)} min)"
+    message = f"{message} {reminder_notification_marker(reminder.id)} {reminder_due_at_marker(reminder_dt)}"
+
+    return models.Notification(
+        user_id=reminder.user_id,
+        title=title,
+        message=message,
+        notification_type=notif_type,
+        reminder_id=reminder.id,
+        fire_at=reminder.notify_at,
+    )
+
+
+def _materialize(db: Session, reminder: models.Reminder, now: datetime) -> Optional[models.Notification]:
+    notification = _build_notification(reminder, now)
+    try:
+        with db.begin_nested():
+            db.add(notification)
+    except IntegrityError:
+        notification = None
+    reminder.is_notified = True
+    return notification
+
+
+def materialize_reminder(db: Session, reminder: models.Reminder, now: Optional[datetime] = None) -> Optional[models.Notification]:
+    """Create the notification for one reminder if it is already inside its
+    notify window. Used right after a create/update so the user does not wait
+    for the next scheduler tick."""
+    now = now or _utcnow()
+    if reminder.is_completed or reminder.is_notified or reminder.notify_at is None or reminder.notify_at > now:
+        return None
+    notification = _materialize(db, reminder, now)
+    db.commit()
+    if notification is not None:
+        logger.info("Created reminder notification for: %s", reminder.title)
+    return notification
+
+
+def materialize_due(
+    db: Session,
+    now: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    limit: int = MATERIALIZE_BATCH,
+) -> list[models.Notification]:
+    """Insert notifications for every reminder whose notify_at has passed, in
+    one indexed range read over (is_notified, notify_at)."""
+    now = now or _utcnow()
+    query = db.query(models.Reminder).filter(
+        models.Reminder.is_notified == False,
+        models.Reminder.notify_at != None,
+        models.Reminder.notify_at <= now,
+        models.Reminder.is_completed == False,
+    )
+    if user_id is not None:
+        query = query.filter(models.Reminder.user_id == user_id)
+    reminders = query.order_by(models.Reminder.notify_at).limit(limit).all()
+
+    created = []
+    for reminder in reminders:
+        notification = _materialize(db, reminder, now)
+        if notification is not None:
+            created.append(notification)
+    if reminders:
+        db.commit()
+    if created:
+        logger.info("Materialized %d reminder notifications", len(created))
+    return created
+
+
+def unread_since(db: Session, user_id: int, cursor: int, limit: int = 50) -> list[models.Notification]:
+    return (
+        db.query(models.Notification)
+        .filter(
+            models.Notification.user_id == user_id,
+            models.Notification.id > cursor,
+            models.Notification.is_read == False,
+        )
+        .order_by(models.Notification.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def serialize(notification: models.Notification) -> dict:
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "message": notification.message,
+        "notification_type": notification.notification_type,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat() + "Z",
+    }
+
+
+async def wait_for_notifications(user_id: int, timeout: float) -> bool:
+    """Block until publish() fires for this user or the timeout passes."""
+    waiter = asyncio.Event()
+    _listeners[user_id].add(waiter)
+    try:
+        await asyncio.wait_for(waiter.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        _listeners[user_id].discard(waiter)
+        if not _listeners[user_id]:
+            _listeners.pop(user_id, None)
+
+
+async def publish(notifications: list[dict]) -> None:
+    """Wake long-polls in this process and push over the user's websocket."""
+    from services.websocket_manager import manager
+
+    for payload in notifications:
+        user_id = payload["user_id"]
+        for waiter in list(_listeners.get(user_id, ())):
+            waiter.set()
+        await manager.send_personal_message(
+            {"type": "notification", "notification": payload["notification"]},
+            user_id,
+        )
+
+
+def _materialize_batch(session_factory) -> list[dict]:
+    db = session_factory()
+    try:
+        return [
+            {"user_id": n.user_id, "notification": serialize(n)}
+            for n in materialize_due(db)
+        ]
+    except Exception as e:
+        db.rollback()
+        logger.error("Reminder materialization failed: %s", e, exc_info=True)
+        return []
+    finally:
+        db.close()
+
+
+async def run_materialize_job(session_factory) -> int:
+    created = await asyncio.to_thread(_materialize_batch, session_factory)
+    if created:
+        await publish(created)
+    return len(created)
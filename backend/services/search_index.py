@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+import weakref
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# One row per searchable entity in search_documents (notes, flashcard sets,
+# chats, question sets, Atlas wiki pages), written in the same flush as the
+# entity itself. The table is owned here and by Alembic (revision
+# c8e1f3a4b457), not mapped, because its index columns are dialect specific:
+#   Postgres  tsv tsvector (generated from title A / body B) with a GIN index,
+#             plus a pg_trgm GIN index on title for typo-tolerant matches
+#   SQLite    an external-content FTS5 table kept in step by triggers
+# Ranked search returns the entity's display columns, author name and child
+# counts from a single statement; routes/search.py falls back to its LIKE
+# scan when the index is missing.
+#
+# Bodies are indexed up to BODY_CHARS, far past any real note, so matches deep
+# in long notes are still found; the cap only keeps one document's Postgres
+# tsvector clear of its 1 MB limit. Result rows carry the first SNIPPET_CHARS.
+BODY_CHARS = 200_000
+SNIPPET_CHARS = 4000
+QUESTION_TEXTS_PER_SET = 50
+DEFAULT_LIMIT = 200
+PUBLIC_TYPES = ("note", "flashcard_set")
+# How long a probe result is trusted, so a failed probe or a migration run
+# against a live process is picked up without a restart.
+AVAILABILITY_TTL_SECONDS = 300
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_availability: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+SQLITE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS search_documents (
+        id          INTEGER     PRIMARY KEY,
+        entity_type VARCHAR(20) NOT NULL,
+        entity_id   INTEGER     NOT NULL,
+        owner_id    INTEGER     NOT NULL,
+        is_public   BOOLEAN     NOT NULL DEFAULT 0,
+        title       VARCHAR(255),
+        body        TEXT,
+        created_at  DATETIME
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_search_documents_entity ON search_documents (entity_type, entity_id)",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_owner_type ON search_documents (owner_id, entity_type)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+        title, body,
+        content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_documents_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+)
+
+_UPSERT_SQL = text("""
+    INSERT INTO search_documents (entity_type, entity_id, owner_id, is_public, title, body, created_at)
+    VALUES (:entity_type, :entity_id, :owner_id, :is_public, :title, :body, :created_at)
+    ON CONFLICT (entity_type, entity_id) DO UPDATE SET
+        owner_id = excluded.owner_id,
+        is_public = excluded.is_public,
+        title = excluded.title,
+        body = excluded.body,
+        created_at = excluded.created_at
+""")
+_DELETE_SQL = text("DELETE FROM search_documents WHERE entity_type = :entity_type AND entity_id = :entity_id")
+
+
+def create_sqlite_schema(connection) -> None:
+    for statement in SQLITE_SCHEMA:
+        connection.execute(text(statement))
+
+
+def available(db: Session) -> bool:
+    """Whether the migration has installed the index on this database. Probed
+    on the session's own connection so the check joins its transaction, and
+    re-probed once the cached answer is AVAILABILITY_TTL_SECONDS old."""
+    key = db.get_bind()
+    key = getattr(key, "engine", key)
+    cached = _availability.get(key)
+    if cached is None or cached[1] <= time.monotonic():
+        try:
+            connection = db.connection()
+            inspector = inspect(connection)
+            tables = set(inspector.get_table_names())
+            if connection.dialect.name == "sqlite":
+                ready = {"search_documents", "search_documents_fts"} <= tables
+            else:
+                ready = "search_documents" in tables and any(
+                    col["name"] == "tsv" for col in inspector.get_columns("search_documents")
+                )
+        except Exception as e:
+            logger.warning(f"Search index probe failed: {e}")
+            ready = False
+        cached = (ready, time.monotonic() + AVAILABILITY_TTL_SECONDS)
+        _availability[key] = cached
+    return cached[0]
+
+
+def remove_documents(db: Session, entity_type: str, entity_ids: Iterable[int]) -> None:
+    """Drop the rows of entities removed with a query-level delete, which the
+    flush hook never sees. Runs in the caller's transaction."""
+    params = [{"entity_type": entity_type, "entity_id": entity_id} for entity_id in entity_ids]
+    if params and available(db):
+        db.connection().execute(_DELETE_SQL, params)
+
+
+def _clip(value: Optional[str], limit: int) -> str:
+    return (value or "")[:limit]
+
+
+def _document_for(obj, connection) -> Optional[dict]:
+    if getattr(obj, "user_id", None) is None:
+        return None
+    if isinstance(obj, models.Note):
+        if obj.is_deleted:
+            return None
+        return {
+            "entity_type": "note", "entity_id": obj.id, "owner_id": obj.user_id,
+            "is_public": bool(obj.is_public), "title": _clip(obj.title, 255),
+            "body": _clip(obj.content, BODY_CHARS), "created_at": obj.created_at,
+        }
+    if isinstance(obj, models.FlashcardSet):
+        return {
+            "entity_type": "flashcard_set", "entity_id": obj.id, "owner_id": obj.user_id,
+            "is_public": bool(obj.is_public), "title": _clip(obj.title, 255),
+            "body": _clip(obj.description, BODY_CHARS), "created_at": obj.created_at,
+        }
+    if isinstance(obj, models.ChatSession):
+        return {
+            "entity_type": "chat", "entity_id": obj.id, "owner_id": obj.user_id,
+            "is_public": False, "title": _clip(obj.title, 255), "body": "",
+            "created_at": obj.created_at,
+        }
+    if isinstance(obj, models.QuestionSet):
+        question_texts = connection.execute(
+            text("SELECT question_text FROM questions WHERE question_set_id = :set_id ORDER BY order_index, id LIMIT :limit"),
+            {"set_id": obj.id, "limit": QUESTION_TEXTS_PER_SET},
+        ).scalars().all()
+        body = "\n".join([obj.description or ""] + [q for q in question_texts if q])
+        return {
+            "entity_type": "question_set", "entity_id": obj.id, "owner_id": obj.user_id,
+            "is_public": False, "title": _clip(obj.title, 255),
+            "body": _clip(body, BODY_CHARS), "created_at": obj.created_at,
+        }
+    if isinstance(obj, models.AtlasWikiPage):
+        body = "\n".join([obj.path or "", obj.summary or "", obj.content or ""])
+        return {
+            "entity_type": "wiki_page", "entity_id": obj.id, "owner_id": obj.user_id,
+            "is_public": False, "title": _clip(obj.title, 255),
+            "body": _clip(body, BODY_CHARS), "created_at": obj.created_at,
+        }
+    return None
+
+
+_ENTITY_TYPES = {
+    models.Note: "note",
+    models.FlashcardSet: "flashcard_set",
+    models.ChatSession: "chat",
+    models.QuestionSet: "question_set",
+    models.AtlasWikiPage: "wiki_page",
+}
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_documents(session, flush_context):
+    changed: dict[tuple[str, int], object] = {}
+    removed: set[tuple[str, int]] = set()
+    question_set_ids: set[int] = set()
+
+    for obj in list(session.new) + list(session.dirty):
+        entity_type = _ENTITY_TYPES.get(type(obj))
+        if entity_type and obj.id is not None:
+            changed[(entity_type, obj.id)] = obj
+        elif isinstance(obj, models.Question) and obj.question_set_id:
+            question_set_ids.add(obj.question_set_id)
+    for obj in session.deleted:
+        entity_type = _ENTITY_TYPES.get(type(obj))
+        if entity_type and obj.id is not None:
+            removed.add((entity_type, obj.id))
+        elif isinstance(obj, models.Question) and obj.question_set_id:
+            question_set_ids.add(obj.question_set_id)
+
+    for set_id in question_set_ids:
+        key = ("question_set", set_id)
+        if key not in changed and key not in removed:
+            question_set = session.identity_map.get((models.QuestionSet, (set_id,), None))
+            if question_set is None:
+                question_set = session.get(models.QuestionSet, set_id)
+            if question_set is not None:
+                changed[key] = question_set
+    if not changed and not removed:
+        return
+    if not available(session):
+        return
+
+    connection = session.connection()
+    try:
+        for (entity_type, entity_id) in removed:
+            connection.execute(_DELETE_SQL, {"entity_type": entity_type, "entity_id": entity_id})
+        for (entity_type, entity_id), obj in changed.items():
+            document = _document_for(obj, connection)
+            if document is None:
+                connection.execute(_DELETE_SQL, {"entity_type": entity_type, "entity_id": entity_id})
+            else:
+                connection.execute(_UPSERT_SQL, document)
+    except Exception as e:
+        logger.error(f"Search index sync failed: {e}")
+        raise
+
+
+def _term_tokens(terms: Iterable[str]) -> list[list[str]]:
+    token_groups = []
+    seen = set()
+    for term in terms:
+        tokens = [t.lower() for t in _TOKEN_RE.findall(term or "")]
+        key = tuple(tokens)
+        if tokens and key not in seen:
+            seen.add(key)
+            token_groups.append(tokens)
+    return token_groups
+
+
+def fts5_query(terms: Iterable[str]) -> str:
+    """Any term matches; within a term every word must appear, as a prefix."""
+    groups = _term_tokens(terms)
+    return " OR ".join("(" + " ".join(f'"{token}"*' for token in tokens) + ")" for tokens in groups)
+
+
+def tsquery(terms: Iterable[str]) -> str:
+    groups = _term_tokens(terms)
+    return " | ".join("(" + " & ".join(f"{token}:*" for token in tokens) + ")" for tokens in groups)
+
+
+# Ranking and LIMIT happen in the inner query; author and display columns
+# are joined, and child rows counted, for the returned page only.
+_PAGE_SQL = """
+    SELECT
+        d.entity_type, d.entity_id, d.owner_id, d.is_public, d.title, d.body, d.created_at, d.rank,
+        u.username AS author,
+        n.uid AS note_uid, n.is_favorite AS note_is_favorite, n.folder_id AS note_folder_id,
+        fs.public_token AS set_uid, fs.source_type AS set_source_type,
+        c.public_token AS chat_uid, c.folder_id AS chat_folder_id, c.updated_at AS chat_updated_at,
+        CASE d.entity_type
+            WHEN 'flashcard_set' THEN (SELECT COUNT(*) FROM flashcards f WHERE f.set_id = d.entity_id)
+            WHEN 'question_set' THEN (SELECT COUNT(*) FROM questions q WHERE q.question_set_id = d.entity_id)
+            WHEN 'chat' THEN (SELECT COUNT(*) FROM chat_messages m WHERE m.chat_session_id = d.entity_id)
+        END AS item_count
+    FROM ({ranked}) d
+    LEFT JOIN users u ON u.id = d.owner_id
+    LEFT JOIN notes n ON d.entity_type = 'note' AND n.id = d.entity_id
+    LEFT JOIN flashcard_sets fs ON d.entity_type = 'flashcard_set' AND fs.id = d.entity_id
+    LEFT JOIN chat_sessions c ON d.entity_type = 'chat' AND c.id = d.entity_id
+    ORDER BY d.rank DESC
+"""
+_DOCUMENT_COLUMNS = (
+    "d.entity_type, d.entity_id, d.owner_id, d.is_public, d.title, "
+    f"substr(d.body, 1, {SNIPPET_CHARS}) AS body, d.created_at"
+)
+
+
+def search(
+    db: Session,
+    user_id: int,
+    terms: list[str],
+    entity_types: list[str],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> list[dict]:
+    """Ranked matches the user may see (own rows, or public notes and
+    flashcard sets), best first, as rows ready for to_result()."""
+    entity_types = [t for t in entity_types if t in _ENTITY_TYPES.values()]
+    if not entity_types:
+        return []
+    params: dict = {"user_id": user_id, "limit": limit}
+    type_params = []
+    for i, entity_type in enumerate(entity_types):
+        params[f"type_{i}"] = entity_type
+        type_params.append(f":type_{i}")
+    filters = [
+        f"d.entity_type IN ({', '.join(type_params)})",
+        "(d.owner_id = :user_id OR d.is_public = :public)",
+    ]
+    params["public"] = True
+    if date_from:
+        filters.append("d.created_at >= :date_from")
+        params["date_from"] = date_from
+    if date_to:
+        filters.append("d.created_at <= :date_to")
+        params["date_to"] = date_to
+
+    if db.get_bind().dialect.name == "sqlite":
+        match = fts5_query(terms)
+        if not match:
+            return []
+        params["match"] = match
+        ranked = f"""
+            SELECT {_DOCUMENT_COLUMNS}, -bm25(search_documents_fts, 10.0, 1.0) AS rank
+            FROM search_documents_fts
+            JOIN search_documents d ON d.id = search_documents_fts.rowid
+            WHERE search_documents_fts MATCH :match AND {' AND '.join(filters)}
+            ORDER BY rank DESC
+            LIMIT :limit
+        """
+    else:
+        query = tsquery(terms)
+        if not query:
+            return []
+        params["tsq"] = query
+        params["raw"] = " ".join(terms[:1])
+        ranked = f"""
+            SELECT {_DOCUMENT_COLUMNS},
+                   ts_rank_cd(d.tsv, to_tsquery('simple', :tsq)) + similarity(d.title, :raw) AS rank
+            FROM search_documents d
+            WHERE (d.tsv @@ to_tsquery('simple', :tsq) OR d.title % :raw) AND {' AND '.join(filters)}
+            ORDER BY rank DESC
+            LIMIT :limit
+        """
+    sql = _PAGE_SQL.format(ranked=ranked)
+    return [dict(row) for row in db.execute(text(sql), params).mappings()]
+
+
+def _iso(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def to_result(row: dict, user_id: int) -> dict:
+    """Shape an index row like the per-type dicts search_content has always returned."""
+    entity_type = row["entity_type"]
+    base = {
+        "id": row["entity_id"],
+        "type": entity_type,
+        "created_at": _iso(row["created_at"]),
+        "relevance": round(float(row.get("rank") or 0), 4),
+    }
+    author = {
+        "author": row["author"] or "Unknown",
+        "author_id": row["owner_id"],
+        "is_public": bool(row["is_public"]),
+        "is_own": row["owner_id"] == user_id,
+    }
+    if entity_type == "note":
+        return {
+            **base,
+            "uid": row["note_uid"],
+            "title": row["title"] or "Untitled Note",
+            "description": (row["body"] or "")[:200],
+            "is_favorite": bool(row["note_is_favorite"]),
+            "folder_id": row["note_folder_id"],
+            **author,
+        }
+    if entity_type == "flashcard_set":
+        return {
+            **base,
+            "uid": row["set_uid"],
+            "title": row["title"] or "Untitled Set",
+            "description": row["body"] or "",
+            "card_count": row["item_count"] or 0,
+            "source_type": row["set_source_type"],
+            **author,
+        }
+    if entity_type == "chat":
+        message_count = row["item_count"] or 0
+        return {
+            **base,
+            "uid": row["chat_uid"],
+            "title": row["title"] or "Untitled Chat",
+            "description": f"{message_count} messages",
+            "updated_at": _iso(row["chat_updated_at"]),
+            "message_count": message_count,
+            "folder_id": row["chat_folder_id"],
+        }
+    description = (row["body"] or "").split("\n", 1)[0]
+    return {
+        **base,
+        "title": row["title"],
+        "description": description,
+        "question_count": row["item_count"] or 0,
+        "difficulty": None,
+        "subject": None,
+    }
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from services.storage_service import LocalStorage, StorageService
+
+logger = logging.getLogger(__name__)
+
+# Rendered slide pages are content-addressed: the key is
+# (sha256 of the source document, page, scale, format), so a render never goes
+# stale and can be served with an immutable Cache-Control and a strong ETag.
+# Pages are written through the configured storage backend (local disk, S3, R2);
+# backends without upload_bytes fall back to local disk.
+SCALES = {
+    "full": 2.0,
+    "thumb": 0.35,
+}
+MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+PRERENDER_RADIUS = max(0, int(os.getenv("SLIDE_PRERENDER_RADIUS", "2")))
+PRERENDER_WORKERS = max(1, int(os.getenv("SLIDE_PRERENDER_WORKERS", "2")))
+LOSSY_QUALITY = int(os.getenv("SLIDE_RENDER_QUALITY", "80"))
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+MEMO_ENTRIES = max(1, int(os.getenv("SLIDE_MEMO_ENTRIES", "1024")))
+
+
+class PageOutOfRange(ValueError):
+    def __init__(self, page_count: int):
+        super().__init__(f"Invalid page number. File has {page_count} pages.")
+        self.page_count = page_count
+
+
+class _Memo:
+    """Least-recently-used map of at most MEMO_ENTRIES items, shared by request
+    and prerender threads."""
+
+    def __init__(self):
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > MEMO_ENTRIES:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+_hash_memo = _Memo()
+_page_count_memo = _Memo()
+_inflight: set[str] = set()
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_storage = None
+
+
+def _get_storage():
+    global _storage
+    if _storage is None:
+        storage = StorageService.get_storage()
+        if not (hasattr(storage, "upload_bytes") and hasattr(storage, "download_bytes")):
+            storage = LocalStorage()
+        _storage = storage
+    return _storage
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PRERENDER_WORKERS, thread_name_prefix="slide-prerender")
+    return _executor
+
+
+def document_hash(path: Path) -> str:
+    """sha256 of the file, memoized on (path, size, mtime) so repeat page views
+    do not re-read the document."""
+    stat = os.stat(path)
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    cached = _hash_memo.get(memo_key)
+    if cached:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    _hash_memo[memo_key] = value
+    return value
+
+
+def supported_formats() -> set[str]:
+    formats = {"png"}
+    try:
+        from PIL import features
+
+        if features.check("webp"):
+            formats.add("webp")
+        if features.check("avif"):
+            formats.add("avif")
+    except Exception:
+        pass
+    return formats
+
+
+def negotiate_format(requested: str, accept: str = "") -> str:
+    """Resolve ?format= (png, webp, avif or auto) against what Pillow can encode;
+    auto picks the smallest format the Accept header allows."""
+    available = supported_formats()
+    requested = (requested or "png").lower()
+    if requested == "auto":
+        accept = (accept or "").lower()
+        for fmt in ("avif", "webp"):
+            if fmt in available and f"image/{fmt}" in accept:
+                return fmt
+        return "png"
+    return requested if requested in available else "png"
+
+
+def cache_key(doc_hash: str, page_number: int, scale: str, fmt: str) -> str:
+    return f"slide_renders/{doc_hash[:2]}/{doc_hash}/{page_number}@{scale}.{fmt}"
+
+
+def etag_for(doc_hash: str, page_number: int, scale: str, fmt: str) -> str:
+    return f'"{doc_hash[:20]}-{page_number}-{scale}-{fmt}"'
+
+
+def page_count(pdf_path: Path, doc_hash: str) -> int:
+    cached = _page_count_memo.get(doc_hash)
+    if cached is not None:
+        return cached
+    import fitz
+
+    with fitz.open(str(pdf_path)) as doc:
+        count = len(doc)
+    _page_count_memo[doc_hash] = count
+    return count
+
+
+def render_pdf_page(pdf_path: Path, page_number: int, scale: str, fmt: str) -> bytes:
+    import fitz
+
+    with fitz.open(str(pdf_path)) as doc:
+        if page_number < 1 or page_number > len(doc):
+            raise PageOutOfRange(len(doc))
+        zoom = SCALES[scale]
+        pix = doc[page_number - 1].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        if fmt == "png":
+            return pix.tobytes("png")
+        from PIL import Image
+
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        buffer = io.BytesIO()
+        img.save(buffer, format=fmt.upper(), quality=LOSSY_QUALITY)
+        return buffer.getvalue()
+
+
+def get_or_render(
+    pdf_path: Path,
+    doc_hash: str,
+    page_number: int,
+    scale: str,
+    fmt: str,
+    render: Callable[[Path, int, str, str], bytes] = render_pdf_page,
+    storage=None,
+) -> bytes:
+    storage = storage or _get_storage()
+    key = cache_key(doc_hash, page_number, scale, fmt)
+    try:
+        return storage.download_bytes(key)
+    except Exception:
+        pass
+    content = render(pdf_path, page_number, scale, fmt)
+    try:
+        storage.upload_bytes(content, key, MEDIA_TYPES[fmt])
+    except Exception as e:
+        logger.warning(f"Could not store rendered slide page {key}: {e}")
+    return content
+
+
+def _prerender_one(pdf_path, doc_hash, page_number, scale, fmt, render, storage):
+    key = cache_key(doc_hash, page_number, scale, fmt)
+    try:
+        if not storage.file_exists(key):
+            storage.upload_bytes(render(pdf_path, page_number, scale, fmt), key, MEDIA_TYPES[fmt])
+    except Exception as e:
+        logger.debug(f"Slide pre-render skipped for {key}: {e}")
+    finally:
+        with _lock:
+            _inflight.discard(key)
+
+
+def schedule_prerender(
+    pdf_path: Path,
+    doc_hash: str,
+    page_number: int,
+    total_pages: int,
+    scale: str,
+    fmt: str,
+    render: Callable[[Path, int, str, str], bytes] = render_pdf_page,
+    storage=None,
+    executor=None,
+) -> list[int]:
+    """Queue renders for the pages either side of the one being viewed, nearest
+    first and forward before backward. Returns the pages queued."""
+    storage = storage or _get_storage()
+    executor = executor or _get_executor()
+    neighbours = []
+    for distance in range(1, PRERENDER_RADIUS + 1):
+        neighbours.extend([page_number + distance, page_number - distance])
+    queued = []
+    for page in neighbours:
+        if page < 1 or page > total_pages:
+            continue
+        key = cache_key(doc_hash, page, scale, fmt)
+        with _lock:
+            if key in _inflight:
+                continue
+            _inflight.add(key)
+        executor.submit(_prerender_one, pdf_path, doc_hash, page, scale, fmt, render, storage)
+        queued.append(page)
+    return queued
@@ -58,9 +58,12 @@ def build_chroma_prompts(user_id: str) -> list:
     if not chroma_store.available():
         return []
 
-    episodes = []
-    for source in ("note_activity", "flashcard_created", "chat", "flashcard_review", "quiz_created", "quiz_completed"):
-        episodes.extend(chroma_store.retrieve_recent_by_source(user_id, source, top_k=5))
+    try:
+        context = chroma_store.retrieve_recent_context(user_id, per_source=5)
+    except Exception:
+        return []
+
+    episodes = [e for source in chroma_store.RECENT_SOURCES for e in context["episodes"].get(source, [])]
 
     prompts = []
     for entry in episodes:
@@ -107,7 +110,7 @@ def build_chroma_prompts(user_id: str) -> list:
             prompts.append({"text": f"create flashcards on {topic}", "reason": "Turn the discussion into practice", "priority": "medium"})
 
     try:
-        weak_topics = chroma_store.get_weak_quiz_topics(user_id, top_k=3)
+        weak_topics = chroma_store.weak_topics_from_history(context["quiz_history"], top_k=3)
         for wt in weak_topics:
             if is_valid_topic(wt):
                 prompts.append({"text": f"quiz me on {wt}", "reason": "Focus on weaker areas", "priority": "high"})
@@ -116,8 +119,7 @@ def build_chroma_prompts(user_id: str) -> list:
         pass
 
     try:
-        important_entries = chroma_store.retrieve_important(user_id, top_k=3)
-        for entry in important_entries:
+        for entry in context["important"][:3]:
             topic = extract_topic_from_episode(entry)
             if not topic:
                 continue
@@ -136,12 +138,17 @@ def get_chroma_suggestions(user_id: str, query: Optional[str], limit: int = 8) -
     if not chroma_store.available():
         return []
 
+    try:
+        context = chroma_store.retrieve_recent_context(user_id, per_source=5)
+    except Exception:
+        context = {"episodes": {}, "quiz_history": [], "important": []}
+
     episodes: List[dict] = []
     if query:
         episodes = chroma_store.retrieve_episodes_filtered(user_id, query, top_k=limit)
     else:
-        for source in ("note_activity", "flashcard_created", "chat", "flashcard_review", "quiz_created", "quiz_completed"):
-            episodes.extend(chroma_store.retrieve_recent_by_source(user_id, source, top_k=4))
+        for source in chroma_store.RECENT_SOURCES:
+            episodes.extend(context["episodes"].get(source, [])[:4])
 
     suggestions: List[str] = []
     seen_topics: set = set()
@@ -182,7 +189,7 @@ def get_chroma_suggestions(user_id: str, query: Optional[str], limit: int = 8) -
             break
 
     try:
-        weak_topics = chroma_store.get_weak_quiz_topics(user_id, top_k=2)
+        weak_topics = chroma_store.weak_topics_from_history(context["quiz_history"], top_k=2)
         for wt in weak_topics:
             if is_valid_topic(wt):
                 suggestions.insert(0, f"/flashcards {wt}")
@@ -191,8 +198,7 @@ def get_chroma_suggestions(user_id: str, query: Optional[str], limit: int = 8) -
         pass
 
     try:
-        important_entries = chroma_store.retrieve_important(user_id, top_k=3)
-        for entry in important_entries:
+        for entry in context["important"][:3]:
             topic = extract_topic_from_episode(entry)
             if not topic or topic.lower() in seen_topics:
                 continue
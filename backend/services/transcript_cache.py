@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from services import redis_cache
+
+logger = logging.getLogger(__name__)
+
+# YouTube transcripts and video metadata, shared across workers through Redis
+# when it is connected and kept on local disk otherwise. Entries are compact
+# JSON, zlib-compressed, with a TTL; failures are cached too, for
+# NEGATIVE_TTL, so a video without captions is not re-fetched through
+# youtube-transcript-api and yt-dlp on every request. Both stores are bounded
+# to MAX_ENTRIES and evict least recently used entries first.
+TRANSCRIPT_TTL = int(os.getenv("YOUTUBE_TRANSCRIPT_CACHE_TTL_SECONDS", str(30 * 86400)))
+INFO_TTL = int(os.getenv("YOUTUBE_INFO_CACHE_TTL_SECONDS", str(7 * 86400)))
+NEGATIVE_TTL = int(os.getenv("YOUTUBE_NEGATIVE_CACHE_TTL_SECONDS", "1800"))
+MAX_ENTRIES = max(1, int(os.getenv("YOUTUBE_CACHE_MAX_ENTRIES", "5000")))
+CACHE_DIR = Path(__file__).resolve().parent.parent / "cache" / "transcripts"
+
+_REDIS_PREFIX = "bw:yt:"
+_REDIS_LRU = "bw:yt:lru"
+_FILE_SUFFIX = ".json.z"
+_EVICT_EVERY = 32
+
+
+def _encode(value: Any, expires_at: float) -> bytes:
+    payload = json.dumps({"e": expires_at, "v": value}, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"), 6)
+
+
+def _decode(blob: bytes) -> tuple[Any, float]:
+    data = json.loads(zlib.decompress(blob).decode("utf-8"))
+    return data["v"], float(data["e"])
+
+
+class FileStore:
+    """One compressed file per key; the file mtime is its last access time."""
+
+    def __init__(self, directory: Path, max_entries: int = MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_FILE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            value, expires_at = _decode(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Transcript cache read error for {key}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        if time.time() > expires_at:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(_encode(value, time.time() + ttl))
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"Transcript cache write error for {key}: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % _EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        files = []
+        for path in self.directory.glob(f"*{_FILE_SUFFIX}"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        excess = len(files) - self.max_entries
+        if excess <= 0:
+            return
+        files.sort(key=lambda item: item[0])
+        for _, path in files[:excess]:
+            path.unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in list(self.directory.glob(f"*{_FILE_SUFFIX}")) + list(self.directory.glob("*.json")):
+            path.unlink(missing_ok=True)
+
+
+class RedisStore:
+    """Keys expire through Redis TTLs; a sorted set of access times bounds the
+    number of entries."""
+
+    def __init__(self, client, max_entries: int = MAX_ENTRIES):
+        self.client = client
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(_REDIS_PREFIX + key)
+        if raw is None:
+            return None
+        value, _ = _decode(base64.b64decode(raw))
+        self.client.zadd(_REDIS_LRU, {key: time.time()})
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        blob = base64.b64encode(_encode(value, time.time() + ttl)).decode("ascii")
+        pipe = self.client.pipeline()
+        pipe.set(_REDIS_PREFIX + key, blob, ex=ttl)
+        pipe.zadd(_REDIS_LRU, {key: time.time()})
+        pipe.zcard(_REDIS_LRU)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = [k for k, _ in self.client.zpopmin(_REDIS_LRU, size - self.max_entries)]
+            if evicted:
+                self.client.delete(*[_REDIS_PREFIX + k for k in evicted])
+
+    def delete(self, key: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(_REDIS_PREFIX + key)
+        pipe.zrem(_REDIS_LRU, key)
+        pipe.execute()
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{_REDIS_PREFIX}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+_file_store = FileStore(CACHE_DIR)
+
+
+def _store():
+    client = redis_cache._redis_client
+    return RedisStore(client) if client is not None else _file_store
+
+
+def _stores() -> list:
+    store = _store()
+    return [store] if store is _file_store else [store, _file_store]
+
+
+def read(key: str) -> Optional[Any]:
+    store = _store()
+    try:
+        return store.get(key)
+    except Exception as e:
+        logger.debug(f"Transcript cache get failed for {key}: {e}")
+        return None
+
+
+def write(key: str, value: Any, ttl: int) -> None:
+    if ttl <= 0:
+        return
+    store = _store()
+    try:
+        store.set(key, value, ttl)
+    except Exception as e:
+        logger.debug(f"Transcript cache set failed for {key}: {e}")
+
+
+def delete(key: str) -> None:
+    for store in _stores():
+        try:
+            store.delete(key)
+        except Exception as e:
+            logger.debug(f"Transcript cache delete failed for {key}: {e}")
+
+
+def clear() -> None:
+    for store in _stores():
+        try:
+            store.clear()
+        except Exception as e:
+            logger.debug(f"Transcript cache clear failed: {e}")
+
+
+def migrate_legacy(video_id: str, key: str) -> Optional[Any]:
+    """Move a transcript from the old pretty-printed {video_id}.json file."""
+    path = CACHE_DIR / f"{video_id}.json"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Legacy transcript cache read error for {video_id}: {e}")
+        data = None
+    path.unlink(missing_ok=True)
+    if data and data.get("success"):
+        write(key, data, TRANSCRIPT_TTL)
+        return data
+    return None
+
+
+_inflight: dict[tuple[int, str], asyncio.Task] = {}
+
+
+async def single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Run factory once per key at a time in this process; concurrent callers
+    await the same task."""
+    loop = asyncio.get_running_loop()
+    slot = (id(loop), key)
+    task = _inflight.get(slot)
+    if task is None:
+        task = loop.create_task(factory())
+        _inflight[slot] = task
+        task.add_done_callback(lambda _t: _inflight.pop(slot, None))
+    return await asyncio.shield(task)
@@ -6,6 +6,7 @@ import logging
 import os
 import math
 import threading
+from contextvars import ContextVar
 from typing import Optional
 
 from sqlalchemy import create_engine, text
@@ -17,6 +18,11 @@ _embed_model = None
 _lazy_init_lock = threading.Lock()
 _lazy_init_attempted = False
 
+# Request-scoped memo of query embeddings and per-user existence probes. A
+# single tutor turn embeds the same user input for several collections/filters;
+# with a memo active the encoder runs once per distinct text for the whole turn.
+_request_memo: ContextVar[Optional[dict]] = ContextVar("vector_store_request_memo", default=None)
+
 _UPSERT_SQL_PG = text("""
     INSERT INTO embeddings (id, collection, user_id, content, embedding, metadata)
     VALUES (:id, :col, :uid, :content, CAST(:emb AS vector), CAST(:meta AS jsonb))
@@ -202,11 +208,10 @@ def _lazy_init() -> None:
             return
         _lazy_init_attempted = True
         try:
-            from sentence_transformers import SentenceTransformer
-            try:
-                embed_model = SentenceTransformer("BAAI/bge-small-en-v1.5")
-            except Exception:
-                embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+            from services import embedding_service
+            embed_model = embedding_service.get_model(embedding_service.PRIMARY_MODEL)
+            if embed_model is None:
+                raise RuntimeError("no embedding model could be loaded")
             initialize(embed_model)
             logger.info("vector_store lazily initialized on first use")
         except Exception as e:
@@ -231,15 +236,45 @@ def _verify_schema() -> None:
                 "initializing vector_store"
             ) from e
 
+def begin_request_memo():
+    return _request_memo.set({"embed": {}, "exists": {}})
+
+def clear_request_memo(token):
+    _request_memo.reset(token)
+
+def memoized_embedding(text_: str) -> Optional[list[float]]:
+    memo = _request_memo.get()
+    if memo is None:
+        return None
+    return memo["embed"].get(text_)
+
+def _remember_exists(collection: str, user_id: Optional[str]) -> None:
+    memo = _request_memo.get()
+    if memo is not None:
+        memo["exists"][(collection, user_id)] = True
+
+def _forget_exists(collection: str) -> None:
+    memo = _request_memo.get()
+    if memo is None:
+        return
+    for key in [k for k in memo["exists"] if k[0] == collection]:
+        memo["exists"].pop(key, None)
+
 def embed(text_: str) -> list[float]:
     if _embed_model is None:
         return [0.0] * 384
+    memo = _request_memo.get()
+    if memo is not None and text_ in memo["embed"]:
+        return memo["embed"][text_]
     try:
-        vec = _embed_model.encode(text_)
-        return vec.tolist() if hasattr(vec, "tolist") else list(vec)
+        from services import embedding_service
+        result = embedding_service.encode_one(_embed_model, text_)
     except Exception as e:
         logger.warning(f"embed failed: {e}")
         return [0.0] * 384
+    if memo is not None:
+        memo["embed"][text_] = result
+    return result
 
 def upsert(
     collection: str,
@@ -263,8 +298,12 @@ def upsert(
                 }
             ),
         )
+    _remember_exists(collection, user_id)
 
-def bulk_upsert(rows: list[dict]) -> int:
+def bulk_upsert(rows: list[dict], failed: Optional[list] = None) -> int:
+    """Upsert rows, 200 per statement; returns how many were stored. When
+    `failed` is given, the positions in `rows` that could not be written are
+    appended to it."""
     if not rows:
         return 0
     batch_size = 200
@@ -284,17 +323,21 @@ def bulk_upsert(rows: list[dict]) -> int:
                     len(params_batch),
                     batch_error,
                 )
-                for p in params_batch:
+                for offset, p in enumerate(params_batch):
                     try:
                         _execute_upsert(conn, p)
                         inserted += 1
                     except Exception as row_error:
+                        if failed is not None:
+                            failed.append(start + offset)
                         logger.warning(
                             "bulk_upsert row failed id=%s collection=%s error=%s",
                             p.get("id"),
                             p.get("col"),
                             row_error,
                         )
+    for key in {(r.get("collection", ""), r.get("user_id")) for r in rows}:
+        _remember_exists(*key)
     return inserted
 
 def search(
@@ -354,6 +397,62 @@ def search(
         for r in rows
     ]
 
+def recent_by_group(
+    user_id: str,
+    groups: list[tuple[str, Optional[str], int]],
+) -> list[list[dict]]:
+    """Newest rows for several (collection, metadata source, limit) groups in
+    one statement. A ROW_NUMBER window per group replaces one search per
+    source; a source of None matches any source in that collection. Returns
+    one list per group, newest first by metadata timestamp."""
+    if not groups:
+        return []
+    if _is_sqlite():
+        source_expr = "json_extract(metadata, '$.source')"
+        stamp_expr = "json_extract(metadata, '$.timestamp')"
+    else:
+        source_expr = "metadata->>'source'"
+        stamp_expr = "metadata->>'timestamp'"
+
+    params: dict = {"uid": str(user_id)}
+    tags, limits = [], []
+    for i, (collection, source, limit) in enumerate(groups):
+        params[f"c{i}"] = collection
+        params[f"k{i}"] = int(limit)
+        if source is None:
+            tags.append(f"WHEN collection = :c{i} THEN {i}")
+        else:
+            params[f"s{i}"] = source
+            tags.append(f"WHEN collection = :c{i} AND {source_expr} = :s{i} THEN {i}")
+        limits.append(f"WHEN {i} THEN :k{i}")
+    collections = sorted({c for c, _, _ in groups})
+    for i, collection in enumerate(collections):
+        params[f"col{i}"] = collection
+    in_list = ", ".join(f":col{i}" for i in range(len(collections)))
+
+    sql = f"""
+        SELECT grp, id, content, metadata FROM (
+            SELECT grp, id, content, metadata,
+                   ROW_NUMBER() OVER (PARTITION BY grp ORDER BY stamp DESC, created_at DESC) AS rn
+            FROM (
+                SELECT id, content, metadata, created_at, {stamp_expr} AS stamp,
+                       CASE {' '.join(tags)} END AS grp
+                FROM embeddings
+                WHERE user_id = :uid AND collection IN ({in_list})
+            ) tagged
+            WHERE grp IS NOT NULL
+        ) ranked
+        WHERE rn <= CASE grp {' '.join(limits)} END
+        ORDER BY grp, rn
+    """
+    with _engine.connect() as conn:
+        rows = conn.execute(text(sql), params).fetchall()
+
+    out: list[list[dict]] = [[] for _ in groups]
+    for r in rows:
+        out[int(r[0])].append({"id": r[1], "content": r[2], "metadata": _parse_metadata(r[3])})
+    return out
+
 def get_by_metadata(
     collection: str,
     filters: Optional[dict] = None,
@@ -393,12 +492,28 @@ def count(collection: str, user_id: Optional[str] = None) -> int:
     with _engine.connect() as conn:
         return conn.execute(text(sql), params).scalar() or 0
 
+def has_rows(collection: str, user_id: Optional[str] = None) -> bool:
+    """Cheap existence probe (LIMIT 1 instead of COUNT(*)), memoized for the
+    active request so repeated retrieve_* calls in one turn hit the DB once."""
+    memo = _request_memo.get()
+    key = (collection, user_id)
+    if memo is not None and key in memo["exists"]:
+        return memo["exists"][key]
+    where_clause, params = _build_where(collection, user_id)
+    sql = f"SELECT 1 FROM embeddings {where_clause} LIMIT 1"
+    with _engine.connect() as conn:
+        found = conn.execute(text(sql), params).first() is not None
+    if memo is not None:
+        memo["exists"][key] = found
+    return found
+
 def delete(
     collection: str,
     ids: Optional[list[str]] = None,
     user_id: Optional[str] = None,
     doc_id: Optional[str] = None,
 ) -> None:
+    _forget_exists(collection)
     if _is_sqlite():
         conditions = ["collection = :col"]
         params: dict = {"col": collection}
@@ -1,40 +1,243 @@
 
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
 import logging
+import os
+import socket
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Sockets live in one worker, but sends come from whichever worker handled the
+# request. Messages for a user without a local socket go through a backplane:
+#   InMemoryBackplane  single process (default, tests); managers sharing one
+#                      instance behave like workers sharing Redis
+#   RedisBackplane     one pub/sub channel per connected user, so a worker only
+#                      receives traffic for sockets it holds; presence is a
+#                      per-user sorted set of node ids scored by heartbeat expiry
+# WS_BACKPLANE=auto|memory|redis picks the backend at startup.
+PRESENCE_TTL_SECONDS = int(os.getenv("WS_PRESENCE_TTL_SECONDS", "60"))
+CHANNEL_PREFIX = "bw:ws:user:"
+PRESENCE_PREFIX = "bw:ws:presence:"
+
+Handler = Callable[[int, dict], Awaitable[None]]
+
+
+def _default_node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class InMemoryBackplane:
+
+    def __init__(self, presence_ttl: int = PRESENCE_TTL_SECONDS):
+        self.presence_ttl = presence_ttl
+        self._handlers: Dict[str, Handler] = {}
+        self._subscriptions: Dict[int, set] = {}
+        self._presence: Dict[int, Dict[str, float]] = {}
+
+    async def start(self, node_id: str, handler: Handler):
+        self._handlers[node_id] = handler
+
+    async def stop(self, node_id: str):
+        self._handlers.pop(node_id, None)
+        for user_id in list(self._subscriptions):
+            await self.unsubscribe(node_id, user_id)
+
+    async def subscribe(self, node_id: str, user_id: int):
+        self._subscriptions.setdefault(user_id, set()).add(node_id)
+        await self.heartbeat(node_id, [user_id])
+
+    async def unsubscribe(self, node_id: str, user_id: int):
+        nodes = self._subscriptions.get(user_id)
+        if nodes is not None:
+            nodes.discard(node_id)
+            if not nodes:
+                del self._subscriptions[user_id]
+        present = self._presence.get(user_id)
+        if present is not None:
+            present.pop(node_id, None)
+            if not present:
+                del self._presence[user_id]
+
+    async def publish(self, user_id: int, message: dict) -> int:
+        receivers = 0
+        for node_id in list(self._subscriptions.get(user_id, ())):
+            handler = self._handlers.get(node_id)
+            if handler is not None:
+                await handler(user_id, message)
+                receivers += 1
+        return receivers
+
+    async def heartbeat(self, node_id: str, user_ids: List[int]):
+        expires_at = time.time() + self.presence_ttl
+        for user_id in user_ids:
+            self._presence.setdefault(user_id, {})[node_id] = expires_at
+
+    async def is_online(self, user_id: int) -> bool:
+        now = time.time()
+        return any(expiry > now for expiry in self._presence.get(user_id, {}).values())
+
+
+class RedisBackplane:
+
+    def __init__(self, client, presence_ttl: int = PRESENCE_TTL_SECONDS):
+        self.client = client
+        self.presence_ttl = presence_ttl
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._handler: Optional[Handler] = None
+
+    async def start(self, node_id: str, handler: Handler):
+        self._handler = handler
+        self._pubsub = self.client.pubsub()
+        # A per-node channel keeps the connection subscribed while no users are.
+        await self._pubsub.subscribe(f"bw:ws:node:{node_id}")
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def stop(self, node_id: str):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def _read_loop(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message:
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                if not channel.startswith(CHANNEL_PREFIX):
+                    continue
+                await self._handler(int(channel[len(CHANNEL_PREFIX):]), json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket backplane read error: {str(e)}")
+                await asyncio.sleep(1.0)
+
+    async def subscribe(self, node_id: str, user_id: int):
+        await self._pubsub.subscribe(f"{CHANNEL_PREFIX}{user_id}")
+        await self.heartbeat(node_id, [user_id])
+
+    async def unsubscribe(self, node_id: str, user_id: int):
+        await self._pubsub.unsubscribe(f"{CHANNEL_PREFIX}{user_id}")
+        await self.client.zrem(f"{PRESENCE_PREFIX}{user_id}", node_id)
+
+    async def publish(self, user_id: int, message: dict) -> int:
+        return await self.client.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(message, default=str))
+
+    async def heartbeat(self, node_id: str, user_ids: List[int]):
+        if not user_ids:
+            return
+        expires_at = time.time() + self.presence_ttl
+        async with self.client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                key = f"{PRESENCE_PREFIX}{user_id}"
+                pipe.zadd(key, {node_id: expires_at})
+                pipe.zremrangebyscore(key, "-inf", time.time())
+                pipe.expire(key, self.presence_ttl)
+            await pipe.execute()
+
+    async def is_online(self, user_id: int) -> bool:
+        return await self.client.zcount(f"{PRESENCE_PREFIX}{user_id}", time.time(), "+inf") > 0
+
+
 class ConnectionManager:
-    
-    def __init__(self):
+
+    def __init__(self, backplane=None, node_id: Optional[str] = None):
         self.active_connections: Dict[int, WebSocket] = {}
-    
+        self.backplane = backplane or InMemoryBackplane()
+        self.node_id = node_id or _default_node_id()
+        self._started = False
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._started:
+            return
+        await self.backplane.start(self.node_id, self._deliver_local)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        self._started = True
+        logger.info(f"WebSocket backplane {type(self.backplane).__name__} started on {self.node_id}")
+
+    async def stop(self):
+        if not self._started:
+            return
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        for user_id in list(self.active_connections):
+            await self.backplane.unsubscribe(self.node_id, user_id)
+        await self.backplane.stop(self.node_id)
+        self._started = False
+
+    async def _heartbeat_loop(self):
+        interval = max(1.0, self.backplane.presence_ttl / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.backplane.heartbeat(self.node_id, list(self.active_connections))
+            except Exception as e:
+                logger.error(f"WebSocket presence heartbeat failed: {str(e)}")
+
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
         self.active_connections[user_id] = websocket
+        try:
+            await self.backplane.subscribe(self.node_id, user_id)
+        except Exception as e:
+            logger.error(f"WebSocket backplane subscribe failed for user {user_id}: {str(e)}")
         logger.info(f" User {user_id} connected to WebSocket (Total: {len(self.active_connections)})")
-    
-    def disconnect(self, websocket: WebSocket, user_id: int):
+
+    async def disconnect(self, websocket: WebSocket, user_id: int):
         if self.active_connections.get(user_id) is websocket:
             del self.active_connections[user_id]
+            try:
+                await self.backplane.unsubscribe(self.node_id, user_id)
+            except Exception as e:
+                logger.error(f"WebSocket backplane unsubscribe failed for user {user_id}: {str(e)}")
             logger.info(f"🔌 User {user_id} disconnected from WebSocket (Total: {len(self.active_connections)})")
-    
+
+    async def _send_local(self, message: dict, user_id: int) -> bool:
+        try:
+            await self.active_connections[user_id].send_json(message)
+            logger.info(f"📤 Sent message to user {user_id}: {message.get('type')}")
+            return True
+        except Exception as e:
+            logger.error(f" Error sending message to user {user_id}: {str(e)}")
+            if user_id in self.active_connections:
+                await self.disconnect(self.active_connections[user_id], user_id)
+            return False
+
+    async def _deliver_local(self, user_id: int, message: dict):
+        if user_id in self.active_connections:
+            await self._send_local(message, user_id)
+
     async def send_personal_message(self, message: dict, user_id: int):
         if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_json(message)
-                logger.info(f"📤 Sent message to user {user_id}: {message.get('type')}")
-                return True
-            except Exception as e:
-                logger.error(f" Error sending message to user {user_id}: {str(e)}")
-                if user_id in self.active_connections:
-                    del self.active_connections[user_id]
-                return False
-        else:
-            logger.warning(f" User {user_id} not connected to WebSocket")
+            return await self._send_local(message, user_id)
+        try:
+            delivered = await self.backplane.publish(user_id, message) > 0
+        except Exception as e:
+            logger.error(f" Error publishing message for user {user_id}: {str(e)}")
             return False
-    
+        if not delivered:
+            logger.warning(f" User {user_id} not connected to WebSocket")
+        return delivered
+
     async def broadcast(self, message: dict, user_ids: List[int]):
         success_count = 0
         for user_id in user_ids:
@@ -42,8 +245,40 @@ class ConnectionManager:
                 success_count += 1
         return success_count
 
+    async def is_online(self, user_id: int) -> bool:
+        if user_id in self.active_connections:
+            return True
+        try:
+            return await self.backplane.is_online(user_id)
+        except Exception:
+            return False
+
 manager = ConnectionManager()
 
+async def configure_backplane(redis_client=None) -> str:
+    """Pick the backplane for the process-wide manager and start it."""
+    mode = os.getenv("WS_BACKPLANE", "auto").strip().lower()
+    if mode in ("auto", "redis") and redis_client is None:
+        try:
+            import redis.asyncio as _aioredis
+            redis_client = _aioredis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 0)),
+                password=os.getenv("REDIS_PASSWORD") or None,
+                socket_connect_timeout=2,
+                decode_responses=True,
+            )
+            await redis_client.ping()
+        except Exception as e:
+            if mode == "redis":
+                logger.warning(f"WS_BACKPLANE=redis but Redis is unavailable ({e}); using in-memory backplane")
+            redis_client = None
+    if mode != "memory" and redis_client is not None:
+        manager.backplane = RedisBackplane(redis_client)
+    await manager.start()
+    return type(manager.backplane).__name__
+
 async def notify_battle_challenge(opponent_id: int, battle_data: dict):
     message = {
         "type": "battle_challenge",
@@ -15,6 +15,7 @@ from services.ytdlp_utils import (
     summarize_ytdlp_error,
     ytdlp_auth_args,
 )
+from services import transcript_cache
 
 logger = logging.getLogger(__name__)
 
@@ -42,13 +43,19 @@ except ImportError:
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY") or os.getenv("GOOGLE_API_KEY")
 
-CACHE_DIR = Path(__file__).resolve().parent.parent / "cache" / "transcripts"
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# Only outcomes that belong to the video itself are negatively cached; any
+# other failure (timeouts, throttling, 403s, extractor or parse errors) is
+# retried on the next request.
+_PERMANENT_ERROR_CODES = {
+    "no_captions",
+    "video_unavailable",
+    "age_restricted",
+    "geo_restricted",
+}
 
 class YouTubeAPIService:
     
     def __init__(self):
-        self.cache_dir = CACHE_DIR
         self.youtube_api = None
         
         if GOOGLE_API_AVAILABLE and YOUTUBE_API_KEY:
@@ -84,47 +91,30 @@ class YouTubeAPIService:
             
         return None
     
-    def _get_cache_path(self, video_id: str) -> Path:
-        return self.cache_dir / f"{video_id}.json"
-    
-    def _load_from_cache(self, video_id: str) -> Optional[Dict]:
-        cache_path = self._get_cache_path(video_id)
-        if cache_path.exists():
-            try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    logger.info(f"Loaded transcript from cache: {video_id}")
-                    return data
-            except Exception as e:
-                logger.warning(f"Cache read error: {e}")
-        return None
-    
-    def _save_to_cache(self, video_id: str, data: Dict):
-        try:
-            cache_path = self._get_cache_path(video_id)
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            logger.info(f"Saved transcript to cache: {video_id}")
-        except Exception as e:
-            logger.warning(f"Cache write error: {e}")
+    def _cache_transcript(self, key: str, result: Dict):
+        if result.get("success"):
+            transcript_cache.write(key, result, transcript_cache.TRANSCRIPT_TTL)
+        elif result.get("error_code") in _PERMANENT_ERROR_CODES:
+            transcript_cache.write(key, result, transcript_cache.NEGATIVE_TTL)
     
     async def get_transcript(self, video_id: str, language: str = "en") -> Dict[str, Any]:
-        cached = self._load_from_cache(video_id)
+        key = f"transcript-{video_id}"
+        cached = transcript_cache.read(key) or transcript_cache.migrate_legacy(video_id, key)
         if cached:
+            logger.info(f"Transcript cache hit ({'ok' if cached.get('success') else 'negative'}): {video_id}")
             return cached
-        
+        return await transcript_cache.single_flight(key, lambda: self._fetch_transcript(key, video_id, language))
+    
+    async def _fetch_transcript(self, key: str, video_id: str, language: str) -> Dict[str, Any]:
         if TRANSCRIPT_API_AVAILABLE:
             result = await self._fetch_with_transcript_api(video_id, language)
             if result.get("success"):
-                self._save_to_cache(video_id, result)
+                self._cache_transcript(key, result)
                 return result
             logger.warning(f"youtube-transcript-api failed: {result.get('error')}")
         
         result = await self._fetch_with_ytdlp(video_id, language)
-        
-        if result.get("success"):
-            self._save_to_cache(video_id, result)
-        
+        self._cache_transcript(key, result)
         return result
     
     async def _fetch_with_transcript_api(self, video_id: str, language: str = "en") -> Dict:
@@ -293,6 +283,13 @@ class YouTubeAPIService:
         raise RuntimeError("No transcripts available")
     
     async def _get_video_metadata(self, video_id: str) -> Dict:
+        key = f"meta-{video_id}"
+        cached = transcript_cache.read(key)
+        if cached:
+            return cached
+        return await transcript_cache.single_flight(key, lambda: self._fetch_video_metadata(key, video_id))
+    
+    async def _fetch_video_metadata(self, key: str, video_id: str) -> Dict:
         try:
             if self.youtube_api:
                 loop = asyncio.get_event_loop()
@@ -310,7 +307,7 @@ class YouTubeAPIService:
                     duration_str = content_details.get("duration", "PT0S")
                     duration = self._parse_duration(duration_str)
                     
-                    return {
+                    metadata = {
                         "title": snippet.get("title", f"YouTube Video {video_id}"),
                         "author": snippet.get("channelTitle", "Unknown"),
                         "thumbnail": snippet.get("thumbnails", {}).get("maxres", {}).get("url") or 
@@ -319,6 +316,8 @@ class YouTubeAPIService:
                         "duration": duration,
                         "description": snippet.get("description", "")[:500]
                     }
+                    transcript_cache.write(key, metadata, transcript_cache.INFO_TTL)
+                    return metadata
         except Exception as e:
             logger.warning(f"Could not fetch video metadata: {e}")
         
@@ -364,7 +363,7 @@ class YouTubeAPIService:
                     "extractor_error",
                     "network_error",
                 }
-                last_error = {"code": "unknown", "message": "No captions available for this video"}
+                last_error = {"code": "no_captions", "message": "No captions available for this video"}
 
                 with ytdlp_auth_args(logger) as auth_args:
                     common_args = get_ytdlp_common_args()
@@ -649,6 +648,13 @@ class YouTubeAPIService:
         return text.strip()
     
     async def get_video_info(self, video_id: str) -> Dict[str, Any]:
+        key = f"info-{video_id}"
+        cached = transcript_cache.read(key)
+        if cached:
+            return cached
+        return await transcript_cache.single_flight(key, lambda: self._fetch_video_info(key, video_id))
+    
+    async def _fetch_video_info(self, key: str, video_id: str) -> Dict[str, Any]:
         try:
             url = f"https://www.youtube.com/watch?v={video_id}"
             loop = asyncio.get_event_loop()
@@ -686,7 +692,7 @@ class YouTubeAPIService:
                             continue
                 if not info:
                     return self._fallback_video_info(video_id)
-                return {
+                result = {
                     "success": True,
                     "title": info.get("title", f"YouTube Video {video_id}"),
                     "author": info.get("uploader", info.get("channel", "Unknown")),
@@ -694,10 +700,16 @@ class YouTubeAPIService:
                     "length": info.get("duration", 0),
                     "description": info.get("description", "")[:500]
                 }
+                transcript_cache.write(key, result, transcript_cache.INFO_TTL)
+                return result
             
             if process.returncode != 0:
                 classified = classify_ytdlp_error(process.stderr or process.stdout or "yt-dlp failed")
                 logger.warning("get_video_info yt-dlp failed code=%s detail=%s", classified["code"], classified["detail"])
+                if classified["code"] in _PERMANENT_ERROR_CODES:
+                    fallback = self._fallback_video_info(video_id)
+                    transcript_cache.write(key, fallback, transcript_cache.NEGATIVE_TTL)
+                    return fallback
             return self._fallback_video_info(video_id)
             
         except Exception as e:
@@ -751,13 +763,11 @@ class YouTubeAPIService:
     
     def clear_cache(self, video_id: str = None):
         if video_id:
-            cache_path = self._get_cache_path(video_id)
-            if cache_path.exists():
-                cache_path.unlink()
-                logger.info(f"Cleared cache for: {video_id}")
+            for prefix in ("transcript", "info", "meta"):
+                transcript_cache.delete(f"{prefix}-{video_id}")
+            logger.info(f"Cleared cache for: {video_id}")
         else:
-            for f in self.cache_dir.glob("*.json"):
-                f.unlink()
+            transcript_cache.clear()
             logger.info("Cleared all transcript cache")
 
 youtube_service = YouTubeAPIService()
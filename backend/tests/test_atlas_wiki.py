@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import atlas_wiki_service as wiki
+from services import search_index
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.Folder.__table__,
+        models.Note.__table__,
+        models.FlashcardSet.__table__,
+        models.Flashcard.__table__,
+        models.FlashcardStudySession.__table__,
+        models.FlashcardDueQueue.__table__,
+        models.FlashcardSRCounters.__table__,
+        models.ChatFolder.__table__,
+        models.ChatSession.__table__,
+        models.ChatMessage.__table__,
+        models.QuestionSet.__table__,
+        models.Question.__table__,
+        models.Activity.__table__,
+        models.ContextDocument.__table__,
+        models.AtlasWikiPage.__table__,
+        models.AtlasWikiLink.__table__,
+        models.AtlasWikiCompileState.__table__,
+        models.AtlasWikiEvent.__table__,
+        models.AtlasWikiContradiction.__table__,
+        models.AtlasWikiSchema.__table__,
+    ])
+    with engine.begin() as conn:
+        search_index.create_sqlite_schema(conn)
+    session = sessionmaker(bind=engine)()
+    session.add(models.User(id=1, username="ada", email="ada@example.com"))
+    session.commit()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield SimpleNamespace(session=session, statements=statements)
+    session.close()
+    engine.dispose()
+
+
+def _inbound(db, path):
+    return db.query(models.AtlasWikiPage).filter_by(user_id=1, path=path).one().inbound_links_count
+
+
+def test_link_graph_and_index_follow_page_writes(db):
+    s = db.session
+    wiki.ensure_user_wiki(s, 1)
+    wiki.upsert_page(s, 1, "concepts/cells.md", "Cells", "# Cells\n\nSee [Mitosis](concepts/mitosis.md).")
+    assert _inbound(s, "concepts/cells.md") == 1  # from index.md
+
+    wiki.upsert_page(s, 1, "concepts/mitosis.md", "Mitosis", "# Mitosis\n\nBack to [[concepts/cells.md]].")
+    assert _inbound(s, "concepts/mitosis.md") == 2
+    assert _inbound(s, "concepts/cells.md") == 2
+    backlinks = {b["path"] for b in wiki.get_page(s, 1, "concepts/cells.md")["backlinks"]}
+    assert backlinks == {"index.md", "concepts/mitosis.md"}
+
+    wiki.upsert_page(s, 1, "concepts/cells.md", "Cells", "# Cells\n\nNo links any more.")
+    assert _inbound(s, "concepts/mitosis.md") == 1
+
+    patched = wiki.get_page(s, 1, "index.md")["content"]
+    rebuilt = wiki.build_index_page(s, 1)["content"]
+    assert patched == rebuilt
+    assert "- [Mitosis](concepts/mitosis.md) - Mitosis Back to" in rebuilt
+
+    counts = {p.path: p.inbound_links_count for p in s.query(models.AtlasWikiPage)}
+    wiki.refresh_link_counts(s, 1)
+    assert {p.path: p.inbound_links_count for p in s.query(models.AtlasWikiPage)} == counts
+
+    db.statements.clear()
+    wiki.upsert_page(s, 1, "concepts/mitosis.md", "Mitosis", "# Mitosis\n\nBack to [[concepts/cells.md]].")
+    assert not any(st.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE")) for st in db.statements)
+
+
+def test_search_pages_uses_the_index(db):
+    s = db.session
+    wiki.upsert_page(s, 1, "concepts/photosynthesis.md", "Photosynthesis", "Light reactions in the chloroplast.")
+    wiki.upsert_page(s, 1, "concepts/respiration.md", "Respiration", "Mitochondria and chloroplast exchange.")
+
+    db.statements.clear()
+    hits = wiki.search_pages(s, 1, "chloroplast photosynthesis")
+    assert [h["path"] for h in hits] == ["concepts/photosynthesis.md", "concepts/respiration.md"]
+    assert any("search_documents_fts MATCH" in st for st in db.statements)
+    assert wiki.search_pages(s, 1, "glycolysis") == []
+
+
+def test_compile_skips_unchanged_documents(db):
+    s = db.session
+    for i, summary in enumerate(["Cells divide by mitosis.", "Enzymes speed reactions."]):
+        s.add(models.ContextDocument(
+            user_id=1, doc_id=f"doc-{i}-0000", filename=f"bio{i}.pdf", status="ready",
+            subject="Biology", ai_summary=summary, topic_tags='["Cells"]',
+        ))
+    s.commit()
+
+    first = wiki.compile_from_documents(s, 1, include_platform=False)
+    assert first["recompiled_docs"] == 2 and first["source_pages"] == 2
+
+    again = wiki.compile_from_documents(s, 1, include_platform=False)
+    assert again["recompiled_docs"] == 0
+    assert again["concept_pages"] == first["concept_pages"]
+
+    doc = s.query(models.ContextDocument).filter_by(doc_id="doc-1-0000").one()
+    doc.ai_summary = "Enzymes lower activation energy."
+    s.commit()
+    third = wiki.compile_from_documents(s, 1, include_platform=False)
+    assert third["recompiled_docs"] == 1
+    page = wiki.get_page(s, 1, "sources/bio1-doc-1-00.md")
+    assert "activation energy" in page["content"]
+    cells = wiki.get_page(s, 1, "concepts/cells.md")
+    assert "Enzymes lower activation energy" in cells["content"]
+    assert "Cells divide by mitosis" in cells["content"]
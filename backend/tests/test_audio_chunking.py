@@ -0,0 +1,121 @@
+import asyncio
+import gc
+import math
+import struct
+import sys
+import wave
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import audio_chunking as ac
+
+
+def _script(lines=40, speech=4.0, gap=1.0):
+    script, t = [], 0.5
+    for n in range(lines):
+        script.append((t, t + speech, f"Sentence {n} about the water cycle."))
+        t += speech + gap
+    return script, t + 0.5
+
+
+def _write_wav(path, script, duration, rate=8000):
+    frames = bytearray()
+    for i in range(int(duration * rate)):
+        t = i / rate
+        speaking = any(start <= t < end for start, end, _ in script)
+        frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * t)) if speaking else 0)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+
+
+def test_cuts_land_in_silences_and_chunks_overlap():
+    script, duration = _script()
+    silences = [(script[i][1], script[i + 1][0]) for i in range(len(script) - 1)]
+    chunks = ac.plan_chunks(duration, silences, target=30, overlap=1.5, window=5)
+
+    assert len(chunks) > 1
+    assert chunks[0].core_start == 0 and chunks[-1].core_end == duration
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.core_end == current.core_start
+        assert any(start < current.core_start < end for start, end in silences)
+        assert current.start < previous.end
+
+    hard = ac.plan_chunks(95, [], target=30, overlap=1, window=5)
+    assert [c.core_start for c in hard] == [0, 30, 60]
+
+
+def test_stitching_restores_the_script_once():
+    script, duration = _script()
+    silences = [(script[i][1], script[i + 1][0]) for i in range(len(script) - 1)]
+    chunks = ac.plan_chunks(duration, silences, target=30, overlap=3, window=5)
+    transcriber = ac.ScriptTranscriber(script)
+
+    async def transcribe_all():
+        return [(chunk, await transcriber(chunk)) for chunk in chunks]
+
+    stitched = ac.stitch(asyncio.run(transcribe_all()))
+    assert stitched["transcript"] == " ".join(text for _, _, text in script)
+    assert [round(s["start"], 3) for s in stitched["segments"]] == [round(start, 3) for start, _, _ in script]
+
+
+def test_repeated_boundary_words_are_dropped_for_text_only_results():
+    first = ac.AudioChunk(index=0, start=0, end=12, core_start=0, core_end=10)
+    second = ac.AudioChunk(index=1, start=8, end=20, core_start=10, core_end=20)
+    stitched = ac.stitch([
+        (second, {"transcript": "the mitochondria makes ATP for the cell."}),
+        (first, {"segments": [{"start": 0, "end": 9.5, "text": "Respiration happens in the mitochondria"}]}),
+    ])
+    assert stitched["transcript"] == "Respiration happens in the mitochondria makes ATP for the cell."
+
+
+@pytest.mark.skipif(not ac.ffmpeg_binary(), reason="ffmpeg not installed")
+def test_transcribe_chunked_on_generated_audio(tmp_path, monkeypatch):
+    script, duration = _script(lines=24)
+    audio_path = tmp_path / "lecture.wav"
+    _write_wav(audio_path, script, duration)
+
+    detected_duration, silences = ac.analyze_audio(str(audio_path))
+    assert abs(detected_duration - duration) < 0.1
+    assert len(silences) >= len(script) - 1
+
+    monkeypatch.setitem(ac.PROVIDER_CONCURRENCY, "local", 2)
+    transcriber = ac.ScriptTranscriber(script, seconds_per_audio_second=0.002)
+    in_flight = {"now": 0, "max": 0}
+
+    async def tracking(chunk):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return await transcriber(chunk)
+        finally:
+            in_flight["now"] -= 1
+
+    result = asyncio.run(ac.transcribe_chunked(str(audio_path), tracking, "local", target=20, overlap=1.5))
+    assert result["success"] and result["chunks"] == transcriber.calls > 2
+    assert in_flight["max"] == 2
+    assert result["transcript"] == " ".join(text for _, _, text in script)
+
+
+def test_provider_semaphores_go_away_with_their_loop():
+    async def limiter():
+        return ac._provider_semaphore("local")
+
+    gc.collect()
+    before = len(ac._semaphores)
+    loop = asyncio.new_event_loop()
+    semaphore = loop.run_until_complete(limiter())
+    assert loop.run_until_complete(limiter()) is semaphore
+    assert len(ac._semaphores) == before + 1
+
+    loop.close()
+    del loop, semaphore
+    gc.collect()
+    assert len(ac._semaphores) == before
@@ -0,0 +1,155 @@
+import functools
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from routes import battles
+from services import battle_question_pool as pool
+from services import redis_cache
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, monkeypatch):
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(redis_cache, "_redis_client", fakeredis.FakeRedis(decode_responses=True))
+    else:
+        monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(pool, "_memory_pools", {})
+    monkeypatch.setattr(pool, "_local_locks", {})
+    monkeypatch.setattr(pool, "_inflight", set())
+    monkeypatch.setattr(pool, "POOL_TARGET", 6)
+    monkeypatch.setattr(pool, "POOL_REFILL_BATCH", 4)
+
+    calls = []
+
+    def fake_call_ai(prompt, max_tokens=2000, temperature=0.7, **kwargs):
+        count = int(prompt.split("Generate exactly ")[1].split()[0])
+        calls.append(count)
+        start = sum(calls) - count
+        return json.dumps([
+            {"question": f"Q{start + i}?", "options": ["right", "w1", "w2", "w3"], "correct_answer": 0, "explanation": ""}
+            for i in range(count)
+        ])
+
+    monkeypatch.setitem(sys.modules, "deps", SimpleNamespace(call_ai=fake_call_ai))
+    yield calls
+    pool.shutdown()
+
+
+def test_generated_questions_keep_the_correct_option_after_shuffle(backend):
+    questions = pool.generate_questions("battle", "Biology", "beginner", 5)
+    assert len(questions) == 5
+    for q in questions:
+        assert q["options"][q["correct_answer"]] == "right"
+        assert q["difficulty"] == "beginner"
+
+
+def test_battles_take_from_the_pool_and_refill_in_background(backend):
+    first = pool.acquire_questions("battle", "World History", "advanced", 3)
+    assert backend[0] == 3
+    assert len(first) == 3
+
+    deadline = time.monotonic() + 5
+    while pool.pool_size("battle", "world  history", "advanced") < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.pool_size("battle", "World History", "advanced") == 6
+    assert backend == [3, 4, 2]
+
+    second = pool.acquire_questions("battle", "world history", "ADVANCED", 5)
+    assert [q["question"] for q in second] == [f"Q{i}?" for i in range(3, 8)]
+    assert backend[:3] == [3, 4, 2]
+    assert pool.pool_size("battle", "Chemistry", "advanced") == 0
+
+
+def test_generation_lock_is_single_flight(backend):
+    entered, results = [], []
+
+    def worker(i):
+        with pool.generation_lock("battle:1", wait=5) as acquired:
+            entered.append(i)
+            results.append(acquired and len(entered) == 1)
+            time.sleep(0.05)
+            entered.remove(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [True, True, True]
+
+    with pool.generation_lock("battle:2") as outer:
+        with pool.generation_lock("battle:2", wait=0) as inner:
+            assert outer and not inner
+    with pool.generation_lock("battle:2", wait=0) as again:
+        assert again
+    assert pool._local_locks == {}
+
+
+def test_lease_reports_a_lapsed_redis_lock(backend):
+    if redis_cache._redis_client is None:
+        pytest.skip("lease expiry only applies to the Redis lock")
+    with pool.generation_lock("battle:3", ttl=60) as lease:
+        assert lease.held()
+        redis_cache._redis_client.set("bw:lock:battle:3", "other-worker")
+        assert not lease.held()
+    assert redis_cache._redis_client.get("bw:lock:battle:3") == "other-worker"
+
+
+def test_route_keeps_questions_saved_by_the_worker_that_took_over(backend, monkeypatch):
+    if redis_cache._redis_client is None:
+        pytest.skip("lease expiry only applies to the Redis lock")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    import models
+    from database import Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__, models.QuizBattle.__table__, models.BattleQuestion.__table__,
+    ])
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    user = models.User(id=1, username="ada", email="ada@example.com")
+    db.add_all([user, models.User(id=2, username="bo", email="bo@example.com")])
+    db.add(models.QuizBattle(id=7, challenger_id=1, opponent_id=2, subject="Biology"))
+    db.commit()
+
+    def slow_generation(kind, subject, variant, count):
+        # The lock expires mid-call and another worker saves its own set.
+        redis_cache._redis_client.set("bw:lock:battle:7", "other-worker")
+        other = Session()
+        other.add(models.BattleQuestion(battle_id=7, question="Theirs?", options='["a","b"]', correct_answer=0))
+        other.commit()
+        other.close()
+        return [{"question": "Ours?", "options": ["a", "b"], "correct_answer": 0}]
+
+    monkeypatch.setattr(pool, "acquire_questions", slow_generation)
+    result = battles.generate_battle_questions({"battle_id": 7, "subject": "Biology"}, current_user=user, db=db)
+
+    assert [q["question"] for q in result["questions"]] == ["Theirs?"]
+    assert db.query(models.BattleQuestion).count() == 1
+    assert pool.pool_size("battle", "Biology", "intermediate") == 1
+
+    redis_cache._redis_client.set("bw:lock:battle:8", "other-worker")
+    db.add(models.QuizBattle(id=8, challenger_id=1, opponent_id=2, subject="Biology"))
+    db.commit()
+    with pytest.raises(battles.HTTPException) as busy:
+        with monkeypatch.context() as m:
+            m.setattr(pool, "generation_lock", functools.partial(pool.generation_lock, wait=0))
+            battles.generate_battle_questions({"battle_id": 8, "subject": "Biology"}, current_user=user, db=db)
+    assert busy.value.status_code == 503
+    db.close()
+    engine.dispose()
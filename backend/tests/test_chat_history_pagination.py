@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def _load_chat_module(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test-secret-that-is-long-enough-for-jwt")
+    monkeypatch.setenv("GROQ_API_KEY", "dummy")
+    backend_root = str(Path(__file__).resolve().parents[1])
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return importlib.import_module("routes.chat")
+
+
+@pytest.fixture
+def chat_env(monkeypatch):
+    chat = _load_chat_module(monkeypatch)
+    import models
+    from database import Base
+    from services import redis_cache
+
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(redis_cache, "_fallback", {})
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.ChatFolder.__table__,
+        models.ChatSession.__table__,
+        models.ChatMessage.__table__,
+        models.ChatTutorState.__table__,
+    ])
+    db = sessionmaker(bind=engine)()
+    user = models.User(id=1, username="learner", email="learner@example.com")
+    db.add(user)
+    db.add(models.ChatSession(id=5, user_id=1, title="Long session"))
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(25):
+        db.add(models.ChatMessage(
+            chat_session_id=5,
+            user_id=1,
+            user_message=f"q{i}",
+            ai_response=f"a{i}",
+            timestamp=start + timedelta(minutes=i),
+        ))
+    db.commit()
+    yield chat, models, db, user
+    db.close()
+
+
+def _get(chat, db, user, etag=None, **params):
+    request = SimpleNamespace(headers={"if-none-match": etag} if etag else {})
+    response = Response()
+    body = chat.get_chat_messages(
+        request,
+        response,
+        chat_id="5",
+        limit=params.get("limit"),
+        before=params.get("before"),
+        current_user=user,
+        db=db,
+    )
+    return body, response
+
+
+def test_keyset_pages_walk_back_through_history(chat_env):
+    chat, _, db, user = chat_env
+
+    first, response = _get(chat, db, user, limit=10)
+    assert [m["content"] for m in first[::2]] == [f"q{i}" for i in range(15, 25)]
+    assert response.headers["X-Has-More"] == "true"
+
+    second, response = _get(chat, db, user, limit=10, before=int(response.headers["X-Next-Cursor"]))
+    assert [m["content"] for m in second[::2]] == [f"q{i}" for i in range(5, 15)]
+
+    third, response = _get(chat, db, user, limit=10, before=int(response.headers["X-Next-Cursor"]))
+    assert [m["content"] for m in third[::2]] == [f"q{i}" for i in range(5)]
+    assert response.headers["X-Has-More"] == "false"
+    assert "X-Next-Cursor" not in response.headers
+
+    full, _ = _get(chat, db, user)
+    assert full == third + second + first
+
+
+def test_unchanged_session_returns_304_until_a_new_message(chat_env):
+    chat, models, db, user = chat_env
+
+    _, response = _get(chat, db, user, limit=10)
+    etag = response.headers["ETag"]
+
+    not_modified, _ = _get(chat, db, user, etag=etag, limit=10)
+    assert not_modified.status_code == 304
+
+    db.add(models.ChatMessage(chat_session_id=5, user_id=1, user_message="q25", ai_response="a25"))
+    db.commit()
+    chat.invalidate_chat_history_cache(5)
+
+    page, response = _get(chat, db, user, etag=etag, limit=10)
+    assert response.headers["ETag"] != etag
+    assert page[-2]["content"] == "q25"
+
+
+def test_latest_page_is_served_from_cache(chat_env, monkeypatch):
+    chat, _, db, user = chat_env
+    from services import redis_cache
+
+    first, _ = _get(chat, db, user, limit=10)
+    assert redis_cache.get_chat_page(5)["messages"] == first
+
+    db.query = _fail_on_message_scan(db.query)
+    cached, response = _get(chat, db, user, limit=10)
+    assert cached == first
+    assert response.headers["X-Has-More"] == "true"
+
+
+def _fail_on_message_scan(original_query):
+    import models
+
+    def query(*entities, **kwargs):
+        if entities and entities[0] is models.ChatMessage:
+            raise AssertionError("latest page should come from the cache")
+        return original_query(*entities, **kwargs)
+
+    return query
@@ -0,0 +1,119 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import redis_cache
+from services.context_agent import CentralContextAgent, LearningEvent, effective_mastery
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(redis_cache, "_fallback", {})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.StudentKnowledgeState.__table__,
+        models.AgentEvent.__table__,
+        models.Notification.__table__,
+        models.ComprehensiveUserProfile.__table__,
+        models.UserGamificationStats.__table__,
+        models.DailyLearningMetrics.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(models.User(id=1, username="ada", email="ada@example.com"))
+    session.commit()
+    session.statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: session.statements.append(statement),
+    )
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _flashcard(concept, correct):
+    return LearningEvent(student_id="1", source="flashcard", event_type="review",
+                         concept_id=concept, concept_name=concept.title(), correct=correct)
+
+
+def test_batch_applies_events_in_order_with_counter_triggers(db):
+    agent = CentralContextAgent(db_factory=None)
+    events = [_flashcard("cells", False) for _ in range(3)] + [_flashcard("atoms", True)]
+
+    decisions = agent.record_events(db, events)
+
+    assert [d.triggers_fired for d in decisions] == [[], [], ["rule1_flashcard_to_chat"], []]
+    assert decisions[2].inject_concept_to_chat == "cells"
+    selects = [s for s in db.statements if s.lstrip().upper().startswith("SELECT")]
+    assert not any("agent_events" in s for s in selects)
+    assert sum("student_knowledge_states" in s for s in selects) == 1
+
+    cells = db.query(models.StudentKnowledgeState).filter_by(concept_id="cells").one()
+    assert cells.interaction_count == 3 and len(cells.mastery_history) == 3
+    assert cells.flashcard_wrong_count == 3
+    assert db.query(models.AgentEvent).count() == 4
+
+    assert agent.record_event(db, _flashcard("cells", False)).triggers_fired == ["rule1_flashcard_to_chat"]
+
+
+def test_mastery_milestone_is_notified_once(db):
+    agent = CentralContextAgent(db_factory=None)
+    quiz = dict(student_id="1", source="quiz", concept_id="ions", concept_name="Ions", correct=True, score=1.0)
+
+    fired = [agent.record_event(db, LearningEvent(**quiz)).triggers_fired for _ in range(5)]
+
+    assert fired.count(["rule4_mastery_milestone"]) == 1
+    assert db.query(models.Notification).filter_by(notification_type="milestone").count() == 1
+
+
+def test_forgetting_curve_is_applied_at_read_time(db):
+    stale = datetime.now(timezone.utc) - timedelta(days=3, hours=1)
+    db.add(models.StudentKnowledgeState(
+        user_id=1, concept_id="waves", concept_name="Waves", p_mastery=0.8,
+        mastery_history=[0.8], interaction_count=4, last_updated=stale,
+    ))
+    db.commit()
+    agent = CentralContextAgent(db_factory=None)
+
+    for _ in range(2):
+        profile = agent.get_student_profile(db, 1)
+        assert profile.strong_concepts[0].p_mastery == pytest.approx(0.8 * 0.95 ** 3)
+    assert db.query(models.StudentKnowledgeState.p_mastery).scalar() == pytest.approx(0.8)
+    assert effective_mastery(0.05, stale) == pytest.approx(0.05)
+
+    agent.record_event(db, LearningEvent(student_id="1", source="chat", concept_id="waves"))
+    state = db.query(models.StudentKnowledgeState).one()
+    assert state.p_mastery == pytest.approx(0.8 * 0.95 ** 3 + 0.01)
+    assert effective_mastery(state.p_mastery, state.last_updated) == pytest.approx(state.p_mastery)
+
+
+def test_chat_pipeline_updates_from_decayed_mastery(db):
+    import asyncio
+
+    from services.ml_pipeline import MessageMLPipeline
+
+    stale = datetime.now(timezone.utc) - timedelta(days=3, hours=1)
+    db.add(models.StudentKnowledgeState(
+        user_id=1, concept_id="waves", concept_name="Waves", p_mastery=0.8,
+        p_learn=0.1, p_slip=0.1, p_guess=0.2, mastery_history=[0.8], interaction_count=4, last_updated=stale,
+    ))
+    db.commit()
+
+    _, _, before, after = asyncio.run(MessageMLPipeline(db_factory=None)._layer2_bkt_update(db, 1, ["waves"], "question"))
+
+    assert before["waves"] == pytest.approx(0.8 * 0.95 ** 3)
+    state = db.query(models.StudentKnowledgeState).one()
+    assert state.p_mastery == pytest.approx(after["waves"]) and after["waves"] < 0.8
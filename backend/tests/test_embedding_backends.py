@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+from services import embedding_service
+
+PARITY_TEXTS = [
+    "Photosynthesis converts light energy into chemical energy.",
+    "What is the derivative of x squared?",
+    "The mitochondria is the powerhouse of the cell.",
+    "Explain Newton's third law with an example.",
+]
+
+
+def _load_or_skip(name, backend):
+    try:
+        return embedding_service.load_encoder(name, backend)
+    except Exception as e:
+        pytest.skip(f"{backend} encoder for {name} unavailable here: {e}")
+
+
+@pytest.mark.parametrize("model_name", [embedding_service.PRIMARY_MODEL, embedding_service.MINILM_MODEL])
+@pytest.mark.parametrize("backend,min_cos", [("onnx", 0.999), ("onnx-int8", 0.97)])
+def test_onnx_backends_match_torch_vectors(model_name, backend, min_cos):
+    reference = np.asarray(
+        embedding_service.encode_many(_load_or_skip(model_name, "torch"), PARITY_TEXTS, normalize=True)
+    )
+    candidate = np.asarray(
+        embedding_service.encode_many(_load_or_skip(model_name, backend), PARITY_TEXTS, normalize=True)
+    )
+
+    assert candidate.shape == reference.shape == (len(PARITY_TEXTS), 384)
+    cosines = (reference * candidate).sum(axis=1)
+    assert cosines.min() >= min_cos
+
@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import embedding_service
+
+
+class SlowModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode(self, texts, **kwargs):
+        self.batch_sizes.append(len(texts))
+        time.sleep(0.02)
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_batcher_coalesces_concurrent_encodes():
+    model = SlowModel()
+    batcher = embedding_service.EncodeBatcher(model, max_batch=64, max_wait_ms=20)
+    texts = [f"question {i}" * (i % 3 + 1) for i in range(24)]
+    results: dict[int, list[float]] = {}
+
+    def worker(i):
+        results[i] = batcher.encode_one(texts[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(results[i] == [float(len(texts[i])), 1.0] for i in range(len(texts)))
+    assert sum(model.batch_sizes) <= len(texts)
+    assert len(model.batch_sizes) < len(texts)
+    assert batcher.stats()["items"] == len(texts)
+
+
+def test_get_model_shares_one_copy_and_falls_back(monkeypatch):
+    loads = []
+
+    def fake_load(name):
+        loads.append(name)
+        if name == "broken/model":
+            raise OSError("not downloadable")
+        return SlowModel()
+
+    monkeypatch.setattr(embedding_service, "_models", {})
+    monkeypatch.setattr(embedding_service, "_failed", set())
+    monkeypatch.setattr(embedding_service, "_load", fake_load)
+
+    minilm = embedding_service.get_model("sentence-transformers/all-MiniLM-L6-v2", fallback=None)
+    assert embedding_service.get_model(embedding_service.MINILM_MODEL) is minilm
+
+    fallback = embedding_service.get_model("broken/model")
+    assert fallback is minilm
+    assert embedding_service.get_model("broken/model") is minilm
+    assert loads == [embedding_service.MINILM_MODEL, "broken/model"]
+
+    report = embedding_service.memory_report()
+    assert report["distinct_models"] == 1
+    assert report["models"]["broken/model"] == {"shared_with": embedding_service.MINILM_MODEL}
+
+
+def test_unknown_backend_falls_back_to_torch(monkeypatch):
+    monkeypatch.setenv("EMBED_BACKEND", "tensorrt")
+    assert embedding_service.encoder_backend() == "torch"
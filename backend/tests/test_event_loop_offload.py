@@ -0,0 +1,108 @@
+import asyncio
+import gc
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from middleware import event_loop
+
+
+def _app(route_class=None):
+    router = APIRouter(prefix="/api", **({"route_class": route_class} if route_class else {}))
+
+    def get_multiplier():
+        return 3
+
+    @router.get("/slow_report")
+    async def slow_report(days: int = 7, multiplier: int = Depends(get_multiplier)):
+        time.sleep(0.3)
+        return {"days": days * multiplier}
+
+    @router.get("/ping")
+    async def ping():
+        await asyncio.sleep(0)
+        return {"ok": True}
+
+    app = FastAPI()
+    app.add_middleware(event_loop.EventLoopMonitorMiddleware, threshold_ms=100)
+    app.include_router(router)
+    return app
+
+
+async def _slow_and_cheap(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def timed(path, delay=0.0):
+            await asyncio.sleep(delay)
+            response = await client.get(path)
+            return response, time.perf_counter() - started
+
+        # A full collection of the suite's heap can pause the loop for longer
+        # than the thresholds below, so it runs before the clock starts.
+        gc.collect()
+        gc.disable()
+        started = time.perf_counter()
+        try:
+            return await asyncio.gather(timed("/api/slow_report?days=2"), timed("/api/ping", delay=0.02))
+        finally:
+            gc.enable()
+
+
+def test_only_non_suspending_coroutines_are_offloaded():
+    async def blocking(db=None):
+        return sum(range(10))
+
+    async def awaits():
+        await asyncio.sleep(0)
+
+    async def schedules():
+        asyncio.create_task(awaits())
+
+    def plain():
+        return 1
+
+    assert event_loop.runs_without_loop(blocking)
+    assert not event_loop.runs_without_loop(awaits)
+    assert not event_loop.runs_without_loop(schedules)
+    assert not event_loop.runs_without_loop(plain)
+
+    sync = event_loop.as_sync(blocking)
+    assert not asyncio.iscoroutinefunction(sync)
+    assert sync() == 45 and list(event_loop.inspect.signature(sync).parameters) == ["db"]
+
+
+def test_offloaded_handler_no_longer_stalls_cheap_requests():
+    event_loop.reset_stats()
+    (slow, slow_s), (cheap, cheap_s) = asyncio.run(_slow_and_cheap(_app()))
+    assert slow.json() == {"days": 6} and cheap.json() == {"ok": True}
+    assert cheap_s > 0.25
+    [flagged] = event_loop.get_stats()["blocking_routes"]
+    assert flagged["route"] == "GET /api/slow_report" and flagged["max_ms"] >= 250
+
+    event_loop.reset_stats()
+    (slow, slow_s), (cheap, cheap_s) = asyncio.run(_slow_and_cheap(_app(event_loop.OffloadRoute)))
+    assert slow.json() == {"days": 6} and cheap.json() == {"ok": True}
+    assert cheap_s < 0.1 < slow_s
+    assert event_loop.get_stats()["blocking_routes"] == []
+
+
+def test_lag_sampler_records_a_blocked_loop():
+    event_loop.reset_stats()
+
+    async def scenario():
+        sampler = asyncio.create_task(event_loop.sample_loop_lag(interval_ms=20))
+        await asyncio.sleep(0.05)
+        time.sleep(0.15)
+        await asyncio.sleep(0.05)
+        sampler.cancel()
+
+    asyncio.run(scenario())
+    lag = event_loop.get_stats()["lag"]
+    assert lag["samples"] >= 2 and lag["max_ms"] >= 100 and lag["over_threshold"] >= 1
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import importlib
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import and_, create_engine, insert, or_
+from sqlalchemy.orm import sessionmaker
+
+TOTAL_CARDS = 100_000
+USERS = 3
+SETS_PER_USER = 20
+
+
+def _load(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test-secret-that-is-long-enough-for-jwt")
+    monkeypatch.setenv("GROQ_API_KEY", "dummy")
+    backend_root = str(Path(__file__).resolve().parents[1])
+    if backend_root not in sys.path:
+        sys.path.insert(0, backend_root)
+    return importlib.import_module("routes.flashcards")
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    mp = pytest.MonkeyPatch()
+    flashcards = _load(mp)
+    import models
+    from database import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.FlashcardSet.__table__,
+        models.Flashcard.__table__,
+        models.FlashcardDueQueue.__table__,
+        models.FlashcardSRCounters.__table__,
+    ])
+    rng = random.Random(33)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": uid, "username": f"learner{uid}", "email": f"learner{uid}@example.com"}
+            for uid in range(1, USERS + 1)
+        ])
+        conn.execute(insert(models.FlashcardSet), [
+            {"id": (uid - 1) * SETS_PER_USER + n + 1, "user_id": uid, "title": f"Set {uid}-{n}"}
+            for uid in range(1, USERS + 1)
+            for n in range(SETS_PER_USER)
+        ])
+        rows = []
+        for card_id in range(1, TOTAL_CARDS + 1):
+            state = rng.choice(["new", "new", None, "learning", "review", "review", "relearning"])
+            scheduled = state not in ("new", None) or rng.random() < 0.1
+            rows.append({
+                "id": card_id,
+                "set_id": rng.randint(1, USERS * SETS_PER_USER),
+                "question": f"Question {card_id}",
+                "answer": "Answer",
+                "sr_state": state,
+                "next_review_date": (
+                    now + timedelta(minutes=rng.randint(-30 * 1440, 30 * 1440)) if scheduled else None
+                ),
+                "ease_factor": rng.choice([None, 1.3, 1.8, 2.2, 2.5, 2.7, 3.1]),
+                "interval": rng.randint(0, 120) / 2,
+                "lapses": rng.choice([0, 0, 0, 1, 2, 5]),
+                "times_reviewed": rng.randint(0, 30),
+                "correct_count": rng.randint(0, 10),
+            })
+        conn.execute(insert(models.Flashcard), rows)
+    db = sessionmaker(bind=engine)()
+    yield flashcards, models, db
+    db.close()
+    mp.undo()
+
+
+def _reference_due(models, db, user_id, limit):
+    now = datetime.now(timezone.utc)
+    cards = (
+        db.query(models.Flashcard)
+        .join(models.FlashcardSet)
+        .filter(
+            models.FlashcardSet.user_id == user_id,
+            or_(
+                models.Flashcard.next_review_date <= now,
+                and_(
+                    models.Flashcard.next_review_date == None,
+                    or_(models.Flashcard.sr_state == "new", models.Flashcard.sr_state == None),
+                ),
+            ),
+        )
+        .order_by(models.Flashcard.next_review_date.asc().nullsfirst(), models.Flashcard.id.asc())
+        .limit(limit)
+        .all()
+    )
+    return [(c.id, db.get(models.FlashcardSet, c.set_id).title) for c in cards]
+
+
+def _reference_stats(models, db, user_id):
+    cards = (
+        db.query(models.Flashcard)
+        .join(models.FlashcardSet)
+        .filter(models.FlashcardSet.user_id == user_id)
+        .all()
+    )
+    state_dist = {"new": 0, "learning": 0, "review": 0, "relearning": 0}
+    ease = [0] * 5
+    for c in cards:
+        state = c.sr_state or "new"
+        if state in state_dist:
+            state_dist[state] += 1
+        e = c.ease_factor or 2.5
+        ease[0 if e < 1.7 else 1 if e < 2.1 else 2 if e < 2.5 else 3 if e < 2.9 else 4] += 1
+    total_reviews = sum(c.times_reviewed or 0 for c in cards)
+    total_correct = sum(c.correct_count or 0 for c in cards)
+    now = datetime.now(timezone.utc)
+    forecast = []
+    for offset in range(14):
+        target = (now + timedelta(days=offset)).date()
+        count = 0
+        for c in cards:
+            if c.next_review_date:
+                if c.next_review_date.date() == target:
+                    count += 1
+            elif (c.sr_state or "new") == "new" and offset == 0:
+                count += 1
+        forecast.append(count)
+    intervals = [c.interval or 0 for c in cards if c.sr_state == "review"]
+    lapsed = sorted((c for c in cards if (c.lapses or 0) > 0), key=lambda c: (-(c.lapses or 0), c.id))[:5]
+    return {
+        "total_cards": len(cards),
+        "state_distribution": state_dist,
+        "retention_rate": round(total_correct / total_reviews * 100, 1) if total_reviews else 0,
+        "total_reviews": total_reviews,
+        "ease": ease,
+        "forecast": forecast,
+        "maturity": {
+            "average_interval": round(sum(intervals) / len(intervals), 1) if intervals else 0,
+            "mature_count": sum(1 for i in intervals if i >= 21),
+            "longest_interval": round(max(intervals), 1) if intervals else 0,
+            "review_card_count": len(intervals),
+        },
+        "total_lapses": sum(c.lapses or 0 for c in cards),
+        "most_lapsed": [c.id for c in lapsed],
+    }
+
+
+def _assert_matches_full_scan(flashcards, models, db, user_id):
+    username = f"learner{user_id}"
+    for limit in (50, 5_000):
+        due = flashcards.get_due_flashcards(user_id=username, limit=limit, db=db)
+        assert [(c["id"], c["set_title"]) for c in due["cards"]] == _reference_due(models, db, user_id, limit)
+
+    stats = flashcards.get_sr_stats(user_id=username, db=db)
+    expected = _reference_stats(models, db, user_id)
+    assert stats["total_cards"] == expected["total_cards"]
+    assert stats["state_distribution"] == expected["state_distribution"]
+    assert stats["retention_rate"] == expected["retention_rate"]
+    assert stats["total_reviews"] == expected["total_reviews"]
+    assert [b["count"] for b in stats["ease_distribution"]] == expected["ease"]
+    assert [d["count"] for d in stats["review_forecast"]] == expected["forecast"]
+    assert stats["maturity"] == expected["maturity"]
+    assert stats["lapse_stats"]["total_lapses"] == expected["total_lapses"]
+    assert [c["card_id"] for c in stats["lapse_stats"]["most_lapsed"]] == expected["most_lapsed"]
+
+
+def test_materialized_queue_matches_full_scan_after_lazy_build(seeded):
+    flashcards, models, db = seeded
+    for user_id in range(1, USERS + 1):
+        _assert_matches_full_scan(flashcards, models, db, user_id)
+    assert db.query(models.FlashcardDueQueue).count() == TOTAL_CARDS
+
+
+def test_incremental_updates_track_reviews_edits_and_deletes(seeded):
+    flashcards, models, db = seeded
+    from services.spaced_repetition import GRADE_MAP, calculate_next_review
+
+    rng = random.Random(5)
+    user_sets = [s.id for s in db.query(models.FlashcardSet).filter(models.FlashcardSet.user_id == 1)]
+    cards = (
+        db.query(models.Flashcard)
+        .filter(models.Flashcard.set_id.in_(user_sets))
+        .order_by(models.Flashcard.id)
+        .limit(300)
+        .all()
+    )
+    for card in cards[:200]:
+        result = calculate_next_review(
+            card.sr_state or "new",
+            card.ease_factor or 2.5,
+            card.interval or 0,
+            card.repetitions or 0,
+            card.lapses or 0,
+            GRADE_MAP[rng.choice(["again", "hard", "good", "easy"])],
+            card.learning_step or 0,
+        )
+        card.sr_state = result["new_state"]
+        card.ease_factor = result["new_ease"]
+        card.interval = result["new_interval"]
+        card.lapses = result["new_lapses"]
+        card.next_review_date = result["next_review_date"]
+        card.times_reviewed = (card.times_reviewed or 0) + 1
+    for card in cards[200:250]:
+        db.delete(card)
+    for card in cards[250:300]:
+        card.set_id = db.query(models.FlashcardSet.id).filter(models.FlashcardSet.user_id == 2).first()[0]
+    db.add(models.Flashcard(set_id=user_sets[0], question="Fresh card", answer="A"))
+    db.commit()
+
+    for user_id in (1, 2):
+        _assert_matches_full_scan(flashcards, models, db, user_id)
+
+
+
+def test_set_delete_invalidates_the_owner_queue(seeded):
+    flashcards, models, db = seeded
+    models.FlashcardStudySession.__table__.create(db.get_bind(), checkfirst=True)
+
+    _assert_matches_full_scan(flashcards, models, db, 3)
+    owner = db.get(models.User, 3)
+    set_id = db.query(models.FlashcardSet.id).filter(models.FlashcardSet.user_id == 3).first()[0]
+    assert db.query(models.Flashcard).filter(models.Flashcard.set_id == set_id).count() > 0
+
+    assert flashcards.delete_flashcard_set(set_id=str(set_id), db=db, current_user=owner)["success"]
+
+    assert db.query(models.Flashcard).filter(models.Flashcard.set_id == set_id).count() == 0
+    _assert_matches_full_scan(flashcards, models, db, 3)
@@ -0,0 +1,178 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import gamification_pipeline as gp
+from services import gamification_system as gs
+from services import leaderboard_service as lb
+from services import redis_cache
+
+TABLES = [
+    models.User.__table__,
+    models.UserGamificationStats.__table__,
+    models.PointTransaction.__table__,
+    models.Notification.__table__,
+    models.ChatSession.__table__,
+    models.ChatMessage.__table__,
+    models.Note.__table__,
+    models.FlashcardSet.__table__,
+]
+
+COUNTERS = [
+    "total_points", "weekly_points", "level", "experience", "current_streak",
+    "total_ai_chats", "weekly_ai_chats", "total_notes_created", "total_questions_answered",
+    "total_quizzes_completed", "total_flashcards_reviewed", "total_battles_won",
+]
+
+EVENTS = (
+    [(1, "ai_chat", {})] * 12
+    + [(1, "note_created", {}), (2, "note_created", {}), (2, "note_created", {})]
+    + [(2, "question_answered", {"count": 15}), (1, "quiz_completed", {"score_percentage": 95})]
+    + [(2, "flashcard_reviewed", {}), (1, "battle_win", {}), (3, "flashcard_created", {})]
+)
+
+
+@pytest.fixture(autouse=True)
+def memory_leaderboard(monkeypatch):
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(lb, "_memory_boards", {})
+    monkeypatch.setattr(lb, "_memory_profiles", {})
+
+
+def _session_factory(tmp_path, name):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    Base.metadata.create_all(engine, tables=TABLES)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        for uid in (1, 2, 3):
+            db.add(models.User(id=uid, username=f"user{uid}", email=f"user{uid}@example.com"))
+        db.commit()
+    return factory
+
+
+def _snapshot(factory):
+    with factory() as db:
+        stats = {
+            s.user_id: {c: getattr(s, c) for c in COUNTERS}
+            for s in db.query(models.UserGamificationStats).all()
+        }
+        kinds = sorted(n.notification_type for n in db.query(models.Notification).all())
+        awards = db.query(models.PointTransaction).count()
+    return stats, kinds, awards
+
+
+def test_batched_awards_match_inline_awards(tmp_path, monkeypatch):
+    monkeypatch.setattr(gs, "DUPLICATE_WINDOW", timedelta(0))
+    inline = _session_factory(tmp_path, "inline.db")
+    with inline() as db:
+        for user_id, activity, metadata in EVENTS:
+            gs.award_points(db, user_id, activity, metadata)
+
+    batched = _session_factory(tmp_path, "batched.db")
+    pipeline = gp.AwardPipeline(batched, max_batch=1000)
+    for user_id, activity, metadata in EVENTS:
+        assert pipeline.submit(user_id, activity, metadata, start=False)
+    pipeline.submit(99, "ai_chat", start=False)
+
+    assert pipeline.flush() == len(EVENTS)
+    assert pipeline.stats()["batches"] == 1
+    assert pipeline.stats()["dropped"] == 1
+    assert _snapshot(batched) == _snapshot(inline)
+    assert "ai_chat_milestone" in _snapshot(batched)[1]
+
+
+def test_batch_skips_duplicates_inside_the_window(tmp_path):
+    factory = _session_factory(tmp_path, "dupes.db")
+    with factory() as db:
+        gs.award_points(db, 1, "note_created")
+
+    pipeline = gp.AwardPipeline(factory)
+    for activity in ("note_created", "ai_chat", "ai_chat", "flashcard_set", "flashcard_created"):
+        pipeline.submit(1, activity, start=False)
+
+    assert pipeline.flush() == 2
+    assert pipeline.stats()["duplicates"] == 3
+    with factory() as db:
+        stats = db.query(models.UserGamificationStats).filter_by(user_id=1).one()
+        assert (stats.total_notes_created, stats.total_ai_chats, stats.total_flashcards_created) == (1, 1, 1)
+
+
+def test_retried_batch_counts_each_event_once(tmp_path):
+    factory = _session_factory(tmp_path, "retry.db")
+    with factory() as db:
+        gs.award_points(db, 1, "note_created")
+    sessions = []
+
+    def racing_factory():
+        db = factory()
+        if not sessions:
+            def lose_the_race():
+                raise IntegrityError("INSERT INTO user_gamification_stats", {}, Exception("unique"))
+            db.commit = lose_the_race
+        sessions.append(db)
+        return db
+
+    pipeline = gp.AwardPipeline(racing_factory)
+    for user_id, activity in ((1, "note_created"), (1, "ai_chat"), (1, "ai_chat"), (99, "ai_chat")):
+        pipeline.submit(user_id, activity, start=False)
+
+    assert pipeline.flush() == 1
+    assert len(sessions) == 2
+    assert pipeline.stats()["duplicates"] == 2 and pipeline.stats()["dropped"] == 1
+
+
+def test_enqueue_awards_inline_on_single_connection_pool():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=TABLES)
+    db = sessionmaker(bind=engine)()
+    db.add(models.User(id=1, username="solo", email="solo@example.com"))
+    db.commit()
+
+    assert gp.enqueue_award(db, 1, "note_created") is False
+    assert db.query(models.UserGamificationStats).filter_by(user_id=1).one().total_notes_created == 1
+    db.close()
+
+
+def test_recalculate_all_stats_rebuilds_every_user_in_bulk(tmp_path):
+    factory = _session_factory(tmp_path, "recalc.db")
+    week_start = datetime.combine(gs.get_week_start(), datetime.min.time()).replace(tzinfo=timezone.utc)
+    old = week_start - timedelta(days=3)
+    recent = week_start + timedelta(hours=1)
+    with factory() as db:
+        db.add(models.UserGamificationStats(user_id=1, total_points=999, total_battles_won=4, week_start_date=old))
+        session = models.ChatSession(user_id=1, title="t")
+        db.add(session)
+        db.flush()
+        for i in range(12):
+            db.add(models.ChatMessage(chat_session_id=session.id, user_id=1, user_message="q", ai_response="a",
+                                      timestamp=recent if i < 5 else old))
+        for i in range(160):
+            db.add(models.Note(user_id=2, title=f"n{i}", content="", created_at=old))
+        db.add(models.FlashcardSet(user_id=2, title="s", created_at=recent))
+        db.commit()
+
+        assert gs.recalculate_all_stats(db) == 3
+        rows = {s.user_id: s for s in db.query(models.UserGamificationStats).all()}
+
+    assert set(rows) == {1, 2, 3}
+    one, two, three = rows[1], rows[2], rows[3]
+    assert (one.total_ai_chats, one.weekly_ai_chats, one.total_points, one.weekly_points) == (12, 5, 12, 5)
+    assert one.total_battles_won == 0
+    assert (two.total_notes_created, two.weekly_notes_created, two.total_flashcards_created) == (160, 0, 1)
+    assert two.total_points == two.experience == 160 * 20 + 10
+    assert two.weekly_points == 10
+    for stats in (one, two, three):
+        assert stats.level == gs.calculate_level_from_xp(stats.total_points)
+    assert three.total_points == 0 and three.level == 1
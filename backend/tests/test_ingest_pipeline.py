@@ -0,0 +1,217 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("httpx")
+
+import models
+from database import Base
+from ingest import pipeline as ingest_pipeline
+from services import context_store
+from services import vector_store as vs
+
+PARAGRAPH = (
+    "Enzymes lower the activation energy of reactions. Competitive inhibitors bind "
+    "the active site while allosteric inhibitors change the enzyme's shape."
+)
+
+
+def _pdf(title: str) -> bytes:
+    doc = fitz.open()
+    for n in range(3):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 523, 770), f"{title} section {n}. " + " ".join([PARAGRAPH] * 6), fontsize=11)
+    return doc.tobytes()
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return [[float(len(t))] + [0.0] * 383 for t in texts]
+
+
+@pytest.fixture
+def server():
+    documents = {f"/book-{n}.pdf": _pdf(f"Book {n}") for n in range(4)}
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            body = documents.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", hits
+    httpd.shutdown()
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test-secret-that-is-long-enough-for-jwt")
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.ContextFolder.__table__,
+        models.ContextDocument.__table__,
+        models.IngestCheckpoint.__table__,
+    ])
+
+    db_url = f"sqlite:///{tmp_path / 'vs.db'}"
+    with create_engine(db_url).begin() as conn:
+        conn.execute(text(
+            """
+            CREATE TABLE embeddings (
+                id TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                user_id TEXT,
+                content TEXT NOT NULL,
+                embedding TEXT,
+                metadata TEXT DEFAULT '{}',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (collection, id)
+            )
+            """
+        ))
+    model = CountingModel()
+    vs.initialize(model, db_url)
+    monkeypatch.setattr(ingest_pipeline, "STATE_FILE", str(tmp_path / "missing_state.json"))
+    yield sessionmaker(bind=engine), model, tmp_path
+    vs._engine = None
+    vs._embed_model = None
+
+
+def _catalog(base_url, count=4):
+    return [
+        {
+            "slug": f"book-{n}",
+            "title": f"Book {n}",
+            "subject": "Biology",
+            "curriculum": "us",
+            "source_type": "direct",
+            "direct_url": f"{base_url}/book-{n}.pdf",
+        }
+        for n in range(count)
+    ]
+
+
+def _pipeline(session_factory, tmp_path, **kwargs):
+    return ingest_pipeline.IngestPipeline(
+        session_factory=session_factory,
+        work_dir=str(tmp_path / "work"),
+        download_concurrency=kwargs.pop("download_concurrency", 3),
+        process_workers=kwargs.pop("process_workers", 0),
+        **kwargs,
+    )
+
+
+def test_documents_are_embedded_in_cross_document_batches(env, server):
+    session_factory, model, tmp_path = env
+    base_url, hits = server
+    catalog = _catalog(base_url) + [{
+        "slug": "missing", "title": "Missing", "source_type": "direct", "direct_url": f"{base_url}/missing.pdf",
+    }]
+
+    stats = _pipeline(session_factory, tmp_path, process_workers=2).run(catalog)
+
+    assert (stats.succeeded, stats.failed, stats.skipped) == (4, 1, 0)
+    assert model.calls == 1
+    assert vs.count(context_store.HS_CURRICULUM_COLLECTION) == sum(r.chunk_count for r in stats.results)
+    db = session_factory()
+    statuses = {cp.slug: cp.status for cp in db.query(models.IngestCheckpoint)}
+    assert statuses == {"book-0": "done", "book-1": "done", "book-2": "done", "book-3": "done", "missing": "failed"}
+    assert db.query(models.ContextDocument).count() == 4
+    assert list((tmp_path / "work").iterdir()) == []
+
+
+def test_crashed_run_resumes_from_last_stage(env, server, monkeypatch):
+    session_factory, model, tmp_path = env
+    base_url, hits = server
+    catalog = _catalog(base_url, count=3)
+
+    def crash(documents):
+        raise RuntimeError("embedding service went away")
+
+    monkeypatch.setattr(context_store, "add_documents_chunks", crash)
+    first = _pipeline(session_factory, tmp_path).run(catalog)
+    assert first.failed == 3
+    assert len(hits) == 3
+    db = session_factory()
+    assert all(cp.chunks_path for cp in db.query(models.IngestCheckpoint))
+    db.close()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(ingest_pipeline, "STATE_FILE", str(tmp_path / "missing_state.json"))
+    second = _pipeline(session_factory, tmp_path).run(catalog)
+    assert second.succeeded == 3
+    assert len(hits) == 3, "resumed entries should not be downloaded again"
+
+    third = _pipeline(session_factory, tmp_path).run(catalog)
+    assert (third.skipped, third.succeeded) == (3, 0)
+
+
+def test_unreadable_empty_and_partly_stored_documents_fail_alone(env, server, monkeypatch):
+    session_factory, model, tmp_path = env
+    base_url, hits = server
+    catalog = _catalog(base_url)
+
+    def crash(documents):
+        raise RuntimeError("embedding service went away")
+
+    monkeypatch.setattr(context_store, "add_documents_chunks", crash)
+    assert _pipeline(session_factory, tmp_path).run(catalog).failed == 4
+    monkeypatch.undo()
+    monkeypatch.setattr(ingest_pipeline, "STATE_FILE", str(tmp_path / "missing_state.json"))
+
+    db = session_factory()
+    checkpoints = {cp.slug: cp for cp in db.query(models.IngestCheckpoint)}
+    Path(checkpoints["book-0"].chunks_path).write_text("{not json", encoding="utf-8")
+    Path(checkpoints["book-1"].chunks_path).write_text('{"chunks": ["  ", ""]}', encoding="utf-8")
+    with vs._engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TRIGGER reject_chunk BEFORE INSERT ON embeddings "
+            f"WHEN NEW.collection = 'user_docs' AND NEW.id = '{checkpoints['book-2'].doc_id}_1' "
+            f"BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+        ))
+    db.close()
+
+    stats = _pipeline(session_factory, tmp_path).run(catalog)
+
+    assert (stats.succeeded, stats.failed) == (1, 3)
+    errors = {r.slug: r.error for r in stats.results if not r.success}
+    assert errors["book-0"].startswith("chunks file unreadable")
+    assert errors["book-1"] == "no non-empty chunks"
+    assert errors["book-2"].startswith("stored ")
+    db = session_factory()
+    checkpoints = {cp.slug: cp for cp in db.query(models.IngestCheckpoint)}
+    assert {slug: cp.status for slug, cp in checkpoints.items()} == {
+        "book-0": "failed", "book-1": "failed", "book-2": "failed", "book-3": "done",
+    }
+    assert checkpoints["book-0"].chunks_path is None
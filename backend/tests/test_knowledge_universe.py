@@ -0,0 +1,140 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import atlas_wiki_service, knowledge_universe, redis_cache
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(redis_cache, "_fallback", {})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.Folder.__table__,
+        models.Note.__table__,
+        models.FlashcardSet.__table__,
+        models.Flashcard.__table__,
+        models.FlashcardStudySession.__table__,
+        models.FlashcardDueQueue.__table__,
+        models.FlashcardSRCounters.__table__,
+        models.QuestionSet.__table__,
+        models.Question.__table__,
+        models.QuestionSession.__table__,
+        models.Activity.__table__,
+        models.ContextDocument.__table__,
+        models.AtlasWikiPage.__table__,
+        models.AtlasWikiLink.__table__,
+        models.AtlasWikiSchema.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(models.User(id=1, username="ada", email="ada@example.com"))
+    session.add(models.Note(user_id=1, title="Cell biology", content="Mitosis and meiosis."))
+    fset = models.FlashcardSet(user_id=1, title="Organelles")
+    fset.flashcards = [models.Flashcard(question="What is the mitochondria?", answer="Powerhouse", category="Cells")]
+    session.add(fset)
+    qset = models.QuestionSet(user_id=1, title="Genetics quiz")
+    qset.questions = [models.Question(question_text="Define allele", topic="Genetics")]
+    session.add(qset)
+    session.commit()
+    session.add(models.QuestionSession(user_id=1, question_set_id=qset.id, score=1))
+    session.add(models.Activity(user_id=1, question="q", answer="a", topic="Photosynthesis"))
+    session.commit()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield SimpleNamespace(session=session, statements=statements, fset=fset)
+    session.close()
+    engine.dispose()
+
+
+def _queried(statements, table):
+    return any(st.lstrip().upper().startswith("SELECT") and f"FROM {table}" in st for st in statements)
+
+
+def test_graph_is_materialized_and_refreshed_per_part(db):
+    s = db.session
+    first = atlas_wiki_service.build_knowledge_universe_graph(s, 1)
+    ids = {n["id"] for n in first["nodes"]}
+    assert {"hub:atlas", "fset:1", "qset:1", "qsession:1", "quiz:1", "wiki:index.md", "concept:genetics"} <= ids
+    assert {"source": "qsession:1", "target": "qset:1", "type": "from_set", "weight": 0.85} in first["edges"]
+    assert first["counts"]["flashcard_sets"] == 1
+
+    db.statements.clear()
+    again = atlas_wiki_service.build_knowledge_universe_graph(s, 1)
+    assert db.statements == []
+    assert again["etag"] == first["etag"]
+
+    s.add(models.Note(user_id=1, title="Enzymes", content="Catalysts."))
+    s.commit()
+    db.statements.clear()
+    third = atlas_wiki_service.build_knowledge_universe_graph(s, 1)
+    assert _queried(db.statements, "notes")
+    assert not _queried(db.statements, "flashcard_sets") and not _queried(db.statements, "atlas_wiki_pages")
+    assert third["etag"] != first["etag"]
+    assert third["counts"]["notes"] == 2
+
+    card = db.fset.flashcards[0]
+    card.times_reviewed = 3
+    s.commit()
+    assert redis_cache.pop_knowledge_graph_dirty(1) == set()
+
+    card.category = "Organelles"
+    s.commit()
+    assert redis_cache.pop_knowledge_graph_dirty(1) == {"flashcards"}
+
+    s.add(models.Activity(user_id=1, question="q", answer="a", topic="Osmosis"))
+    s.flush()
+    s.rollback()
+    assert redis_cache.pop_knowledge_graph_dirty(1) == set()
+
+
+def test_pages_deliver_every_node_and_edge_once(db):
+    s = db.session
+    full = knowledge_universe.graph(s, 1)
+    nodes, edges, offset = [], [], 0
+    while offset is not None:
+        result = knowledge_universe.page(s, 1, offset=offset, limit=7)
+        loaded = {n["id"] for n in nodes} | {n["id"] for n in result["nodes"]}
+        assert all(e["source"] in loaded and e["target"] in loaded for e in result["edges"])
+        nodes += result["nodes"]
+        edges += result["edges"]
+        offset = result["next_offset"]
+    assert nodes == full["nodes"]
+    assert sorted(map(str, edges)) == sorted(map(str, full["edges"]))
+
+    concepts = knowledge_universe.page(s, 1, cluster="cat:concepts", limit=1000)
+    assert {n["cluster"] for n in concepts["nodes"]} == {"core", "cat:concepts"}
+    assert concepts["total"] == result["clusters"]["cat:concepts"] + result["clusters"]["core"]
+    assert concepts["next_offset"] is None
+    assert concepts["etag"] != result["etag"]
+
+
+def test_query_level_deletes_mark_their_part(db):
+    s = db.session
+    first = atlas_wiki_service.build_knowledge_universe_graph(s, 1)
+    assert "qsession:1" in {n["id"] for n in first["nodes"]}
+
+    s.query(models.QuestionSession).filter_by(user_id=1).delete(synchronize_session=False)
+    knowledge_universe.note_bulk_write(s, 1, "quiz_sessions")
+    s.rollback()
+    assert redis_cache.pop_knowledge_graph_dirty(1) == set()
+
+    s.query(models.QuestionSession).filter_by(user_id=1).delete(synchronize_session=False)
+    knowledge_universe.note_bulk_write(s, 1, "quiz_sessions")
+    s.commit()
+    db.statements.clear()
+    second = atlas_wiki_service.build_knowledge_universe_graph(s, 1)
+    assert _queried(db.statements, "question_sessions") and not _queried(db.statements, "notes")
+    assert "qsession:1" not in {n["id"] for n in second["nodes"]}
@@ -0,0 +1,117 @@
+import random
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import leaderboard_service as lb
+from services import redis_cache
+from services.gamification_system import get_week_start
+
+
+@pytest.fixture(params=["memory", "redis"])
+def db(request, monkeypatch):
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(redis_cache, "_redis_client", fakeredis.FakeRedis(decode_responses=True))
+    else:
+        monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(lb, "_memory_boards", {})
+    monkeypatch.setattr(lb, "_memory_profiles", {})
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine, tables=[models.User.__table__, models.UserGamificationStats.__table__]
+    )
+    session = sessionmaker(bind=engine)()
+    week = datetime.combine(get_week_start(), datetime.min.time()).replace(tzinfo=timezone.utc)
+    rng = random.Random(7)
+    for uid in range(1, 41):
+        session.add(models.User(id=uid, username=f"user{uid}", email=f"user{uid}@example.com"))
+        session.add(models.UserGamificationStats(
+            user_id=uid,
+            total_points=rng.choice([0, 10, 10, 25, 50, 120]),
+            weekly_points=rng.choice([0, 5, 5, 15]),
+            level=1,
+            experience=0,
+            week_start_date=week,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _sql_order(db):
+    rows = db.query(models.UserGamificationStats).order_by(
+        models.UserGamificationStats.total_points.desc(),
+        models.UserGamificationStats.user_id.asc(),
+    ).all()
+    return [(r.user_id, r.total_points) for r in rows]
+
+
+def test_board_matches_sql_ordering_and_rank(db):
+    expected = _sql_order(db)
+
+    board = lb.top(db, lb.GLOBAL, limit=25)
+
+    assert [(e["user_id"], e["total_points"]) for e in board] == expected[:25]
+    assert [e["rank"] for e in board] == list(range(1, 26))
+    assert board[0]["username"] == f"user{expected[0][0]}"
+    for position, (uid, _) in enumerate(expected, start=1):
+        assert lb.rank_of(db, uid) == position
+
+
+def test_record_points_moves_user_and_refreshes_profile(db):
+    last_uid = _sql_order(db)[-1][0]
+    lb.top(db, lb.GLOBAL, limit=5)
+
+    stats = db.query(models.UserGamificationStats).filter_by(user_id=last_uid).one()
+    stats.total_points = 10_000
+    stats.weekly_points = 900
+    db.commit()
+    lb.record_points(last_uid, 10_000, 900)
+
+    assert lb.rank_of(db, last_uid) == 1
+    assert lb.rank_of(db, last_uid, lb.WEEKLY) == 1
+    leader = lb.top(db, lb.GLOBAL, limit=1)[0]
+    assert (leader["user_id"], leader["total_points"], leader["weekly_points"]) == (last_uid, 10_000, 900)
+
+
+def test_friend_group_merge_and_weekly_board(db):
+    group = [3, 8, 15, 22, 39]
+    expected = [uid for uid, _ in _sql_order(db) if uid in group]
+
+    ranked = lb.rank_within(db, group)
+
+    assert [e["user_id"] for e in ranked] == expected
+    weekly = lb.top(db, lb.WEEKLY, limit=50)
+    assert all(e["weekly_points"] > 0 for e in weekly)
+    assert [e["weekly_points"] for e in weekly] == sorted((e["weekly_points"] for e in weekly), reverse=True)
+
+
+def test_lazy_rebuild_runs_once_under_the_lock(db, monkeypatch):
+    client = redis_cache._redis_client
+    if client is None:
+        pytest.skip("lazy rebuild is Redis-only")
+    calls = []
+    rebuild = lb.rebuild_from_db
+    monkeypatch.setattr(lb, "rebuild_from_db", lambda session: calls.append(1) or rebuild(session))
+
+    client.set(lb._REBUILD_LOCK_KEY, "other-worker")
+    assert lb.rank_of(db, 1) is None
+    assert calls == []
+
+    client.delete(lb._REBUILD_LOCK_KEY)
+    assert lb.rank_of(db, 1) is not None
+    assert lb.rank_of(db, 2) is not None
+    assert calls == [1]
+    assert not client.exists(lb._REBUILD_LOCK_KEY)
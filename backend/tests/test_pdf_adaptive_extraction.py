@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+fitz = pytest.importorskip("fitz")
+
+from services import document_processor as dp
+
+PARAGRAPH = (
+    "Mitochondria produce ATP through oxidative phosphorylation. The electron "
+    "transport chain pumps protons across the inner membrane."
+)
+
+
+def _pdf(page_texts, image_pages=()):
+    doc = fitz.open()
+    for index, text in enumerate(page_texts):
+        page = doc.new_page()
+        if index in image_pages:
+            pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 60, 80), False)
+            pix.clear_with(200)
+            page.insert_image(page.rect, pixmap=pix)
+        if text:
+            page.insert_textbox(fitz.Rect(72, 72, 523, 770), text, fontsize=11)
+    return doc.tobytes()
+
+
+def _classify(data):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return dp._classify_pdf(doc)
+
+
+def test_classifies_text_and_scanned_documents():
+    assert _classify(_pdf([f"Page {n}. {PARAGRAPH}" for n in range(8)])) == "text"
+    assert _classify(_pdf([""] * 6, image_pages=range(6))) == "scanned"
+
+
+def test_only_pages_failing_the_quality_check_fall_back(monkeypatch):
+    data = _pdf([f"Page {n}. {PARAGRAPH}" for n in range(4)] + ["12"])
+    calls = []
+    real_fallback = dp._fallback_page_text
+
+    def spy(file_bytes, index, readers):
+        calls.append(index)
+        return real_fallback(file_bytes, index, readers)
+
+    monkeypatch.setattr(dp, "_fallback_page_text", spy)
+    pages = dp._extract_pages_adaptive(data)
+    assert calls == [4]
+    assert [p["page_num"] for p in pages] == [1, 2, 3, 4, 5]
+    assert all(p["parser"] == "pymupdf" for p in pages[:4])
+
+
+def test_scanned_documents_skip_parser_fallbacks(monkeypatch):
+    data = _pdf([""] * 3, image_pages=range(3))
+    monkeypatch.setattr(dp, "_fallback_page_text", lambda *a: pytest.fail("fallback should not run"))
+    result = dp.extract_text_from_pdf_detailed(data)
+    assert result["text"] == ""
+    assert result["page_count"] == 3
+    assert "scanned" in result["warnings"][0]
+
+
+def test_parallel_matches_serial_and_exhaustive(monkeypatch):
+    data = _pdf([f"Chapter notes {n}. {PARAGRAPH}" for n in range(6)])
+    serial = dp._extract_pages_adaptive(data)
+
+    monkeypatch.setattr(dp, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(dp, "PDF_EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(dp, "PDF_PAGES_PER_TASK", 2)
+    try:
+        parallel = dp._extract_pages_adaptive(data)
+    finally:
+        if dp._process_pool is not None:
+            dp._process_pool.shutdown()
+            dp._process_pool = None
+
+    assert parallel == serial
+    exhaustive = dp._extract_pages_exhaustive(data)
+    assert [p["text"].split() for p in serial] == [p["text"].split() for p in exhaustive]
+
+
+def test_complex_layouts_are_read_in_a_single_pass(monkeypatch):
+    data = _pdf([f"Page {n}. {PARAGRAPH}" for n in range(3)])
+    monkeypatch.setattr(dp, "_classify_pdf", lambda doc: "complex")
+    whole = dp.PDFExtractionCandidate(
+        parser="pymupdf4llm", text=PARAGRAPH, page_count=3, non_empty_pages=3, warnings=[],
+    )
+    monkeypatch.setattr(dp, "_extract_with_pymupdf4llm", lambda file_bytes: whole)
+    monkeypatch.setattr(dp, "_extract_page_range", lambda *a: pytest.fail("per-page pass should not run"))
+    assert dp._extract_text_adaptive(data)["parser"] == "pymupdf4llm"
+
+    monkeypatch.undo()
+    monkeypatch.setattr(dp, "_classify_pdf", lambda doc: "complex")
+    monkeypatch.setattr(dp, "_extract_with_pymupdf4llm", lambda file_bytes: None)
+    result = dp._extract_text_adaptive(data)
+    assert result["parser"] == "pymupdf" and result["non_empty_pages"] == 3
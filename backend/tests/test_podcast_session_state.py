@@ -0,0 +1,131 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import podcast_agent, redis_cache
+
+TRANSCRIPT = " ".join(f"Sentence {i} explains photosynthesis and the light reactions." for i in range(400))
+
+
+def fake_call_ai(prompt, max_tokens=2000, temperature=0.7, **kwargs):
+    if "podcast episode structure" in prompt:
+        return json.dumps({
+            "episode_title": "Light",
+            "key_takeaways": ["Plants make sugar"],
+            "chapters": [{"title": f"Part {i}", "content": f"Narration for part {i}. " * 5} for i in range(5)],
+        })
+    if "multiple-choice" in prompt:
+        return json.dumps({"questions": [
+            {"question": f"Q{i}?", "options": ["a", "b", "c", "d"], "correct_index": 1, "explanation": ""}
+            for i in range(3)
+        ]})
+    return "Chlorophyll absorbs light. What does it absorb?"
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(redis_cache, "_fallback", {})
+    monkeypatch.setattr(podcast_agent, "call_ai", fake_call_ai)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.PodcastSessionMemory.__table__,
+        models.PodcastSessionMessage.__table__,
+        models.PodcastBookmark.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(models.User(id=1, username="ada", email="ada@example.com"))
+    session.commit()
+    session.statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, params, *args: session.statements.append((statement, params)),
+    )
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _start(service, db):
+    return service.start_session(
+        db=db, user_id=1, transcript=TRANSCRIPT, analysis={"key_concepts": ["photosynthesis"]},
+        title="Plants", source_type="media", voice_mode="coach", voice_persona="mentor",
+        difficulty="intermediate", answer_language="en",
+    )
+
+
+def _written_bytes(statements):
+    total = 0
+    for statement, params in statements:
+        if statement.lstrip().upper().startswith(("UPDATE", "INSERT")):
+            rows = params if isinstance(params, list) else [params]
+            for row in rows:
+                values = row.values() if isinstance(row, dict) else row
+                total += sum(len(v) for v in values if isinstance(v, str))
+    return total
+
+
+def test_interactions_write_only_state_deltas(db):
+    service = podcast_agent.PodcastAgentService()
+    session_id = _start(service, db)["session_id"]
+
+    db.statements.clear()
+    service.get_next_segment(db=db, session_id=session_id, user_id=1)
+    service.ask_question(db=db, session_id=session_id, user_id=1, question="What absorbs light?")
+    service.start_mcq_drill(db=db, session_id=session_id, user_id=1, count=3)
+    service.answer_mcq(db=db, session_id=session_id, user_id=1, question_index=0, selected_index=1)
+    written = " ".join(s for s, _ in db.statements)
+    assert "transcript" not in written and "chapters" not in written
+    assert _written_bytes(db.statements) < len(TRANSCRIPT) / 4
+
+    db.statements.clear()
+    service.get_next_segment(db=db, session_id=session_id, user_id=1)
+    updates = [s for s, _ in db.statements if s.lstrip().upper().startswith("UPDATE")]
+    assert len(updates) == 1 and "mcq_state" not in updates[0] and "current_index" in updates[0]
+
+    fresh = podcast_agent.PodcastAgentService()
+    state = fresh.resume_session(db=db, session_id=session_id, user_id=1)
+    original = service._sessions[session_id]
+    assert state["current_index"] == 2
+    assert fresh._sessions[session_id].conversation == original.conversation
+    assert [e["type"] for e in original.conversation] == ["narration", "narration", "question", "answer", "narration"]
+    assert state["mcq_state"]["score"] == 1
+    assert fresh._sessions[session_id].transcript == TRANSCRIPT
+
+    db.statements.clear()
+    service.set_voice_mode(db=db, session_id=session_id, user_id=1, voice_mode="story")
+    assert any("chapters" in s for s, _ in db.statements if s.lstrip().upper().startswith("UPDATE"))
+    assert redis_cache.get_podcast_content(session_id)["chapters"] == service._sessions[session_id].chapters
+
+
+def test_legacy_conversation_blob_is_moved_to_rows(db):
+    db.add(models.PodcastSessionMemory(
+        session_id="legacy", user_id=1, transcript=TRANSCRIPT,
+        chapters=json.dumps([{"index": 0, "title": "Only", "content": "Narration."}]),
+        conversation=json.dumps([{"role": "user", "type": "question", "content": "Hi"}]),
+        current_index=0,
+    ))
+    db.commit()
+
+    service = podcast_agent.PodcastAgentService()
+    assert service.get_state(db=db, session_id="legacy", user_id=1)["current_index"] == 0
+    service.get_next_segment(db=db, session_id="legacy", user_id=1)
+
+    rows = db.query(models.PodcastSessionMessage).filter_by(session_id="legacy").order_by(models.PodcastSessionMessage.id).all()
+    assert [r.entry_type for r in rows] == ["question"]
+    assert db.query(models.PodcastSessionMemory.conversation).filter_by(session_id="legacy").scalar() == "[]"
+    redis_cache._fallback.clear()
+    reloaded = podcast_agent.PodcastAgentService().get_state(db=db, session_id="legacy", user_id=1)
+    assert reloaded["ended"] is True and reloaded["chapters"][0]["title"] == "Only"
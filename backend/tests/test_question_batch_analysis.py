@@ -0,0 +1,68 @@
+import asyncio
+import json
+import re
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from question_bank.agents import BloomTaxonomyAgent, QuestionQualityAgent
+
+
+class BatchAI:
+    primary_ai = "groq"
+    groq_key_pool = None
+
+    def __init__(self, drop_ids=()):
+        self.prompts = []
+        self.drop_ids = set(drop_ids)
+
+    def generate(self, prompt, max_tokens=2000, temperature=0.7):
+        self.prompts.append(prompt)
+        if "QUESTIONS:" not in prompt:
+            if "Bloom" in prompt:
+                return json.dumps({"bloom_level": "apply", "confidence": 0.4})
+            return json.dumps({"overall_score": 5, "improvements": ["single"]})
+        ids = [int(i) for i in re.findall(r'"id": (\d+)', prompt.split("Return a JSON array")[0])]
+        items = []
+        for item_id in ids:
+            if item_id in self.drop_ids:
+                continue
+            items.append({
+                "id": item_id,
+                "overall_score": 9,
+                "improvements": [f"batch {item_id}"],
+                "bloom_level": "analyze",
+                "confidence": 0.8,
+            })
+        items.append({"id": 999, "overall_score": 1, "bloom_level": "create"})
+        return "```json\n" + json.dumps(items) + "\n```"
+
+
+def _questions(n):
+    return [{"question_text": f"Compare process {i} with process {i + 1}."} for i in range(n)]
+
+
+def test_quality_scoring_batches_and_falls_back_only_for_missing_ids(monkeypatch):
+    monkeypatch.setenv("QB_ANALYSIS_BATCH_SIZE", "4")
+    ai = BatchAI(drop_ids={5})
+    scored = asyncio.run(QuestionQualityAgent(ai).batch_score_questions(_questions(10)))
+
+    batch_prompts = [p for p in ai.prompts if "QUESTIONS:" in p]
+    single_prompts = [p for p in ai.prompts if "QUESTIONS:" not in p]
+    assert len(batch_prompts) == 3
+    assert len(single_prompts) == 1
+    assert [q["quality_score"] for q in scored] == [9, 9, 9, 9, 9, 5, 9, 9, 9, 9]
+    assert scored[5]["quality_feedback"] == ["single"]
+    assert scored[9]["quality_feedback"] == ["batch 9"]
+
+
+def test_bloom_tagging_batches_and_validates_levels(monkeypatch):
+    monkeypatch.setenv("QB_ANALYSIS_BATCH_SIZE", "8")
+    ai = BatchAI(drop_ids={2})
+    tagged = asyncio.run(BloomTaxonomyAgent(ai).batch_tag_questions(_questions(3)))
+
+    assert len([p for p in ai.prompts if "QUESTIONS:" in p]) == 1
+    assert [q["bloom_level"] for q in tagged] == ["analyze", "analyze", "apply"]
@@ -0,0 +1,104 @@
+import asyncio
+import gc
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from question_bank import agents
+from question_bank.agents import IncrementalQuestionDeduper, QuestionGeneratorAgent
+
+
+class FakeAI:
+    primary_ai = "groq"
+    groq_key_pool = None
+
+
+class KeywordModel:
+    """Maps questions onto a tiny bag-of-topics space so paraphrases collide."""
+
+    TOPICS = ["photosynthesis", "mitochondria", "osmosis", "enzyme"]
+
+    def encode(self, texts, **kwargs):
+        rows = []
+        for text in texts:
+            lowered = text.lower()
+            vec = [1.0 if topic in lowered else 0.0 for topic in self.TOPICS]
+            norm = sum(v * v for v in vec) ** 0.5 or 1.0
+            rows.append([v / norm for v in vec])
+        return rows
+
+
+class SlowChunkAgent(QuestionGeneratorAgent):
+    def __init__(self):
+        super().__init__(FakeAI())
+        self.active = 0
+        self.peak = 0
+
+    async def _generate_questions_single(self, content, question_count, *args, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        label = content.strip().split()[0]
+        return [
+            {"question_text": f"What does {label} part {i} describe?"}
+            for i in range(question_count)
+        ]
+
+
+def test_chunked_generation_fans_out_and_streams_batches(monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER_CONCURRENCY_GROQ", "3")
+    agent = SlowChunkAgent()
+    content = "\n\n".join(f"section{i} " + "x" * 90 for i in range(6))
+
+    async def run():
+        batches = []
+        async for batch in agent.iter_questions_chunked(
+            content, 12, ["multiple_choice"], {"easy": 1}, chunk_size=100
+        ):
+            batches.append(batch)
+        return batches
+
+    batches = asyncio.run(run())
+
+    assert agent.peak == 3
+    assert len(batches) == 6
+    assert sum(len(b) for b in batches) == 12
+
+
+def test_incremental_deduper_rejects_paraphrases_across_batches():
+    deduper = IncrementalQuestionDeduper(threshold=0.9, model=KeywordModel())
+
+    first = deduper.add_batch([
+        {"question_text": "What is photosynthesis?"},
+        {"question_text": "What do mitochondria produce?"},
+    ])
+    second = deduper.add_batch([
+        {"question_text": "Define photosynthesis in plants."},
+        {"question_text": "How does osmosis move water?"},
+        {"question_text": "What is photosynthesis?"},
+    ])
+
+    assert [q["question_text"] for q in first] == ["What is photosynthesis?", "What do mitochondria produce?"]
+    assert [q["question_text"] for q in second] == ["How does osmosis move water?"]
+
+
+def test_provider_semaphores_go_away_with_their_loop():
+    async def limiter():
+        return agents.provider_semaphore(FakeAI())
+
+    gc.collect()
+    before = len(agents._provider_semaphores)
+    loop = asyncio.new_event_loop()
+    semaphore = loop.run_until_complete(limiter())
+    assert loop.run_until_complete(limiter()) is semaphore
+    assert asyncio.run(limiter()) is not semaphore
+    assert len(agents._provider_semaphores) == before + 1
+
+    loop.close()
+    del loop, semaphore
+    gc.collect()
+    assert len(agents._provider_semaphores) == before
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test-secret-that-is-long-enough-for-jwt")
+    import models
+    from database import Base
+    from services import reminder_notifications
+
+    monkeypatch.setattr(reminder_notifications, "_offset_adopted", OrderedDict())
+    # The scheduler job runs in a worker thread, so share one in-memory connection.
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.ReminderList.__table__,
+        models.Reminder.__table__,
+        models.Notification.__table__,
+    ])
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add(models.User(id=1, username="learner", email="learner@example.com"))
+    db.commit()
+    yield reminder_notifications, models, db, session_factory
+    db.close()
+
+
+def _reminder(models, local_due, offset=-120, **kwargs):
+    return models.Reminder(
+        user_id=1,
+        title=kwargs.pop("title", "Revise chapter 4"),
+        reminder_date=local_due,
+        notify_before_minutes=kwargs.pop("notify_before_minutes", 15),
+        timezone_offset=offset,
+        **kwargs,
+    )
+
+
+def test_notify_at_is_utc_and_tracks_edits(env):
+    service, models, db, _ = env
+    # UTC+2 user (getTimezoneOffset() == -120): 10:00 local is 08:00 UTC.
+    reminder = _reminder(models, datetime(2026, 3, 1, 10, 0))
+    db.add(reminder)
+    db.commit()
+    assert reminder.notify_at == datetime(2026, 3, 1, 7, 45)
+
+    reminder.notify_before_minutes = 60
+    db.commit()
+    assert reminder.notify_at == datetime(2026, 3, 1, 7, 0)
+
+
+def test_materialize_due_creates_each_fire_once(env):
+    service, models, db, _ = env
+    now = datetime(2026, 3, 1, 8, 0)
+    due = _reminder(models, datetime(2026, 3, 1, 10, 5))
+    later = _reminder(models, datetime(2026, 3, 1, 12, 0), title="Later")
+    done = _reminder(models, datetime(2026, 3, 1, 9, 0), title="Done", is_completed=True)
+    db.add_all([due, later, done])
+    db.commit()
+
+    created = service.materialize_due(db, now=now)
+    assert [n.reminder_id for n in created] == [due.id]
+    assert created[0].fire_at == due.notify_at
+    assert "[reminder_due_at:2026-03-01T10:05:00]" in created[0].message
+    assert service.materialize_due(db, now=now) == []
+
+    # A racing worker that still sees the reminder as pending hits the constraint.
+    due.is_notified = False
+    db.commit()
+    assert service.materialize_due(db, now=now) == []
+    assert db.query(models.Notification).count() == 1
+    assert due.is_notified
+
+    # Rescheduling produces a new fire_at and therefore a new notification.
+    due.reminder_date = datetime(2026, 3, 1, 10, 10)
+    due.is_notified = False
+    db.commit()
+    assert len(service.materialize_due(db, now=now)) == 1
+    assert db.query(models.Notification).count() == 2
+
+
+def test_legacy_reminders_adopt_the_polling_clients_offset(env):
+    service, models, db, _ = env
+    legacy = _reminder(models, datetime(2026, 3, 1, 10, 0), offset=None)
+    db.add(legacy)
+    db.commit()
+    assert legacy.notify_at is None
+
+    assert service.adopt_client_offset(db, 1, 300) == 1
+    assert legacy.notify_at == datetime(2026, 3, 1, 14, 45)
+    assert service.adopt_client_offset(db, 1, 300) == 0
+
+
+def test_offset_adoption_marks_expire(env, monkeypatch):
+    service, models, db, _ = env
+    clock = [1000.0]
+    monkeypatch.setattr(service.time, "monotonic", lambda: clock[0])
+    for user_id in (1, 2, 3):
+        service.adopt_client_offset(db, user_id, 300)
+    assert list(service._offset_adopted) == [1, 2, 3]
+
+    clock[0] += service.OFFSET_ADOPTED_TTL_SECONDS
+    legacy = _reminder(models, datetime(2026, 3, 1, 10, 0), offset=None)
+    db.add(legacy)
+    db.commit()
+    assert service.adopt_client_offset(db, 1, 300) == 1
+    assert list(service._offset_adopted) == [1]
+
+
+def test_unread_since_cursor_and_long_poll_wakeup(env):
+    service, models, db, session_factory = env
+    db.add_all([
+        models.Notification(user_id=1, title="old", message="m", is_read=True),
+        models.Notification(user_id=1, title="seen", message="m"),
+    ])
+    db.commit()
+    cursor = db.query(models.Notification).filter_by(title="seen").one().id
+    assert service.unread_since(db, 1, 0)[0].title == "seen"
+    assert service.unread_since(db, 1, cursor) == []
+
+    db.add(_reminder(models, datetime.utcnow() - timedelta(minutes=5), offset=0))
+    db.commit()
+
+    async def scenario():
+        waiter = asyncio.create_task(service.wait_for_notifications(1, timeout=5))
+        await asyncio.sleep(0)
+        created = await service.run_materialize_job(session_factory)
+        return created, await waiter
+
+    created, woke = asyncio.run(scenario())
+    assert created == 1
+    assert woke is True
+    assert [n.title for n in service.unread_since(db, 1, cursor)] == ["Reminder: Revise chapter 4 - NOW!"]
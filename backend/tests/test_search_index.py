@@ -0,0 +1,196 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test-secret-that-is-long-enough-for-jwt")
+    monkeypatch.setenv("GROQ_API_KEY", "dummy")
+    import models
+    from database import Base
+    from services import search_index
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.Folder.__table__,
+        models.Note.__table__,
+        models.FlashcardSet.__table__,
+        models.Flashcard.__table__,
+        models.FlashcardStudySession.__table__,
+        models.FlashcardDueQueue.__table__,
+        models.FlashcardSRCounters.__table__,
+        models.ChatFolder.__table__,
+        models.ChatSession.__table__,
+        models.ChatMessage.__table__,
+        models.QuestionSet.__table__,
+        models.Question.__table__,
+    ])
+    with engine.begin() as conn:
+        search_index.create_sqlite_schema(conn)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.User(id=1, username="ada", email="ada@example.com"),
+        models.User(id=2, username="grace", email="grace@example.com"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _hits(db, user_id, *terms, types=("note", "flashcard_set", "chat", "question_set")):
+    from services import search_index
+
+    return [
+        search_index.to_result(row, user_id)
+        for row in search_index.search(db, user_id, list(terms), list(types))
+    ]
+
+
+def test_index_follows_creates_updates_and_deletes(db):
+    import models
+
+    note = models.Note(user_id=1, title="Photosynthesis", content="Light reactions in the thylakoid")
+    cards = models.FlashcardSet(user_id=1, title="Cell biology", description="Mitochondria and ATP")
+    cards.flashcards = [models.Flashcard(question=f"Q{i}", answer="A") for i in range(3)]
+    quiz = models.QuestionSet(user_id=1, title="Unit test", description="Membranes")
+    quiz.questions = [models.Question(question_text="Define osmosis"), models.Question(question_text="What is diffusion?")]
+    db.add_all([note, cards, quiz])
+    db.commit()
+
+    assert [(h["type"], h["title"]) for h in _hits(db, 1, "thylakoid")] == [("note", "Photosynthesis")]
+    [card_hit] = _hits(db, 1, "mitochond")
+    assert card_hit["card_count"] == 3 and card_hit["author"] == "ada" and card_hit["uid"] == cards.public_token
+    [quiz_hit] = _hits(db, 1, "osmosis")
+    assert quiz_hit["question_count"] == 2 and quiz_hit["description"] == "Membranes"
+
+    note.title = "Chloroplasts"
+    quiz.questions.append(models.Question(question_text="Explain active transport"))
+    db.commit()
+    assert _hits(db, 1, "photosynthesis") == []
+    assert [h["title"] for h in _hits(db, 1, "chloroplast")] == ["Chloroplasts"]
+    assert _hits(db, 1, "transport")[0]["question_count"] == 3
+
+    note.is_deleted = True
+    db.delete(cards)
+    db.commit()
+    assert _hits(db, 1, "chloroplast") == []
+    assert _hits(db, 1, "mitochondria") == []
+
+
+def test_terms_deep_in_long_notes_are_found(db):
+    import models
+    from services import search_index
+
+    content = "filler " * 5000 + "photosynthesis"
+    db.add(models.Note(user_id=1, title="Long lecture", content=content))
+    db.commit()
+
+    [hit] = _hits(db, 1, "photosynthesis")
+    assert hit["title"] == "Long lecture"
+    [row] = search_index.search(db, 1, ["photosynthesis"], ["note"])
+    assert len(row["body"]) == search_index.SNIPPET_CHARS
+
+
+def test_visibility_and_ranking(db):
+    import models
+
+    db.add_all([
+        models.Note(user_id=2, title="Public tectonics", content="plates", is_public=True),
+        models.Note(user_id=2, title="Private tectonics", content="plates"),
+        models.Note(user_id=1, title="Geology review", content="Earthquakes happen where tectonic plates meet"),
+        models.Note(user_id=1, title="Plate tectonics", content="Continental drift"),
+        models.ChatSession(user_id=2, title="Tectonics chat"),
+    ])
+    db.commit()
+
+    hits = _hits(db, 1, "plate tectonics", "continental drift")
+    titles = [h["title"] for h in hits]
+    assert "Private tectonics" not in titles and "Tectonics chat" not in titles
+    assert titles[0] == "Plate tectonics"
+    public = next(h for h in hits if h["title"] == "Public tectonics")
+    assert public["author"] == "grace" and not public["is_own"]
+    assert [h["title"] for h in _hits(db, 1, "tectonics", types=["chat"])] == []
+
+
+def test_search_content_uses_index_and_matches_legacy(db, monkeypatch):
+    import models
+    from routes import search as search_routes
+
+    db.add_all([
+        models.Note(user_id=1, title="Krebs cycle", content="Citric acid cycle in the matrix"),
+        models.FlashcardSet(user_id=1, title="Krebs flashcards", description="cycle steps"),
+        models.ChatSession(user_id=1, title="Krebs cycle questions"),
+        models.QuestionSet(user_id=1, title="Krebs quiz", description="cycle"),
+        models.Note(user_id=1, title="Unrelated", content="glycolysis"),
+    ])
+    db.commit()
+
+    async def expanded(query):
+        return [query]
+
+    async def related(query, results):
+        return []
+
+    monkeypatch.setattr(search_routes, "get_expanded_search_terms", expanded)
+    monkeypatch.setattr(search_routes, "get_related_searches", related)
+    response = asyncio.run(search_routes.search_content(
+        user_id="ada", query="krebs", content_types="all", sort_by="relevance",
+        date_from=None, date_to=None, db=db,
+    ))
+    legacy = search_routes._legacy_search_results(
+        db, 1, "krebs", ["krebs"], ["flashcard_set", "note", "chat", "question_set"], None, None,
+    )
+    assert response["total_results"] == 4
+    assert {(r["type"], r["id"]) for r in response["results"]} == {(r["type"], r["id"]) for r in legacy}
+    assert response["type_counts"] == {"note": 1, "flashcard_set": 1, "chat": 1, "question_set": 1}
+
+
+def test_stats_reset_drops_the_users_chats_from_the_index(db):
+    import models
+    from routes import analytics
+
+    models.TopicMastery.__table__.create(db.get_bind(), checkfirst=True)
+    db.add_all([
+        models.ChatSession(user_id=1, title="Enzyme kinetics"),
+        models.ChatSession(user_id=2, title="Enzyme structure"),
+    ])
+    db.commit()
+
+    asyncio.run(analytics.reset_user_stats(payload={"user_id": "ada"}, db=db))
+
+    assert _hits(db, 1, "enzyme", types=["chat"]) == []
+    assert [h["title"] for h in _hits(db, 2, "enzyme", types=["chat"])] == ["Enzyme structure"]
+
+
+def test_availability_is_probed_again_after_the_ttl(monkeypatch):
+    import models
+    from database import Base
+    from services import search_index
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[models.User.__table__])
+    db = sessionmaker(bind=engine)()
+    assert not search_index.available(db)
+
+    with engine.begin() as conn:
+        search_index.create_sqlite_schema(conn)
+    db.rollback()
+    assert not search_index.available(db)
+
+    clock = search_index.time.monotonic() + search_index.AVAILABILITY_TTL_SECONDS
+    monkeypatch.setattr(search_index.time, "monotonic", lambda: clock)
+    assert search_index.available(db)
+    db.close()
+    engine.dispose()
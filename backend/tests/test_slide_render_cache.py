@@ -0,0 +1,112 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import slide_render_cache as cache
+from services.storage_service import LocalStorage
+
+
+class CountingRenderer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pdf_path, page_number, scale, fmt):
+        self.calls.append((page_number, scale, fmt))
+        return f"{pdf_path.name}:{page_number}:{scale}:{fmt}".encode()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(cache, "_inflight", set())
+    return LocalStorage()
+
+
+@pytest.fixture
+def deck(tmp_path):
+    path = tmp_path / "deck.pdf"
+    path.write_bytes(b"%PDF-1.4 fake deck")
+    return path
+
+
+def test_renders_are_cached_per_hash_page_scale_and_format(storage, deck):
+    render = CountingRenderer()
+    doc_hash = cache.document_hash(deck)
+
+    first = cache.get_or_render(deck, doc_hash, 3, "full", "png", render=render, storage=storage)
+    again = cache.get_or_render(deck, doc_hash, 3, "full", "png", render=render, storage=storage)
+    assert first == again == b"deck.pdf:3:full:png"
+    assert render.calls == [(3, "full", "png")]
+
+    cache.get_or_render(deck, doc_hash, 3, "thumb", "png", render=render, storage=storage)
+    cache.get_or_render(deck, doc_hash, 3, "full", "webp", render=render, storage=storage)
+    assert len(render.calls) == 3
+    assert storage.file_exists(cache.cache_key(doc_hash, 3, "thumb", "png"))
+
+    deck.write_bytes(b"%PDF-1.4 edited deck")
+    assert cache.document_hash(deck) != doc_hash
+    assert cache.etag_for(cache.document_hash(deck), 3, "full", "png") != cache.etag_for(doc_hash, 3, "full", "png")
+
+
+def test_prerender_fills_neighbouring_pages(storage, deck, monkeypatch):
+    monkeypatch.setattr(cache, "PRERENDER_RADIUS", 2)
+    render = CountingRenderer()
+    doc_hash = cache.document_hash(deck)
+    cache.get_or_render(deck, doc_hash, 5, "full", "png", render=render, storage=storage)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        queued = cache.schedule_prerender(
+            deck, doc_hash, 4, 6, "full", "png", render=render, storage=storage, executor=executor
+        )
+    assert queued == [5, 3, 6, 2]
+    assert sorted(page for page, _, _ in render.calls) == [2, 3, 5, 6]
+    assert cache._inflight == set()
+
+    render.calls.clear()
+    assert cache.get_or_render(deck, doc_hash, 6, "full", "png", render=render, storage=storage)
+    assert render.calls == []
+
+
+def test_format_negotiation_falls_back_to_png(monkeypatch):
+    monkeypatch.setattr(cache, "supported_formats", lambda: {"png", "webp"})
+    assert cache.negotiate_format("auto", "image/avif,image/webp,image/*") == "webp"
+    assert cache.negotiate_format("auto", "image/png") == "png"
+    assert cache.negotiate_format("avif") == "png"
+    assert cache.negotiate_format("webp") == "webp"
+
+
+def test_route_rejects_a_page_past_the_end_like_the_page_count_check(storage, tmp_path, monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    from routes import media
+
+    pdf_path = tmp_path / "short.pdf"
+    with fitz.open() as doc:
+        doc.new_page()
+        doc.save(str(pdf_path))
+    monkeypatch.setattr(cache, "_get_storage", lambda: storage)
+    monkeypatch.setattr(cache, "page_count", lambda pdf_path, doc_hash: 3)
+    monkeypatch.setattr(cache, "schedule_prerender", lambda *args, **kwargs: [])
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(media._slide_page_response(request, pdf_path, 2, "full", "png"))
+    assert excinfo.value.status_code == 400 and "1 pages" in excinfo.value.detail
+
+
+def test_memos_keep_only_the_most_recently_used_entries(monkeypatch):
+    monkeypatch.setattr(cache, "MEMO_ENTRIES", 2)
+    memo = cache._Memo()
+    memo["a"], memo["b"] = 1, 2
+    assert memo.get("a") == 1
+    memo["c"] = 3
+    assert (memo.get("a"), memo.get("b"), memo.get("c"), len(memo)) == (1, None, 3, 2)
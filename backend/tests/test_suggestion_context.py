@@ -0,0 +1,98 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, text
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import redis_cache
+from services import vector_store as vs
+
+# Load tutor/chroma_store.py directly: other test modules replace the `tutor`
+# package in sys.modules with stubs.
+_spec = importlib.util.spec_from_file_location("chroma_store_context_under_test", BACKEND_ROOT / "tutor" / "chroma_store.py")
+chroma_store = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(chroma_store)
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return [[float(len(t))] + [0.0] * 383 for t in texts]
+
+
+def _init_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(redis_cache, "_fallback", {})
+    db_url = f"sqlite:///{tmp_path / 'vs.db'}"
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE embeddings (
+                id TEXT NOT NULL,
+                collection TEXT NOT NULL,
+                user_id TEXT,
+                content TEXT NOT NULL,
+                embedding TEXT,
+                metadata TEXT DEFAULT '{}',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (collection, id)
+            )
+        """))
+    engine.dispose()
+    model = CountingModel()
+    vs.initialize(model, db_url)
+    statements = []
+    event.listen(vs._engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return model, statements
+
+
+def _seed():
+    for i in range(7):
+        chroma_store.write_episode("5", f"notes on topic {i}", {"source": "note_activity", "timestamp": f"2026-01-0{i + 1}"})
+    chroma_store.write_episode("5", "chatted about cells", {"source": "chat", "timestamp": "2026-01-03"})
+    chroma_store.write_episode("6", "someone else", {"source": "chat"})
+    chroma_store.write_quiz_result("5", "Algebra", 40.0, 2, 5)
+    chroma_store.write_quiz_result("5", "Geometry", 90.0, 9, 10)
+    chroma_store.write_important("5", "pinned derivatives")
+
+
+def test_recent_context_is_one_query_with_per_source_limits(tmp_path, monkeypatch):
+    model, statements = _init_store(tmp_path, monkeypatch)
+    _seed()
+    embeds = model.calls
+    statements.clear()
+
+    context = chroma_store.retrieve_recent_context("5", per_source=5)
+
+    assert len(statements) == 1
+    assert model.calls == embeds
+    notes = context["episodes"]["note_activity"]
+    assert [e["document"] for e in notes] == [f"notes on topic {i}" for i in (6, 5, 4, 3, 2)]
+    assert [e["document"] for e in context["episodes"]["chat"]] == ["chatted about cells"]
+    assert context["episodes"]["quiz_completed"] == []
+    assert {e["metadata"]["topic"] for e in context["quiz_history"]} == {"Algebra", "Geometry"}
+    assert chroma_store.weak_topics_from_history(context["quiz_history"]) == ["Algebra"]
+    assert [e["document"] for e in context["important"]] == ["pinned derivatives"]
+
+
+def test_recent_context_is_cached_until_a_write(tmp_path, monkeypatch):
+    _, statements = _init_store(tmp_path, monkeypatch)
+    _seed()
+    chroma_store.retrieve_recent_context("5")
+    statements.clear()
+
+    chroma_store.retrieve_recent_context("5")
+    assert statements == []
+
+    chroma_store.write_episode("5", "chatted about mitosis", {"source": "chat", "timestamp": "2026-02-01"})
+    statements.clear()
+    context = chroma_store.retrieve_recent_context("5")
+    assert len(statements) == 1
+    assert context["episodes"]["chat"][0]["document"] == "chatted about mitosis"
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import redis_cache, transcript_cache
+from services import youtube_api_service as yt
+
+
+@pytest.fixture(params=["file", "redis"])
+def store(request, monkeypatch, tmp_path):
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        monkeypatch.setattr(redis_cache, "_redis_client", fakeredis.FakeRedis(decode_responses=True))
+    else:
+        monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(transcript_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(transcript_cache, "_file_store", transcript_cache.FileStore(tmp_path))
+    monkeypatch.setattr(yt, "TRANSCRIPT_API_AVAILABLE", False)
+    return request.param
+
+
+def _service(monkeypatch, results):
+    service = yt.YouTubeAPIService()
+    calls = []
+
+    async def fake_ytdlp(video_id, language="en"):
+        calls.append(video_id)
+        await asyncio.sleep(0.01)
+        return dict(results[video_id])
+
+    monkeypatch.setattr(service, "_fetch_with_ytdlp", fake_ytdlp)
+    return service, calls
+
+
+def test_transcripts_are_cached_and_coalesced(store, monkeypatch):
+    ok = {"success": True, "transcript": "héllo wörld", "segments": [{"start": 0, "text": "héllo"}]}
+    service, calls = _service(monkeypatch, {"aaaaaaaaaaa": ok})
+
+    async def run():
+        return await asyncio.gather(*[service.get_transcript("aaaaaaaaaaa") for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert calls == ["aaaaaaaaaaa"]
+    assert all(r == ok for r in results)
+    assert asyncio.run(service.get_transcript("aaaaaaaaaaa")) == ok
+    assert calls == ["aaaaaaaaaaa"]
+
+    service.clear_cache("aaaaaaaaaaa")
+    asyncio.run(service.get_transcript("aaaaaaaaaaa"))
+    assert len(calls) == 2
+
+
+def test_only_video_level_failures_are_negatively_cached(store, monkeypatch):
+    service, calls = _service(monkeypatch, {
+        "nocaptions1": {"success": False, "error": "No captions", "error_code": "no_captions"},
+        "timedout001": {"success": False, "error": "Request timed out", "error_code": "timeout"},
+        "forbidden01": {"success": False, "error": "HTTP Error 403", "error_code": "forbidden"},
+        "subsfailed1": {"success": False, "error": "Please try again.", "error_code": "subtitle_download_failed"},
+    })
+    for _ in range(2):
+        assert asyncio.run(service.get_transcript("nocaptions1"))["error_code"] == "no_captions"
+        for video_id in ("timedout001", "forbidden01", "subsfailed1"):
+            asyncio.run(service.get_transcript(video_id))
+    assert calls == ["nocaptions1"] + ["timedout001", "forbidden01", "subsfailed1"] * 2
+
+    monkeypatch.setattr(transcript_cache, "NEGATIVE_TTL", 0)
+    service.clear_cache("nocaptions1")
+    asyncio.run(service.get_transcript("nocaptions1"))
+    asyncio.run(service.get_transcript("nocaptions1"))
+    assert calls.count("nocaptions1") == 3
+
+
+def test_entries_are_bounded_least_recently_used_first(store, tmp_path):
+    if store == "redis":
+        backend = transcript_cache.RedisStore(redis_cache._redis_client, max_entries=2)
+    else:
+        backend = transcript_cache.FileStore(tmp_path, max_entries=2)
+    for i, key in enumerate(["a", "b", "c"]):
+        backend.set(key, {"n": i}, 60)
+        if store == "file":
+            os.utime(tmp_path / f"{key}.json.z", (1000 + i, 1000 + i))
+        if key == "b":
+            assert backend.get("a") == {"n": 0}
+            if store == "file":
+                os.utime(tmp_path / "a.json.z", (1001.5, 1001.5))
+    if store == "file":
+        backend.evict()
+    assert backend.get("a") == {"n": 0}
+    assert backend.get("b") is None
+    assert backend.get("c") == {"n": 2}
+
+
+def test_legacy_json_files_are_migrated(store, monkeypatch, tmp_path):
+    (tmp_path / "legacy00001.json").write_text('{\n  "success": true,\n  "transcript": "old"\n}', encoding="utf-8")
+    service, calls = _service(monkeypatch, {})
+    assert asyncio.run(service.get_transcript("legacy00001"))["transcript"] == "old"
+    assert not (tmp_path / "legacy00001.json").exists()
+    assert asyncio.run(service.get_transcript("legacy00001"))["transcript"] == "old"
+    assert calls == []
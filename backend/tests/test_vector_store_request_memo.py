@@ -0,0 +1,96 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import vector_store as vs
+
+# Load tutor/chroma_store.py directly: other test modules replace the `tutor`
+# package in sys.modules with stubs.
+_spec = importlib.util.spec_from_file_location("chroma_store_under_test", BACKEND_ROOT / "tutor" / "chroma_store.py")
+chroma_store = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(chroma_store)
+
+_original_build_where = vs._build_where
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return [[float(len(t))] + [0.0] * 383 for t in texts]
+
+
+def _init_store(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'vs.db'}"
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                CREATE TABLE embeddings (
+                    id TEXT NOT NULL,
+                    collection TEXT NOT NULL,
+                    user_id TEXT,
+                    content TEXT NOT NULL,
+                    embedding TEXT,
+                    metadata TEXT DEFAULT '{}',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (collection, id)
+                )
+                """
+            )
+        )
+    model = CountingModel()
+    vs.initialize(model, db_url)
+    return model
+
+
+def test_request_memo_embeds_once_and_probes_once(tmp_path, monkeypatch):
+    model = _init_store(tmp_path)
+    chroma_store.write_episode("7", "reviewed photosynthesis cards", {"source": "flashcard_review"})
+    model.calls = 0
+
+    probes = []
+
+    def counting_build_where(*args, **kwargs):
+        probes.append(args)
+        return _original_build_where(*args, **kwargs)
+
+    monkeypatch.setattr(vs, "_build_where", counting_build_where)
+    token = vs.begin_request_memo()
+    try:
+        first = chroma_store.retrieve_episodes_filtered("7", "photosynthesis", source_filter="flashcard_review")
+        second = chroma_store.retrieve_episodes_filtered("7", "photosynthesis", source_filter="flashcard_created")
+        assert vs.has_rows("episodic", "7") is True
+    finally:
+        vs.clear_request_memo(token)
+
+    assert [r["document"] for r in first] == ["reviewed photosynthesis cards"]
+    assert second == []
+    assert model.calls == 1
+    assert len(probes) == 1
+
+    chroma_store.retrieve_episodes_filtered("7", "photosynthesis")
+    assert model.calls == 2
+
+
+def test_request_memo_tracks_writes_and_deletes(tmp_path):
+    _init_store(tmp_path)
+    token = vs.begin_request_memo()
+    try:
+        assert vs.has_rows("important", "9") is False
+        chroma_store.write_important("9", "prefers worked examples")
+        assert vs.has_rows("important", "9") is True
+        vs.delete("important", ids=["missing"], user_id="9")
+        assert vs.has_rows("important", "9") is True
+    finally:
+        vs.clear_request_memo(token)
+
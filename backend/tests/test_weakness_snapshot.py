@@ -0,0 +1,183 @@
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+import models
+from database import Base
+from services import comprehensive_weakness_analyzer as cwa
+from services import redis_cache
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setattr(redis_cache, "_redis_client", None)
+    monkeypatch.setattr(redis_cache, "_fallback", {})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        models.User.__table__,
+        models.UserWeakArea.__table__,
+        models.TopicMastery.__table__,
+        models.FlashcardSet.__table__,
+        models.Flashcard.__table__,
+        models.FlashcardStudySession.__table__,
+        models.FlashcardDueQueue.__table__,
+        models.FlashcardSRCounters.__table__,
+        models.ChatSession.__table__,
+        models.ChatMessage.__table__,
+    ])
+    session = sessionmaker(bind=engine)()
+    session.add(models.User(id=1, username="ada", email="ada@example.com"))
+    session.add(models.UserWeakArea(
+        user_id=1, topic="Algebra", total_questions=10, correct_count=4, incorrect_count=6,
+        accuracy=40.0, weakness_score=60.0, priority=7, status="needs_practice",
+    ))
+    session.add(models.TopicMastery(user_id=1, topic_name="Geometry", questions_asked=10, correct_answers=9, mastery_level=0.9))
+    session.add(models.TopicMastery(user_id=1, topic_name="Calculus", questions_asked=6, correct_answers=2, mastery_level=0.3))
+    cards = models.FlashcardSet(id=1, user_id=1, title="Bio")
+    session.add(cards)
+    session.flush()
+    for i in range(4):
+        session.add(models.Flashcard(set_id=1, question=f"q{i}", answer="a", category="Photosynthesis",
+                                     times_reviewed=4, correct_count=1))
+    chat = models.ChatSession(id=1, user_id=1, title="chat")
+    session.add(chat)
+    session.flush()
+    for text in ("Help with algebra please", "more ALGEBRA", "what is calculus", "hello"):
+        session.add(models.ChatMessage(chat_session_id=1, user_id=1, user_message=text, ai_response="ok"))
+    session.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    yield SimpleNamespace(session=session, statements=statements)
+    session.close()
+    engine.dispose()
+
+
+def _areas(result):
+    return {a["topic"]: a for group in result["weak_areas"].values() for a in group}
+
+
+def test_matcher_agrees_with_substring_search():
+    rng = random.Random(5)
+    topics = ["cell", "cell biology", "ell", "bio", "logy", "a", "ab", "bab"]
+    matcher = cwa.TopicMatcher(topics)
+    for _ in range(300):
+        text = "".join(rng.choice("abcelogy ") for _ in range(rng.randint(0, 40)))
+        assert matcher.find(text) == {t for t in topics if t in text}
+    assert matcher.find("intro to cell biology") == {"cell", "cell biology", "ell", "bio", "logy"}
+
+
+def test_analysis_is_materialized_and_served_without_queries(db):
+    first = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    areas = _areas(first)
+
+    assert set(areas) == {"Algebra", "Calculus", "photosynthesis"}
+    assert areas["Algebra"]["chat_analysis"] == {"is_doubtful": True, "mentions": 2}
+    assert areas["Calculus"]["chat_analysis"]["mentions"] == 1
+    assert areas["photosynthesis"]["flashcard_performance"]["total_cards"] == 4
+    assert areas["photosynthesis"]["accuracy"] == 25.0
+    assert [s["topic"] for s in first["strengths"]] == ["Geometry"]
+    persisted = db.session.query(models.UserWeakArea).filter_by(user_id=1, topic="photosynthesis").one()
+    assert persisted.accuracy == 25.0
+
+    db.statements.clear()
+    again = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert db.statements == []
+    assert again["weak_areas"] == first["weak_areas"]
+
+
+def test_events_refresh_only_the_parts_they_touch(db):
+    cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+
+    db.session.add(models.ChatMessage(chat_session_id=1, user_id=1, user_message="algebra again", ai_response="ok"))
+    db.session.commit()
+    cwa.note_learning_event(SimpleNamespace(student_id="1", source="chat", raw_data={}))
+    db.statements.clear()
+    result = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert len(db.statements) == 1 and "chat_messages" in db.statements[0]
+    assert _areas(result)["Algebra"]["chat_analysis"]["mentions"] == 3
+
+    for card in db.session.query(models.Flashcard).all():
+        card.correct_count = 4
+    db.session.commit()
+    cwa.note_learning_event(SimpleNamespace(student_id="1", source="flashcard", raw_data={"category": "Photosynthesis"}))
+    db.statements.clear()
+    result = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert not any("chat_messages" in s for s in db.statements)
+    assert sum("FROM flashcards" in s for s in db.statements) == 1
+    area = _areas(result)["photosynthesis"]
+    assert area["flashcard_performance"]["struggling_cards"] == []
+
+
+def test_failed_refresh_keeps_the_dirty_marks(db, monkeypatch):
+    cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    db.session.add(models.ChatMessage(chat_session_id=1, user_id=1, user_message="algebra again", ai_response="ok"))
+    db.session.commit()
+    cwa.note_learning_event(SimpleNamespace(student_id="1", source="chat", raw_data={}))
+
+    refresh = cwa._refresh_snapshot
+    monkeypatch.setattr(cwa, "_refresh_snapshot", lambda *args: (_ for _ in ()).throw(RuntimeError("db down")))
+    with pytest.raises(RuntimeError):
+        cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+
+    monkeypatch.setattr(cwa, "_refresh_snapshot", refresh)
+    result = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert _areas(result)["Algebra"]["chat_analysis"]["mentions"] == 3
+
+
+def test_committed_weak_area_writes_refresh_the_snapshot(db):
+    cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+
+    db.session.add(models.UserWeakArea(
+        user_id=1, topic="Trigonometry", total_questions=3, correct_count=0, incorrect_count=3,
+        accuracy=0.0, weakness_score=55.0, priority=8, status="needs_practice",
+    ))
+    db.session.query(models.UserWeakArea).filter_by(user_id=1, topic="Algebra").one().status = "mastered"
+    db.session.commit()
+    db.statements.clear()
+    result = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert not any("chat_messages" in s or "FROM flashcards" in s for s in db.statements)
+    assert "Trigonometry" in _areas(result) and "Algebra" not in _areas(result)
+
+    db.statements.clear()
+    cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert db.statements == []
+
+    db.session.add(models.UserWeakArea(user_id=1, topic="Rolled back", status="needs_practice"))
+    db.session.flush()
+    db.session.rollback()
+    assert redis_cache.pop_weakness_dirty(1) == set()
+
+
+def test_tutor_verdicts_from_chat_refresh_the_snapshot(db):
+    chat = pytest.importorskip("routes.chat")
+    cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+
+    recorded = chat._record_tutor_weakness_signals(
+        db.session, 1, {"verdict": "not_yet", "objective": "Vectors", "misconceptions": ["dot product"]},
+    )
+    db.session.commit()
+    result = cwa.get_comprehensive_weakness_analysis(db.session, 1, models)
+    assert recorded and set(recorded) <= set(_areas(result))
+
+
+def test_stats_reset_refreshes_the_snapshot(db):
+    import asyncio
+
+    from routes import analytics
+
+    assert "Calculus" in _areas(cwa.get_comprehensive_weakness_analysis(db.session, 1, models))
+
+    asyncio.run(analytics.reset_user_stats(payload={"user_id": "ada"}, db=db.session))
+
+    assert "Calculus" not in _areas(cwa.get_comprehensive_weakness_analysis(db.session, 1, models))
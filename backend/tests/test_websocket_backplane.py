@@ -0,0 +1,92 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from services import websocket_manager as wsm
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.accepted = False
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def _backplanes(kind, presence_ttl=60):
+    if kind == "memory":
+        shared = wsm.InMemoryBackplane(presence_ttl=presence_ttl)
+        return shared, shared
+    fakeredis = pytest.importorskip("fakeredis")
+    from fakeredis import aioredis
+
+    server = fakeredis.FakeServer()
+    return (
+        wsm.RedisBackplane(aioredis.FakeRedis(server=server, decode_responses=True), presence_ttl=presence_ttl),
+        wsm.RedisBackplane(aioredis.FakeRedis(server=server, decode_responses=True), presence_ttl=presence_ttl),
+    )
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_message_reaches_socket_held_by_another_worker(kind):
+    async def scenario():
+        plane_a, plane_b = _backplanes(kind)
+        worker_a = wsm.ConnectionManager(plane_a, node_id="worker-a")
+        worker_b = wsm.ConnectionManager(plane_b, node_id="worker-b")
+        await worker_a.start()
+        await worker_b.start()
+        try:
+            socket = FakeWebSocket()
+            await worker_b.connect(socket, 7)
+            assert await worker_a.is_online(7)
+
+            assert await worker_a.send_personal_message({"type": "battle_challenge", "battle": {"id": 3}}, 7)
+            assert await worker_a.broadcast({"type": "battle_started", "battle_id": 3}, [7, 8]) == 1
+            await _wait_for(lambda: len(socket.sent) == 2)
+            assert [m["type"] for m in socket.sent] == ["battle_challenge", "battle_started"]
+            assert socket.sent[0]["battle"] == {"id": 3}
+
+            await worker_b.disconnect(socket, 7)
+            assert not await worker_a.is_online(7)
+            assert not await worker_a.send_personal_message({"type": "battle_completed"}, 7)
+        finally:
+            await worker_a.stop()
+            await worker_b.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("kind", ["memory", "redis"])
+def test_presence_expires_without_heartbeats(kind):
+    async def scenario():
+        plane, _ = _backplanes(kind, presence_ttl=1)
+        await plane.start("worker-a", lambda user_id, message: asyncio.sleep(0))
+        try:
+            await plane.heartbeat("worker-a", [11])
+            assert await plane.is_online(11)
+            await asyncio.sleep(1.1)
+            assert not await plane.is_online(11)
+            await plane.heartbeat("worker-a", [11])
+            assert await plane.is_online(11)
+        finally:
+            await plane.stop("worker-a")
+
+    asyncio.run(scenario())
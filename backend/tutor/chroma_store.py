@@ -5,6 +5,7 @@ import logging
 from datetime import datetime, timezone
 from typing import Optional
 
+from services import redis_cache
 from services import vector_store as vs
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,7 @@ def write_episode(user_id: str, summary: str, metadata: Optional[dict] = None):
     meta.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
     meta.setdefault("source", "chat")
     vs.upsert("episodic", str(uuid.uuid4()), summary, embedding, meta, user_id=str(user_id))
+    redis_cache.invalidate_suggestion_context(str(user_id))
 
 def retrieve_episodes(
     user_id: str,
@@ -34,7 +36,7 @@ def retrieve_episodes(
 ) -> list[str]:
     if not available():
         return []
-    if vs.count("episodic", user_id=str(user_id)) == 0:
+    if not vs.has_rows("episodic", user_id=str(user_id)):
         return []
     # Ordinary chat memory must never cross conversation boundaries. Historical
     # rows without a chat_session_id are intentionally excluded here.
@@ -57,7 +59,7 @@ def retrieve_episodes_filtered(
 ) -> list[dict]:
     if not available():
         return []
-    if vs.count("episodic", user_id=str(user_id)) == 0:
+    if not vs.has_rows("episodic", user_id=str(user_id)):
         return []
     where = {"source": source_filter} if source_filter else None
     rows = vs.search("episodic", vs.embed(query), top_k, user_id=str(user_id), where=where)
@@ -68,7 +70,7 @@ def retrieve_episodes_filtered(
 def retrieve_recent_by_source(user_id: str, source: str, top_k: int = 10) -> list[dict]:
     if not available():
         return []
-    if vs.count("episodic", user_id=str(user_id)) == 0:
+    if not vs.has_rows("episodic", user_id=str(user_id)):
         return []
     rows = vs.search(
         "episodic",
@@ -91,11 +93,12 @@ def write_important(user_id: str, summary: str, metadata: Optional[dict] = None)
     meta.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
     meta.setdefault("source", "important")
     vs.upsert("important", str(uuid.uuid4()), summary, embedding, meta, user_id=str(user_id))
+    redis_cache.invalidate_suggestion_context(str(user_id))
 
 def retrieve_important(user_id: str, query: str = "", top_k: int = 10) -> list[dict]:
     if not available():
         return []
-    if vs.count("important", user_id=str(user_id)) == 0:
+    if not vs.has_rows("important", user_id=str(user_id)):
         return []
     rows = vs.search(
         "important",
@@ -133,11 +136,12 @@ def write_quiz_result(
         "source": "quiz_result",
     })
     vs.upsert("quiz_history", str(uuid.uuid4()), summary, embedding, meta, user_id=str(user_id))
+    redis_cache.invalidate_suggestion_context(str(user_id))
 
 def retrieve_quiz_history(user_id: str, query: str = "", top_k: int = 10) -> list[dict]:
     if not available():
         return []
-    if vs.count("quiz_history", user_id=str(user_id)) == 0:
+    if not vs.has_rows("quiz_history", user_id=str(user_id)):
         return []
     rows = vs.search(
         "quiz_history",
@@ -149,10 +153,39 @@ def retrieve_quiz_history(user_id: str, query: str = "", top_k: int = 10) -> lis
     combined.sort(key=lambda x: x.get("metadata", {}).get("timestamp", ""), reverse=True)
     return combined
 
-def get_weak_quiz_topics(user_id: str, score_threshold: float = 65.0, top_k: int = 5) -> list[str]:
+RECENT_SOURCES = ("note_activity", "flashcard_created", "chat", "flashcard_review", "quiz_created", "quiz_completed")
+
+def retrieve_recent_context(
+    user_id: str,
+    per_source: int = 5,
+    quiz_k: int = 20,
+    important_k: int = 3,
+) -> dict:
+    """Newest episodes per source plus recent quiz results and important
+    entries, fetched in one query and cached per user until the next write."""
+    empty = {"episodes": {}, "quiz_history": [], "important": []}
     if not available():
-        return []
-    history = retrieve_quiz_history(user_id, top_k=20)
+        return empty
+    uid = str(user_id)
+    cached = redis_cache.get_suggestion_context(uid)
+    if cached is not None and cached.get("per_source", 0) >= per_source:
+        return cached
+
+    groups = [("episodic", source, per_source) for source in RECENT_SOURCES]
+    groups.append(("quiz_history", None, quiz_k))
+    groups.append(("important", None, important_k))
+    rows = vs.recent_by_group(uid, groups)
+    entries = [[{"document": r["content"], "metadata": r["metadata"]} for r in group] for group in rows]
+    context = {
+        "per_source": per_source,
+        "episodes": dict(zip(RECENT_SOURCES, entries)),
+        "quiz_history": entries[len(RECENT_SOURCES)],
+        "important": entries[len(RECENT_SOURCES) + 1],
+    }
+    redis_cache.set_suggestion_context(uid, context)
+    return context
+
+def weak_topics_from_history(history: list[dict], score_threshold: float = 65.0, top_k: int = 5) -> list[str]:
     topic_scores: dict[str, list[float]] = {}
     for entry in history:
         meta = entry.get("metadata", {})
@@ -172,3 +205,9 @@ def get_weak_quiz_topics(user_id: str, score_threshold: float = 65.0, top_k: int
 
     weak.sort(key=lambda x: x[1])
     return [t for t, _ in weak[:top_k]]
+
+def get_weak_quiz_topics(user_id: str, score_threshold: float = 65.0, top_k: int = 5) -> list[str]:
+    if not available():
+        return []
+    history = retrieve_quiz_history(user_id, top_k=20)
+    return weak_topics_from_history(history, score_threshold, top_k)
@@ -5,6 +5,7 @@ from typing import Any, Optional
 
 from langgraph.graph import StateGraph, END
 
+from services import vector_store
 from tutor.state import TutorState
 from tutor import nodes
 
@@ -81,6 +82,8 @@ class TutorGraph:
             "_hs_ai_client": self.hs_ai_client,
             "_db_factory": self.db_factory,
         }
+        # One embedding/existence memo per turn, shared by every retrieval node.
+        memo_token = vector_store.begin_request_memo()
         try:
             result = await self._graph.ainvoke(initial_state)
             return {
@@ -95,6 +98,8 @@ class TutorGraph:
         except Exception as e:
             logger.error(f"Tutor graph failed: {e}")
             return {"response": "Something went wrong. Please try again.", "error": str(e)}
+        finally:
+            vector_store.clear_request_memo(memo_token)
 
 _tutor: Optional[TutorGraph] = None
 
@@ -310,7 +310,7 @@ const SlideExplorer = () => {
               <div className="se-slide-content-area">
                 <div className="se-slide-image-panel">
                   <img
-                    src={`${API_URL}/slide_image/${selectedSlide.id}/${currentSlide.slide_number}?token=${encodeURIComponent(token)}`}
+                    src={`${API_URL}/slide_image/${selectedSlide.id}/${currentSlide.slide_number}?format=auto&token=${encodeURIComponent(token)}`}
                     alt={`Slide ${currentSlide.slide_number}`}
                     className="se-slide-img"
                     onError={(e) => {
@@ -582,7 +582,7 @@ const SlideExplorer = () => {
                     {/* Thumbnail — image on top */}
                     <div className="se-set-thumbnail" style={{ background: `linear-gradient(135deg, ${color} 0%, ${color}dd 100%)` }}>
                       <img
-                        src={`${API_URL}/slide_image/${slide.id}/1`}
+                        src={`${API_URL}/slide_image/${slide.id}/1?scale=thumb&format=auto&token=${encodeURIComponent(token)}`}
                         alt={slide.filename}
                         className="se-set-thumb-img"
                         onError={(e) => { e.target.style.display = 'none'; }}
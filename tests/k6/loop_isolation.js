@@ -0,0 +1,75 @@
+// Event-loop isolation: a few users keep an `async def` handler that does
+// sync DB work (get_gamification_stats, uncached) busy while a steady stream
+// of cheap requests hits the liveness probe. With OFFLOAD_ASYNC_HANDLERS=true
+// that handler runs in the threadpool and the cheap endpoint's tail latency
+// should not track the slow one; with false it runs on the event loop. Run it
+// both ways to see the difference; the slow_report_ms and cheap_ms trends are
+// reported separately.
+//
+// Needs a test account (gamification routes are authenticated) and should
+// point at local/staging, never prod:
+//
+//   k6 run -e API_URL=http://localhost:8000/api \
+//          -e TEST_USERNAME=loadtest -e TEST_PASSWORD=... \
+//          tests/k6/loop_isolation.js
+
+import http from 'k6/http';
+import { check } from 'k6';
+import { Trend } from 'k6/metrics';
+import { API_URL, TEST_USERNAME, authHeaders } from './config.js';
+
+const SLOW_VUS = Number(__ENV.SLOW_VUS || 4);
+const CHEAP_RATE = Number(__ENV.CHEAP_RATE || 20);
+const DURATION = __ENV.DURATION || '1m';
+const CHEAP_P99_MS = Number(__ENV.CHEAP_P99_MS || 150);
+
+const slowReportMs = new Trend('slow_report_ms', true);
+const cheapMs = new Trend('cheap_ms', true);
+
+export const options = {
+  scenarios: {
+    slow_stats: {
+      executor: 'constant-vus',
+      vus: SLOW_VUS,
+      duration: DURATION,
+      exec: 'slowStats',
+    },
+    cheap_probe: {
+      executor: 'constant-arrival-rate',
+      rate: CHEAP_RATE,
+      timeUnit: '1s',
+      duration: DURATION,
+      preAllocatedVUs: 10,
+      maxVUs: 50,
+      exec: 'cheapProbe',
+    },
+  },
+  thresholds: {
+    'http_req_failed{scenario:cheap_probe}': ['rate<0.01'],
+    cheap_ms: [`p(99)<${CHEAP_P99_MS}`],
+  },
+};
+
+export function setup() {
+  const headers = authHeaders();
+  if (!headers) {
+    throw new Error('loop_isolation.js needs TEST_USERNAME/TEST_PASSWORD for the gamification scenario');
+  }
+  return { headers };
+}
+
+export function slowStats(data) {
+  const user = encodeURIComponent(TEST_USERNAME);
+  const res = http.get(
+    `${API_URL}/get_gamification_stats?user_id=${user}`,
+    { headers: data.headers, tags: { endpoint: 'slow_report' } },
+  );
+  slowReportMs.add(res.timings.duration);
+  check(res, { 'gamification stats returns 200': (r) => r.status === 200 });
+}
+
+export function cheapProbe() {
+  const res = http.get(`${API_URL}/health/live`, { tags: { endpoint: 'cheap' } });
+  cheapMs.add(res.timings.duration);
+  check(res, { 'liveness returns 200': (r) => r.status === 200 });
+}